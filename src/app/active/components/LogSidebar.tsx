@@ -16,8 +16,25 @@ import { RiSearchLine, RiCloseLine } from 'react-icons/ri';
 interface LogEntry {
   message: string;
   timestamp: string;
+  // Present on lines read from a log file: which file and the byte offset just past the line
+  file?: 'logs' | 'comfy';
+  offset?: number;
 }
 
+type LogFile = 'logs' | 'comfy';
+
+// Where the next older page of a log file ends; segment is set once paging has moved
+// on to rotated segments of the file
+interface OlderLogsCursor {
+  segment: number | null;
+  before: number | null;
+}
+
+// Lines requested per file when loading older logs
+const OLDER_PAGE_LINES = 200;
+// Streamed lines kept in memory; pages loaded with "Load older logs" come on top
+const MAX_LIVE_LOGS = 1000;
+
 type LogFilter = 'all' | 'app' | 'comfy';
 
 interface LogSidebarProps {
@@ -37,7 +54,9 @@ export default function LogSidebar(props: LogSidebarProps = {}) {
       setInternalIsOpen(value);
     }
   };
+  // Streamed lines (capped) and the older pages loaded above them (kept in full)
   const [logs, setLogs] = useState<LogEntry[]>([]);
+  const [olderLogs, setOlderLogs] = useState<LogEntry[]>([]);
   const [searchQuery, setSearchQuery] = useState('');
   const [logFilter, setLogFilter] = useState<LogFilter>('all');
   const [isConnected, setIsConnected] = useState(false);
@@ -46,6 +65,12 @@ export default function LogSidebar(props: LogSidebarProps = {}) {
   const [selectedVersion, setSelectedVersion] = useState<string>('');
   const logsEndRef = useRef<HTMLDivElement>(null);
   const eventSourceRef = useRef<EventSource | null>(null);
+  // Stream position of the last received event, used to resume without duplicates
+  const lastEventIdRef = useRef<string>('');
+  // Per file: where the next older page ends (null once the oldest segment is exhausted)
+  const olderCursorRef = useRef<Record<LogFile, OlderLogsCursor | null | undefined>>({ logs: undefined, comfy: undefined });
+  const [hasOlderLogs, setHasOlderLogs] = useState(false);
+  const [isLoadingOlder, setIsLoadingOlder] = useState(false);
 
   // Fetch selected version on mount
   useEffect(() => {
@@ -61,8 +86,9 @@ export default function LogSidebar(props: LogSidebarProps = {}) {
 
   useEffect(() => {
     if (isOpen && !eventSourceRef.current && selectedVersion) {
-      // Connect to log stream with version parameter
-      const eventSource = new EventSource(`/api/logs/stream?version=${encodeURIComponent(selectedVersion)}`);
+      // Connect to log stream with version parameter, resuming where the sidebar left off
+      const since = lastEventIdRef.current ? `&since=${encodeURIComponent(lastEventIdRef.current)}` : '';
+      const eventSource = new EventSource(`/api/logs/stream?version=${encodeURIComponent(selectedVersion)}${since}`);
       eventSourceRef.current = eventSource;
 
       eventSource.onopen = () => {
@@ -71,8 +97,26 @@ export default function LogSidebar(props: LogSidebarProps = {}) {
 
       eventSource.onmessage = (event) => {
         try {
+          if (event.lastEventId) {
+            lastEventIdRef.current = event.lastEventId;
+          }
           const data = JSON.parse(event.data);
-          setLogs((prev) => [...prev, data].slice(-1000)); // Keep last 1000 logs
+          if (data.gap) {
+            // Lines before this offset were not replayed, offer to load them
+            olderCursorRef.current[data.gap.file as LogFile] = { segment: null, before: data.gap.before };
+            setHasOlderLogs(true);
+            return;
+          }
+          // Batched events carry several lines in data.logs
+          const logEntries: LogEntry[] = Array.isArray(data.logs) ? data.logs : [data];
+          logEntries.forEach((entry) => {
+            if (entry.file && entry.offset !== undefined && olderCursorRef.current[entry.file] === undefined) {
+              // The first line seen from a file marks where older pages start
+              olderCursorRef.current[entry.file] = { segment: null, before: entry.offset - 1 };
+              setHasOlderLogs(true);
+            }
+          });
+          setLogs((prev) => [...prev, ...logEntries].slice(-MAX_LIVE_LOGS));
         } catch (error) {
           console.error('Error parsing log data:', error);
         }
@@ -92,6 +136,50 @@ export default function LogSidebar(props: LogSidebarProps = {}) {
     };
   }, [isOpen, selectedVersion]);
 
+  const loadOlderLogs = async () => {
+    if (!selectedVersion || isLoadingOlder) {
+      return;
+    }
+    setIsLoadingOlder(true);
+    try {
+      const pages = await Promise.all((['logs', 'comfy'] as LogFile[]).map(async (file) => {
+        const cursor = olderCursorRef.current[file];
+        if (!cursor) {
+          return [];
+        }
+        const params = new URLSearchParams({ version: selectedVersion, file, limit: String(OLDER_PAGE_LINES) });
+        if (cursor.before !== null) {
+          params.set('before', String(cursor.before));
+        }
+        if (cursor.segment !== null) {
+          params.set('segment', String(cursor.segment));
+        }
+        const res = await fetch(`/api/logs/page?${params.toString()}`);
+        if (!res.ok) {
+          olderCursorRef.current[file] = null;
+          return [];
+        }
+        const data = await res.json();
+        if (data.hasMore) {
+          olderCursorRef.current[file] = { segment: cursor.segment, before: data.before };
+        } else if (data.previousSegment) {
+          // Continue with the most recent rotated segment of this file
+          olderCursorRef.current[file] = { segment: data.previousSegment, before: null };
+        } else {
+          olderCursorRef.current[file] = null;
+        }
+        return (data.logs || []) as LogEntry[];
+      }));
+      const older = pages.flat();
+      setOlderLogs((prev) => [...older, ...prev]);
+      setHasOlderLogs(Object.values(olderCursorRef.current).some((cursor) => Boolean(cursor)));
+    } catch (error) {
+      console.error('Error loading older logs:', error);
+    } finally {
+      setIsLoadingOlder(false);
+    }
+  };
+
   // Auto-scroll to bottom when new logs arrive
   useEffect(() => {
     if (logsEndRef.current) {
@@ -136,7 +224,8 @@ export default function LogSidebar(props: LogSidebarProps = {}) {
   };
 
   // Filter logs based on selected filter and search query
-  const filteredLogs = logs.filter((log) => {
+  const allLogs = [...olderLogs, ...logs];
+  const filteredLogs = allLogs.filter((log) => {
     // Apply tag filter
     const matchesFilter = 
       logFilter === 'all' ||
@@ -275,6 +364,18 @@ export default function LogSidebar(props: LogSidebarProps = {}) {
             scrollbarSize={6}
           >
             <div style={{ paddingRight: '8px', fontFamily: 'monospace', fontSize: '12px' }}>
+              {hasOlderLogs && (
+                <Button
+                  variant="subtle"
+                  size="xs"
+                  fullWidth
+                  loading={isLoadingOlder}
+                  onClick={loadOlderLogs}
+                  mb="xs"
+                >
+                  Load older logs
+                </Button>
+              )}
               {filteredLogs.length === 0 ? (
                 <Text size="sm" c="dimmed" ta="center" py="xl">
                   {searchQuery ? 'No logs match your search' : 'No logs yet...'}
@@ -306,12 +407,15 @@ export default function LogSidebar(props: LogSidebarProps = {}) {
 
           <Group justify="space-between">
             <Text size="xs" c="dimmed">
-              {filteredLogs.length} / {logs.length} logs
+              {filteredLogs.length} / {allLogs.length} logs
             </Text>
             <Button
               variant="subtle"
               size="xs"
-              onClick={() => setLogs([])}
+              onClick={() => {
+                setLogs([]);
+                setOlderLogs([]);
+              }}
             >
               Clear
             </Button>
@@ -50,6 +50,8 @@ export default function ActivePage() {
   const [requirementsHistory, setRequirementsHistory] = useState<any[]>([]);
   const [selectedHistoryEntry, setSelectedHistoryEntry] = useState<string | null>(null);
   const [loadingHistory, setLoadingHistory] = useState(false);
+  const [historyCursor, setHistoryCursor] = useState<string | null>(null);
+  const [loadingMoreHistory, setLoadingMoreHistory] = useState(false);
   const [restoring, setRestoring] = useState(false);
   const [logsSidebarOpen, setLogsSidebarOpen] = useState(false);
   const [comfyUIOnline, setComfyUIOnline] = useState(false);
@@ -163,38 +165,45 @@ export default function ActivePage() {
 
       eventSource.onmessage = (event) => {
         try {
-          const logEntry = JSON.parse(event.data);
-          setRestartLogs((prev) => [...prev, logEntry]);
+          // The activation stream batches several lines into one { logs: [...] } event
+          const data = JSON.parse(event.data);
+          const logEntries: Array<{ message: string; timestamp: string }> = Array.isArray(data.logs) ? data.logs : [data];
+          setRestartLogs((prev) => [...prev, ...logEntries]);
           
-          const message = logEntry.message;
+          // Markers are handled line by line like separate events; a marker ends the
+          // checks for its own line only, so later lines in the batch are still seen
+          for (const logEntry of logEntries) {
+            const message = logEntry.message;
           
-          // Check for restart failures
-          if (message.includes('[ERROR]') || 
-              message.includes('Failed to install dependencies') ||
-              message.includes('ERROR:') ||
-              message.includes('ResolutionImpossible') ||
-              message.includes('Activation failed')) {
-            setComfyUIRestarting(false);
-            return;
-          }
+            // Check for restart failures
+            if (message.includes('[ERROR]') || 
+                message.includes('Failed to install dependencies') ||
+                message.includes('ERROR:') ||
+                message.includes('ResolutionImpossible') ||
+                message.includes('Activation failed')) {
+              setComfyUIRestarting(false);
+              continue;
+            }
           
-          // Check if ComfyUI is ready - look for messages indicating server started
-          if (message.includes('To see the GUI go to:') || 
-              message.includes('Starting server') ||
-              message.includes('Server started') ||
-              message.includes('Running on') ||
-              (message.includes('[COMFY]') && (message.includes('Running on') || message.includes('Server started')))) {
-            setComfyUIOnline(true);
-            setComfyUIRestarting(false);
-            // Refresh nodes list when restart completes
-            if (selectedVersion) {
-              fetchNodesForSpace(selectedVersion);
+            // Check if ComfyUI is ready - look for messages indicating server started
+            if (message.includes('To see the GUI go to:') || 
+                message.includes('Starting server') ||
+                message.includes('Server started') ||
+                message.includes('Running on') ||
+                (message.includes('[COMFY]') && (message.includes('Running on') || message.includes('Server started')))) {
+              setComfyUIOnline(true);
+              setComfyUIRestarting(false);
+              // Refresh nodes list when restart completes
+              if (selectedVersion) {
+                fetchNodesForSpace(selectedVersion);
+              }
+              // Keep logs visible for a bit, then auto-hide after 3 seconds
+              setTimeout(() => {
+                setShowRestartLogs(false);
+                setRestartLogs([]);
+              }, 3000);
+              continue;
             }
-            // Keep logs visible for a bit, then auto-hide after 3 seconds
-            setTimeout(() => {
-              setShowRestartLogs(false);
-              setRestartLogs([]);
-            }, 3000);
           }
         } catch (error) {
           console.error('Error parsing log data:', error);
@@ -264,6 +273,7 @@ export default function ActivePage() {
         
         if (historyResponse.ok && historyData.history) {
           setRequirementsHistory(historyData.history);
+          setHistoryCursor(historyData.nextCursor || null);
           // Select the most recent entry by default
           if (historyData.history.length > 0) {
             setSelectedHistoryEntry(historyData.history[0].id);
@@ -279,6 +289,26 @@ export default function ActivePage() {
     }
   };
 
+  // Older entries are fetched a page at a time
+  const loadMoreHistory = async () => {
+    if (!selectedVersion || !historyCursor) return;
+
+    setLoadingMoreHistory(true);
+    try {
+      const historyResponse = await fetch(`/api/spaces/${encodeURIComponent(selectedVersion)}/requirements/history?cursor=${encodeURIComponent(historyCursor)}`);
+      const historyData = await historyResponse.json();
+
+      if (historyResponse.ok && historyData.history) {
+        setRequirementsHistory(prev => [...prev, ...historyData.history]);
+        setHistoryCursor(historyData.nextCursor || null);
+      }
+    } catch (error) {
+      console.error('Error fetching history:', error);
+    } finally {
+      setLoadingMoreHistory(false);
+    }
+  };
+
   const loadHistoryDiff = async (entryId: string) => {
     if (!selectedVersion || !entryId) return;
     
@@ -966,6 +996,7 @@ export default function ActivePage() {
           setChangesDiff(null);
           setSelectedHistoryEntry(null);
           setRequirementsHistory([]);
+          setHistoryCursor(null);
         }}
         title={
           <Group gap="xs" align="center">
@@ -1151,6 +1182,17 @@ export default function ActivePage() {
                         </Paper>
                       );
                     })}
+                    {historyCursor && (
+                      <Button
+                        size="xs"
+                        variant="subtle"
+                        color="gray"
+                        onClick={loadMoreHistory}
+                        loading={loadingMoreHistory}
+                      >
+                        Load older entries
+                      </Button>
+                    )}
                   </Stack>
                 </ScrollArea>
               </Stack>
@@ -1,106 +1,37 @@
 import { NextRequest } from 'next/server';
-import { join } from 'path';
-import { spawn, exec, execFile } from 'child_process';
-import { existsSync, appendFileSync, mkdirSync, writeFileSync, createWriteStream, readFileSync, statSync } from 'fs';
-import { readdir, readFile, writeFile, mkdir } from 'fs/promises';
+import { basename, join } from 'path';
+import { spawn, exec, execFile, ChildProcess } from 'child_process';
+import { existsSync, mkdirSync, writeFileSync, readFileSync } from 'fs';
+import { readdir } from 'fs/promises';
 import { promisify } from 'util';
+import type { Readable } from 'stream';
+import { readGitMetadataForAll } from '../../utils/gitMetadata';
+import { readSpaceJson, updateSpaceJson } from '../../utils/spaceStore';
+import { cloneRepository } from '../../utils/gitMirror';
+import { runWithConcurrency, getConcurrencyLimit } from '../../utils/concurrency';
+import { LogSink, getLogSink, closeLogSink, rotateLogFile } from '../../utils/logSink';
+import { followLogFile } from '../../utils/logTailer';
+import { getSseLogBatcher, closeSseLogBatcher, LineSplitter } from '../../utils/sseLogBatcher';
+import { computeInstallFingerprint, readInstallState, writeInstallState } from '../../utils/installState';
+import { getWheelhouseArgs, schedulePrebuild } from '../../utils/wheelhouse';
+import { saveRequirementsHistory } from '../../utils/requirementsHistory';
+import { getVenvCommands, normalizeInstallerName, resolveInstaller, resolvePipInstaller, InstallerCommand } from '../../utils/installer';
 
 const execAsync = promisify(exec);
 const execFileAsync = promisify(execFile);
 
-// Helper function to check if requirements have changed
-async function hasRequirementsChanged(
-  spacePath: string,
-  currentContent: string
-): Promise<boolean> {
-  try {
-    const historyPath = join(spacePath, 'requirements_history');
-    
-    // If no history exists, this is the first entry
-    if (!existsSync(historyPath)) {
-      return true;
-    }
-
-    // Get the most recent history entry
-    const files = await readdir(historyPath);
-    const historyFiles = files
-      .filter(f => f.endsWith('.json'))
-      .sort()
-      .reverse();
-
-    if (historyFiles.length === 0) {
-      return true;
-    }
+// How long activation waits for the previous ComfyUI run to exit and flush its log
+const PREVIOUS_RUN_EXIT_TIMEOUT_MS = 10000;
 
-    // Read the most recent entry
-    const latestFile = historyFiles[0];
-    const latestPath = join(historyPath, latestFile);
-    const latestContent = await readFile(latestPath, 'utf-8');
-    const latestEntry = JSON.parse(latestContent);
-
-    // Compare with current content
-    const latestSnapshotPath = join(historyPath, `${latestEntry.id}_requirements.txt`);
-    if (!existsSync(latestSnapshotPath)) {
-      return true;
-    }
-
-    const latestSnapshot = await readFile(latestSnapshotPath, 'utf-8');
-    
-    // Normalize both contents for comparison (trim, sort lines)
-    const normalize = (content: string) => 
-      content.trim().split('\n').map(l => l.trim()).filter(l => l && !l.startsWith('#')).sort().join('\n');
-    
-    return normalize(currentContent) !== normalize(latestSnapshot);
-  } catch (error) {
-    // If we can't check, assume there's a change to be safe
-    console.error('Error checking requirements changes:', error);
-    return true;
-  }
-}
+// Settles once the ComfyUI process started by the last activation has exited and
+// its log sink is closed; null when none was started by this server
+let previousComfyRun: Promise<void> | null = null;
 
 // Helper function to save requirements history snapshot
-async function saveRequirementsHistory(
-  spacePath: string,
-  type: 'activation' | 'node_install',
-  nodeName?: string
-): Promise<void> {
+async function snapshotRequirements(spacePath: string): Promise<void> {
   try {
-    const requirementsPath = join(spacePath, 'requirements.txt');
-    if (!existsSync(requirementsPath)) {
-      return;
-    }
-
-    const requirementsContent = await readFile(requirementsPath, 'utf-8');
-
     // For activation, only save if there are changes
-    if (type === 'activation') {
-      const hasChanged = await hasRequirementsChanged(spacePath, requirementsContent);
-      if (!hasChanged) {
-        return; // No changes, don't save
-      }
-    }
-
-    const historyPath = join(spacePath, 'requirements_history');
-    if (!existsSync(historyPath)) {
-      await mkdir(historyPath, { recursive: true });
-    }
-
-    const timestamp = new Date().toISOString();
-    const id = `${Date.now()}_${Math.random().toString(36).substring(7)}`;
-
-    const historyEntry = {
-      id,
-      timestamp,
-      type,
-      nodeName: nodeName || undefined,
-      requirementsContent,
-    };
-
-    const entryPath = join(historyPath, `${id}.json`);
-    await writeFile(entryPath, JSON.stringify(historyEntry, null, 2), 'utf-8');
-
-    const snapshotPath = join(historyPath, `${id}_requirements.txt`);
-    await writeFile(snapshotPath, requirementsContent, 'utf-8');
+    await saveRequirementsHistory(spacePath, 'activation', undefined, { skipIfUnchanged: true });
   } catch (error) {
     // Silently fail - history tracking shouldn't break the main flow
     console.error('Error saving requirements history:', error);
@@ -141,9 +72,7 @@ async function getDefaultBranch(cloneUrl: string): Promise<string> {
 // Helper function to checkout default branch (main/master) after clone
 async function checkoutDefaultBranch(
   nodePath: string,
-  controller: ReadableStreamDefaultController,
-  encoder: TextEncoder,
-  logFile: string
+  log: (message: string) => void
 ): Promise<void> {
   try {
     // Try to get current branch
@@ -166,7 +95,7 @@ async function checkoutDefaultBranch(
     for (const branch of defaultBranches) {
       // Skip if already on this branch
       if (currentBranch === branch) {
-        sendLog(controller, encoder, `[APP] Already on default branch: ${branch}`, logFile);
+        log(`[APP] Already on default branch: ${branch}`);
         checkedOut = true;
         break;
       }
@@ -178,7 +107,7 @@ async function checkoutDefaultBranch(
           60000,
           'Timeout checking out branch'
         );
-        sendLog(controller, encoder, `[APP] Checked out default branch: ${branch}`, logFile);
+        log(`[APP] Checked out default branch: ${branch}`);
         checkedOut = true;
         break;
       } catch (error) {
@@ -189,32 +118,66 @@ async function checkoutDefaultBranch(
 
     if (!checkedOut) {
       // If neither main nor master exists, stay on current branch
-      sendLog(controller, encoder, `[WARN] Could not find main or master branch, staying on current branch: ${currentBranch}`, logFile);
+      log(`[WARN] Could not find main or master branch, staying on current branch: ${currentBranch}`);
     }
   } catch (error: any) {
-    sendLog(controller, encoder, `[WARN] Error checking out default branch: ${error.message}`, logFile);
+    log(`[WARN] Error checking out default branch: ${error.message}`);
   }
 }
 
-function sendLog(controller: ReadableStreamDefaultController, encoder: TextEncoder, message: string, logFile?: string) {
+// Returns false when the log file has fallen behind (see pauseUntilDrained)
+function sendLog(controller: ReadableStreamDefaultController, encoder: TextEncoder, message: string, logFile?: string): boolean {
   const timestamp = new Date().toISOString();
-  const logEntry = { message, timestamp };
-  const data = JSON.stringify(logEntry) + '\n\n';
-  controller.enqueue(encoder.encode(`data: ${data}`));
+  // Lines are coalesced into batched SSE events instead of one frame per line
+  getSseLogBatcher(controller, encoder).push({ message, timestamp });
   
-  // Save to log file if provided
+  // Queue for the buffered log file writer so logging never blocks the event loop
   if (logFile) {
-    try {
-      // Ensure the directory exists
-      const logDir = join(logFile, '..');
-      if (!existsSync(logDir)) {
-        mkdirSync(logDir, { recursive: true });
-      }
-      appendFileSync(logFile, `[${timestamp}] ${message}\n`);
-    } catch (error) {
-      console.error('Error writing to log file:', error);
+    return getLogSink(logFile).write(`[${timestamp}] ${message}\n`);
+  }
+  return true;
+}
+
+// Stops reading a child's output until the log file catches up, so the child blocks
+// on its pipe instead of the sink dropping its lines
+function pauseUntilDrained(output: Readable, sink: LogSink) {
+  output.pause();
+  void sink.waitForDrain().then(() => output.resume());
+}
+
+// Forward a child process's stdout and stderr to the stream as complete lines,
+// pausing the child while the log file is behind
+function pipeProcessOutput(
+  childProcess: ChildProcess,
+  controller: ReadableStreamDefaultController,
+  encoder: TextEncoder,
+  logFile: string,
+  mapLine: (line: string) => string = line => line
+) {
+  for (const output of [childProcess.stdout, childProcess.stderr]) {
+    if (!output) {
+      continue;
     }
+    const splitter = new LineSplitter();
+    output.on('data', (data) => {
+      const results = splitter.push(data).map(line => sendLog(controller, encoder, mapLine(line), logFile));
+      if (results.includes(false)) {
+        pauseUntilDrained(output, getLogSink(logFile));
+      }
+    });
+    output.on('end', () => {
+      splitter.end().forEach(line => sendLog(controller, encoder, mapLine(line), logFile));
+    });
+  }
+}
+
+// Output of a pip run whose failure activation tolerates. The frontends treat any
+// ERROR or ResolutionImpossible line as a failed activation, so report them as warnings.
+function downgradePipErrors(line: string): string {
+  if (!/ERROR|ResolutionImpossible/.test(line)) {
+    return line;
   }
+  return `[WARN] ${line.replace(/\[ERROR\]\s*|ERROR:\s*/g, '').replace(/ResolutionImpossible/g, 'resolution impossible')}`;
 }
 
 function runCommand(
@@ -233,15 +196,7 @@ function runCommand(
       shell: false,
     });
 
-    childProcess.stdout?.on('data', (data) => {
-      const output = data.toString();
-      sendLog(controller, encoder, output.trim(), logFile);
-    });
-
-    childProcess.stderr?.on('data', (data) => {
-      const output = data.toString();
-      sendLog(controller, encoder, output.trim(), logFile);
-    });
+    pipeProcessOutput(childProcess, controller, encoder, logFile);
 
     childProcess.on('close', (code) => {
       resolve(code || 0);
@@ -328,21 +283,6 @@ function isPythonCommand(commandPart: string): boolean {
   return /(^|[\\/])python(?:\d+)?(?:\.exe)?$/i.test(commandPart.trim());
 }
 
-type PipCommand = { command: string; args: string[]; display: string };
-
-function resolvePipCommand(pythonExec: string, venvPath: string): PipCommand {
-  const isWindows = process.platform === 'win32';
-  const pipPath = isWindows
-    ? join(venvPath, 'Scripts', 'pip.exe')
-    : join(venvPath, 'bin', 'pip');
-
-  if (existsSync(pipPath)) {
-    return { command: pipPath, args: [], display: pipPath };
-  }
-
-  return { command: pythonExec, args: ['-m', 'pip'], display: `${pythonExec} -m pip` };
-}
-
 async function ensurePip(
   pythonExec: string,
   controller: ReadableStreamDefaultController,
@@ -362,8 +302,7 @@ async function ensurePip(
 }
 
 async function updateRequirementsTxt(
-  pipCommand: string,
-  pipArgs: string[],
+  pipInfo: InstallerCommand,
   spacePath: string,
   controller: ReadableStreamDefaultController,
   encoder: TextEncoder,
@@ -372,9 +311,9 @@ async function updateRequirementsTxt(
   try {
     sendLog(controller, encoder, `[APP] Updating requirements.txt with installed packages...`, logFile);
     
-    const pipListProcess = spawn(pipCommand, [...pipArgs, 'list', '--format=freeze'], {
+    const pipListProcess = spawn(pipInfo.command, [...pipInfo.args, 'list', '--format=freeze'], {
       cwd: spacePath,
-      env: { ...process.env },
+      env: { ...process.env, ...pipInfo.env },
       shell: false,
     });
 
@@ -407,9 +346,6 @@ async function updateRequirementsTxt(
       const spaceJsonPath = join(spacePath, 'space.json');
       if (existsSync(spaceJsonPath)) {
         try {
-          const spaceJsonContent = readFileSync(spaceJsonPath, 'utf-8');
-          const spaceJson = JSON.parse(spaceJsonContent);
-          
           // Parse pip list output into dependencies array
           const dependencies = pipListOutput
             .trim()
@@ -418,10 +354,9 @@ async function updateRequirementsTxt(
             .map(line => line.trim());
           
           // Update dependencies in space.json
-          spaceJson.dependencies = dependencies;
-          
-          // Write updated space.json
-          writeFileSync(spaceJsonPath, JSON.stringify(spaceJson, null, 2), 'utf-8');
+          await updateSpaceJson(basename(spacePath), (spaceJson) => {
+            spaceJson.dependencies = dependencies;
+          });
           sendLog(controller, encoder, `[APP] space.json dependencies updated successfully`, logFile);
         } catch (error: any) {
           sendLog(controller, encoder, `[WARN] Error updating space.json: ${error.message}`, logFile);
@@ -437,9 +372,31 @@ async function updateRequirementsTxt(
   }
 }
 
+// Record the installed dependency state so the next activation can skip pip when nothing changed
+async function recordInstallState(
+  spaceId: string,
+  venvPath: string,
+  pythonVersion: string,
+  pythonExec: string,
+  controller: ReadableStreamDefaultController,
+  encoder: TextEncoder,
+  logFile: string
+): Promise<void> {
+  try {
+    // Re-read space.json since updateRequirementsTxt replaces dependencies with the pip freeze output
+    const spaceJson = await readSpaceJson(spaceId);
+    if (!spaceJson) {
+      throw new Error('space.json not found');
+    }
+    const dependencies: string[] = spaceJson.dependencies || [];
+    await writeInstallState(venvPath, dependencies, pythonVersion, pythonExec);
+  } catch (error: any) {
+    sendLog(controller, encoder, `[WARN] Could not record installed state: ${error.message}`, logFile);
+  }
+}
+
 async function createRequirementsBkpIfMissing(
-  pipCommand: string,
-  pipArgs: string[],
+  pipInfo: InstallerCommand,
   spacePath: string,
   controller: ReadableStreamDefaultController,
   encoder: TextEncoder,
@@ -456,9 +413,9 @@ async function createRequirementsBkpIfMissing(
 
     sendLog(controller, encoder, `[APP] requirements.bkp not found. Creating from pip list...`, logFile);
     
-    const pipListProcess = spawn(pipCommand, [...pipArgs, 'list', '--format=freeze'], {
+    const pipListProcess = spawn(pipInfo.command, [...pipInfo.args, 'list', '--format=freeze'], {
       cwd: spacePath,
-      env: { ...process.env },
+      env: { ...process.env, ...pipInfo.env },
       shell: false,
     });
 
@@ -493,46 +450,6 @@ async function createRequirementsBkpIfMissing(
   }
 }
 
-async function getGitBranchAndCommit(nodePath: string): Promise<{ branch: string | null; commitId: string | null }> {
-  try {
-    // Check if .git directory exists
-    const gitPath = join(nodePath, '.git');
-    if (!existsSync(gitPath)) {
-      return { branch: null, commitId: null };
-    }
-
-    // Get current branch
-    let branch: string | null = null;
-    try {
-      const { stdout: branchOutput } = await withTimeout(
-        execFileAsync('git', ['rev-parse', '--abbrev-ref', 'HEAD'], { cwd: nodePath }),
-        5000,
-        'Timeout getting git branch'
-      );
-      branch = branchOutput.trim() || null;
-    } catch (error) {
-      // Branch might not be available, continue
-    }
-
-    // Get current commit ID
-    let commitId: string | null = null;
-    try {
-      const { stdout: commitOutput } = await withTimeout(
-        execFileAsync('git', ['rev-parse', 'HEAD'], { cwd: nodePath }),
-        5000,
-        'Timeout getting git commit'
-      );
-      commitId = commitOutput.trim() || null;
-    } catch (error) {
-      // Commit might not be available, continue
-    }
-
-    return { branch, commitId };
-  } catch (error) {
-    return { branch: null, commitId: null };
-  }
-}
-
 async function updateCustomNodesGitInfo(
   spacePath: string,
   controller: ReadableStreamDefaultController,
@@ -557,15 +474,6 @@ async function updateCustomNodesGitInfo(
       return;
     }
 
-    // Read space.json
-    const spaceJsonContent = readFileSync(spaceJsonPath, 'utf-8');
-    const spaceJson = JSON.parse(spaceJsonContent);
-
-    // Ensure nodes array exists
-    if (!Array.isArray(spaceJson.nodes)) {
-      spaceJson.nodes = [];
-    }
-
     // Read all directories in custom_nodes
     const entries = await readdir(customNodesPath, { withFileTypes: true });
     const nodeDirectories = entries
@@ -575,47 +483,55 @@ async function updateCustomNodesGitInfo(
 
     sendLog(controller, encoder, `[APP] Found ${nodeDirectories.length} custom node directory(ies)`, logFile);
 
-    // Create a map of existing nodes by name for quick lookup
-    const nodesMap = new Map<string, any>();
-    spaceJson.nodes.forEach((node: any) => {
-      nodesMap.set(node.name, node);
-    });
+    // Read git info for all node directories concurrently from .git files (no git processes)
+    const gitMetadata = await readGitMetadataForAll(nodeDirectories.map(nodeName => join(customNodesPath, nodeName)));
 
-    // Update git info for each node directory
-    for (const nodeName of nodeDirectories) {
-      const nodePath = join(customNodesPath, nodeName);
-      const { branch, commitId } = await getGitBranchAndCommit(nodePath);
-
-      if (branch || commitId) {
-        // Find or create node entry
-        let node = nodesMap.get(nodeName);
-        if (!node) {
-          // Create new node entry
-          node = {
-            name: nodeName,
-            githubUrl: null,
-            commitId: null,
-            branch: null,
-            installedAt: new Date().toISOString(),
-            disabled: false
-          };
-          spaceJson.nodes.push(node);
-          nodesMap.set(nodeName, node);
-        }
+    // Apply the git info to the latest space.json through the space store, so changes
+    // made by other requests while we were scanning are kept
+    await updateSpaceJson(basename(spacePath), (spaceJson) => {
+      // Ensure nodes array exists
+      if (!Array.isArray(spaceJson.nodes)) {
+        spaceJson.nodes = [];
+      }
 
-        // Update git info
-        const updated = (node.branch !== branch) || (node.commitId !== commitId);
-        node.branch = branch;
-        node.commitId = commitId;
+      // Create a map of existing nodes by name for quick lookup
+      const nodesMap = new Map<string, any>();
+      spaceJson.nodes.forEach((node: any) => {
+        nodesMap.set(node.name, node);
+      });
+
+      // Update git info for each node directory
+      for (const nodeName of nodeDirectories) {
+        const { branch, commitId } = gitMetadata.get(join(customNodesPath, nodeName)) || { branch: null, commitId: null };
+
+        if (branch || commitId) {
+          // Find or create node entry
+          let node = nodesMap.get(nodeName);
+          if (!node) {
+            // Create new node entry
+            node = {
+              name: nodeName,
+              githubUrl: null,
+              commitId: null,
+              branch: null,
+              installedAt: new Date().toISOString(),
+              disabled: false
+            };
+            spaceJson.nodes.push(node);
+            nodesMap.set(nodeName, node);
+          }
 
-        if (updated) {
-          sendLog(controller, encoder, `[APP] Updated ${nodeName}: branch=${branch || 'N/A'}, commit=${commitId ? commitId.substring(0, 7) : 'N/A'}`, logFile);
+          // Update git info
+          const updated = (node.branch !== branch) || (node.commitId !== commitId);
+          node.branch = branch;
+          node.commitId = commitId;
+
+          if (updated) {
+            sendLog(controller, encoder, `[APP] Updated ${nodeName}: branch=${branch || 'N/A'}, commit=${commitId ? commitId.substring(0, 7) : 'N/A'}`, logFile);
+          }
         }
       }
-    }
-
-    // Write updated space.json
-    writeFileSync(spaceJsonPath, JSON.stringify(spaceJson, null, 2), 'utf-8');
+    });
     sendLog(controller, encoder, `[APP] space.json updated with custom_nodes git information`, logFile);
   } catch (error: any) {
     sendLog(controller, encoder, `[WARN] Error updating custom_nodes git info: ${error.message}`, logFile);
@@ -630,7 +546,8 @@ async function cloneComfyUI(
   commitId: string | null,
   controller: ReadableStreamDefaultController,
   encoder: TextEncoder,
-  logFile: string
+  logFile: string,
+  signal?: AbortSignal
 ): Promise<boolean> {
   try {
     const comfyUIPath = join(spacePath, 'ComfyUI');
@@ -658,54 +575,34 @@ async function cloneComfyUI(
       if (releaseTag) {
         // Clone specific release tag
         sendLog(controller, encoder, `[APP] Cloning release tag: ${releaseTag}`, logFile);
-        await withTimeout(
-          execFileAsync('git', ['clone', '--branch', releaseTag, '--depth', '1', cloneUrl, comfyUIPath]),
-          300000, // 5 minutes timeout
-          'Timeout cloning ComfyUI repository'
-        );
+        await cloneRepository(cloneUrl, comfyUIPath, { branch: releaseTag, depth: 1, signal });
       } else if (commitId) {
         // If we have a specific commit, clone without depth limit to ensure the commit is available
         if (branch) {
           // Clone specific branch (full history needed for specific commit)
           sendLog(controller, encoder, `[APP] Cloning branch ${branch} (full history for commit ${commitId.substring(0, 7)})...`, logFile);
-          await withTimeout(
-            execFileAsync('git', ['clone', '--branch', branch, cloneUrl, comfyUIPath]),
-            300000,
-            'Timeout cloning ComfyUI repository'
-          );
+          await cloneRepository(cloneUrl, comfyUIPath, { branch, commitId, signal });
         } else {
           // Clone default branch (full history needed for specific commit)
           sendLog(controller, encoder, `[APP] Cloning default branch (full history for commit ${commitId.substring(0, 7)})...`, logFile);
-          await withTimeout(
-            execFileAsync('git', ['clone', cloneUrl, comfyUIPath]),
-            300000,
-            'Timeout cloning ComfyUI repository'
-          );
+          await cloneRepository(cloneUrl, comfyUIPath, { commitId, signal });
         }
         
         // Checkout specific commit
         sendLog(controller, encoder, `[APP] Checking out commit: ${commitId.substring(0, 7)}`, logFile);
         await withTimeout(
-          execFileAsync('git', ['checkout', commitId], { cwd: comfyUIPath }),
+          execFileAsync('git', ['checkout', commitId], { cwd: comfyUIPath, signal }),
           60000, // 1 minute timeout
           'Timeout checking out commit'
         );
       } else if (branch) {
         // Clone specific branch (shallow clone is fine if no specific commit)
         sendLog(controller, encoder, `[APP] Cloning branch: ${branch}`, logFile);
-        await withTimeout(
-          execFileAsync('git', ['clone', '--branch', branch, '--depth', '1', cloneUrl, comfyUIPath]),
-          300000,
-          'Timeout cloning ComfyUI repository'
-        );
+        await cloneRepository(cloneUrl, comfyUIPath, { branch, depth: 1, signal });
       } else {
         // Clone default branch (shallow clone is fine if no specific commit)
         sendLog(controller, encoder, `[APP] Cloning default branch`, logFile);
-        await withTimeout(
-          execFileAsync('git', ['clone', '--depth', '1', cloneUrl, comfyUIPath]),
-          300000,
-          'Timeout cloning ComfyUI repository'
-        );
+        await cloneRepository(cloneUrl, comfyUIPath, { depth: 1, signal });
       }
 
       sendLog(controller, encoder, `[APP] ComfyUI cloned successfully`, logFile);
@@ -720,13 +617,89 @@ async function cloneComfyUI(
   }
 }
 
+// Insert a node name prefix after the leading tag so the frontend still recognises [APP]/[WARN]/[ERROR]
+function prefixNodeLog(nodeName: string, message: string): string {
+  const tagMatch = message.match(/^(\[[A-Z]+\])\s*([\s\S]*)$/);
+  if (tagMatch) {
+    return `${tagMatch[1]} [${nodeName}] ${tagMatch[2]}`;
+  }
+  return `[${nodeName}] ${message}`;
+}
+
+async function cloneCustomNode(
+  node: any,
+  customNodesPath: string,
+  log: (message: string) => void,
+  signal?: AbortSignal
+): Promise<void> {
+  const nodeName = node.name;
+  const nodePath = join(customNodesPath, nodeName);
+  const githubUrl = node.githubUrl;
+  const commitId = node.commitId;
+  const branch = node.branch;
+
+  log(`[APP] Cloning node...`);
+
+  // Ensure the URL ends with .git or add it
+  let cloneUrl = githubUrl.trim();
+  if (!cloneUrl.endsWith('.git')) {
+    cloneUrl = cloneUrl.endsWith('/') ? `${cloneUrl}.git` : `${cloneUrl}.git`;
+  }
+
+  // If no branch specified, detect and use default branch
+  let branchToUse = branch;
+  if (!branchToUse) {
+    log(`[APP] No branch specified, detecting default branch...`);
+    branchToUse = await getDefaultBranch(cloneUrl);
+    log(`[APP] Using default branch: ${branchToUse}`);
+  }
+
+  if (commitId) {
+    // If we have a specific commit, clone without depth limit to ensure the commit is available
+    if (branchToUse) {
+      // Clone specific branch or default branch (full history needed for specific commit)
+      log(`[APP] Cloning branch ${branchToUse} (full history for commit ${commitId.substring(0, 7)})...`);
+      await cloneRepository(cloneUrl, nodePath, { branch: branchToUse, commitId, signal });
+    } else {
+      // Clone default branch (full history needed for specific commit)
+      log(`[APP] Cloning default branch (full history for commit ${commitId.substring(0, 7)})...`);
+      await cloneRepository(cloneUrl, nodePath, { commitId, signal });
+    }
+
+    // Checkout specific commit
+    log(`[APP] Checking out commit ${commitId.substring(0, 7)}`);
+    await withTimeout(
+      execFileAsync('git', ['checkout', commitId], { cwd: nodePath, signal }),
+      60000, // 1 minute timeout
+      `Timeout checking out commit for ${nodeName}`
+    );
+  } else if (branchToUse) {
+    // Clone specific branch or default branch (shallow clone is fine if no specific commit)
+    log(`[APP] Cloning branch ${branchToUse}...`);
+    await cloneRepository(cloneUrl, nodePath, { branch: branchToUse, depth: 1, signal });
+
+    // Always checkout default branch (main/master) after clone
+    await checkoutDefaultBranch(nodePath, log);
+  } else {
+    // Clone default branch (shallow clone is fine if no specific commit)
+    log(`[APP] Cloning default branch...`);
+    await cloneRepository(cloneUrl, nodePath, { depth: 1, signal });
+
+    // Always checkout default branch (main/master) after clone
+    await checkoutDefaultBranch(nodePath, log);
+  }
+
+  log(`[APP] Node cloned successfully`);
+}
+
 async function cloneCustomNodes(
   spacePath: string,
   nodes: any[],
   controller: ReadableStreamDefaultController,
   encoder: TextEncoder,
-  logFile: string
-): Promise<void> {
+  logFile: string,
+  signal?: AbortSignal
+): Promise<string[]> {
   try {
     const comfyUIPath = join(spacePath, 'ComfyUI');
     const customNodesPath = join(comfyUIPath, 'custom_nodes');
@@ -734,7 +707,7 @@ async function cloneCustomNodes(
     // Ensure ComfyUI exists first
     if (!existsSync(comfyUIPath)) {
       sendLog(controller, encoder, `[WARN] ComfyUI not found, cannot clone custom nodes`, logFile);
-      return;
+      return [];
     }
 
     // Ensure custom_nodes directory exists
@@ -744,11 +717,13 @@ async function cloneCustomNodes(
 
     if (!Array.isArray(nodes) || nodes.length === 0) {
       sendLog(controller, encoder, `[INFO] No custom nodes found in space.json`, logFile);
-      return;
+      return [];
     }
 
     sendLog(controller, encoder, `[APP] Checking and cloning ${nodes.length} custom node(s)...`, logFile);
 
+    // Work out which nodes actually need cloning before starting the pool
+    const nodesToClone: any[] = [];
     for (const node of nodes) {
       // Skip disabled nodes
       if (node.disabled) {
@@ -756,102 +731,54 @@ async function cloneCustomNodes(
         continue;
       }
 
-      const nodeName = node.name;
-      const nodePath = join(customNodesPath, nodeName);
-      const githubUrl = node.githubUrl;
-      const commitId = node.commitId;
-      const branch = node.branch;
-
       // Check if node already exists
-      if (existsSync(nodePath)) {
-        sendLog(controller, encoder, `[INFO] Node ${nodeName} already exists, skipping`, logFile);
+      if (existsSync(join(customNodesPath, node.name))) {
+        sendLog(controller, encoder, `[INFO] Node ${node.name} already exists, skipping`, logFile);
         continue;
       }
 
       // Skip if no GitHub URL
-      if (!githubUrl) {
-        sendLog(controller, encoder, `[WARN] Node ${nodeName} has no GitHub URL, skipping`, logFile);
+      if (!node.githubUrl) {
+        sendLog(controller, encoder, `[WARN] Node ${node.name} has no GitHub URL, skipping`, logFile);
         continue;
       }
 
-      sendLog(controller, encoder, `[APP] Cloning node: ${nodeName}...`, logFile);
+      nodesToClone.push(node);
+    }
 
-      try {
-        // Ensure the URL ends with .git or add it
-        let cloneUrl = githubUrl.trim();
-        if (!cloneUrl.endsWith('.git')) {
-          cloneUrl = cloneUrl.endsWith('/') ? `${cloneUrl}.git` : `${cloneUrl}.git`;
-        }
+    if (nodesToClone.length === 0) {
+      sendLog(controller, encoder, `[APP] All custom nodes are already present`, logFile);
+      return [];
+    }
 
-        // If no branch specified, detect and use default branch
-        let branchToUse = branch;
-        if (!branchToUse) {
-          sendLog(controller, encoder, `[APP] No branch specified for ${nodeName}, detecting default branch...`, logFile);
-          branchToUse = await getDefaultBranch(cloneUrl);
-          sendLog(controller, encoder, `[APP] Using default branch: ${branchToUse}`, logFile);
-        }
+    // Clone nodes in parallel, bounded by NODE_CLONE_CONCURRENCY (default 4)
+    const concurrency = getConcurrencyLimit(process.env.NODE_CLONE_CONCURRENCY, 4);
+    sendLog(controller, encoder, `[APP] Cloning ${nodesToClone.length} node(s) with concurrency ${concurrency}...`, logFile);
 
-        if (commitId) {
-          // If we have a specific commit, clone without depth limit to ensure the commit is available
-          if (branchToUse) {
-            // Clone specific branch or default branch (full history needed for specific commit)
-            sendLog(controller, encoder, `[APP] Cloning branch ${branchToUse} (full history for commit ${commitId.substring(0, 7)})...`, logFile);
-            await withTimeout(
-              execFileAsync('git', ['clone', '--branch', branchToUse, cloneUrl, nodePath]),
-              300000, // 5 minutes timeout
-              `Timeout cloning ${nodeName}`
-            );
-          } else {
-            // Clone default branch (full history needed for specific commit)
-            sendLog(controller, encoder, `[APP] Cloning default branch (full history for commit ${commitId.substring(0, 7)})...`, logFile);
-            await withTimeout(
-              execFileAsync('git', ['clone', cloneUrl, nodePath]),
-              300000,
-              `Timeout cloning ${nodeName}`
-            );
-          }
-          
-          // Checkout specific commit
-          sendLog(controller, encoder, `[APP] Checking out commit ${commitId.substring(0, 7)} for ${nodeName}`, logFile);
-          await withTimeout(
-            execFileAsync('git', ['checkout', commitId], { cwd: nodePath }),
-            60000, // 1 minute timeout
-            `Timeout checking out commit for ${nodeName}`
-          );
-        } else if (branchToUse) {
-          // Clone specific branch or default branch (shallow clone is fine if no specific commit)
-          sendLog(controller, encoder, `[APP] Cloning branch ${branchToUse}...`, logFile);
-          await withTimeout(
-            execFileAsync('git', ['clone', '--branch', branchToUse, '--depth', '1', cloneUrl, nodePath]),
-            300000, // 5 minutes timeout
-            `Timeout cloning ${nodeName}`
-          );
-          
-          // Always checkout default branch (main/master) after clone
-          await checkoutDefaultBranch(nodePath, controller, encoder, logFile);
-        } else {
-          // Clone default branch (shallow clone is fine if no specific commit)
-          sendLog(controller, encoder, `[APP] Cloning default branch...`, logFile);
-          await withTimeout(
-            execFileAsync('git', ['clone', '--depth', '1', cloneUrl, nodePath]),
-            300000,
-            `Timeout cloning ${nodeName}`
-          );
-          
-          // Always checkout default branch (main/master) after clone
-          await checkoutDefaultBranch(nodePath, controller, encoder, logFile);
-        }
+    const results = await runWithConcurrency(nodesToClone, concurrency, (node) =>
+      cloneCustomNode(node, customNodesPath, (message) =>
+        sendLog(controller, encoder, prefixNodeLog(node.name, message), logFile),
+        signal
+      )
+    );
 
-        sendLog(controller, encoder, `[APP] Node ${nodeName} cloned successfully`, logFile);
-      } catch (error: any) {
-        sendLog(controller, encoder, `[ERROR] Failed to clone node ${nodeName}: ${error.message}`, logFile);
-        // Continue with other nodes even if one fails
+    // Report failures per node; one failed clone never stops the others
+    let failedCount = 0;
+    results.forEach((result, index) => {
+      if (result.status === 'rejected') {
+        failedCount++;
+        const reason = result.reason instanceof Error ? result.reason.message : String(result.reason);
+        sendLog(controller, encoder, `[ERROR] Failed to clone node ${nodesToClone[index].name}: ${reason}`, logFile);
       }
-    }
+    });
 
-    sendLog(controller, encoder, `[APP] Finished cloning custom nodes`, logFile);
+    sendLog(controller, encoder, `[APP] Finished cloning custom nodes (${nodesToClone.length - failedCount} succeeded, ${failedCount} failed)`, logFile);
+    return nodesToClone
+      .filter((_, index) => results[index].status === 'fulfilled')
+      .map(node => node.name);
   } catch (error: any) {
     sendLog(controller, encoder, `[WARN] Error cloning custom nodes: ${error.message}`, logFile);
+    return [];
   }
 }
 
@@ -1006,6 +933,7 @@ export async function GET(request: NextRequest) {
   const encoder = new TextEncoder();
   const searchParams = request.nextUrl.searchParams;
   const version = searchParams.get('version');
+  const forceInstall = searchParams.get('force') === '1';
 
   if (!version) {
     return new Response('Version parameter is required', { status: 400 });
@@ -1020,28 +948,41 @@ export async function GET(request: NextRequest) {
       const comfyLogFilePath = join(spacePath, 'comfy-logs.txt');
       const comfyUIPath = join(spacePath, 'ComfyUI');
 
+      // Aborted when the stream ends early, killing any git process still cloning in the background
+      const cloneAbort = new AbortController();
+
+      // Flush pending log lines and close the stream, guarding against closing an already closed controller
+      let streamClosed = false;
+      const closeStream = () => {
+        cloneAbort.abort();
+        void closeLogSink(logFilePath);
+        if (streamClosed) {
+          return;
+        }
+        streamClosed = true;
+        closeSseLogBatcher(controller);
+        try {
+          controller.close();
+        } catch (error) {
+          // Stream already closed by the client
+        }
+      };
+
+      // Flush anything still buffered from a previous activation before the log is archived
+      await closeLogSink(logFilePath);
+
       // Ensure log directory exists
       try {
         if (!existsSync(spacePath)) {
           mkdirSync(spacePath, { recursive: true });
         }
-        // Clear or create log file
+        // Archive the previous activation's log as a segment, then start a fresh one
+        await rotateLogFile(logFilePath);
         writeFileSync(logFilePath, `=== Activation Log for ${version} - ${new Date().toISOString()} ===\n\n`);
       } catch (error) {
         console.error('Error setting up log file:', error);
       }
 
-      // Clear ComfyUI log file at the start of activation
-      try {
-        const comfyLogDir = join(comfyLogFilePath, '..');
-        if (!existsSync(comfyLogDir)) {
-          mkdirSync(comfyLogDir, { recursive: true });
-        }
-        writeFileSync(comfyLogFilePath, `=== ComfyUI Logs - ${new Date().toISOString()} ===\n\n`);
-      } catch (error) {
-        console.error('Error clearing ComfyUI log file:', error);
-      }
-
       // Track running processes for cancellation
       const runningProcesses: Array<{ process: any; kill: () => void }> = [];
       let isCancelled = false;
@@ -1058,7 +999,7 @@ export async function GET(request: NextRequest) {
             // Ignore errors when killing processes
           }
         });
-        controller.close();
+        closeStream();
       });
 
       try {
@@ -1076,73 +1017,150 @@ export async function GET(request: NextRequest) {
           sendLog(controller, encoder, `[APP] Port ${COMFYUI_PORT} is available`, logFilePath);
         }
 
+        // The previous run writes comfy-logs.txt until it exits; wait for its last
+        // lines to be flushed so it never writes into (or rotates) the new run's log
+        if (previousComfyRun) {
+          await withTimeout(previousComfyRun, PREVIOUS_RUN_EXIT_TIMEOUT_MS, 'Timeout waiting for the previous ComfyUI run to exit')
+            .catch((error) => sendLog(controller, encoder, `[WARN] ${error.message}`, logFilePath));
+        }
+
+        // Archive the previous ComfyUI log, then start a fresh one
+        try {
+          const comfyLogDir = join(comfyLogFilePath, '..');
+          if (!existsSync(comfyLogDir)) {
+            mkdirSync(comfyLogDir, { recursive: true });
+          }
+          await rotateLogFile(comfyLogFilePath);
+          writeFileSync(comfyLogFilePath, `=== ComfyUI Logs - ${new Date().toISOString()} ===\n\n`);
+        } catch (error) {
+          console.error('Error clearing ComfyUI log file:', error);
+        }
+
         if (isCancelled) {
-          controller.close();
+          closeStream();
           return;
         }
 
-        // Step 1: Activate venv and check if it exists
+        // Step 1: Clone ComfyUI and custom nodes in the background. Cloning is network and
+        // disk bound and does not need the venv, so it overlaps venv creation and the base
+        // dependency install. Resolves with the names of nodes cloned by this activation.
+        const cloneRepositories = async (): Promise<string[]> => {
+          let spaceJson: any;
+          try {
+            spaceJson = await readSpaceJson(version);
+            if (!spaceJson) {
+              return [];
+            }
+          } catch (error: any) {
+            sendLog(controller, encoder, `[WARN] Error reading space.json for cloning: ${error.message}`, logFilePath);
+            return [];
+          }
+
+          const metadata = spaceJson.metadata || {};
+          if (metadata.githubUrl) {
+            const comfyUICloned = await cloneComfyUI(
+              spacePath,
+              metadata.githubUrl,
+              metadata.releaseTag,
+              metadata.branch,
+              metadata.commitId,
+              controller,
+              encoder,
+              logFilePath,
+              cloneAbort.signal
+            );
+
+            if (!comfyUICloned) {
+              sendLog(controller, encoder, `[WARN] Failed to clone ComfyUI, but continuing...`, logFilePath);
+            }
+          } else {
+            sendLog(controller, encoder, `[INFO] No GitHub URL found in space.json metadata, skipping ComfyUI clone`, logFilePath);
+          }
+
+          if (isCancelled) {
+            return [];
+          }
+
+          // Custom nodes live inside the ComfyUI checkout, so they wait for it
+          const nodes = spaceJson.nodes || [];
+          if (nodes.length === 0) {
+            sendLog(controller, encoder, `[INFO] No custom nodes found in space.json`, logFilePath);
+            return [];
+          }
+          return cloneCustomNodes(spacePath, nodes, controller, encoder, logFilePath, cloneAbort.signal);
+        };
+        const cloneTask = existsSync(spaceJsonPath) ? cloneRepositories() : Promise.resolve([] as string[]);
+
+        // Step 2: Activate venv and check if it exists
         sendLog(controller, encoder, `[APP] Activating virtual environment for ${version}...`, logFilePath);
         
         if (isCancelled) {
-          controller.close();
+          closeStream();
           return;
         }
         
+        // The installer backend (pip or uv) is chosen per space in space.json metadata
+        let spaceMetadata: any = {};
+        try {
+          spaceMetadata = (await readSpaceJson(version))?.metadata || {};
+        } catch (error) {
+          // Fall back to defaults, missing space.json is reported further down
+        }
+        const installerName = normalizeInstallerName(spaceMetadata.installer);
+
         if (!existsSync(venvPath)) {
           sendLog(controller, encoder, `[APP] Virtual environment not found. Creating venv...`, logFilePath);
           
-          // Create venv with process tracking
-          const venvPython = isWindows ? 'python' : 'python3';
-          const venvProcess = spawn(venvPython, ['-m', 'venv', venvPath], {
-            cwd: spacePath,
-            env: { ...process.env },
-            shell: false,
-          });
-
-          const venvProcessKill = () => {
-            if (!venvProcess.killed) {
-              venvProcess.kill('SIGTERM');
-            }
-          };
-          runningProcesses.push({ process: venvProcess, kill: venvProcessKill });
+          // Create venv with process tracking, trying each candidate command until one succeeds
+          let venvCreateCode = 1;
+          for (const venvCommand of await getVenvCommands(installerName, venvPath, spaceMetadata.pythonVersion)) {
+            sendLog(controller, encoder, `[APP] Running: ${[venvCommand.command, ...venvCommand.args].join(' ')}`, logFilePath);
+            const venvProcess = spawn(venvCommand.command, venvCommand.args, {
+              cwd: spacePath,
+              env: { ...process.env },
+              shell: false,
+            });
 
-          let venvOutput = '';
-          venvProcess.stdout?.on('data', (data) => {
-            venvOutput += data.toString();
-            sendLog(controller, encoder, data.toString().trim(), logFilePath);
-          });
+            const venvProcessKill = () => {
+              if (!venvProcess.killed) {
+                venvProcess.kill('SIGTERM');
+              }
+            };
+            runningProcesses.push({ process: venvProcess, kill: venvProcessKill });
 
-          venvProcess.stderr?.on('data', (data) => {
-            venvOutput += data.toString();
-            sendLog(controller, encoder, data.toString().trim(), logFilePath);
-          });
+            pipeProcessOutput(venvProcess, controller, encoder, logFilePath);
 
-          const venvCreateCode = await new Promise<number>((resolve) => {
-            venvProcess.on('close', (code) => {
-              const index = runningProcesses.findIndex(p => p.process === venvProcess);
-              if (index !== -1) {
-                runningProcesses.splice(index, 1);
-              }
-              resolve(code || 0);
-            });
-            venvProcess.on('error', () => {
-              const index = runningProcesses.findIndex(p => p.process === venvProcess);
-              if (index !== -1) {
-                runningProcesses.splice(index, 1);
-              }
-              resolve(1);
+            venvCreateCode = await new Promise<number>((resolve) => {
+              venvProcess.on('close', (code) => {
+                const index = runningProcesses.findIndex(p => p.process === venvProcess);
+                if (index !== -1) {
+                  runningProcesses.splice(index, 1);
+                }
+                resolve(code || 0);
+              });
+              venvProcess.on('error', () => {
+                const index = runningProcesses.findIndex(p => p.process === venvProcess);
+                if (index !== -1) {
+                  runningProcesses.splice(index, 1);
+                }
+                resolve(1);
+              });
             });
-          });
+
+            if (venvCreateCode === 0 || isCancelled) {
+              break;
+            }
+            sendLog(controller, encoder, `[WARN] Failed to create venv with ${venvCommand.command}, trying next option...`, logFilePath);
+          }
           
           if (isCancelled) {
-            controller.close();
+            closeStream();
             return;
           }
           
           if (venvCreateCode !== 0) {
             sendLog(controller, encoder, `[ERROR] Failed to create virtual environment`, logFilePath);
-            controller.close();
+            closeStream();
             return;
           }
           sendLog(controller, encoder, `[APP] Virtual environment created successfully`, logFilePath);
@@ -1154,24 +1172,31 @@ export async function GET(request: NextRequest) {
         const pythonExec = isWindows 
           ? join(venvPath, 'Scripts', 'python.exe')
           : join(venvPath, 'bin', 'python3');
-        let pipInfo = resolvePipCommand(pythonExec, venvPath);
-        if (pipInfo.command === pythonExec) {
+        const resolvedInstaller = await resolveInstaller(installerName, venvPath);
+        let installer = resolvedInstaller.installer;
+        if (resolvedInstaller.fallbackReason) {
+          sendLog(controller, encoder, `[WARN] ${resolvedInstaller.fallbackReason}`, logFilePath);
+        }
+        if (installer.name === 'pip' && installer.command.command === pythonExec) {
           await ensurePip(pythonExec, controller, encoder, logFilePath);
-          pipInfo = resolvePipCommand(pythonExec, venvPath);
+          installer = resolvePipInstaller(venvPath);
         }
+        const pipInfo = installer.command;
 
         // Display Python and pip versions
         sendLog(controller, encoder, `[APP] Python executable: ${pythonExec}`, logFilePath);
+        let pythonVersion = '';
         try {
-          const pythonVersion = await getVersion(pythonExec, ['--version'], spacePath, process.env);
+          pythonVersion = await getVersion(pythonExec, ['--version'], spacePath, process.env);
           sendLog(controller, encoder, `[APP] Python version: ${pythonVersion}`, logFilePath);
         } catch (error: any) {
           sendLog(controller, encoder, `[WARN] Could not get Python version: ${error.message}`, logFilePath);
         }
 
+        sendLog(controller, encoder, `[APP] Installer: ${installer.name}`, logFilePath);
         sendLog(controller, encoder, `[APP] Pip command: ${pipInfo.display}`, logFilePath);
         try {
-          const pipVersion = await getVersion(pipInfo.command, [...pipInfo.args, '--version'], spacePath, process.env);
+          const pipVersion = await getVersion(pipInfo.command, [...pipInfo.args, '--version'], spacePath, { ...process.env, ...pipInfo.env });
           sendLog(controller, encoder, `[APP] Pip version: ${pipVersion}`, logFilePath);
         } catch (error: any) {
           sendLog(
@@ -1180,24 +1205,32 @@ export async function GET(request: NextRequest) {
             `[ERROR] Pip is not available. Install python3-venv (or python3-pip) and try again. Details: ${error.message}`,
             logFilePath
           );
-          controller.close();
+          closeStream();
           return;
         }
 
         if (isCancelled) {
-          controller.close();
+          closeStream();
           return;
         }
 
-        // Step 2: Install dependencies from space.json
+        // Step 3: Install dependencies from space.json
         let requirementsPath: string | null = null;
         if (existsSync(spaceJsonPath)) {
           try {
-            const spaceJsonContent = readFileSync(spaceJsonPath, 'utf-8');
-            const spaceJson = JSON.parse(spaceJsonContent);
-            const dependencies = spaceJson.dependencies || [];
+            const spaceJson = await readSpaceJson(version);
+            const dependencies = spaceJson?.dependencies || [];
+            const installFingerprint = computeInstallFingerprint(dependencies, pythonVersion, pythonExec);
+            const installState = await readInstallState(venvPath);
             
-            if (dependencies.length > 0) {
+            if (!forceInstall && pythonVersion && installState?.fingerprint === installFingerprint) {
+              // Nothing changed since the last successful install, go straight to launching
+              sendLog(controller, encoder, `[APP] Dependencies unchanged since last install (${installState.installedAt}), skipping pip install. Use force=1 to reinstall.`, logFilePath);
+            } else if (dependencies.length > 0) {
+              if (forceInstall) {
+                sendLog(controller, encoder, `[APP] Forced reinstall requested`, logFilePath);
+              }
+
               // Create temporary requirements.txt from space.json dependencies
               const tempRequirementsPath = join(spacePath, 'requirements_temp.txt');
               const requirementsContent = dependencies.map((dep: string) => dep).join('\n');
@@ -1205,13 +1238,17 @@ export async function GET(request: NextRequest) {
               requirementsPath = tempRequirementsPath;
               
               sendLog(controller, encoder, `[APP] Installing dependencies from space.json...`, logFilePath);
+
+              // Consult the shared wheelhouse before the index so prebuilt wheels install from local disk
+              const wheelhouseArgs = await getWheelhouseArgs(pythonExec);
+              if (wheelhouseArgs.length > 0) {
+                sendLog(controller, encoder, `[APP] Using local wheelhouse: ${wheelhouseArgs[1]}`, logFilePath);
+              }
               
               // Install requirements with process tracking
-              // Use --upgrade-strategy=only-if-needed to allow pip to resolve conflicts
-              // This will upgrade packages only if needed to satisfy dependencies
-              const pipProcess = spawn(pipInfo.command, [...pipInfo.args, 'install', '-r', requirementsPath, '--upgrade-strategy', 'only-if-needed'], {
+              const pipProcess = spawn(pipInfo.command, [...pipInfo.args, ...installer.installArgs(requirementsPath, wheelhouseArgs)], {
                 cwd: spacePath,
-                env: { ...process.env },
+                env: { ...process.env, ...pipInfo.env },
                 shell: false,
               });
 
@@ -1222,15 +1259,7 @@ export async function GET(request: NextRequest) {
               };
               runningProcesses.push({ process: pipProcess, kill: pipProcessKill });
 
-              pipProcess.stdout?.on('data', (data) => {
-                const output = data.toString();
-                sendLog(controller, encoder, output.trim(), logFilePath);
-              });
-
-              pipProcess.stderr?.on('data', (data) => {
-                const output = data.toString();
-                sendLog(controller, encoder, output.trim(), logFilePath);
-              });
+              pipeProcessOutput(pipProcess, controller, encoder, logFilePath);
 
               const pipInstallCode = await new Promise<number>((resolve) => {
                 pipProcess.on('close', (code) => {
@@ -1250,7 +1279,7 @@ export async function GET(request: NextRequest) {
               });
 
               if (isCancelled) {
-                controller.close();
+                closeStream();
                 return;
               }
 
@@ -1289,9 +1318,9 @@ export async function GET(request: NextRequest) {
                 writeFileSync(requirementsPath, adjustedContent, 'utf-8');
                 
                 // Try installation again with relaxed constraints
-                const retryPipProcess = spawn(pipInfo.command, [...pipInfo.args, 'install', '-r', requirementsPath, '--upgrade-strategy', 'only-if-needed'], {
+                const retryPipProcess = spawn(pipInfo.command, [...pipInfo.args, ...installer.installArgs(requirementsPath, wheelhouseArgs)], {
                   cwd: spacePath,
-                  env: { ...process.env },
+                  env: { ...process.env, ...pipInfo.env },
                   shell: false,
                 });
 
@@ -1302,15 +1331,7 @@ export async function GET(request: NextRequest) {
                 };
                 runningProcesses.push({ process: retryPipProcess, kill: retryPipProcessKill });
 
-                retryPipProcess.stdout?.on('data', (data) => {
-                  const output = data.toString();
-                  sendLog(controller, encoder, output.trim(), logFilePath);
-                });
-
-                retryPipProcess.stderr?.on('data', (data) => {
-                  const output = data.toString();
-                  sendLog(controller, encoder, output.trim(), logFilePath);
-                });
+                pipeProcessOutput(retryPipProcess, controller, encoder, logFilePath);
 
                 const retryPipCode = await new Promise<number>((resolve) => {
                   retryPipProcess.on('close', (code) => {
@@ -1330,13 +1351,13 @@ export async function GET(request: NextRequest) {
                 });
 
                 if (isCancelled) {
-                  controller.close();
+                  closeStream();
                   return;
                 }
 
                 if (retryPipCode !== 0) {
                   sendLog(controller, encoder, `[ERROR] Failed to install dependencies even after conflict resolution`, logFilePath);
-                  controller.close();
+                  closeStream();
                   return;
                 }
                 
@@ -1356,12 +1377,17 @@ export async function GET(request: NextRequest) {
               }
 
               // Update requirements.txt with pip list
-              await updateRequirementsTxt(pipInfo.command, pipInfo.args, spacePath, controller, encoder, logFilePath);
+              await updateRequirementsTxt(pipInfo, spacePath, controller, encoder, logFilePath);
+              await recordInstallState(version, venvPath, pythonVersion, pythonExec, controller, encoder, logFilePath);
+
+              // Capture anything pip just built or downloaded into the wheelhouse, in the background
+              schedulePrebuild();
             } else {
               sendLog(controller, encoder, `[INFO] No dependencies found in space.json`, logFilePath);
               
               // Still update requirements.txt with currently installed packages
-              await updateRequirementsTxt(pipInfo.command, pipInfo.args, spacePath, controller, encoder, logFilePath);
+              await updateRequirementsTxt(pipInfo, spacePath, controller, encoder, logFilePath);
+              await recordInstallState(version, venvPath, pythonVersion, pythonExec, controller, encoder, logFilePath);
             }
           } catch (error: any) {
             sendLog(controller, encoder, `[WARN] Error reading space.json: ${error.message}`, logFilePath);
@@ -1370,87 +1396,105 @@ export async function GET(request: NextRequest) {
           sendLog(controller, encoder, `[WARN] space.json not found, skipping dependency installation`, logFilePath);
         }
 
-        // Create requirements.bkp if it doesn't exist
-        await createRequirementsBkpIfMissing(pipInfo.command, pipInfo.args, spacePath, controller, encoder, logFilePath);
-
-        // Save requirements history snapshot after activation
-        await saveRequirementsHistory(spacePath, 'activation');
+        // Step 4: Wait for the clones, then install requirements of nodes cloned by this activation.
+        // This has to follow the base install since both write to the same venv.
+        const clonedNodes = await cloneTask;
 
         if (isCancelled) {
-          controller.close();
+          closeStream();
           return;
         }
 
-        // Step 2.5: Clone ComfyUI if it doesn't exist
-        if (existsSync(spaceJsonPath)) {
-          try {
-            const spaceJsonContent = readFileSync(spaceJsonPath, 'utf-8');
-            const spaceJson = JSON.parse(spaceJsonContent);
-            const metadata = spaceJson.metadata || {};
-            const githubUrl = metadata.githubUrl;
-            const releaseTag = metadata.releaseTag;
-            const branch = metadata.branch;
-            const commitId = metadata.commitId;
-
-            if (githubUrl) {
-              const comfyUICloned = await cloneComfyUI(
-                spacePath,
-                githubUrl,
-                releaseTag,
-                branch,
-                commitId,
-                controller,
-                encoder,
-                logFilePath
-              );
-
-              if (!comfyUICloned) {
-                sendLog(controller, encoder, `[WARN] Failed to clone ComfyUI, but continuing...`, logFilePath);
+        const nodeRequirementFiles = clonedNodes
+          .map(nodeName => ({ nodeName, path: join(comfyUIPath, 'custom_nodes', nodeName, 'requirements.txt') }))
+          .filter(file => existsSync(file.path));
+        if (nodeRequirementFiles.length > 0) {
+          const wheelhouseArgs = await getWheelhouseArgs(pythonExec);
+          const runInstall = async (paths: string[]): Promise<number> => {
+            const extraArgs = [...paths.slice(1).flatMap(path => ['-r', path]), ...wheelhouseArgs];
+            const nodePipProcess = spawn(pipInfo.command, [...pipInfo.args, ...installer.installArgs(paths[0], extraArgs)], {
+              cwd: spacePath,
+              env: { ...process.env, ...pipInfo.env },
+              shell: false,
+            });
+
+            const nodePipProcessKill = () => {
+              if (!nodePipProcess.killed) {
+                nodePipProcess.kill('SIGTERM');
               }
-            } else {
-              sendLog(controller, encoder, `[INFO] No GitHub URL found in space.json metadata, skipping ComfyUI clone`, logFilePath);
-            }
-          } catch (error: any) {
-            sendLog(controller, encoder, `[WARN] Error reading space.json for ComfyUI clone: ${error.message}`, logFilePath);
-          }
-        }
+            };
+            runningProcesses.push({ process: nodePipProcess, kill: nodePipProcessKill });
 
-        if (isCancelled) {
-          controller.close();
-          return;
-        }
+            // A failed node install is retried or skipped, not fatal
+            pipeProcessOutput(nodePipProcess, controller, encoder, logFilePath, downgradePipErrors);
 
-        // Step 2.6: Clone custom nodes if they don't exist
-        if (existsSync(spaceJsonPath)) {
-          try {
-            const spaceJsonContent = readFileSync(spaceJsonPath, 'utf-8');
-            const spaceJson = JSON.parse(spaceJsonContent);
-            const nodes = spaceJson.nodes || [];
+            return new Promise<number>((resolve) => {
+              const untrack = () => {
+                const index = runningProcesses.findIndex(p => p.process === nodePipProcess);
+                if (index !== -1) {
+                  runningProcesses.splice(index, 1);
+                }
+              };
+              nodePipProcess.on('close', (code) => {
+                untrack();
+                resolve(code || 0);
+              });
+              nodePipProcess.on('error', () => {
+                untrack();
+                resolve(1);
+              });
+            });
+          };
 
-            if (nodes.length > 0) {
-              await cloneCustomNodes(spacePath, nodes, controller, encoder, logFilePath);
-            } else {
-              sendLog(controller, encoder, `[INFO] No custom nodes found in space.json`, logFilePath);
+          sendLog(controller, encoder, `[APP] Installing requirements for ${nodeRequirementFiles.length} newly cloned node(s)...`, logFilePath);
+          // One resolver run for all nodes; if it fails, retry node by node so one bad node does not block the rest
+          let nodeInstallCode = await runInstall(nodeRequirementFiles.map(file => file.path));
+          if (nodeInstallCode !== 0 && !isCancelled && nodeRequirementFiles.length > 1) {
+            sendLog(controller, encoder, `[WARN] Combined node requirements install failed, retrying node by node...`, logFilePath);
+            nodeInstallCode = 0;
+            for (const file of nodeRequirementFiles) {
+              if (isCancelled) {
+                break;
+              }
+              if (await runInstall([file.path]) !== 0) {
+                nodeInstallCode = 1;
+                sendLog(controller, encoder, `[WARN] Failed to install requirements for node ${file.nodeName}, continuing...`, logFilePath);
+              }
             }
-          } catch (error: any) {
-            sendLog(controller, encoder, `[WARN] Error reading space.json for custom nodes clone: ${error.message}`, logFilePath);
+          } else if (nodeInstallCode !== 0) {
+            sendLog(controller, encoder, `[WARN] Failed to install node requirements, continuing...`, logFilePath);
           }
+
+          if (isCancelled) {
+            closeStream();
+            return;
+          }
+
+          // Record what the node installs added so the next activation sees an up-to-date state
+          await updateRequirementsTxt(pipInfo, spacePath, controller, encoder, logFilePath);
+          await recordInstallState(version, venvPath, pythonVersion, pythonExec, controller, encoder, logFilePath);
         }
 
+        // Create requirements.bkp if it doesn't exist
+        await createRequirementsBkpIfMissing(pipInfo, spacePath, controller, encoder, logFilePath);
+
+        // Save requirements history snapshot after activation
+        await snapshotRequirements(spacePath);
+
         if (isCancelled) {
-          controller.close();
+          closeStream();
           return;
         }
 
-        // Step 2.7: Update custom_nodes git information in space.json
+        // Step 4.1: Update custom_nodes git information in space.json
         await updateCustomNodesGitInfo(spacePath, controller, encoder, logFilePath);
 
         if (isCancelled) {
-          controller.close();
+          closeStream();
           return;
         }
 
-        // Step 3: Launch ComfyUI
+        // Step 5: Launch ComfyUI
         sendLog(controller, encoder, `[APP] Launching ComfyUI server...`, logFilePath);
         
         // Use the venv python to run ComfyUI
@@ -1463,9 +1507,8 @@ export async function GET(request: NextRequest) {
         let comfyCmd: string | undefined;
         try {
           if (existsSync(spaceJsonPath)) {
-            const spaceJsonContent = readFileSync(spaceJsonPath, 'utf-8');
-            const spaceJson = JSON.parse(spaceJsonContent);
-            if (spaceJson.metadata?.comfyUIArgs) {
+            const spaceJson = await readSpaceJson(version);
+            if (spaceJson?.metadata?.comfyUIArgs) {
               comfyCmd = spaceJson.metadata.comfyUIArgs;
               comfyCmdSource = 'space.json';
             }
@@ -1537,8 +1580,22 @@ export async function GET(request: NextRequest) {
         // Set up environment variables for ComfyUI
         const comfyEnv: NodeJS.ProcessEnv = { ...process.env };
         
-        // Create write stream for log file (append mode since we just cleared it)
-        const logStream = createWriteStream(comfyLogFile, { flags: 'a' }); // Append mode
+        // ComfyUI output goes through a sink owned by this run, which rotates and archives
+        // comfy-logs.txt once it grows too large or too old. It is not the shared sink for
+        // the path, so a later run never writes through it or closes it.
+        const comfyLogSink = new LogSink(comfyLogFile);
+        const writeComfyLog = (output: Readable, data: Buffer) => {
+          if (!comfyLogSink.write(data)) {
+            pauseUntilDrained(output, comfyLogSink);
+          }
+        };
+        let markComfyRunClosed: () => void = () => undefined;
+        previousComfyRun = new Promise<void>(resolve => {
+          markComfyRunClosed = resolve;
+        });
+        const closeComfyRun = () => {
+          void comfyLogSink.close().finally(markComfyRunClosed);
+        };
         
         // Launch ComfyUI in the background (non-blocking)
         // Use detached mode so it runs independently and won't be killed when stream closes
@@ -1562,18 +1619,18 @@ export async function GET(request: NextRequest) {
         // Only track it for logging purposes
 
         // Write stdout to log file only (not to activation logs)
-        comfyProcess.stdout?.on('data', (data) => {
-          logStream.write(data); // Write raw data to comfy-logs.txt only
+        comfyProcess.stdout?.on('data', (data: Buffer) => {
+          writeComfyLog(comfyProcess.stdout!, data); // Write raw data to comfy-logs.txt only
         });
 
         // Write stderr to log file only (not to activation logs)
-        comfyProcess.stderr?.on('data', (data) => {
-          logStream.write(data); // Write raw data to comfy-logs.txt only
+        comfyProcess.stderr?.on('data', (data: Buffer) => {
+          writeComfyLog(comfyProcess.stderr!, data); // Write raw data to comfy-logs.txt only
         });
 
         comfyProcess.on('error', (error) => {
           sendLog(controller, encoder, `[ERROR] Failed to launch ComfyUI: ${error.message}`, logFilePath);
-          logStream.end();
+          closeComfyRun();
         });
 
         comfyProcess.on('close', (code) => {
@@ -1581,77 +1638,35 @@ export async function GET(request: NextRequest) {
           if (code !== 0 && code !== null && !isCancelled) {
             sendLog(controller, encoder, `[INFO] ComfyUI process exited with code ${code}`, logFilePath);
           }
-          // Close the log stream when process exits
-          logStream.end();
+          // Flush and close the log file when the process exits
+          closeComfyRun();
         });
 
         // Keep the stream open to continue receiving logs
         if (!isCancelled) {
           sendLog(controller, encoder, `[APP] ComfyUI server started successfully`, logFilePath);
           
-          // Start watching comfy-logs.txt file and stream new lines
-          let comfyLogLastLineCount = 0;
-          let comfyLogLastModified = existsSync(comfyLogFile) ? statSync(comfyLogFile).mtimeMs : 0;
-          
-          // Read existing comfy logs
-          if (existsSync(comfyLogFile)) {
-            const fileContent = readFileSync(comfyLogFile, 'utf-8');
-            const lines = fileContent.split('\n').filter(line => line.trim());
+          // Follow comfy-logs.txt and stream new lines; the tailer starts over on its own
+          // when the file is rotated into a segment
+          const comfyLogFollower = followLogFile(comfyLogFile, ({ lines }) => {
             for (const line of lines) {
-              if (line.trim()) {
-                // Add [COMFY] tag if not already present
-                const messageToSend = line.match(/^\[COMFY\]/) ? line : `[COMFY] ${line}`;
-                sendLog(controller, encoder, messageToSend, logFilePath);
-              }
-            }
-            comfyLogLastLineCount = lines.length;
-          }
-          
-          // Watch for new comfy logs
-          const comfyLogWatchInterval = setInterval(() => {
-            try {
-              if (existsSync(comfyLogFile)) {
-                const stats = statSync(comfyLogFile);
-                const currentModified = stats.mtimeMs;
-                const currentContent = readFileSync(comfyLogFile, 'utf-8');
-                const lines = currentContent.split('\n').filter(line => line.trim());
-                const currentLineCount = lines.length;
-                
-                // If file was modified
-                if (currentModified !== comfyLogLastModified) {
-                  if (currentLineCount < comfyLogLastLineCount) {
-                    // File was cleared, reset
-                    comfyLogLastLineCount = 0;
-                  } else if (currentLineCount > comfyLogLastLineCount) {
-                    // New lines added, send only the new ones
-                    const newLines = lines.slice(comfyLogLastLineCount);
-                    for (const line of newLines) {
-                      if (line.trim()) {
-                        // Add [COMFY] tag if not already present
-                        const messageToSend = line.match(/^\[COMFY\]/) ? line : `[COMFY] ${line}`;
-                        sendLog(controller, encoder, messageToSend, logFilePath);
-                      }
-                    }
-                  }
-                  
-                  comfyLogLastLineCount = currentLineCount;
-                  comfyLogLastModified = currentModified;
-                }
-              }
-            } catch (error) {
-              console.error('Error reading comfy log file:', error);
+              // Add [COMFY] tag if not already present
+              const messageToSend = line.match(/^\[COMFY\]/) ? line : `[COMFY] ${line}`;
+              sendLog(controller, encoder, messageToSend, logFilePath);
             }
-          }, 500); // Check every 500ms
+          }, (error) => {
+            console.error('Error reading comfy log file:', error);
+          });
           
           // Cleanup comfy log watcher on stream close
           request.signal.addEventListener('abort', () => {
-            clearInterval(comfyLogWatchInterval);
+            void comfyLogFollower.stop();
           });
         }
 
       } catch (error: any) {
         sendLog(controller, encoder, `[ERROR] Activation failed: ${error.message}`, logFilePath);
-        controller.close();
+        closeStream();
       }
     },
   });
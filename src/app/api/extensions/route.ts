@@ -2,7 +2,8 @@ import { NextRequest, NextResponse } from 'next/server';
 import { readdir, readFile } from 'fs/promises';
 import { join } from 'path';
 import { existsSync } from 'fs';
-import { execFileSync } from 'child_process';
+import { readGitMetadata } from '../utils/gitMetadata';
+import { listLogSegments, readLogSegment } from '../utils/logRotation';
 
 interface NodeStatus {
   name: string;
@@ -17,95 +18,111 @@ interface NodeStatus {
 }
 
 async function getGitMetadata(nodePath: string): Promise<{ githubUrl?: string; branch?: string; commitId?: string }> {
-  const gitPath = join(nodePath, '.git');
-  if (!existsSync(gitPath)) {
-    return {};
+  // Parsed from .git files directly and cached by their mtimes, no git processes spawned
+  const { remoteUrl, branch, commitId } = await readGitMetadata(nodePath);
+
+  // Normalize GitHub URL to HTTPS format
+  let normalizedUrl = remoteUrl || undefined;
+  if (remoteUrl?.startsWith('git@github.com:')) {
+    normalizedUrl = remoteUrl.replace('git@github.com:', 'https://github.com/').replace(/\.git$/, '');
+  } else if (remoteUrl?.endsWith('.git')) {
+    normalizedUrl = remoteUrl.replace(/\.git$/, '');
   }
 
-  try {
-    const githubUrl = execFileSync('git', ['remote', 'get-url', 'origin'], { cwd: nodePath, encoding: 'utf-8' }).trim();
-    const branch = execFileSync('git', ['rev-parse', '--abbrev-ref', 'HEAD'], { cwd: nodePath, encoding: 'utf-8' }).trim();
-    const commitId = execFileSync('git', ['rev-parse', 'HEAD'], { cwd: nodePath, encoding: 'utf-8' }).trim();
+  return {
+    githubUrl: normalizedUrl,
+    branch: branch || undefined,
+    commitId: commitId || undefined,
+  };
+}
+
+// Every activation starts comfy-logs.txt with this header; segments rotated out by
+// size later in the same run do not begin with it
+const COMFY_LOG_RUN_HEADER = '=== ComfyUI Logs';
+
+/**
+ * Parses the "Import times for custom nodes" block of a ComfyUI log. Returns null
+ * when the log does not contain the block.
+ */
+function parseImportedNodes(lines: string[]): Set<string> | null {
+  const successfullyImportedNodes = new Set<string>();
+
+  // Find the line with "Import times for custom nodes"
+  for (let i = 0; i < lines.length; i++) {
+    const line = lines[i];
     
-    // Normalize GitHub URL to HTTPS format
-    let normalizedUrl = githubUrl;
-    if (githubUrl.startsWith('git@github.com:')) {
-      normalizedUrl = githubUrl.replace('git@github.com:', 'https://github.com/').replace(/\.git$/, '');
-    } else if (githubUrl.endsWith('.git')) {
-      normalizedUrl = githubUrl.replace(/\.git$/, '');
-    }
+    if (line.includes('Import times for custom nodes')) {
+      // Process subsequent lines until we hit a line that doesn't match the pattern
+      for (let j = i + 1; j < lines.length; j++) {
+        const importLine = lines[j];
+        
+        // Stop if we hit an empty line or a line that doesn't look like an import time entry
+        if (!importLine.trim() || !importLine.includes('seconds:')) {
+          // Check if the next few lines still match the pattern
+          let stillMatching = false;
+          for (let k = j; k < Math.min(j + 3, lines.length); k++) {
+            if (lines[k].includes('seconds:')) {
+              stillMatching = true;
+              break;
+            }
+          }
+          if (!stillMatching) {
+            break;
+          }
+        }
 
-    return {
-      githubUrl: normalizedUrl,
-      branch: branch || undefined,
-      commitId: commitId || undefined,
-    };
-  } catch (error) {
-    // Git commands failed, return empty metadata
-    return {};
+        // Extract node name from path like:
+        // /Users/.../spaces/.../ComfyUI/custom_nodes/ComfyUI-GGUF
+        // or
+        // /Users/.../spaces/.../ComfyUI/custom_nodes/ComfyUI-GGUF/...
+        const pathMatch = importLine.match(/custom_nodes\/([^\/\s]+)/);
+        if (pathMatch) {
+          const nodeName = pathMatch[1];
+          
+          // Skip .py files (they're not nodes)
+          if (nodeName.endsWith('.py')) {
+            continue;
+          }
+
+          // Check if this line contains "(Import Failed)"
+          if (!importLine.includes('(Import Failed)')) {
+            // Normalize node name (handle "core" vs "ComfyUI-Core")
+            const normalizedName = nodeName === 'core' ? 'ComfyUI-Core' : nodeName;
+            successfullyImportedNodes.add(normalizedName);
+          }
+        }
+      }
+      return successfullyImportedNodes;
+    }
   }
+
+  return null;
 }
 
 async function getSuccessfullyImportedNodes(spaceId: string): Promise<Set<string>> {
   const spacesPath = join(process.cwd(), 'spaces');
   const comfyLogFilePath = join(spacesPath, spaceId, 'comfy-logs.txt');
-  const successfullyImportedNodes = new Set<string>();
 
   try {
     if (!existsSync(comfyLogFilePath)) {
-      return successfullyImportedNodes;
+      return new Set<string>();
     }
 
-    const logContent = await readFile(comfyLogFilePath, 'utf-8');
-    const lines = logContent.split('\n');
-
-    // Find the line with "Import times for custom nodes"
-    let foundImportTimes = false;
-    for (let i = 0; i < lines.length; i++) {
-      const line = lines[i];
-      
-      if (line.includes('Import times for custom nodes')) {
-        foundImportTimes = true;
-        // Process subsequent lines until we hit a line that doesn't match the pattern
-        for (let j = i + 1; j < lines.length; j++) {
-          const importLine = lines[j];
-          
-          // Stop if we hit an empty line or a line that doesn't look like an import time entry
-          if (!importLine.trim() || !importLine.includes('seconds:')) {
-            // Check if the next few lines still match the pattern
-            let stillMatching = false;
-            for (let k = j; k < Math.min(j + 3, lines.length); k++) {
-              if (lines[k].includes('seconds:')) {
-                stillMatching = true;
-                break;
-              }
-            }
-            if (!stillMatching) {
-              break;
-            }
-          }
-
-          // Extract node name from path like:
-          // /Users/.../spaces/.../ComfyUI/custom_nodes/ComfyUI-GGUF
-          // or
-          // /Users/.../spaces/.../ComfyUI/custom_nodes/ComfyUI-GGUF/...
-          const pathMatch = importLine.match(/custom_nodes\/([^\/\s]+)/);
-          if (pathMatch) {
-            const nodeName = pathMatch[1];
-            
-            // Skip .py files (they're not nodes)
-            if (nodeName.endsWith('.py')) {
-              continue;
-            }
-
-            // Check if this line contains "(Import Failed)"
-            if (!importLine.includes('(Import Failed)')) {
-              // Normalize node name (handle "core" vs "ComfyUI-Core")
-              const normalizedName = nodeName === 'core' ? 'ComfyUI-Core' : nodeName;
-              successfullyImportedNodes.add(normalizedName);
-            }
-          }
-        }
+    // The import block is printed at startup, so when the current run's log has been
+    // rotated it sits in an older segment. Walk back from the active file until the
+    // block or the start of the current run is found.
+    const segments = await listLogSegments(comfyLogFilePath);
+    const readers: Array<() => Promise<string>> = [
+      () => readFile(comfyLogFilePath, 'utf-8'),
+      ...segments.map(segment => async () => (await readLogSegment(segment)).toString('utf-8')),
+    ];
+    for (const read of readers) {
+      const lines = (await read()).split('\n');
+      const importedNodes = parseImportedNodes(lines);
+      if (importedNodes) {
+        return importedNodes;
+      }
+      if (lines[0]?.startsWith(COMFY_LOG_RUN_HEADER)) {
         break;
       }
     }
@@ -114,7 +131,7 @@ async function getSuccessfullyImportedNodes(spaceId: string): Promise<Set<string
     console.warn(`Failed to read comfy-logs.txt for space ${spaceId}:`, error);
   }
 
-  return successfullyImportedNodes;
+  return new Set<string>();
 }
 
 export async function GET(request: NextRequest) {
@@ -219,6 +236,15 @@ export async function GET(request: NextRequest) {
       }
     }
 
+    // Read git metadata for all custom nodes concurrently
+    const gitMetadataByNode = new Map(
+      await Promise.all(
+        nodesInDataDir
+          .filter(nodeName => nodeName !== 'ComfyUI-Core')
+          .map(async (nodeName) => [nodeName, await getGitMetadata(join(nodesDataPath, nodeName))] as const)
+      )
+    );
+
     // Process nodes from API
     for (const nodeName of nodeNamesFromApi) {
       const existsInDataNodes = nodesInDataDirSet.has(nodeName);
@@ -232,9 +258,7 @@ export async function GET(request: NextRequest) {
       // Get git metadata if node exists in custom_nodes
       let gitMetadata = {};
       if (existsInDataNodes && !isCoreNode) {
-        const actualNodeName = nodeName === 'ComfyUI-Core' ? 'core' : nodeName;
-        const nodePath = join(nodesDataPath, actualNodeName);
-        gitMetadata = await getGitMetadata(nodePath);
+        gitMetadata = gitMetadataByNode.get(nodeName) || {};
       }
 
       if (isCoreNode || existsInDataNodes) {
@@ -267,9 +291,7 @@ export async function GET(request: NextRequest) {
       }
 
       if (!nodeNamesFromApi.has(nodeName)) {
-        const actualNodeName = nodeName === 'ComfyUI-Core' ? 'core' : nodeName;
-        const nodePath = join(nodesDataPath, actualNodeName);
-        const gitMetadata = await getGitMetadata(nodePath);
+        const gitMetadata = gitMetadataByNode.get(nodeName) || {};
         
         // Check if node was successfully imported according to logs
         // If it was successfully imported, mark it as active even if not in API
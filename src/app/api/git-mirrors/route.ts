@@ -0,0 +1,44 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { listMirrors, fetchAllMirrors, pruneMirrors } from '../utils/gitMirror';
+
+// GET endpoint for listing the shared git mirrors
+export async function GET() {
+  try {
+    const mirrors = await listMirrors();
+    return NextResponse.json({ mirrors });
+  } catch (error) {
+    console.error('Error listing git mirrors:', error);
+    return NextResponse.json(
+      { error: 'Failed to list git mirrors' },
+      { status: 500 }
+    );
+  }
+}
+
+// POST endpoint for mirror maintenance: { action: 'fetch' | 'prune' }
+export async function POST(request: NextRequest) {
+  try {
+    const { action } = await request.json();
+
+    if (action === 'fetch') {
+      const result = await fetchAllMirrors();
+      return NextResponse.json({ success: result.failed.length === 0, ...result });
+    }
+
+    if (action === 'prune') {
+      const result = await pruneMirrors();
+      return NextResponse.json({ success: true, ...result });
+    }
+
+    return NextResponse.json(
+      { error: 'Invalid action. Must be "fetch" or "prune"' },
+      { status: 400 }
+    );
+  } catch (error) {
+    console.error('Error maintaining git mirrors:', error);
+    return NextResponse.json(
+      { error: `Failed to maintain git mirrors: ${error instanceof Error ? error.message : 'Unknown error'}` },
+      { status: 500 }
+    );
+  }
+}
@@ -4,6 +4,8 @@ import { execFile } from 'child_process';
 import { join } from 'path';
 import { mkdir, writeFile, readFile, rm } from 'fs/promises';
 import { existsSync } from 'fs';
+import { getWheelhouseArgs } from '../../utils/wheelhouse';
+import { readSpaceJson } from '../../utils/spaceStore';
 
 const execFileAsync = promisify(execFile);
 
@@ -546,9 +548,8 @@ export async function POST(request: Request) {
     
     if (existsSync(spaceJsonPath)) {
       try {
-        const spaceJsonContent = await readFile(spaceJsonPath, 'utf-8');
-        const spaceJson = JSON.parse(spaceJsonContent);
-        const dependenciesList = spaceJson.dependencies || [];
+        const spaceJson = await readSpaceJson(selectedVersion);
+        const dependenciesList = spaceJson?.dependencies || [];
         const requirementsContent = dependenciesList.join('\n');
         existingDeps = parseExistingDependencies(requirementsContent);
       } catch (error) {
@@ -593,6 +594,7 @@ export async function POST(request: Request) {
 
     // Analyze each dependency with pip install --dry-run
     const analyzedDependencies: Dependency[] = [];
+    const wheelhouseArgs = await getWheelhouseArgs(pythonExec);
     
     for (const dep of dependencies) {
       try {
@@ -602,7 +604,7 @@ export async function POST(request: Request) {
         // Run pip install --dry-run
         const { stdout, stderr } = await execFileAsync(
           pythonExec,
-          ['-m', 'pip', 'install', '--dry-run', dep],
+          ['-m', 'pip', 'install', '--dry-run', ...wheelhouseArgs, dep],
           {
             timeout: 30000,
             env: { ...process.env },
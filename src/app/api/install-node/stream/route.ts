@@ -1,45 +1,19 @@
 import { NextRequest } from 'next/server';
 import { join } from 'path';
 import { execFile } from 'child_process';
-import { existsSync, appendFileSync, mkdirSync, writeFileSync, readFileSync } from 'fs';
-import { readFile, writeFile, mkdir } from 'fs/promises';
+import { existsSync, mkdirSync, writeFileSync, readFileSync } from 'fs';
+import { readFile, writeFile } from 'fs/promises';
 import { promisify } from 'util';
+import { cloneRepository } from '../../utils/gitMirror';
+import { getLogSink, closeLogSink } from '../../utils/logSink';
+import { updateSpaceJson } from '../../utils/spaceStore';
+import { saveRequirementsHistory } from '../../utils/requirementsHistory';
 const execFileAsync = promisify(execFile);
 
 // Helper function to save requirements history snapshot
-async function saveRequirementsHistory(
-  spacePath: string,
-  type: 'activation' | 'node_install',
-  nodeName?: string
-): Promise<void> {
+async function snapshotRequirements(spacePath: string, nodeName: string): Promise<void> {
   try {
-    const requirementsPath = join(spacePath, 'requirements.txt');
-    if (!existsSync(requirementsPath)) {
-      return;
-    }
-
-    const historyPath = join(spacePath, 'requirements_history');
-    if (!existsSync(historyPath)) {
-      await mkdir(historyPath, { recursive: true });
-    }
-
-    const requirementsContent = await readFile(requirementsPath, 'utf-8');
-    const timestamp = new Date().toISOString();
-    const id = `${Date.now()}_${Math.random().toString(36).substring(7)}`;
-
-    const historyEntry = {
-      id,
-      timestamp,
-      type,
-      nodeName: nodeName || undefined,
-      requirementsContent,
-    };
-
-    const entryPath = join(historyPath, `${id}.json`);
-    await writeFile(entryPath, JSON.stringify(historyEntry, null, 2), 'utf-8');
-
-    const snapshotPath = join(historyPath, `${id}_requirements.txt`);
-    await writeFile(snapshotPath, requirementsContent, 'utf-8');
+    await saveRequirementsHistory(spacePath, 'node_install', nodeName);
   } catch (error) {
     // Silently fail - history tracking shouldn't break the main flow
     console.error('Error saving requirements history:', error);
@@ -52,16 +26,9 @@ function sendLog(controller: ReadableStreamDefaultController, encoder: TextEncod
   const data = JSON.stringify(logEntry) + '\n\n';
   controller.enqueue(encoder.encode(`data: ${data}`));
   
+  // Queue for the buffered log file writer so logging never blocks the event loop
   if (logFile) {
-    try {
-      const logDir = join(logFile, '..');
-      if (!existsSync(logDir)) {
-        mkdirSync(logDir, { recursive: true });
-      }
-      appendFileSync(logFile, `[${timestamp}] ${message}\n`);
-    } catch (error) {
-      console.error('Error writing to log file:', error);
-    }
+    getLogSink(logFile).write(`[${timestamp}] ${message}\n`);
   }
 }
 
@@ -163,6 +130,12 @@ export async function GET(request: NextRequest) {
       const requirementsPath = join(spacePath, 'requirements.txt');
       const logFilePath = join(spacePath, 'comfy-logs.txt');
 
+      // Flush buffered log lines before ending the stream
+      const closeStream = () => {
+        void closeLogSink(logFilePath);
+        controller.close();
+      };
+
       try {
         // Parse selected dependencies
         let dependenciesToInstall: Array<{ name: string; version?: string }> = [];
@@ -178,7 +151,7 @@ export async function GET(request: NextRequest) {
         const urlMatch = githubUrl.match(/github\.com\/([^\/]+)\/([^\/\.]+)/);
         if (!urlMatch) {
           sendLog(controller, encoder, `[ERROR] Invalid GitHub URL format`, logFilePath);
-          controller.close();
+          closeStream();
           return;
         }
 
@@ -204,7 +177,7 @@ export async function GET(request: NextRequest) {
             sendLog(controller, encoder, `[APP] Fetched latest changes successfully`, logFilePath);
           } catch (error: any) {
             sendLog(controller, encoder, `[ERROR] Failed to fetch updates: ${error.message}`, logFilePath);
-            controller.close();
+            closeStream();
             return;
           }
 
@@ -216,7 +189,7 @@ export async function GET(request: NextRequest) {
               sendLog(controller, encoder, `[APP] Checked out commit ${commitId} successfully`, logFilePath);
             } catch (error: any) {
               sendLog(controller, encoder, `[ERROR] Failed to checkout commit: ${error.message}`, logFilePath);
-              controller.close();
+              closeStream();
               return;
             }
           } else if (branch) {
@@ -231,7 +204,7 @@ export async function GET(request: NextRequest) {
               sendLog(controller, encoder, `[APP] Pulled latest changes successfully`, logFilePath);
             } catch (error: any) {
               sendLog(controller, encoder, `[ERROR] Failed to checkout/pull branch: ${error.message}`, logFilePath);
-              controller.close();
+              closeStream();
               return;
             }
           } else {
@@ -245,7 +218,7 @@ export async function GET(request: NextRequest) {
               sendLog(controller, encoder, `[APP] Pulled latest changes successfully`, logFilePath);
             } catch (error: any) {
               sendLog(controller, encoder, `[ERROR] Failed to pull changes: ${error.message}`, logFilePath);
-              controller.close();
+              closeStream();
               return;
             }
           }
@@ -269,11 +242,7 @@ export async function GET(request: NextRequest) {
               sendLog(controller, encoder, `[APP] Using default branch: ${branchToUse}`, logFilePath);
             }
 
-            if (branchToUse) {
-              await execFileAsync('git', ['clone', '--branch', branchToUse, '--depth', '1', cloneUrl, nodePath]);
-            } else {
-              await execFileAsync('git', ['clone', '--depth', '1', cloneUrl, nodePath]);
-            }
+            await cloneRepository(cloneUrl, nodePath, { branch: branchToUse, commitId, depth: 1 });
 
             if (commitId && !branch) {
               // Checkout specific commit if provided (and not using a specific branch)
@@ -286,7 +255,7 @@ export async function GET(request: NextRequest) {
             sendLog(controller, encoder, `[APP] Repository cloned successfully`, logFilePath);
           } catch (error: any) {
             sendLog(controller, encoder, `[ERROR] Failed to clone repository: ${error.message}`, logFilePath);
-            controller.close();
+            closeStream();
             return;
           }
         }
@@ -335,37 +304,38 @@ export async function GET(request: NextRequest) {
         sendLog(controller, encoder, `[APP] Updating space.json...`, logFilePath);
         if (existsSync(spaceJsonPath)) {
           try {
-            const spaceJsonContent = await readFile(spaceJsonPath, 'utf-8');
-            const spaceJson = JSON.parse(spaceJsonContent);
-
-            // Update dependencies in space.json from requirements.txt
+            // Dependencies in space.json follow requirements.txt
+            let allDeps: string[] | null = null;
             if (existsSync(requirementsPath)) {
               const requirementsContent = await readFile(requirementsPath, 'utf-8');
-              const allDeps = requirementsContent
+              allDeps = requirementsContent
                 .split('\n')
                 .map(line => line.trim())
                 .filter(line => line && !line.startsWith('#'));
-              spaceJson.dependencies = allDeps;
-            }
-
-            // Add node to nodes array
-            if (!spaceJson.nodes) {
-              spaceJson.nodes = [];
             }
 
-            const nodeExists = spaceJson.nodes.some((node: any) => node.name === nodeName);
-            if (!nodeExists) {
-              spaceJson.nodes.push({
-                name: nodeName,
-                githubUrl: githubUrl,
-                commitId: commitId || null,
-                branch: branch || null,
-                installedAt: new Date().toISOString(),
-                disabled: false,
-              });
-            }
-
-            await writeFile(spaceJsonPath, JSON.stringify(spaceJson, null, 2), 'utf-8');
+            await updateSpaceJson(selectedVersion, (spaceJson) => {
+              if (allDeps) {
+                spaceJson.dependencies = allDeps;
+              }
+
+              // Add node to nodes array
+              if (!spaceJson.nodes) {
+                spaceJson.nodes = [];
+              }
+
+              const nodeExists = spaceJson.nodes.some((node: any) => node.name === nodeName);
+              if (!nodeExists) {
+                spaceJson.nodes.push({
+                  name: nodeName,
+                  githubUrl: githubUrl,
+                  commitId: commitId || null,
+                  branch: branch || null,
+                  installedAt: new Date().toISOString(),
+                  disabled: false,
+                });
+              }
+            });
             sendLog(controller, encoder, `[APP] space.json updated successfully`, logFilePath);
           } catch (error: any) {
             sendLog(controller, encoder, `[WARN] Error updating space.json: ${error.message}`, logFilePath);
@@ -378,7 +348,7 @@ export async function GET(request: NextRequest) {
         sendLog(controller, encoder, `[APP] Dependencies added to requirements.txt. They will be installed during space reactivation.`, logFilePath);
 
         // Step 5: Save requirements history snapshot
-        await saveRequirementsHistory(spacePath, 'node_install', nodeName);
+        await snapshotRequirements(spacePath, nodeName);
 
         // Step 6: Installation complete - signal frontend to reactivate space
         // This will install dependencies and restart ComfyUI
@@ -388,10 +358,10 @@ export async function GET(request: NextRequest) {
         // Send signal to frontend to reactivate space
         sendLog(controller, encoder, `[INSTALL_COMPLETE]`, logFilePath);
         
-        controller.close();
+        closeStream();
       } catch (error: any) {
         sendLog(controller, encoder, `[ERROR] ${error.message}`, logFilePath);
-        controller.close();
+        closeStream();
       }
     },
   });
@@ -4,85 +4,22 @@ import { readFile, writeFile, mkdir } from 'fs/promises';
 import { existsSync } from 'fs';
 import { spawn } from 'child_process';
 import { promisify } from 'util';
+import { readSpaceJson } from '../../utils/spaceStore';
+import { diffRequirements, parseRequirements } from '../../utils/requirementsDiff';
+import type { ParsedRequirements, RequirementEntry } from '../../utils/requirementsDiff';
 
-interface Dependency {
-  name: string;
-  version: string;
-}
+type LineAnnotationType = 'added' | 'removed' | 'updated' | 'unchanged' | 'none';
 
-function parseRequirements(content: string): Dependency[] {
-  const dependencies: Dependency[] = [];
-  const lines = content.split('\n');
-  
-  for (const line of lines) {
-    const trimmed = line.trim();
-    // Skip comments and empty lines
-    if (!trimmed || trimmed.startsWith('#')) {
-      continue;
-    }
-    
-    // Handle inline comments
-    const lineWithoutComment = trimmed.split('#')[0].trim();
-    if (!lineWithoutComment) {
-      continue;
-    }
-    
-    // Parse dependency line
-    // Format: package==version, package>=version, package~=version, package, etc.
-    // Match package name (can include dots, hyphens, underscores) and optional version specifiers
-    const match = lineWithoutComment.match(/^([a-zA-Z0-9_.-]+(?:\[[^\]]+\])?)(?:\s*([=<>!~]+)\s*(.+))?$/);
-    if (match) {
-      const fullName = match[1];
-      const name = fullName.split('[')[0]; // Remove extras like package[extra]
-      const version = match[3] ? match[3].trim() : '*'; // Use * for unspecified versions
-      dependencies.push({ name, version });
-    }
-  }
-  
-  return dependencies;
+// Version shown for a requirement in the updated list
+function describeVersion(entry: RequirementEntry): string {
+  return entry.pinned || entry.specifier || 'unspecified';
 }
 
-function compareDependencies(
-  oldDeps: Dependency[],
-  newDeps: Dependency[]
-): { added: string[]; removed: string[]; updated: Array<{ name: string; old: string; new: string }> } {
-  const oldMap = new Map<string, string>();
-  const newMap = new Map<string, string>();
-  
-  oldDeps.forEach(dep => oldMap.set(dep.name.toLowerCase(), dep.version));
-  newDeps.forEach(dep => newMap.set(dep.name.toLowerCase(), dep.version));
-  
-  const added: string[] = [];
-  const removed: string[] = []; // Always empty - current dependencies are never removed
-  const updated: Array<{ name: string; old: string; new: string }> = [];
-  
-  // Find added and updated
-  // Current dependencies are never removed, so we only check what's in incoming
-  newMap.forEach((newVersion, name) => {
-    const oldVersion = oldMap.get(name);
-    if (!oldVersion) {
-      // New dependency - not in current, so it's added
-      const dep = newDeps.find(d => d.name.toLowerCase() === name);
-      if (dep) {
-        added.push(newVersion === '*' ? dep.name : `${dep.name}==${newVersion}`);
-      }
-    } else if (oldVersion !== newVersion) {
-      // Updated dependency - exists in both but versions differ
-      const dep = newDeps.find(d => d.name.toLowerCase() === name);
-      if (dep) {
-        updated.push({
-          name: dep.name,
-          old: oldVersion === '*' ? 'unspecified' : oldVersion,
-          new: newVersion === '*' ? 'unspecified' : newVersion,
-        });
-      }
-    }
-  });
-  
-  // Note: We don't mark anything as removed because current dependencies are preserved
-  // Dependencies that exist in current but not in incoming will remain unchanged
-  
-  return { added, removed, updated };
+// Key of the requirement on a line; null for pip options, URLs and paths, which
+// have no package name to compare by
+function getRequirementKey(parsed: ParsedRequirements, index: number): string | null {
+  const key = parsed.lineKeys[index];
+  return key && parsed.entries.get(key)?.pep508 ? key : null;
 }
 
 export async function GET(request: NextRequest) {
@@ -120,9 +57,8 @@ export async function GET(request: NextRequest) {
     }
 
     // Read space.json to get current dependencies
-    const spaceJsonContent = await readFile(spaceJsonPath, 'utf-8');
-    const spaceJson = JSON.parse(spaceJsonContent);
-    const currentDependencies = spaceJson.dependencies || [];
+    const spaceJson = await readSpaceJson(selectedVersion);
+    const currentDependencies = spaceJson?.dependencies || [];
     const sourceContent = currentDependencies.join('\n');
 
     if (!existsSync(nodeRequirementsPath)) {
@@ -132,6 +68,7 @@ export async function GET(request: NextRequest) {
           added: [],
           removed: [],
           updated: [],
+          other: [],
         },
         { status: 200 } // Return empty diff if requirements.txt doesn't exist
       );
@@ -140,122 +77,74 @@ export async function GET(request: NextRequest) {
     // Read node requirements
     const nodeContent = await readFile(nodeRequirementsPath, 'utf-8');
 
-    // Parse dependencies
-    const sourceDeps = parseRequirements(sourceContent);
-    const nodeDeps = parseRequirements(nodeContent);
-
-    // Compare dependencies
-    const diff = compareDependencies(sourceDeps, nodeDeps);
-
-    // Create line-by-line comparison for side-by-side view
-    const sourceLines = sourceContent.split('\n');
-    const nodeLines = nodeContent.split('\n');
-    
-    // Create maps for dependency lookup by name
-    const sourceDepMap = new Map<string, string>();
-    const nodeDepMap = new Map<string, string>();
-    
-    sourceDeps.forEach((dep) => {
-      sourceDepMap.set(dep.name.toLowerCase(), dep.version);
-    });
-    
-    nodeDeps.forEach((dep) => {
-      nodeDepMap.set(dep.name.toLowerCase(), dep.version);
-    });
+    // Parse dependencies; parses and the diff are cached by content hash
+    const source = parseRequirements(sourceContent);
+    const node = parseRequirements(nodeContent);
+    const { changes, byKey } = diffRequirements(source, node);
 
-    // Helper function to extract dependency name from a line
-    function getDepNameFromLine(line: string): string | null {
-      const trimmed = line.trim();
-      if (!trimmed || trimmed.startsWith('#')) {
-        return null;
+    // Current dependencies are never removed, so only what's in incoming is reported.
+    // Incoming options, URLs and paths cannot be compared by name and are listed as other.
+    const added: string[] = [];
+    const removed: string[] = []; // Always empty - current dependencies are preserved
+    const updated: Array<{ name: string; old: string; new: string }> = [];
+    const other = Array.from(node.entries.values()).filter(entry => !entry.pep508).map(entry => entry.line);
+    for (const change of changes) {
+      if (!(change.target ?? change.base)?.pep508) {
+        continue;
       }
-      const lineWithoutComment = trimmed.split('#')[0].trim();
-      const match = lineWithoutComment.match(/^([a-zA-Z0-9_.-]+(?:\[[^\]]+\])?)/);
-      if (match) {
-        return match[1].split('[')[0].toLowerCase();
+      if (change.type === 'added' && change.target) {
+        added.push(change.target.specifier ? `${change.target.name}${change.target.specifier}` : change.target.name);
+      } else if (change.base && change.target && change.type !== 'unchanged') {
+        updated.push({
+          name: change.target.name,
+          old: describeVersion(change.base),
+          new: describeVersion(change.target),
+        });
       }
-      return null;
     }
+    const diff = { added, removed, updated, other };
 
     // Build line annotations for source (current)
-    // Current dependencies are never removed, so they're either unchanged or updated
-    const sourceLineAnnotations: Array<{ line: string; type: 'added' | 'removed' | 'updated' | 'unchanged' | 'none'; depName?: string }> = [];
-    sourceLines.forEach((line) => {
-      const depName = getDepNameFromLine(line);
+    // Current dependencies are never removed - they stay unchanged or are marked as updated
+    const sourceLineAnnotations = source.lines.map((line, index) => {
+      const depName = getRequirementKey(source, index);
       if (!depName) {
-        sourceLineAnnotations.push({ line, type: 'none' });
-        return;
-      }
-      
-      const inNew = nodeDepMap.has(depName);
-      const oldVersion = sourceDepMap.get(depName);
-      const newVersion = nodeDepMap.get(depName);
-      
-      // Current dependencies are never removed - they stay unchanged or are marked as updated
-      if (inNew && oldVersion && newVersion && oldVersion !== newVersion) {
-        // Same dependency with different version - mark as updated
-        sourceLineAnnotations.push({ line, type: 'updated', depName });
-      } else {
-        // Not in new or same version - mark as unchanged (current dependencies are preserved)
-        sourceLineAnnotations.push({ line, type: 'unchanged', depName });
+        return { line, type: 'none' as LineAnnotationType };
       }
+      const change = byKey.get(depName);
+      const type: LineAnnotationType = change && change !== 'unchanged' && change !== 'removed' ? 'updated' : 'unchanged';
+      return { line, type, depName };
     });
 
     // Build line annotations for node (incoming)
-    const nodeLineAnnotations: Array<{ line: string; type: 'added' | 'removed' | 'updated' | 'unchanged' | 'none'; depName?: string }> = [];
-    nodeLines.forEach((line) => {
-      const depName = getDepNameFromLine(line);
+    const nodeLineAnnotations = node.lines.map((line, index) => {
+      const depName = getRequirementKey(node, index);
       if (!depName) {
-        nodeLineAnnotations.push({ line, type: 'none' });
-        return;
-      }
-      
-      const inOld = sourceDepMap.has(depName);
-      const oldVersion = sourceDepMap.get(depName);
-      const newVersion = nodeDepMap.get(depName);
-      
-      if (!inOld) {
-        nodeLineAnnotations.push({ line, type: 'added', depName });
-      } else if (oldVersion && newVersion && oldVersion !== newVersion) {
-        nodeLineAnnotations.push({ line, type: 'updated', depName });
-      } else {
-        nodeLineAnnotations.push({ line, type: 'unchanged', depName });
+        return { line, type: 'none' as LineAnnotationType };
       }
+      const change = byKey.get(depName);
+      const type: LineAnnotationType = change === 'added' ? 'added' : change === 'unchanged' ? 'unchanged' : 'updated';
+      return { line, type, depName };
     });
 
     // Check for conflicts using pip-compile
     // Merge requirements: current (source) + incoming (node), keeping current as base
     // Current dependencies take priority - they are never removed or downgraded
-    const mergedRequirements: string[] = [];
-    const seenDeps = new Set<string>();
-    
-    // First, add all current dependencies (these take priority)
-    sourceLines.forEach((line) => {
-      const trimmed = line.trim();
-      const depName = getDepNameFromLine(line);
-      if (depName) {
-        seenDeps.add(depName);
-      }
-      mergedRequirements.push(line);
-    });
-    
+    const mergedRequirements = [...source.lines];
+    const seenDeps = new Set(source.entries.keys());
+
     // Then, add incoming dependencies that aren't in current
-    // Skip any that conflict with current (current takes priority)
-    nodeLines.forEach((line) => {
-      const trimmed = line.trim();
-      if (!trimmed || trimmed.startsWith('#')) {
-        // Add comments and empty lines from incoming if they're meaningful
-        return;
-      }
-      
-      const depName = getDepNameFromLine(line);
+    // Skip any that conflict with current (current takes priority); options and
+    // URLs are keyed by their text, so only exact repeats are skipped
+    node.lines.forEach((line, index) => {
+      const depName = node.lineKeys[index];
       if (depName && !seenDeps.has(depName)) {
         // Only add if it's a new dependency not in current
         mergedRequirements.push(line);
         seenDeps.add(depName);
       }
     });
-    
+
     const mergedContent = mergedRequirements.join('\n');
     
     // Create temporary file for merged requirements
@@ -1,7 +1,8 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { join } from 'path';
-import { writeFile, copyFile, readFile } from 'fs/promises';
+import { copyFile, readFile } from 'fs/promises';
 import { existsSync } from 'fs';
+import { updateSpaceJson } from '../../utils/spaceStore';
 
 export async function POST(request: NextRequest) {
   try {
@@ -35,15 +36,10 @@ export async function POST(request: NextRequest) {
       );
     }
 
-    // Read current space.json
-    const spaceJsonContent = await readFile(spaceJsonPath, 'utf-8');
-    const spaceJson = JSON.parse(spaceJsonContent);
-
     // Update dependencies in space.json
-    spaceJson.dependencies = mergedDependencies;
-
-    // Write updated space.json
-    await writeFile(spaceJsonPath, JSON.stringify(spaceJson, null, 2), 'utf-8');
+    await updateSpaceJson(selectedVersion, (spaceJson) => {
+      spaceJson.dependencies = mergedDependencies;
+    });
 
     return NextResponse.json({ 
       success: true,
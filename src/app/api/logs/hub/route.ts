@@ -0,0 +1,7 @@
+import { NextResponse } from 'next/server';
+import { getLogHubStats } from '../../utils/logHub';
+
+// GET endpoint for log hub diagnostics: subscribers, buffered lines and drop counters per log file
+export async function GET() {
+  return NextResponse.json({ channels: getLogHubStats() });
+}
@@ -0,0 +1,103 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { join } from 'path';
+import { existsSync } from 'fs';
+import { readIndexedPage, readLinesBefore, readSegmentLinesBefore, MAX_PAGE_LINES } from '../../utils/logPage';
+import { LOG_SOURCES, formatLogLine, isLogSource } from '../../utils/logFormat';
+
+const DEFAULT_PAGE_LINES = 200;
+
+// GET endpoint for older log lines: ?version=&file=logs|comfy&before=<offset>&limit=&segment=
+// Pages walk backwards from `before` (a byte offset from the log stream's cursors, or
+// the end of the file when omitted). Passing the stream's `generation` makes the
+// request fail with 409 once the file has been cleared or replaced. When a file is
+// exhausted, `previousSegment` names the rotated segment to continue with via ?segment=.
+// The active file can also be addressed by line through its sparse line index:
+// ?beforeLine=<n> pages back from a line number, ?at=<ISO time> jumps to a moment.
+export async function GET(request: NextRequest) {
+  const searchParams = request.nextUrl.searchParams;
+  const version = searchParams.get('version');
+  const file = searchParams.get('file') || 'logs';
+  const beforeParam = searchParams.get('before');
+  const limitParam = searchParams.get('limit');
+  const expectedGeneration = searchParams.get('generation');
+  const segmentParam = searchParams.get('segment');
+  const beforeLineParam = searchParams.get('beforeLine');
+  const atParam = searchParams.get('at');
+
+  if (!version) {
+    return NextResponse.json({ error: 'version parameter is required' }, { status: 400 });
+  }
+  if (!isLogSource(file)) {
+    return NextResponse.json({ error: 'file must be "logs" or "comfy"' }, { status: 400 });
+  }
+
+  const before = beforeParam === null ? null : Number(beforeParam);
+  if (before !== null && (!Number.isInteger(before) || before < 0)) {
+    return NextResponse.json({ error: 'before must be a non-negative byte offset' }, { status: 400 });
+  }
+  const limit = limitParam === null ? DEFAULT_PAGE_LINES : Number(limitParam);
+  if (!Number.isInteger(limit) || limit < 1) {
+    return NextResponse.json({ error: 'limit must be a positive integer' }, { status: 400 });
+  }
+
+  const segment = segmentParam === null ? null : Number(segmentParam);
+  if (segment !== null && (!Number.isInteger(segment) || segment < 1)) {
+    return NextResponse.json({ error: 'segment must be a positive integer' }, { status: 400 });
+  }
+
+  const beforeLine = beforeLineParam === null ? null : Number(beforeLineParam);
+  if (beforeLine !== null && (!Number.isInteger(beforeLine) || beforeLine < 0)) {
+    return NextResponse.json({ error: 'beforeLine must be a non-negative line number' }, { status: 400 });
+  }
+  const at = atParam === null ? null : Date.parse(atParam);
+  if (at !== null && Number.isNaN(at)) {
+    return NextResponse.json({ error: 'at must be an ISO timestamp' }, { status: 400 });
+  }
+  const lineAddressed = beforeLine !== null || at !== null;
+  if (lineAddressed && (segment !== null || before !== null)) {
+    return NextResponse.json(
+      { error: 'beforeLine and at cannot be combined with before or segment' },
+      { status: 400 }
+    );
+  }
+
+  const logFilePath = join(process.cwd(), 'spaces', version, LOG_SOURCES[file].fileName);
+  if (segment === null && !existsSync(logFilePath)) {
+    return NextResponse.json({ error: 'Log file not found' }, { status: 404 });
+  }
+
+  try {
+    const pageLimit = Math.min(limit, MAX_PAGE_LINES);
+    const page = lineAddressed
+      ? await readIndexedPage(logFilePath, { beforeLine, at }, pageLimit)
+      : segment === null
+        ? await readLinesBefore(logFilePath, before, pageLimit)
+        : await readSegmentLinesBefore(logFilePath, segment, before, pageLimit);
+    if (!page) {
+      return NextResponse.json({ error: 'Log segment not found' }, { status: 404 });
+    }
+    if (expectedGeneration && expectedGeneration !== page.generation) {
+      return NextResponse.json(
+        { error: 'Log file was cleared or replaced', generation: page.generation },
+        { status: 409 }
+      );
+    }
+    return NextResponse.json({
+      file,
+      generation: page.generation,
+      before: page.before,
+      hasMore: page.hasMore,
+      segment,
+      previousSegment: page.previousSegment,
+      firstLine: page.firstLine,
+      totalLines: page.totalLines,
+      logs: page.lines.map(({ offset, line, lineNumber }) => ({ ...formatLogLine(file, line), offset, lineNumber })),
+    });
+  } catch (error) {
+    console.error('Error reading log page:', error);
+    return NextResponse.json(
+      { error: error instanceof Error ? error.message : 'Failed to read log file' },
+      { status: 500 }
+    );
+  }
+}
@@ -0,0 +1,61 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { join } from 'path';
+import { existsSync } from 'fs';
+import { parseLogFilter, searchLogs, DEFAULT_SEARCH_LIMIT } from '../../utils/logSearch';
+import { formatLogLine } from '../../utils/logFormat';
+
+// GET endpoint for searching a space's logs, including rotated segments:
+// ?version=&q=&regex=1&case=1&tag=APP,COMFY&level=warn,error&from=&to=&limit=&order=newest|oldest
+// Each match carries its file, segment and byte offset so the client can load the
+// surrounding lines from /api/logs/page.
+export async function GET(request: NextRequest) {
+  const searchParams = request.nextUrl.searchParams;
+  const version = searchParams.get('version');
+  if (!version) {
+    return NextResponse.json({ error: 'version parameter is required' }, { status: 400 });
+  }
+
+  const { filter, error } = parseLogFilter(searchParams);
+  if (error) {
+    return NextResponse.json({ error }, { status: 400 });
+  }
+
+  const limitParam = searchParams.get('limit');
+  const limit = limitParam === null ? DEFAULT_SEARCH_LIMIT : Number(limitParam);
+  if (!Number.isInteger(limit) || limit < 1) {
+    return NextResponse.json({ error: 'limit must be a positive integer' }, { status: 400 });
+  }
+  const order = searchParams.get('order') || 'newest';
+  if (order !== 'newest' && order !== 'oldest') {
+    return NextResponse.json({ error: 'order must be "newest" or "oldest"' }, { status: 400 });
+  }
+
+  const spacePath = join(process.cwd(), 'spaces', version);
+  if (!existsSync(spacePath)) {
+    return NextResponse.json({ error: 'Space not found' }, { status: 404 });
+  }
+
+  try {
+    const result = await searchLogs(spacePath, filter, { limit, order, signal: request.signal });
+    return NextResponse.json({
+      totalMatches: result.totalMatches,
+      truncated: result.truncated,
+      scannedBytes: result.scannedBytes,
+      timedOut: result.timedOut,
+      matches: result.matches.map(({ file, segment, offset, lineNumber, line, level }) => ({
+        ...formatLogLine(file, line),
+        level,
+        file,
+        segment,
+        offset,
+        lineNumber,
+      })),
+    });
+  } catch (error) {
+    console.error('Error searching logs:', error);
+    return NextResponse.json(
+      { error: error instanceof Error ? error.message : 'Failed to search logs' },
+      { status: 500 }
+    );
+  }
+}
@@ -1,195 +1,193 @@
 import { NextRequest } from 'next/server';
-import { readFileSync, existsSync, statSync } from 'fs';
 import { join } from 'path';
+import { subscribeToLog, DEFAULT_BACKFILL_LINES } from '../../utils/logHub';
+import type { LogCursor, LogHubEvent } from '../../utils/logHub';
+import { LOG_SOURCES, formatLogLine } from '../../utils/logFormat';
+import { parseLogFilter, matchesLogFilter, isLineFilterActive, runWithTimeout } from '../../utils/logSearch';
+import type { LogSource } from '../../utils/logFormat';
 
+// Events queued in the stream before a subscriber counts as slow and the hub holds lines back
+const STREAM_HIGH_WATER_MARK = 256;
+// Longest a filter may take over one batch of lines before the stream gives up on it
+const FILTER_TIMEOUT_MS = 1000;
+
+const STREAM_SOURCES: LogSource[] = ['logs', 'comfy'];
+
+type StreamCursor = Record<LogSource, LogCursor | null>;
+
+/**
+ * Parses a stream cursor of the form `<generation>:<offset>|<generation>:<offset>`
+ * (activation log first, ComfyUI log second). Either half may be empty when that
+ * file had not produced any lines yet.
+ */
+function parseCursor(value: string | null): StreamCursor | null {
+  if (!value) {
+    return null;
+  }
+  const parts = value.split('|');
+  if (parts.length !== STREAM_SOURCES.length) {
+    return null;
+  }
+  const cursor: StreamCursor = { logs: null, comfy: null };
+  STREAM_SOURCES.forEach((source, index) => {
+    const match = parts[index].match(/^([0-9a-z]+-[0-9a-f]+):(\d+)$/);
+    if (match) {
+      cursor[source] = { generation: match[1], offset: Number(match[2]) };
+    }
+  });
+  return cursor;
+}
+
+function formatCursor(cursor: StreamCursor): string {
+  return STREAM_SOURCES
+    .map(source => {
+      const position = cursor[source];
+      return position ? `${position.generation}:${position.offset}` : '';
+    })
+    .join('|');
+}
+
+// SSE stream of a space's activation and ComfyUI logs. Every event that carries log
+// lines has an `id:` with the position in both files, so a reconnecting EventSource
+// (which sends it back as Last-Event-ID) or a client passing ?since= resumes without
+// gaps or duplicates. Without a cursor only the last ?backfill= lines (default 500)
+// are sent; older lines are fetched from /api/logs/page. The search filter
+// parameters (q, regex, case, tag, level, from, to) restrict the stream to
+// matching lines.
 export async function GET(request: NextRequest) {
   const encoder = new TextEncoder();
   const searchParams = request.nextUrl.searchParams;
   const version = searchParams.get('version');
-  
+  const { filter, error: filterError } = parseLogFilter(searchParams);
+  if (filterError) {
+    return new Response(filterError, { status: 400 });
+  }
+  const filterLines = isLineFilterActive(filter);
+  const since = parseCursor(request.headers.get('last-event-id') || searchParams.get('since'));
+  const backfillParam = Number(searchParams.get('backfill'));
+  const backfill = searchParams.has('backfill') && Number.isInteger(backfillParam) && backfillParam >= 0
+    ? backfillParam
+    : DEFAULT_BACKFILL_LINES;
+  const subscriptions: Array<{ drain: () => void; unsubscribe: () => void }> = [];
+  const cursor: StreamCursor = { logs: since?.logs ?? null, comfy: since?.comfy ?? null };
+  let closed = false;
+
   const stream = new ReadableStream({
     async start(controller) {
+      const enqueue = (payload: unknown, withId: boolean = false) => {
+        if (closed) {
+          return;
+        }
+        try {
+          const id = withId ? `id: ${formatCursor(cursor)}\n` : '';
+          controller.enqueue(encoder.encode(`${id}data: ${JSON.stringify(payload)}\n\n`));
+        } catch (error) {
+          // Client disconnected
+          closed = true;
+        }
+      };
+
       const sendLog = (message: string, timestamp?: string) => {
-        const logEntry = {
+        enqueue({
           message,
           timestamp: timestamp || new Date().toISOString()
-        };
-        const data = JSON.stringify(logEntry) + '\n\n';
-        controller.enqueue(encoder.encode(`data: ${data}`));
+        });
+      };
+
+      const close = () => {
+        if (closed) {
+          return;
+        }
+        closed = true;
+        subscriptions.forEach(({ unsubscribe }) => unsubscribe());
+        try {
+          controller.close();
+        } catch (error) {
+          // Already closed
+        }
       };
 
+      // Cleanup on client disconnect
+      request.signal.addEventListener('abort', close);
+
       // Send initial connection message
-      sendLog('Log stream connected');
+      sendLog(since ? 'Log stream resumed' : 'Log stream connected');
 
       // If version is provided, read from the activation log file
       if (version) {
         const spacePath = join(process.cwd(), 'spaces', version);
-        const logFilePath = join(spacePath, 'logs.txt');
-        const comfyLogFilePath = join(spacePath, 'comfy-logs.txt');
 
         try {
-          // Helper function to watch a log file
-          const watchLogFile = (
-            filePath: string,
-            fileLabel: string,
-            parseTimestamp: boolean = true,
-            addTag: string | null = null
-          ) => {
-            // Read existing logs from file
-            let lastLineCount = 0;
-            if (existsSync(filePath)) {
-              const fileContent = readFileSync(filePath, 'utf-8');
-              const lines = fileContent.split('\n').filter(line => line.trim());
-              
-              // Parse and send existing logs
-              for (const line of lines) {
-                let messageToSend = line;
-                if (parseTimestamp) {
-                  // Parse log format: [timestamp] message
-                  const timestampMatch = line.match(/^\[([^\]]+)\]\s*(.+)$/);
-                  if (timestampMatch) {
-                    const [, timestamp, message] = timestampMatch;
-                    messageToSend = message;
-                    // If message already has the tag, keep it; otherwise add the tag if specified
-                    if (addTag && !messageToSend.match(new RegExp(`^\\[${addTag}\\]`))) {
-                      messageToSend = `[${addTag}] ${messageToSend}`;
-                    }
-                    sendLog(messageToSend, timestamp);
-                  } else {
-                    // If no timestamp, add tag if specified
-                    if (addTag && !messageToSend.match(new RegExp(`^\\[${addTag}\\]`))) {
-                      messageToSend = `[${addTag}] ${messageToSend}`;
-                    }
-                    sendLog(messageToSend);
-                  }
-                } else {
-                  // For comfy-logs.txt, add [COMFY] tag if not already present
-                  if (addTag && !messageToSend.match(new RegExp(`^\\[${addTag}\\]`))) {
-                    messageToSend = `[${addTag}] ${messageToSend}`;
-                  }
-                  sendLog(messageToSend);
-                }
-              }
-              lastLineCount = lines.length;
-            }
+          // Helper function to subscribe to a log file through the shared log hub
+          const watchLogFile = async (source: LogSource) => {
+            const { fileName, label, tag } = LOG_SOURCES[source];
 
-            // Watch for file changes and stream new logs
-            let lastModified = existsSync(filePath) ? statSync(filePath).mtimeMs : 0;
-            
-            const watchInterval = setInterval(async () => {
-              try {
-                if (existsSync(filePath)) {
-                  const stats = statSync(filePath);
-                  const currentModified = stats.mtimeMs;
-                  const currentContent = readFileSync(filePath, 'utf-8');
-                  const lines = currentContent.split('\n').filter(line => line.trim());
-                  const currentLineCount = lines.length;
-                  
-                  // If file was modified
-                  if (currentModified !== lastModified) {
-                    if (currentLineCount < lastLineCount) {
-                      // File was cleared, send a message and then all new content
-                      const clearMessage = addTag 
-                        ? `[${addTag}] ${fileLabel} cleared, showing new logs...`
-                        : `[APP] ${fileLabel} cleared, showing new logs...`;
-                      sendLog(clearMessage);
-                      // Send all lines from the cleared file
-                      for (const line of lines) {
-                        let messageToSend = line;
-                        if (parseTimestamp) {
-                          const timestampMatch = line.match(/^\[([^\]]+)\]\s*(.+)$/);
-                          if (timestampMatch) {
-                            const [, timestamp, message] = timestampMatch;
-                            messageToSend = message;
-                            if (addTag && !messageToSend.match(new RegExp(`^\\[${addTag}\\]`))) {
-                              messageToSend = `[${addTag}] ${messageToSend}`;
-                            }
-                            sendLog(messageToSend, timestamp);
-                          } else if (line.trim()) {
-                            if (addTag && !messageToSend.match(new RegExp(`^\\[${addTag}\\]`))) {
-                              messageToSend = `[${addTag}] ${messageToSend}`;
-                            }
-                            sendLog(messageToSend);
-                          }
-                        } else {
-                          if (line.trim()) {
-                            if (addTag && !messageToSend.match(new RegExp(`^\\[${addTag}\\]`))) {
-                              messageToSend = `[${addTag}] ${messageToSend}`;
-                            }
-                            sendLog(messageToSend);
-                          }
-                        }
-                      }
-                    } else if (currentLineCount > lastLineCount) {
-                      // New lines added, send only the new ones
-                      const newLines = lines.slice(lastLineCount);
-                      for (const line of newLines) {
-                        let messageToSend = line;
-                        if (parseTimestamp) {
-                          const timestampMatch = line.match(/^\[([^\]]+)\]\s*(.+)$/);
-                          if (timestampMatch) {
-                            const [, timestamp, message] = timestampMatch;
-                            messageToSend = message;
-                            if (addTag && !messageToSend.match(new RegExp(`^\\[${addTag}\\]`))) {
-                              messageToSend = `[${addTag}] ${messageToSend}`;
-                            }
-                            sendLog(messageToSend, timestamp);
-                          } else if (line.trim()) {
-                            if (addTag && !messageToSend.match(new RegExp(`^\\[${addTag}\\]`))) {
-                              messageToSend = `[${addTag}] ${messageToSend}`;
-                            }
-                            sendLog(messageToSend);
-                          }
-                        } else {
-                          if (line.trim()) {
-                            if (addTag && !messageToSend.match(new RegExp(`^\\[${addTag}\\]`))) {
-                              messageToSend = `[${addTag}] ${messageToSend}`;
-                            }
-                            sendLog(messageToSend);
-                          }
-                        }
-                      }
-                    }
-                    
-                    lastLineCount = currentLineCount;
-                    lastModified = currentModified;
-                  }
-                } else {
-                  // File doesn't exist yet, reset tracking
-                  lastLineCount = 0;
-                  lastModified = 0;
+            const handleEvent = (event: LogHubEvent) => {
+              if (event.type === 'reset') {
+                // File was cleared or replaced, new content follows
+                cursor[source] = { generation: event.generation, offset: 0 };
+                enqueue({ message: `[${tag}] ${label} cleared, showing new logs...`, timestamp: new Date().toISOString() }, true);
+              } else if (event.type === 'dropped') {
+                sendLog(`[${tag}] ${event.count} log line(s) skipped because the connection could not keep up`);
+              } else if (event.type === 'gap') {
+                // Lines before `before` are no longer buffered, the client can page them in
+                enqueue({ gap: { file: source, generation: event.generation, before: event.before } });
+              } else {
+                cursor[source] = { generation: event.generation, offset: event.lines[event.lines.length - 1].offset };
+                let lines = event.lines;
+                if (filterLines && !runWithTimeout(() => {
+                  lines = event.lines.filter(({ line }) => matchesLogFilter(filter, source, line) !== null);
+                }, FILTER_TIMEOUT_MS)) {
+                  sendLog(`[${tag}] Log filter took too long to match, stream closed`);
+                  close();
+                  return;
                 }
-              } catch (error) {
-                console.error(`Error reading ${fileLabel}:`, error);
+                if (lines.length === 0) {
+                  return;
+                }
+                const entries = lines.map(({ offset, line }) => ({ ...formatLogLine(source, line), file: source, offset }));
+                // Several lines go out as one { logs } event, like the activation stream
+                enqueue(entries.length === 1 ? entries[0] : { logs: entries }, true);
               }
-            }, 500); // Check every 500ms
+            };
 
-            return watchInterval;
+            const subscription = await subscribeToLog(version, fileName, join(spacePath, fileName), {
+              send: handleEvent,
+              isReady: () => !closed && (controller.desiredSize ?? 0) > 0,
+            }, { since: since?.[source], backfill });
+            if (closed) {
+              subscription.unsubscribe();
+            } else {
+              subscriptions.push(subscription);
+            }
           };
 
-          // Watch activation logs (with timestamp parsing, add [APP] tag)
-          const activationWatchInterval = watchLogFile(logFilePath, 'Activation log file', true, 'APP');
-          
-          // Watch ComfyUI logs (without timestamp parsing, add [COMFY] tag)
-          const comfyWatchInterval = watchLogFile(comfyLogFilePath, 'ComfyUI log file', false, 'COMFY');
-
-          // Cleanup on client disconnect
-          request.signal.addEventListener('abort', () => {
-            clearInterval(activationWatchInterval);
-            clearInterval(comfyWatchInterval);
-            controller.close();
-          });
+          // Activation logs (with timestamp parsing, [APP] tag) and ComfyUI logs ([COMFY] tag)
+          for (const source of STREAM_SOURCES) {
+            // Sources excluded by ?tag= are not followed at all
+            if (filter.sources.includes(source)) {
+              await watchLogFile(source);
+            }
+          }
         } catch (error) {
           sendLog(`Error reading log file: ${error instanceof Error ? error.message : 'Unknown error'}`);
-          controller.close();
+          close();
         }
       } else {
         // No version provided, just send a message
         sendLog('No space version specified. Please provide version parameter.');
-        controller.close();
+        close();
       }
     },
-  });
+    pull() {
+      // The client caught up, hand over lines the hub held back
+      subscriptions.forEach(({ drain }) => drain());
+    },
+    cancel() {
+      closed = true;
+      subscriptions.forEach(({ unsubscribe }) => unsubscribe());
+    },
+  }, { highWaterMark: STREAM_HIGH_WATER_MARK });
 
   return new Response(stream, {
     headers: {
@@ -199,4 +197,3 @@ export async function GET(request: NextRequest) {
     },
   });
 }
-
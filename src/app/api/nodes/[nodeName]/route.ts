@@ -1,7 +1,8 @@
 import { NextResponse } from 'next/server';
 import { join } from 'path';
 import { existsSync, rmSync } from 'fs';
-import { readFile, writeFile } from 'fs/promises';
+import { readFile } from 'fs/promises';
+import { updateSpaceJson } from '../../utils/spaceStore';
 
 export async function DELETE(
   request: Request,
@@ -41,16 +42,12 @@ export async function DELETE(
     // It's okay if the node doesn't exist in space.json - we'll just filter it out if it does
     if (existsSync(spaceJsonPath)) {
       try {
-        const spaceJsonContent = await readFile(spaceJsonPath, 'utf-8');
-        const spaceJson = JSON.parse(spaceJsonContent);
-
-        // Remove node from nodes array if it exists (it's okay if it doesn't exist)
-        if (Array.isArray(spaceJson.nodes)) {
-          spaceJson.nodes = spaceJson.nodes.filter((node: any) => node.name !== nodeName);
-          
-          // Write updated space.json
-          await writeFile(spaceJsonPath, JSON.stringify(spaceJson, null, 2), 'utf-8');
-        }
+        await updateSpaceJson(selectedVersion, (spaceJson) => {
+          // Remove node from nodes array if it exists (it's okay if it doesn't exist)
+          if (Array.isArray(spaceJson.nodes)) {
+            spaceJson.nodes = spaceJson.nodes.filter((node: any) => node.name !== nodeName);
+          }
+        });
       } catch (error) {
         console.error('Error updating space.json:', error);
         // Don't fail the request if space.json update fails - it's okay if node doesn't exist in space.json
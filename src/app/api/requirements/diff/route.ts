@@ -2,6 +2,8 @@ import { NextResponse } from 'next/server';
 import { join } from 'path';
 import { readFile } from 'fs/promises';
 import { existsSync } from 'fs';
+import { diffRequirements, parseRequirements, toLineDiff } from '../../utils/requirementsDiff';
+import { readSpaceJson } from '../../utils/spaceStore';
 
 export async function GET() {
   try {
@@ -27,79 +29,28 @@ export async function GET() {
     }
 
     // Read space.json
-    const spaceJsonContent = await readFile(spaceJsonPath, 'utf-8');
-    const spaceJson = JSON.parse(spaceJsonContent);
-    const currentDependencies = spaceJson.dependencies || [];
+    const spaceJson = await readSpaceJson(selectedVersion);
+    const currentDependencies = spaceJson?.dependencies || [];
     
     // For now, return empty diff since we don't have a backup mechanism yet
     // This can be enhanced later to compare with a previous version
     const currentContent = currentDependencies.join('\n');
     const backupContent = currentDependencies.join('\n'); // Same as current for now
 
-    // Split into lines for comparison
-    const currentLines = currentContent.split('\n');
-    const backupLines = backupContent.split('\n');
-
-    // Simple line-by-line diff
-    const diff: Array<{
-      lineNumber: number;
-      type: 'added' | 'removed' | 'unchanged';
-      currentLine?: string;
-      backupLine?: string;
-    }> = [];
-
-    const maxLines = Math.max(currentLines.length, backupLines.length);
-
-    for (let i = 0; i < maxLines; i++) {
-      const currentLine = currentLines[i];
-      const backupLine = backupLines[i];
-
-      if (currentLine === undefined && backupLine !== undefined) {
-        // Line removed
-        diff.push({
-          lineNumber: i + 1,
-          type: 'removed',
-          backupLine: backupLine,
-        });
-      } else if (currentLine !== undefined && backupLine === undefined) {
-        // Line added
-        diff.push({
-          lineNumber: i + 1,
-          type: 'added',
-          currentLine: currentLine,
-        });
-      } else if (currentLine !== backupLine) {
-        // Line changed
-        diff.push({
-          lineNumber: i + 1,
-          type: 'removed',
-          backupLine: backupLine,
-        });
-        diff.push({
-          lineNumber: i + 1,
-          type: 'added',
-          currentLine: currentLine,
-        });
-      } else {
-        // Line unchanged
-        diff.push({
-          lineNumber: i + 1,
-          type: 'unchanged',
-          currentLine: currentLine,
-          backupLine: backupLine,
-        });
-      }
-    }
+    // Compared by requirement through the shared, cached diff engine
+    const current = parseRequirements(currentContent);
+    const backup = parseRequirements(backupContent);
+    const diff = toLineDiff(diffRequirements(backup, current));
 
     return NextResponse.json({
       hasBackup: true,
       current: {
         content: currentContent,
-        lineCount: currentLines.length,
+        lineCount: current.lines.length,
       },
       backup: {
         content: backupContent,
-        lineCount: backupLines.length,
+        lineCount: backup.lines.length,
       },
       diff,
     });
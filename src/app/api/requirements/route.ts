@@ -2,6 +2,7 @@ import { NextResponse } from 'next/server';
 import { join } from 'path';
 import { readFile } from 'fs/promises';
 import { existsSync } from 'fs';
+import { readSpaceJson } from '../utils/spaceStore';
 
 interface Dependency {
   name: string;
@@ -64,9 +65,8 @@ export async function GET() {
     }
 
     // Read and parse dependencies from space.json
-    const spaceJsonContent = await readFile(spaceJsonPath, 'utf-8');
-    const spaceJson = JSON.parse(spaceJsonContent);
-    const dependenciesList = spaceJson.dependencies || [];
+    const spaceJson = await readSpaceJson(selectedVersion);
+    const dependenciesList = spaceJson?.dependencies || [];
     
     // Convert to Dependency format
     const dependencies: Dependency[] = dependenciesList.map((dep: string) => {
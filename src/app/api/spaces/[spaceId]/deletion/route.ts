@@ -0,0 +1,36 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { getSpaceDeletions } from '../../../utils/spaceTrash';
+
+// GET endpoint for the progress of a space's background deletion. The space itself
+// is already gone from spaces/, so there is no existence check; an empty list
+// means its files have been removed.
+export async function GET(
+  request: NextRequest,
+  { params }: { params: Promise<{ spaceId: string }> | { spaceId: string } }
+) {
+  try {
+    // Handle both Promise and direct params (for Next.js version compatibility)
+    const resolvedParams = params instanceof Promise ? await params : params;
+    const spaceId = decodeURIComponent(resolvedParams.spaceId);
+
+    if (!spaceId) {
+      return NextResponse.json(
+        { error: 'Space ID is required' },
+        { status: 400 }
+      );
+    }
+
+    const deletions = await getSpaceDeletions(spaceId);
+
+    return NextResponse.json({
+      deletions,
+      done: deletions.length === 0,
+    });
+  } catch (error) {
+    console.error('Error reading space deletion progress:', error);
+    return NextResponse.json(
+      { error: `Failed to read deletion progress: ${error instanceof Error ? error.message : 'Unknown error'}` },
+      { status: 500 }
+    );
+  }
+}
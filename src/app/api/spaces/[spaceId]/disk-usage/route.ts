@@ -0,0 +1,47 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { join } from 'path';
+import { existsSync } from 'fs';
+import { getDiskUsage } from '../../../utils/diskUsage';
+
+// GET endpoint for a space's disk usage broken down by venv, ComfyUI, custom nodes,
+// models, logs and requirements history. Only directories that changed since the
+// last scan are read again; ?refresh=full rescans everything.
+export async function GET(
+  request: NextRequest,
+  { params }: { params: Promise<{ spaceId: string }> | { spaceId: string } }
+) {
+  try {
+    // Handle both Promise and direct params (for Next.js version compatibility)
+    const resolvedParams = params instanceof Promise ? await params : params;
+    const spaceId = decodeURIComponent(resolvedParams.spaceId);
+
+    if (!spaceId) {
+      return NextResponse.json(
+        { error: 'Space ID is required' },
+        { status: 400 }
+      );
+    }
+
+    const spacePath = join(process.cwd(), 'spaces', spaceId);
+    if (!existsSync(spacePath)) {
+      return NextResponse.json(
+        { error: 'Space not found' },
+        { status: 404 }
+      );
+    }
+
+    const full = request.nextUrl.searchParams.get('refresh') === 'full';
+    const usage = await getDiskUsage(spaceId, { full });
+
+    return NextResponse.json({
+      ...usage,
+      exclusiveBytes: usage.totalBytes - usage.sharedBytes,
+    });
+  } catch (error) {
+    console.error('Error measuring disk usage:', error);
+    return NextResponse.json(
+      { error: `Failed to measure disk usage: ${error instanceof Error ? error.message : 'Unknown error'}` },
+      { status: 500 }
+    );
+  }
+}
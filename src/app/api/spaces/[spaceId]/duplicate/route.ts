@@ -1,7 +1,10 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { join } from 'path';
-import { readFile, writeFile, mkdir, cp } from 'fs/promises';
+import { readFile, mkdir, cp, rm } from 'fs/promises';
 import { existsSync } from 'fs';
+import { copyTree, copyVenv } from '../../../utils/copyOnWrite';
+import { invalidateSpaceCatalogue } from '../../../utils/spaceCatalogue';
+import { writeSpaceJson } from '../../../utils/spaceStore';
 
 function generateSpaceId(visibleName: string): string {
   return visibleName
@@ -95,8 +98,40 @@ export async function POST(
     };
 
     // Write new space.json
-    const newSpaceJsonPath = join(newSpacePath, 'space.json');
-    await writeFile(newSpaceJsonPath, JSON.stringify(newSpaceJson, null, 2), 'utf-8');
+    await writeSpaceJson(newSpaceId, newSpaceJson);
+
+    // Copy the source checkout and venv so the duplicate does not have to clone and
+    // install everything again on first activation. Reflinks make this cheap on CoW
+    // filesystems. If a copy fails the partial tree is removed and activation falls
+    // back to cloning and installing as usual.
+    const sourceComfyUIPath = join(sourceSpacePath, 'ComfyUI');
+    if (existsSync(sourceComfyUIPath)) {
+      const newComfyUIPath = join(newSpacePath, 'ComfyUI');
+      try {
+        await copyTree(sourceComfyUIPath, newComfyUIPath);
+      } catch (error) {
+        console.warn(`Failed to copy ComfyUI from ${sourceSpaceId}:`, error);
+        await rm(newComfyUIPath, { recursive: true, force: true });
+      }
+    }
+
+    const sourceVenvPath = join(sourceSpacePath, 'venv');
+    if (existsSync(sourceVenvPath)) {
+      const newVenvPath = join(newSpacePath, 'venv');
+      try {
+        await copyVenv(sourceVenvPath, newVenvPath, sourceSpaceJson.dependencies || []);
+      } catch (error) {
+        console.warn(`Failed to copy venv from ${sourceSpaceId}:`, error);
+        await rm(newVenvPath, { recursive: true, force: true });
+      }
+    }
+
+    const sourceRequirementsPath = join(sourceSpacePath, 'requirements.txt');
+    if (existsSync(sourceRequirementsPath)) {
+      await cp(sourceRequirementsPath, join(newSpacePath, 'requirements.txt'));
+    }
+
+    invalidateSpaceCatalogue(newSpaceId);
 
     return NextResponse.json({ 
       success: true,
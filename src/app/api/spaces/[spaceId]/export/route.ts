@@ -2,6 +2,35 @@ import { NextRequest, NextResponse } from 'next/server';
 import { join } from 'path';
 import { readFile } from 'fs/promises';
 import { existsSync } from 'fs';
+import { Readable } from 'stream';
+import {
+  createSpaceBundle,
+  getBundleContentType,
+  getBundleFileName,
+  getDefaultBundleCompression,
+  isZstdSupported,
+} from '../../../utils/spaceBundle';
+import type { BundleCompression } from '../../../utils/spaceBundle';
+
+const BUNDLE_COMPRESSIONS: BundleCompression[] = ['zstd', 'gzip', 'none'];
+
+// Hands a Node stream to the response, reading from it only as the client consumes
+function toWebStream(stream: Readable): ReadableStream<Uint8Array> {
+  const iterator = stream[Symbol.asyncIterator]();
+  return new ReadableStream<Uint8Array>({
+    async pull(controller) {
+      const { value, done } = await iterator.next();
+      if (done) {
+        controller.close();
+      } else {
+        controller.enqueue(value);
+      }
+    },
+    cancel() {
+      stream.destroy();
+    },
+  });
+}
 
 export async function GET(
   request: NextRequest,
@@ -29,6 +58,34 @@ export async function GET(
       );
     }
 
+    // ?format=bundle exports the whole space (checkouts and wheels) for offline import
+    if (request.nextUrl.searchParams.get('format') === 'bundle') {
+      const requested = request.nextUrl.searchParams.get('compression');
+      const compression = (requested || getDefaultBundleCompression()) as BundleCompression;
+      if (!BUNDLE_COMPRESSIONS.includes(compression)) {
+        return NextResponse.json(
+          { error: `Invalid compression "${requested}", expected zstd, gzip or none` },
+          { status: 400 }
+        );
+      }
+      if (compression === 'zstd' && !isZstdSupported()) {
+        return NextResponse.json(
+          { error: 'zstd compression needs a newer Node.js version; use compression=gzip or none' },
+          { status: 400 }
+        );
+      }
+
+      const includeWheels = request.nextUrl.searchParams.get('wheels') !== '0';
+      const bundle = createSpaceBundle(spaceId, { compression, includeWheels });
+      return new Response(toWebStream(bundle), {
+        headers: {
+          'Content-Type': getBundleContentType(compression),
+          'Content-Disposition': `attachment; filename="${getBundleFileName(spaceId, compression)}"`,
+          'Cache-Control': 'no-store',
+        },
+      });
+    }
+
     const spaceJsonContent = await readFile(spaceJsonPath, 'utf-8');
     
     // Return as JSON with proper headers for download
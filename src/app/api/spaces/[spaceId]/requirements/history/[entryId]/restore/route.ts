@@ -1,7 +1,9 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { join } from 'path';
-import { readFile, writeFile } from 'fs/promises';
+import { writeFile } from 'fs/promises';
 import { existsSync } from 'fs';
+import { updateSpaceJson } from '../../../../../../utils/spaceStore';
+import { readHistorySnapshot } from '../../../../../../utils/requirementsHistory';
 
 export async function POST(
   request: NextRequest,
@@ -22,8 +24,6 @@ export async function POST(
     const spacesPath = join(process.cwd(), 'spaces');
     const spacePath = join(spacesPath, spaceId);
     const requirementsPath = join(spacePath, 'requirements.txt');
-    const historyPath = join(spacePath, 'requirements_history');
-    const historySnapshotPath = join(historyPath, `${entryId}_requirements.txt`);
 
     // Check if space exists
     if (!existsSync(spacePath)) {
@@ -33,16 +33,15 @@ export async function POST(
       );
     }
 
-    // Check if history snapshot exists
-    if (!existsSync(historySnapshotPath)) {
+    // Read history snapshot
+    const snapshot = await readHistorySnapshot(spacePath, entryId);
+    if (!snapshot) {
       return NextResponse.json(
         { error: 'History entry not found' },
         { status: 404 }
       );
     }
-
-    // Read history snapshot
-    const historyContent = await readFile(historySnapshotPath, 'utf-8');
+    const historyContent = snapshot.content;
 
     // Restore requirements.txt
     await writeFile(requirementsPath, historyContent, 'utf-8');
@@ -55,9 +54,6 @@ export async function POST(
     const spaceJsonPath = join(spacePath, 'space.json');
     if (existsSync(spaceJsonPath)) {
       try {
-        const spaceJsonContent = await readFile(spaceJsonPath, 'utf-8');
-        const spaceJson = JSON.parse(spaceJsonContent);
-        
         // Parse requirements into dependencies array
         const dependencies = historyContent
           .trim()
@@ -66,10 +62,9 @@ export async function POST(
           .map(line => line.trim());
         
         // Update dependencies in space.json
-        spaceJson.dependencies = dependencies;
-        
-        // Write updated space.json
-        await writeFile(spaceJsonPath, JSON.stringify(spaceJson, null, 2), 'utf-8');
+        await updateSpaceJson(spaceId, (spaceJson) => {
+          spaceJson.dependencies = dependencies;
+        });
       } catch (error: any) {
         console.error('Error updating space.json:', error);
         // Continue even if space.json update fails
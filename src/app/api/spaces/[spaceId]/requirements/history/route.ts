@@ -1,14 +1,7 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { join } from 'path';
-import { readdir, readFile } from 'fs/promises';
-import { existsSync, statSync } from 'fs';
-
-interface HistoryEntry {
-  id: string;
-  timestamp: string;
-  type: 'activation' | 'node_install';
-  nodeName?: string;
-}
+import { existsSync } from 'fs';
+import { listRequirementsHistory } from '../../../../utils/requirementsHistory';
 
 export async function GET(
   request: NextRequest,
@@ -27,7 +20,6 @@ export async function GET(
 
     const spacesPath = join(process.cwd(), 'spaces');
     const spacePath = join(spacesPath, spaceId);
-    const historyPath = join(spacePath, 'requirements_history');
 
     // Check if space exists
     if (!existsSync(spacePath)) {
@@ -37,45 +29,32 @@ export async function GET(
       );
     }
 
-    // Check if history directory exists
-    if (!existsSync(historyPath)) {
-      return NextResponse.json({
-        history: [],
-      });
+    const searchParams = request.nextUrl.searchParams;
+    const cursor = searchParams.get('cursor');
+    const limitParam = searchParams.get('limit');
+    if (cursor !== null && !/^\d+$/.test(cursor)) {
+      return NextResponse.json(
+        { error: 'Invalid cursor' },
+        { status: 400 }
+      );
     }
-
-    // Read all history entries
-    const files = await readdir(historyPath);
-    const historyFiles = files.filter(f => f.endsWith('.json'));
-
-    const history: HistoryEntry[] = [];
-
-    for (const file of historyFiles) {
-      try {
-        const filePath = join(historyPath, file);
-        const content = await readFile(filePath, 'utf-8');
-        const entry = JSON.parse(content);
-        
-        // Get file modification time as fallback
-        const stats = statSync(filePath);
-        
-        history.push({
-          id: entry.id,
-          timestamp: entry.timestamp || stats.mtime.toISOString(),
-          type: entry.type,
-          nodeName: entry.nodeName,
-        });
-      } catch (error) {
-        // Skip invalid entries
-        console.error(`Error reading history file ${file}:`, error);
-      }
+    if (limitParam !== null && !/^[1-9]\d*$/.test(limitParam)) {
+      return NextResponse.json(
+        { error: 'Invalid limit' },
+        { status: 400 }
+      );
     }
 
-    // Sort by timestamp (newest first)
-    history.sort((a, b) => new Date(b.timestamp).getTime() - new Date(a.timestamp).getTime());
+    // Served from the history index, entry files are only read once to build it
+    const { history, nextCursor, total } = await listRequirementsHistory(spacePath, {
+      cursor,
+      limit: limitParam !== null ? Number(limitParam) : undefined,
+    });
 
     return NextResponse.json({
       history,
+      nextCursor,
+      total,
     });
   } catch (error: any) {
     console.error('Error fetching requirements history:', error);
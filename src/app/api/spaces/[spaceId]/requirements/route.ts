@@ -2,6 +2,7 @@ import { NextRequest, NextResponse } from 'next/server';
 import { join } from 'path';
 import { readFile, writeFile } from 'fs/promises';
 import { existsSync } from 'fs';
+import { updateSpaceJson } from '../../../utils/spaceStore';
 
 // GET endpoint for fetching requirements.txt
 export async function GET(
@@ -91,9 +92,6 @@ export async function PUT(
     // Update space.json dependencies if it exists
     if (existsSync(spaceJsonPath)) {
       try {
-        const spaceJsonContent = await readFile(spaceJsonPath, 'utf-8');
-        const spaceJson = JSON.parse(spaceJsonContent);
-        
         // Parse requirements.txt content into dependencies array
         const dependencies = content
           .trim()
@@ -102,10 +100,9 @@ export async function PUT(
           .map(line => line.trim());
         
         // Update dependencies in space.json
-        spaceJson.dependencies = dependencies;
-        
-        // Write updated space.json
-        await writeFile(spaceJsonPath, JSON.stringify(spaceJson, null, 2), 'utf-8');
+        await updateSpaceJson(spaceId, (spaceJson) => {
+          spaceJson.dependencies = dependencies;
+        });
       } catch (error) {
         console.error('Error updating space.json:', error);
         // Don't fail the request if space.json update fails
@@ -1,7 +1,12 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { join } from 'path';
-import { readFile, writeFile } from 'fs/promises';
-import { existsSync, rmSync } from 'fs';
+import { readFile } from 'fs/promises';
+import { existsSync } from 'fs';
+import { INSTALLER_NAMES } from '../../utils/installer';
+import { invalidateSpaceCatalogue } from '../../utils/spaceCatalogue';
+import { discardDiskUsage } from '../../utils/diskUsage';
+import { trashSpace } from '../../utils/spaceTrash';
+import { updateSpaceJson } from '../../utils/spaceStore';
 
 // DELETE endpoint for deleting a space
 export async function DELETE(
@@ -47,12 +52,15 @@ export async function DELETE(
       );
     }
 
-    // Delete the space directory
-    rmSync(spacePath, { recursive: true, force: true });
+    // Move the space to the trash; its files are removed in the background
+    const deletion = await trashSpace(spaceId);
+    invalidateSpaceCatalogue(spaceId);
+    await discardDiskUsage(spaceId);
 
     return NextResponse.json({ 
       success: true,
-      message: `Space "${spaceId}" deleted successfully`
+      message: `Space "${spaceId}" deleted successfully`,
+      deletion,
     });
   } catch (error) {
     console.error('Error deleting space:', error);
@@ -80,7 +88,7 @@ export async function PUT(
     }
 
     const body = await request.json();
-    const { visibleName, comfyUIArgs } = body;
+    const { visibleName, comfyUIArgs, installer } = body;
 
     const spacesPath = join(process.cwd(), 'spaces');
     const spaceJsonPath = join(spacesPath, spaceId, 'space.json');
@@ -92,43 +100,58 @@ export async function PUT(
       );
     }
 
-    // Read existing space.json
-    const spaceJsonContent = await readFile(spaceJsonPath, 'utf-8');
-    const spaceJson = JSON.parse(spaceJsonContent);
+    // Validate visibleName if provided
+    if (visibleName !== undefined && (typeof visibleName !== 'string' || visibleName.trim() === '')) {
+      return NextResponse.json(
+        { error: 'visibleName must be a non-empty string' },
+        { status: 400 }
+      );
+    }
 
-    // Update metadata
-    if (!spaceJson.metadata) {
-      spaceJson.metadata = {};
+    // Validate installer backend if provided
+    if (installer !== undefined && !INSTALLER_NAMES.includes(installer)) {
+      return NextResponse.json(
+        { error: `installer must be one of: ${INSTALLER_NAMES.join(', ')}` },
+        { status: 400 }
+      );
     }
-    
-    // Update visibleName if provided
-    if (visibleName !== undefined) {
-      if (typeof visibleName !== 'string' || visibleName.trim() === '') {
-        return NextResponse.json(
-          { error: 'visibleName must be a non-empty string' },
-          { status: 400 }
-        );
+
+    // Update metadata through the space store so concurrent writers do not lose changes
+    const metadata = await updateSpaceJson(spaceId, (spaceJson) => {
+      if (!spaceJson.metadata) {
+        spaceJson.metadata = {};
       }
-      spaceJson.metadata.visibleName = visibleName.trim();
-    }
-    
-    // Update comfyUIArgs if provided
-    if (comfyUIArgs !== undefined) {
-      spaceJson.metadata.comfyUIArgs = comfyUIArgs && typeof comfyUIArgs === 'string' && comfyUIArgs.trim() ? comfyUIArgs.trim() : null;
-    }
 
-    // Write updated space.json
-    await writeFile(spaceJsonPath, JSON.stringify(spaceJson, null, 2), 'utf-8');
+      // Update visibleName if provided
+      if (visibleName !== undefined) {
+        spaceJson.metadata.visibleName = visibleName.trim();
+      }
+
+      // Update comfyUIArgs if provided
+      if (comfyUIArgs !== undefined) {
+        spaceJson.metadata.comfyUIArgs = comfyUIArgs && typeof comfyUIArgs === 'string' && comfyUIArgs.trim() ? comfyUIArgs.trim() : null;
+      }
+
+      // Update installer backend if provided
+      if (installer !== undefined) {
+        spaceJson.metadata.installer = installer;
+      }
+
+      return spaceJson.metadata;
+    });
+    invalidateSpaceCatalogue(spaceId);
 
     const message = visibleName !== undefined 
       ? `Space renamed to "${visibleName.trim()}" successfully`
-      : 'Command arguments updated successfully';
+      : comfyUIArgs !== undefined
+        ? 'Command arguments updated successfully'
+        : 'Installer updated successfully';
 
     return NextResponse.json({ 
       success: true,
       message,
-      visibleName: spaceJson.metadata.visibleName,
-      comfyUIArgs: spaceJson.metadata.comfyUIArgs
+      visibleName: metadata.visibleName,
+      comfyUIArgs: metadata.comfyUIArgs
     });
   } catch (error) {
     console.error('Error renaming space:', error);
@@ -4,85 +4,13 @@ import { readFile, writeFile, mkdir, readdir, cp } from 'fs/promises';
 import { existsSync } from 'fs';
 import { spawn, execFile } from 'child_process';
 import { promisify } from 'util';
+import { cloneRepository } from '../../utils/gitMirror';
+import { createVenv, normalizeInstallerName } from '../../utils/installer';
+import { invalidateSpaceCatalogue } from '../../utils/spaceCatalogue';
+import { writeSpaceJson } from '../../utils/spaceStore';
 
 const execFileAsync = promisify(execFile);
 
-type PythonCandidate = { command: string; args: string[] };
-
-function formatPythonCommand(candidate: PythonCandidate): string {
-  return [candidate.command, ...candidate.args].join(' ').trim();
-}
-
-function buildPythonCandidates(pythonVersion?: string): PythonCandidate[] {
-  const candidates: PythonCandidate[] = [];
-  const isWindows = process.platform === 'win32';
-  const versionMatch = pythonVersion?.trim().match(/^\d+(?:\.\d+)?/);
-  const version = versionMatch?.[0];
-
-  if (version) {
-    if (isWindows) {
-      candidates.push({ command: 'py', args: [`-${version}`] });
-    } else {
-      candidates.push({ command: `python${version}`, args: [] });
-    }
-  }
-
-  if (isWindows) {
-    candidates.push({ command: 'py', args: ['-3'] });
-    candidates.push({ command: 'python', args: [] });
-    candidates.push({ command: 'python3', args: [] });
-  } else {
-    candidates.push({ command: 'python3', args: [] });
-    candidates.push({ command: 'python', args: [] });
-  }
-
-  return candidates;
-}
-
-async function createVenv(
-  venvPath: string,
-  spacePath: string,
-  pythonVersion?: string
-): Promise<void> {
-  const candidates = buildPythonCandidates(pythonVersion);
-  let lastError: Error | null = null;
-
-  for (const candidate of candidates) {
-    try {
-      await new Promise<void>((resolve, reject) => {
-        const venvProcess = spawn(
-          candidate.command,
-          [...candidate.args, '-m', 'venv', venvPath],
-          {
-            cwd: spacePath,
-            env: { ...process.env },
-            shell: false,
-          }
-        );
-
-        venvProcess.on('close', (code) => {
-          if (code === 0) {
-            resolve();
-          } else {
-            reject(new Error(`exit code ${code}`));
-          }
-        });
-
-        venvProcess.on('error', (error) => {
-          reject(error);
-        });
-      });
-      return;
-    } catch (error) {
-      lastError = error as Error;
-      console.warn(`Failed to create venv with ${formatPythonCommand(candidate)}: ${lastError.message}`);
-    }
-  }
-
-  const attempts = candidates.map(formatPythonCommand).join(', ');
-  throw new Error(`Failed to create venv using: ${attempts}${lastError ? `. Last error: ${lastError.message}` : ''}`);
-}
-
 function parseRequirements(content: string): string[] {
   const dependencies: string[] = [];
   const lines = content.split('\n');
@@ -234,7 +162,7 @@ function overrideTorchPackages(
 export async function POST(request: NextRequest) {
   try {
     const body = await request.json();
-    const { visibleName, spaceId, githubUrl, comfyUIArgs, branch, commitId, releaseTag } = body;
+    const { visibleName, spaceId, githubUrl, comfyUIArgs, branch, commitId, releaseTag, installer } = body;
     
     // Auto-detect Python version
     let pythonVersion = '3.11'; // Default fallback
@@ -335,15 +263,16 @@ export async function POST(request: NextRequest) {
     const cloneUrl = githubUrl.trim();
     
     try {
+      // Clones go through the shared mirror cache, which also makes pinned commits available
       if (releaseTag) {
         // Clone specific release tag
-        await execFileAsync('git', ['clone', '--branch', releaseTag, '--depth', '1', cloneUrl, comfyUIPath]);
+        await cloneRepository(cloneUrl, comfyUIPath, { branch: releaseTag, depth: 1 });
       } else if (branch) {
         // Clone specific branch
-        await execFileAsync('git', ['clone', '--branch', branch, '--depth', '1', cloneUrl, comfyUIPath]);
+        await cloneRepository(cloneUrl, comfyUIPath, { branch, commitId, depth: 1 });
       } else {
         // Clone default branch
-        await execFileAsync('git', ['clone', '--depth', '1', cloneUrl, comfyUIPath]);
+        await cloneRepository(cloneUrl, comfyUIPath, { commitId, depth: 1 });
       }
 
       // Checkout specific commit if provided (and not using release tag)
@@ -474,15 +403,15 @@ export async function POST(request: NextRequest) {
         releaseTag: releaseTag || null,
         createdAt: new Date().toISOString(),
         comfyUISource: releaseTag ? 'release' : (branch || commitId ? 'custom' : 'default'),
+        installer: normalizeInstallerName(installer),
       },
     };
-    const spaceJsonPath = join(spacePath, 'space.json');
-    await writeFile(spaceJsonPath, JSON.stringify(spaceJson, null, 2), 'utf-8');
+    await writeSpaceJson(finalSpaceId, spaceJson);
 
     // Create venv with specified Python version
     const venvPath = join(spacePath, 'venv');
     const pythonVersionToUse = pythonVersion || '3.11';
-    await createVenv(venvPath, spacePath, pythonVersionToUse);
+    await createVenv(venvPath, spacePath, pythonVersionToUse, normalizeInstallerName(installer));
 
     // Create log files
     const logsPath = join(spacePath, 'logs.txt');
@@ -495,6 +424,8 @@ export async function POST(request: NextRequest) {
     const selectedVersionPath = join(spacesPath, 'selected_version.txt');
     await writeFile(selectedVersionPath, finalSpaceId, 'utf-8');
 
+    invalidateSpaceCatalogue(finalSpaceId);
+
     return NextResponse.json({
       success: true,
       message: `Space "${visibleName}" created successfully`,
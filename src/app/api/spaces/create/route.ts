@@ -1,9 +1,11 @@
 import { NextResponse } from 'next/server';
 import { join } from 'path';
-import { readFile, writeFile, mkdir, readdir, cp } from 'fs/promises';
+import { readFile, writeFile, mkdir, readdir, cp, rm } from 'fs/promises';
 import { existsSync } from 'fs';
-import { spawn } from 'child_process';
 import { ensureSpacesDir } from '../../utils/ensureSpacesDir';
+import { copyTree, copyVenv } from '../../utils/copyOnWrite';
+import { createVenv, normalizeInstallerName } from '../../utils/installer';
+import { invalidateSpaceCatalogue } from '../../utils/spaceCatalogue';
 
 export async function POST() {
   try {
@@ -51,16 +53,16 @@ export async function POST() {
     // Create new space directory
     await mkdir(nextVersionPath, { recursive: true });
 
-    // Copy ComfyUI directory to new space
+    // Copy ComfyUI directory to new space (reflinks where supported, so this is near-instant on CoW filesystems)
     const currentComfyUIPath = join(currentVersionPath, 'ComfyUI');
     const newComfyUIPath = join(nextVersionPath, 'ComfyUI');
     if (existsSync(currentComfyUIPath)) {
-      await cp(currentComfyUIPath, newComfyUIPath, { recursive: true });
+      await copyTree(currentComfyUIPath, newComfyUIPath);
     } else {
       // If no ComfyUI in current space, copy from root ComfyUI
       const rootComfyUIPath = join(process.cwd(), 'ComfyUI');
       if (existsSync(rootComfyUIPath)) {
-        await cp(rootComfyUIPath, newComfyUIPath, { recursive: true });
+        await copyTree(rootComfyUIPath, newComfyUIPath);
       }
     }
 
@@ -71,27 +73,30 @@ export async function POST() {
     const newSpaceJsonPath = join(nextVersionPath, 'space.json');
     await cp(currentSpaceJsonPath, newSpaceJsonPath);
 
-    // Create venv in new space
+    // Copy the current venv when there is one, so the new version starts with its packages installed
+    const currentSpaceJson = JSON.parse(await readFile(currentSpaceJsonPath, 'utf-8'));
+    const currentVenvPath = join(currentVersionPath, 'venv');
     const venvPath = join(nextVersionPath, 'venv');
-    await new Promise<void>((resolve, reject) => {
-      const venvProcess = spawn('python3', ['-m', 'venv', venvPath], {
-        cwd: nextVersionPath,
-        env: { ...process.env },
-        shell: true,
-      });
-
-      venvProcess.on('close', (code) => {
-        if (code === 0) {
-          resolve();
-        } else {
-          reject(new Error(`Failed to create venv: exit code ${code}`));
-        }
-      });
+    let venvCopied = false;
+    if (existsSync(currentVenvPath)) {
+      try {
+        await copyVenv(currentVenvPath, venvPath, currentSpaceJson.dependencies || []);
+        venvCopied = true;
+      } catch (error) {
+        console.warn(`Failed to copy venv from ${currentVersion}, creating a fresh one:`, error);
+        await rm(venvPath, { recursive: true, force: true });
+      }
+    }
 
-      venvProcess.on('error', (error) => {
-        reject(error);
-      });
-    });
+    // Otherwise create a fresh venv in new space
+    if (!venvCopied) {
+      await createVenv(
+        venvPath,
+        nextVersionPath,
+        currentSpaceJson.metadata?.pythonVersion,
+        normalizeInstallerName(currentSpaceJson.metadata?.installer)
+      );
+    }
 
     // Create logs.txt in new space
     const logsPath = join(nextVersionPath, 'logs.txt');
@@ -101,6 +106,8 @@ export async function POST() {
     const comfyLogsPath = join(nextVersionPath, 'comfy-logs.txt');
     await writeFile(comfyLogsPath, '', 'utf-8');
 
+    invalidateSpaceCatalogue(nextVersion);
+
     return NextResponse.json({
       success: true,
       message: `New space ${nextVersion} created successfully`,
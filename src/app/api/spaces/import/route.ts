@@ -2,97 +2,91 @@ import { NextRequest, NextResponse } from 'next/server';
 import { join } from 'path';
 import { readFile, writeFile, mkdir } from 'fs/promises';
 import { existsSync } from 'fs';
-import { spawn, execFile } from 'child_process';
+import { execFile } from 'child_process';
 import { promisify } from 'util';
+import { cloneRepository } from '../../utils/gitMirror';
+import { createVenv, normalizeInstallerName } from '../../utils/installer';
+import { invalidateSpaceCatalogue } from '../../utils/spaceCatalogue';
+import { writeSpaceJson } from '../../utils/spaceStore';
+import { importSpaceBundle, InvalidBundleError } from '../../utils/spaceBundle';
 
 const execFileAsync = promisify(execFile);
 
-type PythonCandidate = { command: string; args: string[] };
-
-function formatPythonCommand(candidate: PythonCandidate): string {
-  return [candidate.command, ...candidate.args].join(' ').trim();
+function generateSpaceId(visibleName: string): string {
+  return visibleName
+    .toLowerCase()
+    .replace(/%20/g, '-') // Replace %20 with -
+    .replace(/[^a-z0-9-]/g, '-') // Replace special chars with -
+    .replace(/-+/g, '-') // Replace multiple dashes with single dash
+    .replace(/^-|-$/g, ''); // Remove leading/trailing dashes
 }
 
-function buildPythonCandidates(pythonVersion?: string): PythonCandidate[] {
-  const candidates: PythonCandidate[] = [];
-  const isWindows = process.platform === 'win32';
-  const versionMatch = pythonVersion?.trim().match(/^\d+(?:\.\d+)?/);
-  const version = versionMatch?.[0];
+// Content types an offline bundle may be posted with; anything else is a space.json import
+const BUNDLE_CONTENT_TYPES = ['application/octet-stream', 'application/x-tar', 'application/gzip', 'application/x-gzip', 'application/zstd'];
 
-  if (version) {
-    if (isWindows) {
-      candidates.push({ command: 'py', args: [`-${version}`] });
-    } else {
-      candidates.push({ command: `python${version}`, args: [] });
+// Yields the request body chunk by chunk as it arrives
+async function* readBody(body: ReadableStream<Uint8Array>): AsyncGenerator<Uint8Array> {
+  const reader = body.getReader();
+  let finished = false;
+  try {
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) {
+        finished = true;
+        return;
+      }
+      yield value;
     }
+  } finally {
+    if (!finished) {
+      await reader.cancel().catch(() => undefined);
+    }
+    reader.releaseLock();
   }
+}
 
-  if (isWindows) {
-    candidates.push({ command: 'py', args: ['-3'] });
-    candidates.push({ command: 'python', args: [] });
-    candidates.push({ command: 'python3', args: [] });
-  } else {
-    candidates.push({ command: 'python3', args: [] });
-    candidates.push({ command: 'python', args: [] });
+// Imports an offline bundle from the export route (?format=bundle), posted as the raw archive
+async function importBundle(request: NextRequest) {
+  if (!request.body) {
+    return NextResponse.json(
+      { error: 'Bundle is required' },
+      { status: 400 }
+    );
   }
 
-  return candidates;
-}
-
-async function createVenv(
-  venvPath: string,
-  spacePath: string,
-  pythonVersion?: string
-): Promise<void> {
-  const candidates = buildPythonCandidates(pythonVersion);
-  let lastError: Error | null = null;
+  try {
+    const result = await importSpaceBundle(readBody(request.body), {
+      spaceId: request.nextUrl.searchParams.get('spaceId'),
+      visibleName: request.nextUrl.searchParams.get('visibleName'),
+    });
+    invalidateSpaceCatalogue(result.spaceId);
 
-  for (const candidate of candidates) {
-    try {
-      await new Promise<void>((resolve, reject) => {
-        const venvProcess = spawn(
-          candidate.command,
-          [...candidate.args, '-m', 'venv', venvPath],
-          {
-            cwd: spacePath,
-            env: { ...process.env },
-            shell: false,
-          }
-        );
-
-        venvProcess.on('close', (code) => {
-          if (code === 0) {
-            resolve();
-          } else {
-            reject(new Error(`exit code ${code}`));
-          }
-        });
-
-        venvProcess.on('error', (error) => {
-          reject(error);
-        });
-      });
-      return;
-    } catch (error) {
-      lastError = error as Error;
-      console.warn(`Failed to create venv with ${formatPythonCommand(candidate)}: ${lastError.message}`);
+    return NextResponse.json({
+      success: true,
+      message: `Space "${result.visibleName}" imported successfully`,
+      ...result,
+    });
+  } catch (error) {
+    if (error instanceof InvalidBundleError) {
+      return NextResponse.json(
+        { error: error.message },
+        { status: 400 }
+      );
     }
+    console.error('Error importing space bundle:', error);
+    return NextResponse.json(
+      { error: `Failed to import space bundle: ${error instanceof Error ? error.message : 'Unknown error'}` },
+      { status: 500 }
+    );
   }
-
-  const attempts = candidates.map(formatPythonCommand).join(', ');
-  throw new Error(`Failed to create venv using: ${attempts}${lastError ? `. Last error: ${lastError.message}` : ''}`);
-}
-
-function generateSpaceId(visibleName: string): string {
-  return visibleName
-    .toLowerCase()
-    .replace(/%20/g, '-') // Replace %20 with -
-    .replace(/[^a-z0-9-]/g, '-') // Replace special chars with -
-    .replace(/-+/g, '-') // Replace multiple dashes with single dash
-    .replace(/^-|-$/g, ''); // Remove leading/trailing dashes
 }
 
 export async function POST(request: NextRequest) {
+  const contentType = (request.headers.get('content-type') || '').split(';')[0].trim().toLowerCase();
+  if (BUNDLE_CONTENT_TYPES.includes(contentType)) {
+    return importBundle(request);
+  }
+
   try {
     const body = await request.json();
     const { nodes, dependencies, metadata } = body;
@@ -148,15 +142,16 @@ export async function POST(request: NextRequest) {
     const cloneUrl = githubUrl.trim();
     
     try {
+      // Clones go through the shared mirror cache, which also makes pinned commits available
       if (releaseTag) {
         // Clone specific release tag
-        await execFileAsync('git', ['clone', '--branch', releaseTag, '--depth', '1', cloneUrl, comfyUIPath]);
+        await cloneRepository(cloneUrl, comfyUIPath, { branch: releaseTag, depth: 1 });
       } else if (branch) {
         // Clone specific branch
-        await execFileAsync('git', ['clone', '--branch', branch, '--depth', '1', cloneUrl, comfyUIPath]);
+        await cloneRepository(cloneUrl, comfyUIPath, { branch, commitId, depth: 1 });
       } else {
         // Clone default branch
-        await execFileAsync('git', ['clone', '--depth', '1', cloneUrl, comfyUIPath]);
+        await cloneRepository(cloneUrl, comfyUIPath, { commitId, depth: 1 });
       }
 
       // Checkout specific commit if provided (and not using release tag)
@@ -206,15 +201,15 @@ export async function POST(request: NextRequest) {
         releaseTag: metadata.releaseTag || null,
         createdAt: metadata.createdAt || new Date().toISOString(),
         comfyUISource: metadata.comfyUISource || (metadata.releaseTag ? 'release' : (metadata.branch || metadata.commitId ? 'custom' : 'default')),
+        installer: normalizeInstallerName(metadata.installer),
       },
     };
-    const spaceJsonPath = join(spacePath, 'space.json');
-    await writeFile(spaceJsonPath, JSON.stringify(spaceJson, null, 2), 'utf-8');
+    await writeSpaceJson(finalSpaceId, spaceJson);
 
     // Create venv with specified Python version
     const venvPath = join(spacePath, 'venv');
     const pythonVersionToUse = metadata.pythonVersion || '3.11';
-    await createVenv(venvPath, spacePath, pythonVersionToUse);
+    await createVenv(venvPath, spacePath, pythonVersionToUse, normalizeInstallerName(metadata.installer));
 
     // Create log files
     const logsPath = join(spacePath, 'logs.txt');
@@ -226,6 +221,8 @@ export async function POST(request: NextRequest) {
     // Note: We do NOT update selected_version.txt or automatically activate
     // The user will need to manually activate the imported space
 
+    invalidateSpaceCatalogue(finalSpaceId);
+
     return NextResponse.json({
       success: true,
       message: `Space "${metadata.visibleName}" imported successfully`,
@@ -1,127 +1,26 @@
-import { NextResponse } from 'next/server';
-import { readdir, readFile, stat } from 'fs/promises';
-import { join } from 'path';
-import { existsSync } from 'fs';
-import { ensureSpacesDir } from '../utils/ensureSpacesDir';
+import { NextRequest, NextResponse } from 'next/server';
+import { getSpaceCatalogue } from '../utils/spaceCatalogue';
 
-interface SpaceInfo {
-  name: string; // spaceId (directory name)
-  visibleName: string; // visible name from space.json
-  pythonVersion: string;
-  lastUpdated: string;
-  path: string;
-  comfyUIVersion: string;
-}
-
-export async function GET() {
+// Lists all spaces from the in-process catalogue. The response carries an ETag;
+// a request whose If-None-Match matches gets 304 without a body.
+export async function GET(request: NextRequest) {
   try {
-    // Ensure spaces directory exists
-    await ensureSpacesDir();
-    
-    const spacesPath = join(process.cwd(), 'spaces');
-    const entries = await readdir(spacesPath, { withFileTypes: true });
-    
-    // Filter to only include directories (skip files like selected_version.txt)
-    const spaceDirs = entries
-      .filter(entry => entry.isDirectory())
-      .map(entry => entry.name)
-      .sort();
-    
-    // Get detailed info for each space
-    const spaces: SpaceInfo[] = await Promise.all(
-      spaceDirs.map(async (spaceId) => {
-        const spacePath = join(spacesPath, spaceId);
-        const spaceJsonPath = join(spacePath, 'space.json');
-        const comfyUIPath = join(spacePath, 'ComfyUI');
-        const venvConfigPath = join(spacePath, 'venv', 'pyvenv.cfg');
-        
-        // Get visible name and Python version from space.json
-        let visibleName = spaceId; // Fallback to spaceId if space.json doesn't exist
-        let pythonVersion = 'Unknown';
-        try {
-          if (existsSync(spaceJsonPath)) {
-            const spaceJsonContent = await readFile(spaceJsonPath, 'utf-8');
-            const spaceJson = JSON.parse(spaceJsonContent);
-            if (spaceJson.metadata?.visibleName) {
-              visibleName = spaceJson.metadata.visibleName;
-            }
-            if (spaceJson.metadata?.pythonVersion) {
-              pythonVersion = spaceJson.metadata.pythonVersion;
-            }
-          }
-        } catch (error) {
-          console.error(`Error reading space.json for ${spaceId}:`, error);
-        }
-        
-        // If Python version not in space.json, try to get from pyvenv.cfg
-        if (pythonVersion === 'Unknown') {
-          try {
-            if (existsSync(venvConfigPath)) {
-              const configContent = await readFile(venvConfigPath, 'utf-8');
-              const versionMatch = configContent.match(/^version\s*=\s*(.+)$/m);
-              if (versionMatch) {
-                pythonVersion = versionMatch[1].trim();
-              }
-            }
-          } catch (error) {
-            console.error(`Error reading Python version for ${spaceId}:`, error);
-          }
-        }
-        
-        // Get last updated timestamp
-        let lastUpdated = 'Unknown';
-        try {
-          const stats = await stat(spacePath);
-          lastUpdated = new Date(stats.mtime).toISOString();
-        } catch (error) {
-          console.error(`Error getting stats for ${spaceId}:`, error);
-        }
-        
-        // Get relative path from project root
-        const path = `spaces/${spaceId}`;
-        
-        // Get ComfyUI version from space's ComfyUI pyproject.toml
-        let comfyUIVersion = 'Unknown';
-        try {
-          const pyprojectPath = join(comfyUIPath, 'pyproject.toml');
-          if (existsSync(pyprojectPath)) {
-            const tomlContent = await readFile(pyprojectPath, 'utf-8');
-            // Match version = "0.6.0" in the [project] section
-            const versionMatch = tomlContent.match(/\[project\][\s\S]*?version\s*=\s*["']([^"']+)["']/);
-            if (versionMatch) {
-              comfyUIVersion = versionMatch[1].trim();
-            }
-          }
-        } catch (error) {
-          console.error(`Error reading ComfyUI version:`, error);
-        }
-        
-        return {
-          name: spaceId, // spaceId (directory name)
-          visibleName: visibleName, // visible name from space.json
-          pythonVersion,
-          lastUpdated,
-          path,
-          comfyUIVersion,
-        };
-      })
-    );
-    
-    // Read selected version
-    const selectedVersionPath = join(spacesPath, 'selected_version.txt');
-    let selectedVersion = '';
-    try {
-      const selectedContent = await readFile(selectedVersionPath, 'utf-8');
-      selectedVersion = selectedContent.trim();
-    } catch (error) {
-      // If file doesn't exist, use first space as default
-      selectedVersion = spaceDirs[0] || '';
+    const { spaces, selectedVersion, etag } = await getSpaceCatalogue();
+    const headers = {
+      'ETag': etag,
+      // Let the browser keep the list but revalidate it on every request
+      'Cache-Control': 'no-cache',
+    };
+
+    const ifNoneMatch = request.headers.get('if-none-match');
+    if (ifNoneMatch && ifNoneMatch.split(',').some(tag => tag.trim().replace(/^W\//, '') === etag)) {
+      return new NextResponse(null, { status: 304, headers });
     }
-    
+
     return NextResponse.json({
       spaces,
       selectedVersion,
-    });
+    }, { headers });
   } catch (error) {
     console.error('Error reading spaces:', error);
     return NextResponse.json(
@@ -130,4 +29,3 @@ export async function GET() {
     );
   }
 }
-
@@ -0,0 +1,49 @@
+/**
+ * Runs an async worker over a list of items with at most `limit` workers in flight.
+ * Each item's outcome is reported independently, so one failure never stops the others.
+ * Results are returned in the same order as the input items.
+ */
+export async function runWithConcurrency<T, R>(
+  items: T[],
+  limit: number,
+  worker: (item: T, index: number) => Promise<R>
+): Promise<PromiseSettledResult<R>[]> {
+  const results: PromiseSettledResult<R>[] = new Array(items.length);
+  let nextIndex = 0;
+
+  const runWorker = async () => {
+    while (nextIndex < items.length) {
+      const index = nextIndex++;
+      try {
+        results[index] = { status: 'fulfilled', value: await worker(items[index], index) };
+      } catch (error) {
+        results[index] = { status: 'rejected', reason: error };
+      }
+    }
+  };
+
+  const workerCount = Math.max(1, Math.min(limit, items.length));
+  await Promise.all(Array.from({ length: workerCount }, runWorker));
+  return results;
+}
+
+function parsePositiveInt(value: string | undefined, defaultValue: number): number {
+  const parsed = parseInt(value || '', 10);
+  return Number.isFinite(parsed) && parsed > 0 ? parsed : defaultValue;
+}
+
+/**
+ * Parses a positive integer concurrency limit from an environment variable,
+ * falling back to the given default when unset or invalid.
+ */
+export function getConcurrencyLimit(envValue: string | undefined, defaultLimit: number): number {
+  return parsePositiveInt(envValue, defaultLimit);
+}
+
+/**
+ * Reads a positive integer setting (a size, an age, a count) from the named
+ * environment variable, falling back to the given default when unset or invalid.
+ */
+export function getPositiveIntEnv(name: string, defaultValue: number): number {
+  return parsePositiveInt(process.env[name], defaultValue);
+}
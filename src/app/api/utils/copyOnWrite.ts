@@ -0,0 +1,213 @@
+import { join, relative, sep } from 'path';
+import { constants, existsSync } from 'fs';
+import { copyFile, link, lstat, mkdir, readdir, readFile, readlink, rename, symlink, writeFile } from 'fs/promises';
+import { runWithConcurrency, getConcurrencyLimit } from './concurrency';
+import { computeInstallFingerprint, readInstallState, writeInstallState } from './installState';
+
+const COPY_CONCURRENCY = getConcurrencyLimit(process.env.COPY_CONCURRENCY, 32);
+// Text files larger than this are never scanned for venv paths
+const MAX_RELOCATE_FILE_BYTES = 1024 * 1024;
+// Errors that mean the filesystem cannot reflink (or hardlink) between these paths
+const UNSUPPORTED_CODES = new Set(['ENOTSUP', 'EOPNOTSUPP', 'EXDEV', 'EINVAL', 'ENOSYS', 'EPERM', 'EMLINK']);
+
+export interface CopyStats {
+  reflinked: number;
+  hardlinked: number;
+  copied: number;
+  symlinks: number;
+  directories: number;
+}
+
+interface CopyContext {
+  stats: CopyStats;
+  reflinkSupported: boolean;
+}
+
+/**
+ * Git objects and packs are content-addressed and never modified in place, so two
+ * checkouts can safely share them through hardlinks.
+ */
+function isImmutableFile(relativePath: string): boolean {
+  return /(^|[\\/])\.git[\\/]objects[\\/]([0-9a-f]{2}|pack)[\\/]/.test(relativePath);
+}
+
+function isUnsupported(error: unknown): boolean {
+  return UNSUPPORTED_CODES.has((error as NodeJS.ErrnoException)?.code || '');
+}
+
+async function copyRegularFile(source: string, dest: string, relativePath: string, context: CopyContext): Promise<void> {
+  if (context.reflinkSupported) {
+    try {
+      await copyFile(source, dest, constants.COPYFILE_FICLONE_FORCE);
+      context.stats.reflinked++;
+      return;
+    } catch (error) {
+      if (!isUnsupported(error)) {
+        throw error;
+      }
+      // Remember the answer so the rest of the tree skips the failing attempt
+      context.reflinkSupported = false;
+    }
+  }
+
+  if (isImmutableFile(relativePath)) {
+    try {
+      await link(source, dest);
+      context.stats.hardlinked++;
+      return;
+    } catch (error) {
+      if (!isUnsupported(error)) {
+        throw error;
+      }
+    }
+  }
+
+  await copyFile(source, dest);
+  context.stats.copied++;
+}
+
+/**
+ * Copies a directory tree using the cheapest safe method per file: a reflink
+ * (copy-on-write clone) where the filesystem supports it, a hardlink for immutable
+ * git objects otherwise, and a plain copy for everything else. Symlinks are
+ * recreated as-is. Files are copied concurrently.
+ */
+export async function copyTree(sourceRoot: string, destRoot: string): Promise<CopyStats> {
+  const context: CopyContext = {
+    stats: { reflinked: 0, hardlinked: 0, copied: 0, symlinks: 0, directories: 0 },
+    reflinkSupported: true,
+  };
+  const files: string[] = [];
+  const links: string[] = [];
+
+  // Walk the tree first so directories exist before any file lands in them
+  const walk = async (relativeDir: string) => {
+    await mkdir(join(destRoot, relativeDir), { recursive: true });
+    context.stats.directories++;
+    const entries = await readdir(join(sourceRoot, relativeDir), { withFileTypes: true });
+    const subdirs: string[] = [];
+    for (const entry of entries) {
+      const relativePath = relativeDir ? join(relativeDir, entry.name) : entry.name;
+      if (entry.isDirectory()) {
+        subdirs.push(relativePath);
+      } else if (entry.isSymbolicLink()) {
+        links.push(relativePath);
+      } else if (entry.isFile()) {
+        files.push(relativePath);
+      }
+    }
+    await Promise.all(subdirs.map(walk));
+  };
+  await walk('');
+
+  const results = await runWithConcurrency([...files, ...links], COPY_CONCURRENCY, async (relativePath) => {
+    const source = join(sourceRoot, relativePath);
+    const dest = join(destRoot, relativePath);
+    if ((await lstat(source)).isSymbolicLink()) {
+      await symlink(await readlink(source), dest);
+      context.stats.symlinks++;
+    } else {
+      await copyRegularFile(source, dest, relativePath, context);
+    }
+  });
+
+  const failure = results.find(result => result.status === 'rejected');
+  if (failure && failure.status === 'rejected') {
+    throw failure.reason;
+  }
+
+  return context.stats;
+}
+
+function getVenvPython(venvPath: string): string {
+  return process.platform === 'win32'
+    ? join(venvPath, 'Scripts', 'python.exe')
+    : join(venvPath, 'bin', 'python3');
+}
+
+async function rewriteFile(filePath: string, from: string, to: string): Promise<boolean> {
+  const stats = await lstat(filePath);
+  if (!stats.isFile() || stats.size > MAX_RELOCATE_FILE_BYTES) {
+    return false;
+  }
+  const content = await readFile(filePath);
+  // Skip binaries (the interpreter itself, compiled launchers)
+  if (content.includes(0) || !content.includes(from)) {
+    return false;
+  }
+  await writeFile(filePath, content.toString('utf-8').split(from).join(to), 'utf-8');
+  return true;
+}
+
+/**
+ * Rewrites the absolute venv path baked into a copied venv: script shebangs and
+ * activate scripts, pyvenv.cfg, top-level .pth files in site-packages, and
+ * symlinks that pointed inside the old venv. Returns the number of files changed.
+ */
+export async function relocateVenv(venvPath: string, oldVenvPath: string): Promise<number> {
+  let rewritten = 0;
+  const candidates: string[] = [join(venvPath, 'pyvenv.cfg')];
+
+  for (const binDir of ['bin', 'Scripts']) {
+    const entries = await readdir(join(venvPath, binDir)).catch(() => [] as string[]);
+    candidates.push(...entries.map(name => join(venvPath, binDir, name)));
+  }
+
+  for (const libDir of ['lib', 'Lib']) {
+    const libPath = join(venvPath, libDir);
+    const pythonDirs = await readdir(libPath).catch(() => [] as string[]);
+    // Windows venvs have Lib/site-packages directly, POSIX venvs have lib/pythonX.Y/site-packages
+    const sitePackagesDirs = [join(libPath, 'site-packages'), ...pythonDirs.map(name => join(libPath, name, 'site-packages'))];
+    for (const sitePackages of sitePackagesDirs) {
+      const entries = await readdir(sitePackages).catch(() => [] as string[]);
+      candidates.push(...entries.filter(name => name.endsWith('.pth')).map(name => join(sitePackages, name)));
+    }
+  }
+
+  for (const candidate of candidates) {
+    try {
+      const stats = await lstat(candidate);
+      if (stats.isSymbolicLink()) {
+        const target = await readlink(candidate);
+        if (target.startsWith(oldVenvPath + sep)) {
+          await symlink(join(venvPath, relative(oldVenvPath, target)), `${candidate}.relocated`);
+          await rename(`${candidate}.relocated`, candidate);
+          rewritten++;
+        }
+      } else if (await rewriteFile(candidate, oldVenvPath, venvPath)) {
+        rewritten++;
+      }
+    } catch (error) {
+      console.warn(`Could not relocate ${candidate}:`, error);
+    }
+  }
+
+  return rewritten;
+}
+
+/**
+ * Copies a venv to a new location so it can be used without reinstalling from the
+ * network. Files are cloned with copyTree, then absolute paths are rewritten. When
+ * the source venv's recorded install state still matches its space's dependencies,
+ * the state is carried over so the first activation of the copy skips pip.
+ */
+export async function copyVenv(
+  sourceVenvPath: string,
+  destVenvPath: string,
+  sourceDependencies: string[]
+): Promise<{ stats: CopyStats; relocatedFiles: number; installStateCarried: boolean }> {
+  const stats = await copyTree(sourceVenvPath, destVenvPath);
+  const relocatedFiles = await relocateVenv(destVenvPath, sourceVenvPath);
+
+  let installStateCarried = false;
+  const state = await readInstallState(sourceVenvPath);
+  if (state) {
+    const sourceFingerprint = computeInstallFingerprint(sourceDependencies, state.pythonVersion, getVenvPython(sourceVenvPath));
+    if (state.fingerprint === sourceFingerprint && existsSync(getVenvPython(destVenvPath))) {
+      await writeInstallState(destVenvPath, sourceDependencies, state.pythonVersion, getVenvPython(destVenvPath));
+      installStateCarried = true;
+    }
+  }
+
+  return { stats, relocatedFiles, installStateCarried };
+}
@@ -0,0 +1,346 @@
+import { join } from 'path';
+import { lstat, mkdir, readdir, readFile, rename, unlink, writeFile } from 'fs/promises';
+import type { Stats } from 'fs';
+import { getConcurrencyLimit, getPositiveIntEnv, runWithConcurrency } from './concurrency';
+
+// Directories read at once while walking a space, and files stat'ed at once per directory
+const DISK_USAGE_CONCURRENCY = getConcurrencyLimit(process.env.DISK_USAGE_CONCURRENCY, 16);
+// Usage older than this is refreshed in the background when the space catalogue is read
+const DISK_USAGE_MAX_AGE_MS = getPositiveIntEnv('DISK_USAGE_MAX_AGE_MINUTES', 10) * 60 * 1000;
+// A directory modified this shortly before it was read may still have files being written
+// into it, so it is read again on the next scan even if its mtime did not change
+const SETTLE_MS = 60 * 1000;
+// Bumped when the cache format changes; older caches are ignored
+const CACHE_VERSION = 1;
+
+export const DISK_USAGE_CATEGORIES = ['venv', 'comfyUI', 'customNodes', 'models', 'logs', 'history', 'other'] as const;
+export type DiskUsageCategory = typeof DISK_USAGE_CATEGORIES[number];
+
+export interface DiskUsageBucket {
+  /** Allocated bytes, counting a hardlinked file once */
+  bytes: number;
+  /** Part of `bytes` in files also linked from outside the space */
+  sharedBytes: number;
+  files: number;
+}
+
+export interface DiskUsage {
+  spaceId: string;
+  totalBytes: number;
+  /**
+   * Bytes in files hardlinked from outside the space (installer caches, the git
+   * mirrors, other spaces); deleting the space does not free them
+   */
+  sharedBytes: number;
+  files: number;
+  directories: number;
+  categories: Record<DiskUsageCategory, DiskUsageBucket>;
+  scannedAt: string;
+  /** Directories read by the last scan; the others were taken from the cache */
+  rescannedDirectories: number;
+  durationMs: number;
+}
+
+export interface DiskUsageSummary {
+  totalBytes: number;
+  sharedBytes: number;
+  files: number;
+  directories: number;
+  scannedAt: string;
+}
+
+interface DirRecord {
+  mtimeMs: number;
+  unsettled?: boolean;
+  /** Allocated bytes and number of singly linked files directly in the directory */
+  bytes: Partial<Record<DiskUsageCategory, number>>;
+  files: Partial<Record<DiskUsageCategory, number>>;
+  /** Files with several links as [device:inode, bytes, link count, category] */
+  linked: Array<[string, number, number, DiskUsageCategory]>;
+  dirs: string[];
+}
+
+interface DirCache {
+  version: number;
+  dirs: Record<string, DirRecord>;
+}
+
+// Last known usage per space, loaded from disk on first use (null when never scanned)
+const summaries = new Map<string, DiskUsage | null>();
+// Scans in flight per space
+const scans = new Map<string, Promise<DiskUsage>>();
+// Background refreshes run one space at a time so they never compete for the disk
+const queued = new Set<string>();
+let backgroundQueue: Promise<void> = Promise.resolve();
+
+function getUsageDir(): string {
+  return join(process.cwd(), 'spaces', '.disk-usage');
+}
+
+function getSummaryPath(spaceId: string): string {
+  return join(getUsageDir(), `${spaceId}.json`);
+}
+
+function getDirCachePath(spaceId: string): string {
+  return join(getUsageDir(), `${spaceId}.dirs.json`);
+}
+
+async function readJson<T>(path: string): Promise<T | null> {
+  try {
+    return JSON.parse(await readFile(path, 'utf-8')) as T;
+  } catch (error) {
+    return null;
+  }
+}
+
+async function writeJsonAtomic(path: string, value: unknown): Promise<void> {
+  await mkdir(getUsageDir(), { recursive: true });
+  const tempPath = `${path}.tmp`;
+  await writeFile(tempPath, JSON.stringify(value), 'utf-8');
+  await rename(tempPath, path);
+}
+
+function categorizeDirectory(relPath: string): DiskUsageCategory {
+  const [top, second] = relPath.split('/');
+  if (top === 'venv') {
+    return 'venv';
+  }
+  if (top === 'ComfyUI') {
+    return second === 'custom_nodes' ? 'customNodes' : second === 'models' ? 'models' : 'comfyUI';
+  }
+  return top === 'requirements_history' ? 'history' : 'other';
+}
+
+function categorizeFile(dirRelPath: string, name: string): DiskUsageCategory {
+  if (dirRelPath === '') {
+    // Active logs, rotated segments and their line indexes
+    if (/^(logs|comfy-logs)\.txt/.test(name)) {
+      return 'logs';
+    }
+    if (name === 'requirements.bkp') {
+      return 'history';
+    }
+  }
+  return categorizeDirectory(dirRelPath);
+}
+
+function allocatedBytes(stats: Stats): number {
+  // Blocks are not reported on every platform
+  return stats.blocks > 0 ? stats.blocks * 512 : stats.size;
+}
+
+async function readDirectory(dirPath: string, relPath: string, mtimeMs: number, scanStartedAt: number): Promise<DirRecord> {
+  const record: DirRecord = { mtimeMs, bytes: {}, files: {}, linked: [], dirs: [] };
+  if (mtimeMs > scanStartedAt - SETTLE_MS) {
+    record.unsettled = true;
+  }
+  const entries = await readdir(dirPath, { withFileTypes: true });
+  const fileNames: string[] = [];
+  for (const entry of entries) {
+    if (entry.isDirectory()) {
+      record.dirs.push(entry.name);
+    } else {
+      // Symlinks are counted as themselves, never followed
+      fileNames.push(entry.name);
+    }
+  }
+
+  const results = await runWithConcurrency(fileNames, DISK_USAGE_CONCURRENCY, name => lstat(join(dirPath, name)));
+  results.forEach((result, index) => {
+    if (result.status !== 'fulfilled') {
+      // Removed while we were reading the directory
+      return;
+    }
+    const stats = result.value;
+    const category = categorizeFile(relPath, fileNames[index]);
+    const bytes = allocatedBytes(stats);
+    if (stats.nlink > 1 && !stats.isDirectory()) {
+      record.linked.push([`${stats.dev}:${stats.ino}`, bytes, stats.nlink, category]);
+    } else {
+      record.bytes[category] = (record.bytes[category] || 0) + bytes;
+      record.files[category] = (record.files[category] || 0) + 1;
+    }
+  });
+  return record;
+}
+
+function summarize(
+  spaceId: string,
+  dirs: Record<string, DirRecord>,
+  rescannedDirectories: number,
+  startedAt: number
+): DiskUsage {
+  const categories = Object.fromEntries(
+    DISK_USAGE_CATEGORIES.map(category => [category, { bytes: 0, sharedBytes: 0, files: 0 }])
+  ) as Record<DiskUsageCategory, DiskUsageBucket>;
+  // Hardlinked files are counted once per space; links seen inside the space tell
+  // whether the remaining links live outside it
+  const linked = new Map<string, { bytes: number; nlink: number; seen: number; category: DiskUsageCategory }>();
+
+  const records = Object.values(dirs);
+  for (const record of records) {
+    for (const category of Object.keys(record.bytes) as DiskUsageCategory[]) {
+      categories[category].bytes += record.bytes[category] || 0;
+      categories[category].files += record.files[category] || 0;
+    }
+    for (const [key, bytes, nlink, category] of record.linked) {
+      const existing = linked.get(key);
+      if (existing) {
+        existing.seen++;
+      } else {
+        linked.set(key, { bytes, nlink, seen: 1, category });
+      }
+    }
+  }
+  for (const { bytes, nlink, seen, category } of linked.values()) {
+    categories[category].bytes += bytes;
+    categories[category].files++;
+    if (seen < nlink) {
+      categories[category].sharedBytes += bytes;
+    }
+  }
+
+  const buckets = Object.values(categories);
+  return {
+    spaceId,
+    totalBytes: buckets.reduce((sum, bucket) => sum + bucket.bytes, 0),
+    sharedBytes: buckets.reduce((sum, bucket) => sum + bucket.sharedBytes, 0),
+    files: buckets.reduce((sum, bucket) => sum + bucket.files, 0),
+    directories: records.length,
+    categories,
+    scannedAt: new Date().toISOString(),
+    rescannedDirectories,
+    durationMs: Date.now() - startedAt,
+  };
+}
+
+async function scanSpace(spaceId: string, full: boolean): Promise<DiskUsage> {
+  const spacePath = join(process.cwd(), 'spaces', spaceId);
+  const startedAt = Date.now();
+  const cache = full ? null : await readJson<DirCache>(getDirCachePath(spaceId));
+  const previous = cache?.version === CACHE_VERSION ? cache.dirs : {};
+  const dirs: Record<string, DirRecord> = {};
+  let rescannedDirectories = 0;
+
+  // Breadth-first, one level at a time with at most DISK_USAGE_CONCURRENCY directories in flight
+  let level = [''];
+  while (level.length > 0) {
+    const results = await runWithConcurrency(level, DISK_USAGE_CONCURRENCY, async (relPath) => {
+      const dirPath = relPath ? join(spacePath, relPath) : spacePath;
+      const { mtimeMs } = await lstat(dirPath);
+      const cached = previous[relPath];
+      // The mtime of a directory changes when entries are added, removed or renamed,
+      // not when a file in it grows; the space root is always read again because
+      // the logs and requirements files there are rewritten in place
+      if (relPath !== '' && cached && !cached.unsettled && cached.mtimeMs === mtimeMs) {
+        return cached;
+      }
+      rescannedDirectories++;
+      return readDirectory(dirPath, relPath, mtimeMs, startedAt);
+    });
+
+    const next: string[] = [];
+    results.forEach((result, index) => {
+      const relPath = level[index];
+      if (result.status === 'fulfilled') {
+        dirs[relPath] = result.value;
+        next.push(...result.value.dirs.map(name => (relPath ? `${relPath}/${name}` : name)));
+      } else if (relPath === '') {
+        throw result.reason;
+      }
+      // Subdirectories removed during the walk are simply left out
+    });
+    level = next;
+  }
+
+  const usage = summarize(spaceId, dirs, rescannedDirectories, startedAt);
+  // The space was deleted while it was walked; keep its discarded cache discarded
+  if (!(await lstat(spacePath).catch(() => null))) {
+    throw new Error(`Space ${spaceId} was removed during the disk usage scan`);
+  }
+  summaries.set(spaceId, usage);
+  const dirCache: DirCache = { version: CACHE_VERSION, dirs };
+  try {
+    await writeJsonAtomic(getDirCachePath(spaceId), dirCache);
+    await writeJsonAtomic(getSummaryPath(spaceId), usage);
+  } catch (error) {
+    console.warn(`Failed to save disk usage cache for ${spaceId}:`, error);
+  }
+  return usage;
+}
+
+/**
+ * Measures the disk usage of a space, broken down into venv, ComfyUI, custom
+ * nodes, models, logs, requirements history and everything else. The first scan
+ * walks the whole space with a concurrent directory walker; the per-directory
+ * results are persisted under spaces/.disk-usage, and later scans only read
+ * directories whose mtime changed (plus the space root). Pass `full` to ignore
+ * the cache, for example after files were rewritten in place. Hardlinked files
+ * are counted once, and those also linked from outside the space are reported as
+ * shared. Concurrent calls for one space share a scan.
+ */
+export async function getDiskUsage(spaceId: string, options: { full?: boolean } = {}): Promise<DiskUsage> {
+  const existing = scans.get(spaceId);
+  if (existing) {
+    if (!options.full) {
+      return existing;
+    }
+    await existing.catch(() => undefined);
+  }
+  const scan: Promise<DiskUsage> = scanSpace(spaceId, Boolean(options.full)).finally(() => {
+    if (scans.get(spaceId) === scan) {
+      scans.delete(spaceId);
+    }
+  });
+  scans.set(spaceId, scan);
+  return scan;
+}
+
+/**
+ * Returns the last measured usage of a space without scanning it, or null if it
+ * was never measured.
+ */
+export async function getDiskUsageSummary(spaceId: string): Promise<DiskUsageSummary | null> {
+  if (!summaries.has(spaceId)) {
+    summaries.set(spaceId, await readJson<DiskUsage>(getSummaryPath(spaceId)));
+  }
+  const usage = summaries.get(spaceId);
+  if (!usage) {
+    return null;
+  }
+  const { totalBytes, sharedBytes, files, directories, scannedAt } = usage;
+  return { totalBytes, sharedBytes, files, directories, scannedAt };
+}
+
+/**
+ * Queues a background scan of a space if its usage was never measured or is
+ * older than DISK_USAGE_MAX_AGE_MINUTES. Only one background scan runs at a time.
+ */
+export function scheduleDiskUsageRefresh(spaceId: string): void {
+  const usage = summaries.get(spaceId);
+  const fresh = usage && Date.now() - new Date(usage.scannedAt).getTime() < DISK_USAGE_MAX_AGE_MS;
+  if (fresh || queued.has(spaceId) || scans.has(spaceId)) {
+    return;
+  }
+  queued.add(spaceId);
+  backgroundQueue = backgroundQueue.then(async () => {
+    try {
+      await getDiskUsage(spaceId);
+    } catch (error) {
+      console.warn(`Failed to measure disk usage of ${spaceId}:`, error);
+    } finally {
+      queued.delete(spaceId);
+    }
+  });
+}
+
+/**
+ * Forgets the usage of a deleted space and removes its cache files, after any
+ * scan still running for it has finished so it cannot write them back.
+ */
+export async function discardDiskUsage(spaceId: string): Promise<void> {
+  await scans.get(spaceId)?.catch(() => undefined);
+  summaries.delete(spaceId);
+  await unlink(getSummaryPath(spaceId)).catch(() => undefined);
+  await unlink(getDirCachePath(spaceId)).catch(() => undefined);
+}
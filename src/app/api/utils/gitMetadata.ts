@@ -0,0 +1,164 @@
+import { join, isAbsolute } from 'path';
+import { readFile, stat } from 'fs/promises';
+
+export interface GitMetadata {
+  branch: string | null;
+  commitId: string | null;
+  remoteUrl: string | null;
+}
+
+interface CacheEntry {
+  stamp: string;
+  metadata: GitMetadata;
+}
+
+const EMPTY_METADATA: GitMetadata = { branch: null, commitId: null, remoteUrl: null };
+
+// Cache keyed by repository path, validated by the mtimes of the files the metadata is read from
+const metadataCache = new Map<string, CacheEntry>();
+
+async function readTextFile(path: string): Promise<string | null> {
+  try {
+    return await readFile(path, 'utf-8');
+  } catch (error) {
+    return null;
+  }
+}
+
+async function getMtime(path: string): Promise<number> {
+  try {
+    return (await stat(path)).mtimeMs;
+  } catch (error) {
+    return 0;
+  }
+}
+
+// Resolve the git directory, following "gitdir:" files used by submodules and worktrees
+async function resolveGitDirs(repoPath: string): Promise<{ gitDir: string; commonDir: string } | null> {
+  const dotGit = join(repoPath, '.git');
+  let gitDir: string;
+  try {
+    const stats = await stat(dotGit);
+    if (stats.isDirectory()) {
+      gitDir = dotGit;
+    } else {
+      const content = (await readFile(dotGit, 'utf-8')).trim();
+      const match = content.match(/^gitdir:\s*(.+)$/m);
+      if (!match) {
+        return null;
+      }
+      gitDir = isAbsolute(match[1]) ? match[1] : join(repoPath, match[1]);
+    }
+  } catch (error) {
+    return null;
+  }
+
+  // Worktrees keep refs, packed-refs and config in a shared common directory
+  const commonDirContent = await readTextFile(join(gitDir, 'commondir'));
+  const commonDir = commonDirContent
+    ? (isAbsolute(commonDirContent.trim()) ? commonDirContent.trim() : join(gitDir, commonDirContent.trim()))
+    : gitDir;
+
+  return { gitDir, commonDir };
+}
+
+function findPackedRef(packedRefs: string | null, refName: string): string | null {
+  if (!packedRefs) {
+    return null;
+  }
+  for (const line of packedRefs.split('\n')) {
+    if (!line || line.startsWith('#') || line.startsWith('^')) {
+      continue;
+    }
+    const [sha, name] = line.trim().split(/\s+/);
+    if (name === refName) {
+      return sha;
+    }
+  }
+  return null;
+}
+
+function parseOriginUrl(config: string | null): string | null {
+  if (!config) {
+    return null;
+  }
+  let inOrigin = false;
+  for (const rawLine of config.split('\n')) {
+    const line = rawLine.trim();
+    if (line.startsWith('[')) {
+      inOrigin = /^\[remote\s+"origin"\]$/.test(line);
+      continue;
+    }
+    if (inOrigin) {
+      const match = line.match(/^url\s*=\s*(.+)$/);
+      if (match) {
+        return match[1].trim();
+      }
+    }
+  }
+  return null;
+}
+
+/**
+ * Reads the branch, commit and origin URL of a git checkout by parsing .git/HEAD,
+ * loose refs, packed-refs and config directly instead of spawning git.
+ * Results are cached until one of those files changes. A detached HEAD reports
+ * branch "HEAD", matching `git rev-parse --abbrev-ref HEAD`.
+ */
+export async function readGitMetadata(repoPath: string): Promise<GitMetadata> {
+  const dirs = await resolveGitDirs(repoPath);
+  if (!dirs) {
+    return EMPTY_METADATA;
+  }
+  const { gitDir, commonDir } = dirs;
+
+  const headPath = join(gitDir, 'HEAD');
+  const packedRefsPath = join(commonDir, 'packed-refs');
+  const configPath = join(commonDir, 'config');
+
+  const head = (await readTextFile(headPath))?.trim() || '';
+  const refMatch = head.match(/^ref:\s*(.+)$/);
+  const refName = refMatch ? refMatch[1].trim() : null;
+  const looseRefPath = refName ? join(commonDir, refName) : null;
+
+  const mtimes = await Promise.all([
+    getMtime(headPath),
+    getMtime(packedRefsPath),
+    getMtime(configPath),
+    looseRefPath ? getMtime(looseRefPath) : Promise.resolve(0),
+  ]);
+  const stamp = `${head}|${mtimes.join('|')}`;
+
+  const cached = metadataCache.get(repoPath);
+  if (cached && cached.stamp === stamp) {
+    return cached.metadata;
+  }
+
+  let branch: string | null = null;
+  let commitId: string | null = null;
+
+  if (refName && looseRefPath) {
+    branch = refName.replace(/^refs\/heads\//, '');
+    const looseRef = (await readTextFile(looseRefPath))?.trim();
+    commitId = looseRef || findPackedRef(await readTextFile(packedRefsPath), refName);
+  } else if (/^[0-9a-f]{40,64}$/i.test(head)) {
+    branch = 'HEAD';
+    commitId = head;
+  }
+
+  const metadata: GitMetadata = {
+    branch,
+    commitId,
+    remoteUrl: parseOriginUrl(await readTextFile(configPath)),
+  };
+  metadataCache.set(repoPath, { stamp, metadata });
+  return metadata;
+}
+
+/**
+ * Reads git metadata for many checkouts concurrently, keyed by path.
+ */
+export async function readGitMetadataForAll(repoPaths: string[]): Promise<Map<string, GitMetadata>> {
+  const results = await Promise.all(repoPaths.map(async (repoPath) => [repoPath, await readGitMetadata(repoPath)] as const));
+  return new Map(results);
+}
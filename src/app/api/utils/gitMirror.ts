@@ -0,0 +1,280 @@
+import { join, basename } from 'path';
+import { createHash } from 'crypto';
+import { existsSync } from 'fs';
+import { mkdir, readdir, readFile, rename, rm, stat } from 'fs/promises';
+import { execFile } from 'child_process';
+import { promisify } from 'util';
+
+const execFileAsync = promisify(execFile);
+
+// Mirrors that were fetched more recently than this are reused as-is for unpinned clones
+const MIRROR_FRESHNESS_MS = 5 * 60 * 1000;
+const MIRROR_CLONE_TIMEOUT_MS = 600000;
+const MIRROR_FETCH_TIMEOUT_MS = 300000;
+
+// Serializes operations on the same mirror (parallel node clones may share a repository)
+const mirrorLocks = new Map<string, Promise<unknown>>();
+
+export interface CloneOptions {
+  branch?: string | null;
+  commitId?: string | null;
+  depth?: number;
+  timeoutMs?: number;
+  /** Aborting kills any git process started for this clone */
+  signal?: AbortSignal;
+}
+
+export interface MirrorInfo {
+  name: string;
+  path: string;
+  url: string | null;
+  lastFetched: string | null;
+}
+
+/**
+ * Root of the manager-level bare mirror cache. Lives under the spaces directory
+ * as a dot-directory so it is never listed as a space.
+ */
+export function getMirrorsRoot(): string {
+  return join(process.cwd(), 'spaces', '.git-mirrors');
+}
+
+function normalizeRepoUrl(url: string): string {
+  return url.trim().replace(/\/+$/, '').replace(/\.git$/, '').toLowerCase();
+}
+
+/**
+ * Returns the mirror directory for a repository URL. The same repository always
+ * maps to the same mirror regardless of a trailing slash or .git suffix.
+ */
+export function getMirrorPath(cloneUrl: string): string {
+  const normalized = normalizeRepoUrl(cloneUrl);
+  const hash = createHash('sha1').update(normalized).digest('hex').substring(0, 12);
+  const repoName = basename(normalized).replace(/[^a-z0-9._-]/g, '-') || 'repo';
+  return join(getMirrorsRoot(), `${repoName}-${hash}.git`);
+}
+
+async function withMirrorLock<T>(mirrorPath: string, fn: () => Promise<T>): Promise<T> {
+  const previous = mirrorLocks.get(mirrorPath) || Promise.resolve();
+  const current = previous.catch(() => undefined).then(fn);
+  mirrorLocks.set(mirrorPath, current);
+  try {
+    return await current;
+  } finally {
+    if (mirrorLocks.get(mirrorPath) === current) {
+      mirrorLocks.delete(mirrorPath);
+    }
+  }
+}
+
+async function hasRevision(mirrorPath: string, revision: string): Promise<boolean> {
+  try {
+    await execFileAsync('git', ['rev-parse', '--verify', '--quiet', `${revision}^{commit}`], { cwd: mirrorPath });
+    return true;
+  } catch (error) {
+    return false;
+  }
+}
+
+async function getLastFetchTime(mirrorPath: string): Promise<number> {
+  for (const marker of ['FETCH_HEAD', 'HEAD']) {
+    try {
+      return (await stat(join(mirrorPath, marker))).mtimeMs;
+    } catch (error) {
+      // Try next marker
+    }
+  }
+  return 0;
+}
+
+async function fetchMirror(mirrorPath: string, signal?: AbortSignal): Promise<void> {
+  await execFileAsync('git', ['fetch', '--prune', '--tags', 'origin'], {
+    cwd: mirrorPath,
+    timeout: MIRROR_FETCH_TIMEOUT_MS,
+    signal,
+  });
+}
+
+/**
+ * Makes sure a bare mirror of the repository exists and contains the requested
+ * revisions. Pinned revisions (tags, commits) only trigger a fetch when missing;
+ * unpinned clones refresh the mirror when it is older than the freshness window.
+ */
+export async function ensureMirror(cloneUrl: string, options: CloneOptions = {}): Promise<string> {
+  const mirrorPath = getMirrorPath(cloneUrl);
+
+  return withMirrorLock(mirrorPath, async () => {
+    if (!existsSync(mirrorPath)) {
+      await mkdir(getMirrorsRoot(), { recursive: true });
+      // Clone into a temporary directory first so a failed clone never leaves a broken mirror
+      const tempPath = `${mirrorPath}.tmp-${process.pid}-${Date.now()}`;
+      try {
+        await execFileAsync('git', ['clone', '--mirror', cloneUrl, tempPath], { timeout: MIRROR_CLONE_TIMEOUT_MS, signal: options.signal });
+        // Spaces reference these objects through alternates, so never let gc drop them
+        await execFileAsync('git', ['config', 'gc.auto', '0'], { cwd: tempPath });
+        await rename(tempPath, mirrorPath);
+      } catch (error) {
+        await rm(tempPath, { recursive: true, force: true }).catch(() => undefined);
+        throw error;
+      }
+      return mirrorPath;
+    }
+
+    if (options.commitId) {
+      if (!(await hasRevision(mirrorPath, options.commitId))) {
+        await fetchMirror(mirrorPath, options.signal);
+      }
+    } else if (options.branch && (await hasRevision(mirrorPath, `refs/tags/${options.branch}`))) {
+      // Tags are immutable, no need to refresh
+    } else if (Date.now() - (await getLastFetchTime(mirrorPath)) > MIRROR_FRESHNESS_MS) {
+      await fetchMirror(mirrorPath, options.signal);
+    }
+
+    return mirrorPath;
+  });
+}
+
+/**
+ * Clones a repository into destPath using the shared mirror cache. The clone borrows
+ * objects from the mirror through git alternates, so repeat clones of a known
+ * repository are local and copy no objects. Falls back to a plain network clone if
+ * the mirror cannot be used. The clone's origin always points at the real URL.
+ */
+export async function cloneRepository(
+  cloneUrl: string,
+  destPath: string,
+  options: CloneOptions = {}
+): Promise<{ usedMirror: boolean }> {
+  const timeout = options.timeoutMs || 300000;
+  const signal = options.signal;
+  const branchArgs = options.branch ? ['--branch', options.branch] : [];
+
+  try {
+    const mirrorPath = await ensureMirror(cloneUrl, options);
+    await execFileAsync('git', ['clone', '--shared', ...branchArgs, mirrorPath, destPath], { timeout, signal });
+    await execFileAsync('git', ['remote', 'set-url', 'origin', cloneUrl], { cwd: destPath });
+    return { usedMirror: true };
+  } catch (error) {
+    await rm(destPath, { recursive: true, force: true }).catch(() => undefined);
+    if (signal?.aborted) {
+      throw error;
+    }
+    console.warn(`Mirror clone failed for ${cloneUrl}, falling back to direct clone:`, error);
+  }
+
+  const depthArgs = options.depth ? ['--depth', String(options.depth)] : [];
+  await execFileAsync('git', ['clone', ...branchArgs, ...depthArgs, cloneUrl, destPath], { timeout, signal });
+  return { usedMirror: false };
+}
+
+/**
+ * Lists all mirrors in the cache with their upstream URL and last fetch time.
+ */
+export async function listMirrors(): Promise<MirrorInfo[]> {
+  const mirrorsRoot = getMirrorsRoot();
+  if (!existsSync(mirrorsRoot)) {
+    return [];
+  }
+
+  const entries = await readdir(mirrorsRoot, { withFileTypes: true });
+  const mirrors = entries.filter(entry => entry.isDirectory() && entry.name.endsWith('.git'));
+
+  return Promise.all(
+    mirrors.map(async (entry) => {
+      const mirrorPath = join(mirrorsRoot, entry.name);
+      let url: string | null = null;
+      try {
+        const config = await readFile(join(mirrorPath, 'config'), 'utf-8');
+        const match = config.match(/\[remote "origin"\][^[]*?url\s*=\s*(.+)/);
+        url = match ? match[1].trim() : null;
+      } catch (error) {
+        // Leave url unknown
+      }
+      const lastFetch = await getLastFetchTime(mirrorPath);
+      return {
+        name: entry.name,
+        path: mirrorPath,
+        url,
+        lastFetched: lastFetch ? new Date(lastFetch).toISOString() : null,
+      };
+    })
+  );
+}
+
+/**
+ * Fetches every mirror from its upstream. Returns the names of mirrors that failed.
+ */
+export async function fetchAllMirrors(): Promise<{ fetched: string[]; failed: string[] }> {
+  const fetched: string[] = [];
+  const failed: string[] = [];
+
+  for (const mirror of await listMirrors()) {
+    try {
+      await withMirrorLock(mirror.path, () => fetchMirror(mirror.path));
+      fetched.push(mirror.name);
+    } catch (error) {
+      console.error(`Error fetching mirror ${mirror.name}:`, error);
+      failed.push(mirror.name);
+    }
+  }
+
+  return { fetched, failed };
+}
+
+async function collectReferencedMirrors(): Promise<Set<string>> {
+  const spacesPath = join(process.cwd(), 'spaces');
+  const referenced = new Set<string>();
+
+  const readAlternates = async (repoPath: string) => {
+    try {
+      const content = await readFile(join(repoPath, '.git', 'objects', 'info', 'alternates'), 'utf-8');
+      content
+        .split('\n')
+        .map(line => line.trim())
+        .filter(line => line)
+        // alternates point at <mirror>/objects
+        .forEach(line => referenced.add(join(line, '..')));
+    } catch (error) {
+      // Not a shared clone
+    }
+  };
+
+  const spaceDirs = await readdir(spacesPath, { withFileTypes: true }).catch(() => []);
+  for (const spaceDir of spaceDirs) {
+    if (!spaceDir.isDirectory() || spaceDir.name.startsWith('.')) {
+      continue;
+    }
+    const comfyUIPath = join(spacesPath, spaceDir.name, 'ComfyUI');
+    await readAlternates(comfyUIPath);
+
+    const nodeDirs = await readdir(join(comfyUIPath, 'custom_nodes'), { withFileTypes: true }).catch(() => []);
+    await Promise.all(
+      nodeDirs
+        .filter(nodeDir => nodeDir.isDirectory())
+        .map(nodeDir => readAlternates(join(comfyUIPath, 'custom_nodes', nodeDir.name)))
+    );
+  }
+
+  return referenced;
+}
+
+/**
+ * Removes mirrors that no clone in any space borrows objects from. Mirrors that are
+ * still referenced are kept, since removing them would break those clones.
+ */
+export async function pruneMirrors(): Promise<{ removed: string[]; kept: string[] }> {
+  const referenced = await collectReferencedMirrors();
+  const removed: string[] = [];
+  const kept: string[] = [];
+
+  for (const mirror of await listMirrors()) {
+    if (referenced.has(mirror.path)) {
+      kept.push(mirror.name);
+      continue;
+    }
+    await withMirrorLock(mirror.path, () => rm(mirror.path, { recursive: true, force: true }));
+    removed.push(mirror.name);
+  }
+
+  return { removed, kept };
+}
@@ -0,0 +1,76 @@
+import { createHash } from 'crypto';
+import { join } from 'path';
+import { readFile, writeFile } from 'fs/promises';
+
+const INSTALL_STATE_FILE = '.comfy-spaces-install-state.json';
+
+export interface InstallState {
+  fingerprint: string;
+  pythonVersion: string;
+  pythonExec: string;
+  dependencyCount: number;
+  installedAt: string;
+}
+
+/**
+ * Normalizes a dependency list so that ordering, whitespace and comments
+ * do not affect the fingerprint.
+ */
+function normalizeDependencies(dependencies: string[]): string[] {
+  return dependencies
+    .map(dep => dep.trim())
+    .filter(dep => dep && !dep.startsWith('#'))
+    .sort();
+}
+
+/**
+ * Computes a fingerprint of everything that determines what pip installs into a venv:
+ * the dependency list, the Python version and the interpreter path.
+ */
+export function computeInstallFingerprint(
+  dependencies: string[],
+  pythonVersion: string,
+  pythonExec: string
+): string {
+  const hash = createHash('sha256');
+  hash.update(`python=${pythonVersion.trim()}\n`);
+  hash.update(`exec=${pythonExec}\n`);
+  for (const dep of normalizeDependencies(dependencies)) {
+    hash.update(`${dep}\n`);
+  }
+  return hash.digest('hex');
+}
+
+/**
+ * Reads the installed state recorded in a venv after its last successful install.
+ * Returns null if no state has been recorded or the file cannot be parsed.
+ */
+export async function readInstallState(venvPath: string): Promise<InstallState | null> {
+  try {
+    const content = await readFile(join(venvPath, INSTALL_STATE_FILE), 'utf-8');
+    const state = JSON.parse(content);
+    return typeof state?.fingerprint === 'string' ? state : null;
+  } catch (error) {
+    return null;
+  }
+}
+
+/**
+ * Records the installed state of a venv. Should only be called after pip has
+ * successfully installed the given dependency list.
+ */
+export async function writeInstallState(
+  venvPath: string,
+  dependencies: string[],
+  pythonVersion: string,
+  pythonExec: string
+): Promise<void> {
+  const state: InstallState = {
+    fingerprint: computeInstallFingerprint(dependencies, pythonVersion, pythonExec),
+    pythonVersion,
+    pythonExec,
+    dependencyCount: normalizeDependencies(dependencies).length,
+    installedAt: new Date().toISOString(),
+  };
+  await writeFile(join(venvPath, INSTALL_STATE_FILE), JSON.stringify(state, null, 2), 'utf-8');
+}
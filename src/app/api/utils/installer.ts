@@ -0,0 +1,212 @@
+import { join } from 'path';
+import { existsSync } from 'fs';
+import { spawn, execFile } from 'child_process';
+import { promisify } from 'util';
+
+const execFileAsync = promisify(execFile);
+
+export type InstallerName = 'pip' | 'uv';
+
+export const INSTALLER_NAMES: InstallerName[] = ['pip', 'uv'];
+
+/**
+ * A command line for the package installer. `env` holds extra environment
+ * variables the command needs on top of process.env.
+ */
+export type InstallerCommand = { command: string; args: string[]; display: string; env: Record<string, string> };
+
+type PythonCandidate = { command: string; args: string[] };
+
+/**
+ * Installer backend for a venv. The pip backend runs the venv's own pip; the uv
+ * backend runs `uv pip` against the venv, which resolves and installs much faster.
+ */
+export interface Installer {
+  name: InstallerName;
+  /** Base command for pip-compatible subcommands (install, list, --version) */
+  command: InstallerCommand;
+  /** Arguments for installing a requirements file, extraArgs are appended */
+  installArgs(requirementsPath: string, extraArgs?: string[]): string[];
+}
+
+let uvAvailability: Promise<string | null> | null = null;
+
+/**
+ * Returns the uv executable if one can be run, or null. Honours UV_PATH and
+ * otherwise looks for uv on PATH. The result is cached for the process lifetime.
+ */
+export function findUv(): Promise<string | null> {
+  if (!uvAvailability) {
+    const uvCommand = process.env.UV_PATH || 'uv';
+    uvAvailability = execFileAsync(uvCommand, ['--version'], { timeout: 10000 })
+      .then(() => uvCommand)
+      .catch(() => null);
+  }
+  return uvAvailability;
+}
+
+/**
+ * Reads the installer name from space.json metadata, defaulting to pip.
+ */
+export function normalizeInstallerName(value: unknown): InstallerName {
+  return value === 'uv' ? 'uv' : 'pip';
+}
+
+function getVenvPaths(venvPath: string): { pythonExec: string; pipPath: string } {
+  const isWindows = process.platform === 'win32';
+  return isWindows
+    ? { pythonExec: join(venvPath, 'Scripts', 'python.exe'), pipPath: join(venvPath, 'Scripts', 'pip.exe') }
+    : { pythonExec: join(venvPath, 'bin', 'python3'), pipPath: join(venvPath, 'bin', 'pip') };
+}
+
+function createPipInstaller(venvPath: string): Installer {
+  const { pythonExec, pipPath } = getVenvPaths(venvPath);
+  const command: InstallerCommand = existsSync(pipPath)
+    ? { command: pipPath, args: [], display: pipPath, env: {} }
+    : { command: pythonExec, args: ['-m', 'pip'], display: `${pythonExec} -m pip`, env: {} };
+
+  return {
+    name: 'pip',
+    command,
+    // Use --upgrade-strategy=only-if-needed to allow pip to resolve conflicts
+    // This will upgrade packages only if needed to satisfy dependencies
+    installArgs: (requirementsPath, extraArgs = []) => ['install', '-r', requirementsPath, '--upgrade-strategy', 'only-if-needed', ...extraArgs],
+  };
+}
+
+function createUvInstaller(uvCommand: string, venvPath: string): Installer {
+  return {
+    name: 'uv',
+    // uv pip targets the environment named by VIRTUAL_ENV
+    command: { command: uvCommand, args: ['pip'], display: `${uvCommand} pip (${venvPath})`, env: { VIRTUAL_ENV: venvPath } },
+    // uv only upgrades what the requirements need by default
+    installArgs: (requirementsPath, extraArgs = []) => ['install', '-r', requirementsPath, ...extraArgs],
+  };
+}
+
+/**
+ * Resolves the installer for a venv. A space that asks for uv falls back to pip when
+ * uv is not installed; `fallbackReason` explains why so callers can log it.
+ */
+export async function resolveInstaller(
+  preferred: InstallerName,
+  venvPath: string
+): Promise<{ installer: Installer; fallbackReason: string | null }> {
+  if (preferred === 'uv') {
+    const uvCommand = await findUv();
+    if (uvCommand) {
+      return { installer: createUvInstaller(uvCommand, venvPath), fallbackReason: null };
+    }
+    return { installer: createPipInstaller(venvPath), fallbackReason: 'uv was requested but is not installed, using pip' };
+  }
+  return { installer: createPipInstaller(venvPath), fallbackReason: null };
+}
+
+/**
+ * Re-resolves the pip backend after ensurepip may have created the pip script.
+ */
+export function resolvePipInstaller(venvPath: string): Installer {
+  return createPipInstaller(venvPath);
+}
+
+function formatCommand(candidate: PythonCandidate): string {
+  return [candidate.command, ...candidate.args].join(' ').trim();
+}
+
+function buildPythonCandidates(pythonVersion?: string): PythonCandidate[] {
+  const candidates: PythonCandidate[] = [];
+  const isWindows = process.platform === 'win32';
+  const versionMatch = pythonVersion?.trim().match(/^\d+(?:\.\d+)?/);
+  const version = versionMatch?.[0];
+
+  if (version) {
+    if (isWindows) {
+      candidates.push({ command: 'py', args: [`-${version}`] });
+    } else {
+      candidates.push({ command: `python${version}`, args: [] });
+    }
+  }
+
+  if (isWindows) {
+    candidates.push({ command: 'py', args: ['-3'] });
+    candidates.push({ command: 'python', args: [] });
+    candidates.push({ command: 'python3', args: [] });
+  } else {
+    candidates.push({ command: 'python3', args: [] });
+    candidates.push({ command: 'python', args: [] });
+  }
+
+  return candidates;
+}
+
+/**
+ * Returns the commands to try, in order, for creating a venv. With uv the first
+ * attempt is `uv venv --seed` (seeded with pip so pip-based tooling keeps working);
+ * the `python -m venv` candidates follow as fallbacks.
+ */
+export async function getVenvCommands(
+  installerName: InstallerName,
+  venvPath: string,
+  pythonVersion?: string
+): Promise<PythonCandidate[]> {
+  const commands: PythonCandidate[] = [];
+
+  if (installerName === 'uv') {
+    const uvCommand = await findUv();
+    if (uvCommand) {
+      const versionMatch = pythonVersion?.trim().match(/^\d+(?:\.\d+)?/);
+      const pythonArgs = versionMatch ? ['--python', versionMatch[0]] : [];
+      commands.push({ command: uvCommand, args: ['venv', '--seed', ...pythonArgs, venvPath] });
+    }
+  }
+
+  for (const candidate of buildPythonCandidates(pythonVersion)) {
+    commands.push({ command: candidate.command, args: [...candidate.args, '-m', 'venv', venvPath] });
+  }
+
+  return commands;
+}
+
+/**
+ * Creates a venv, trying each command from getVenvCommands until one succeeds.
+ */
+export async function createVenv(
+  venvPath: string,
+  cwd: string,
+  pythonVersion?: string,
+  installerName: InstallerName = 'pip'
+): Promise<void> {
+  const candidates = await getVenvCommands(installerName, venvPath, pythonVersion);
+  let lastError: Error | null = null;
+
+  for (const candidate of candidates) {
+    try {
+      await new Promise<void>((resolve, reject) => {
+        const venvProcess = spawn(candidate.command, candidate.args, {
+          cwd,
+          env: { ...process.env },
+          shell: false,
+        });
+
+        venvProcess.on('close', (code) => {
+          if (code === 0) {
+            resolve();
+          } else {
+            reject(new Error(`exit code ${code}`));
+          }
+        });
+
+        venvProcess.on('error', (error) => {
+          reject(error);
+        });
+      });
+      return;
+    } catch (error) {
+      lastError = error as Error;
+      console.warn(`Failed to create venv with ${formatCommand(candidate)}: ${lastError.message}`);
+    }
+  }
+
+  const attempts = candidates.map(formatCommand).join(', ');
+  throw new Error(`Failed to create venv using: ${attempts}${lastError ? `. Last error: ${lastError.message}` : ''}`);
+}
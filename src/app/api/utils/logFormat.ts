@@ -0,0 +1,87 @@
+export type LogSource = 'logs' | 'comfy';
+
+export type LogLevel = 'info' | 'warn' | 'error';
+
+export const LOG_LEVELS: LogLevel[] = ['info', 'warn', 'error'];
+
+export interface LogSourceConfig {
+  fileName: string;
+  label: string;
+  /** Activation log lines carry a `[timestamp] message` prefix, ComfyUI output does not */
+  parseTimestamp: boolean;
+  tag: string;
+}
+
+export const LOG_SOURCES: Record<LogSource, LogSourceConfig> = {
+  logs: { fileName: 'logs.txt', label: 'Activation log file', parseTimestamp: true, tag: 'APP' },
+  comfy: { fileName: 'comfy-logs.txt', label: 'ComfyUI log file', parseTimestamp: false, tag: 'COMFY' },
+};
+
+// Tag patterns are compiled once rather than for every line
+const TAG_PATTERNS: Record<LogSource, RegExp> = {
+  logs: new RegExp(`^\\[${LOG_SOURCES.logs.tag}\\]`),
+  comfy: new RegExp(`^\\[${LOG_SOURCES.comfy.tag}\\]`),
+};
+// Activation log messages carry an explicit level tag after the timestamp
+const LEVEL_TAG_PATTERN = /^(?:\[(?:APP|COMFY)\]\s*)?\[(ERROR|WARN|WARNING|INFO|DEBUG)\]/;
+// ComfyUI output has no level tags; errors and warnings are recognised by their wording
+const COMFY_ERROR_PATTERN = /\b(?:ERROR|Error|Traceback|Exception|Import Failed)\b/;
+const COMFY_WARN_PATTERN = /\b(?:WARN|WARNING|Warning|DeprecationWarning)\b/;
+
+export function isLogSource(value: unknown): value is LogSource {
+  return value === 'logs' || value === 'comfy';
+}
+
+/**
+ * Splits the `[timestamp] ` prefix off an activation log line. Returns a null
+ * timestamp for lines without one (all ComfyUI output).
+ */
+export function splitLogTimestamp(source: LogSource, line: string): { timestamp: string | null; message: string } {
+  if (LOG_SOURCES[source].parseTimestamp) {
+    // Parse log format: [timestamp] message
+    const timestampMatch = line.match(/^\[([^\]]+)\]\s*(.+)$/);
+    if (timestampMatch) {
+      return { timestamp: timestampMatch[1], message: timestampMatch[2] };
+    }
+  }
+  return { timestamp: null, message: line };
+}
+
+/**
+ * Derives the level of a log message (without its timestamp prefix).
+ */
+export function getLogLevel(source: LogSource, message: string): LogLevel {
+  const tagMatch = message.match(LEVEL_TAG_PATTERN);
+  if (tagMatch) {
+    const tag = tagMatch[1];
+    return tag === 'ERROR' ? 'error' : tag === 'WARN' || tag === 'WARNING' ? 'warn' : 'info';
+  }
+  if (source === 'comfy') {
+    if (COMFY_ERROR_PATTERN.test(message)) {
+      return 'error';
+    }
+    if (COMFY_WARN_PATTERN.test(message)) {
+      return 'warn';
+    }
+  }
+  return 'info';
+}
+
+/**
+ * Turns a raw log file line into the `{ message, timestamp }` entry shown in the log
+ * sidebar: the timestamp prefix is split off where the file has one, the source
+ * tag is added unless the line already carries it, and the level is derived.
+ */
+export function formatLogLine(
+  source: LogSource,
+  line: string
+): { message: string; timestamp: string; level: LogLevel } {
+  const { tag } = LOG_SOURCES[source];
+  const split = splitLogTimestamp(source, line);
+  let message = split.message;
+  const level = getLogLevel(source, message);
+  if (!TAG_PATTERNS[source].test(message)) {
+    message = `[${tag}] ${message}`;
+  }
+  return { message, timestamp: split.timestamp || new Date().toISOString(), level };
+}
@@ -0,0 +1,299 @@
+import { followLogFile } from './logTailer';
+import type { LogFollower, TailResult } from './logTailer';
+
+// Recent lines kept per log file and replayed to new subscribers
+const RING_CAPACITY = 2000;
+// On startup only this much of an existing log is read to fill the ring
+const INITIAL_TAIL_BYTES = 2 * 1024 * 1024;
+// Lines sent to a new subscriber without a resume cursor, unless it asks for fewer
+export const DEFAULT_BACKFILL_LINES = 500;
+// Lines queued for a subscriber that is not reading; older ones are dropped beyond this
+const MAX_QUEUED_LINES = 5000;
+// Keep a channel (and its tailer) alive this long after the last subscriber leaves,
+// so page reloads do not re-read the file
+const IDLE_CHANNEL_TTL_MS = 30000;
+
+export interface LogHubLine {
+  /** Byte offset just past the line in the log file; with the generation it forms a resume cursor */
+  offset: number;
+  line: string;
+}
+
+export type LogHubEvent =
+  | { type: 'lines'; generation: string; lines: LogHubLine[] }
+  | { type: 'reset'; generation: string }
+  | { type: 'dropped'; count: number }
+  | { type: 'gap'; generation: string; before: number };
+
+/**
+ * Where a reconnecting subscriber left off: the file generation and the byte offset
+ * just past the last line it received.
+ */
+export interface LogCursor {
+  generation: string;
+  offset: number;
+}
+
+export interface SubscribeOptions {
+  /** Resume after this cursor instead of sending the backfill */
+  since?: LogCursor | null;
+  /** Recent lines to send when not resuming (capped at the ring size) */
+  backfill?: number;
+}
+
+/**
+ * Receiving side of a subscription. `isReady` reports whether the consumer can take
+ * more data right now (for SSE, whether the stream's queue has room); events are
+ * held back per subscriber while it returns false.
+ */
+export interface LogHubSink {
+  send(event: LogHubEvent): void;
+  isReady(): boolean;
+}
+
+export interface LogHubStats {
+  key: string;
+  filePath: string;
+  subscribers: number;
+  bufferedLines: number;
+  droppedLines: number;
+}
+
+/**
+ * Fixed-size circular buffer; pushing past capacity overwrites the oldest item.
+ */
+class RingBuffer<T> {
+  private items: T[] = [];
+  private start = 0;
+
+  constructor(private capacity: number) {}
+
+  /** Adds an item and returns the one it overwrote, if any */
+  push(item: T): T | undefined {
+    if (this.items.length < this.capacity) {
+      this.items.push(item);
+      return undefined;
+    }
+    const evicted = this.items[this.start];
+    this.items[this.start] = item;
+    this.start = (this.start + 1) % this.capacity;
+    return evicted;
+  }
+
+  toArray(): T[] {
+    return [...this.items.slice(this.start), ...this.items.slice(0, this.start)];
+  }
+
+  clear(): void {
+    this.items = [];
+    this.start = 0;
+  }
+
+  get size(): number {
+    return this.items.length;
+  }
+}
+
+class Subscription {
+  private queue: LogHubEvent[] = [];
+  private queuedLines = 0;
+  private pendingDrops = 0;
+  droppedTotal = 0;
+
+  constructor(private sink: LogHubSink) {}
+
+  enqueue(event: LogHubEvent): void {
+    this.queue.push(event);
+    if (event.type === 'lines') {
+      this.queuedLines += event.lines.length;
+    }
+    // Slow consumer: drop the oldest queued lines so memory stays bounded
+    while (this.queuedLines > MAX_QUEUED_LINES) {
+      const index = this.queue.findIndex(queued => queued.type === 'lines');
+      if (index === -1) {
+        break;
+      }
+      const oldest = this.queue[index] as Extract<LogHubEvent, { type: 'lines' }>;
+      const excess = this.queuedLines - MAX_QUEUED_LINES;
+      const removed = Math.min(excess, oldest.lines.length);
+      oldest.lines = oldest.lines.slice(removed);
+      if (oldest.lines.length === 0) {
+        this.queue.splice(index, 1);
+      }
+      this.queuedLines -= removed;
+      this.pendingDrops += removed;
+      this.droppedTotal += removed;
+    }
+    this.drain();
+  }
+
+  drain(): void {
+    while (this.queue.length > 0 && this.sink.isReady()) {
+      if (this.pendingDrops > 0) {
+        const count = this.pendingDrops;
+        this.pendingDrops = 0;
+        this.sink.send({ type: 'dropped', count });
+        continue;
+      }
+      const event = this.queue.shift()!;
+      if (event.type === 'lines') {
+        this.queuedLines -= event.lines.length;
+      }
+      this.sink.send(event);
+    }
+  }
+}
+
+class LogChannel {
+  private ring = new RingBuffer<LogHubLine>(RING_CAPACITY);
+  private generation = '';
+  // Byte offset from which the ring holds every line of the current generation
+  private bufferedFrom = 0;
+  private subscriptions = new Set<Subscription>();
+  private follower: LogFollower;
+  private idleTimer: NodeJS.Timeout | null = null;
+
+  constructor(readonly key: string, readonly filePath: string, private onIdle: () => void) {
+    this.follower = followLogFile(
+      filePath,
+      (result) => this.publish(result),
+      (error) => console.error(`Error tailing ${filePath}:`, error),
+      INITIAL_TAIL_BYTES
+    );
+  }
+
+  /** Resolves once the existing file contents have been read into the ring */
+  get ready(): Promise<void> {
+    return this.follower.ready;
+  }
+
+  private publish({ lines, offsets, from, generation, reset }: TailResult): void {
+    if (reset) {
+      this.ring.clear();
+      this.subscriptions.forEach(subscription => subscription.enqueue({ type: 'reset', generation }));
+    }
+    if (reset || this.ring.size === 0) {
+      this.bufferedFrom = from;
+    }
+    this.generation = generation;
+    if (lines.length === 0) {
+      return;
+    }
+    const entries = lines.map((line, index) => ({ offset: offsets[index], line }));
+    entries.forEach(entry => {
+      const evicted = this.ring.push(entry);
+      if (evicted) {
+        this.bufferedFrom = evicted.offset;
+      }
+    });
+    this.subscriptions.forEach(subscription => subscription.enqueue({ type: 'lines', generation, lines: entries }));
+  }
+
+  subscribe(sink: LogHubSink, options: SubscribeOptions = {}): { subscription: Subscription; unsubscribe: () => void } {
+    if (this.idleTimer) {
+      clearTimeout(this.idleTimer);
+      this.idleTimer = null;
+    }
+    const subscription = new Subscription(sink);
+    // Replay first; new lines follow in order since publish runs synchronously
+    const backlog = this.ring.toArray();
+    const { since } = options;
+    if (since && since.generation === this.generation) {
+      const missed = backlog.filter(entry => entry.offset > since.offset);
+      // Lines between the cursor and the oldest ring entry are no longer buffered;
+      // tell the subscriber so it can page them in from the file
+      if (since.offset < this.bufferedFrom) {
+        subscription.enqueue({ type: 'gap', generation: this.generation, before: this.bufferedFrom });
+      }
+      if (missed.length > 0) {
+        subscription.enqueue({ type: 'lines', generation: this.generation, lines: missed });
+      }
+    } else {
+      if (since && this.generation) {
+        // The file was cleared or replaced since the subscriber's cursor
+        subscription.enqueue({ type: 'reset', generation: this.generation });
+      }
+      const backfill = Math.max(0, Math.min(options.backfill ?? DEFAULT_BACKFILL_LINES, RING_CAPACITY));
+      const recent = backfill > 0 ? backlog.slice(-backfill) : [];
+      if (recent.length > 0) {
+        subscription.enqueue({ type: 'lines', generation: this.generation, lines: recent });
+      }
+    }
+    this.subscriptions.add(subscription);
+
+    return {
+      subscription,
+      unsubscribe: () => {
+        this.subscriptions.delete(subscription);
+        if (this.subscriptions.size === 0 && !this.idleTimer) {
+          this.idleTimer = setTimeout(() => {
+            this.idleTimer = null;
+            if (this.subscriptions.size === 0) {
+              void this.follower.stop();
+              this.onIdle();
+            }
+          }, IDLE_CHANNEL_TTL_MS);
+          this.idleTimer.unref?.();
+        }
+      },
+    };
+  }
+
+  getStats(): LogHubStats {
+    let droppedLines = 0;
+    this.subscriptions.forEach(subscription => {
+      droppedLines += subscription.droppedTotal;
+    });
+    return {
+      key: this.key,
+      filePath: this.filePath,
+      subscribers: this.subscriptions.size,
+      bufferedLines: this.ring.size,
+      droppedLines,
+    };
+  }
+}
+
+const channels = new Map<string, LogChannel>();
+
+/**
+ * Subscribes to a space's log file through the process-wide hub. All subscribers to
+ * the same file share one tailer and one ring of recent lines, so ten open
+ * dashboards cost the same as one. A subscriber resuming with a cursor from the same
+ * file generation gets only the lines after it (plus a 'gap' event when some are no
+ * longer buffered); otherwise it gets the last `backfill` lines. Every new line is
+ * delivered afterwards. Call `drain` when the sink becomes ready again and
+ * `unsubscribe` when done.
+ */
+export async function subscribeToLog(
+  spaceId: string,
+  fileName: string,
+  filePath: string,
+  sink: LogHubSink,
+  options: SubscribeOptions = {}
+): Promise<{ drain: () => void; unsubscribe: () => void }> {
+  const key = `${spaceId}/${fileName}`;
+  let channel = channels.get(key);
+  if (!channel) {
+    channel = new LogChannel(key, filePath, () => channels.delete(key));
+    channels.set(key, channel);
+  }
+  // The cursor can only be compared once the file's generation is known
+  await channel.ready;
+  if (channels.get(key) !== channel) {
+    // The channel went idle and was stopped while we waited, start a fresh one
+    return subscribeToLog(spaceId, fileName, filePath, sink, options);
+  }
+  const { subscription, unsubscribe } = channel.subscribe(sink, options);
+  return {
+    drain: () => subscription.drain(),
+    unsubscribe,
+  };
+}
+
+/**
+ * Reports subscriber counts, ring usage and drop counters for every open channel.
+ */
+export function getLogHubStats(): LogHubStats[] {
+  return Array.from(channels.values()).map(channel => channel.getStats());
+}
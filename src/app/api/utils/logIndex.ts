@@ -0,0 +1,418 @@
+import { open, unlink } from 'fs/promises';
+import type { FileHandle } from 'fs/promises';
+import { readLogGeneration } from './logTailer';
+import { getPositiveIntEnv } from './concurrency';
+
+// One index record is kept for every this many lines
+const INDEX_INTERVAL_LINES = getPositiveIntEnv('LOG_INDEX_INTERVAL', 256);
+// Fixed-size header holding the format version, interval and the log's generation
+const HEADER_BYTES = 64;
+// Each record: byte offset of the line's start and its timestamp (ms), both as doubles
+const RECORD_BYTES = 16;
+const INDEX_VERSION = 1;
+// Bytes read per step when scanning forward through a log file
+const SCAN_CHUNK_BYTES = 256 * 1024;
+// Leading bytes of a line kept while scanning, enough for its timestamp prefix
+const LINE_HEAD_BYTES = 64;
+// Appends are indexed this long after the last write, so bursts are scanned once
+const UPDATE_DEBOUNCE_MS = 1000;
+
+export interface IndexedLine {
+  /** Zero-based line number in the file, counting blank lines */
+  lineNumber: number;
+  /** Byte offset just past the line, the same cursor the log stream uses */
+  offset: number;
+  line: string;
+}
+
+/**
+ * Returns the index file that belongs to a log file.
+ */
+export function getLogIndexPath(logFilePath: string): string {
+  return `${logFilePath}.idx`;
+}
+
+function parseLineTimestamp(line: Buffer): number | null {
+  // Activation log lines start with "[<ISO timestamp>] "
+  if (line[0] !== 0x5b) {
+    return null;
+  }
+  const close = line.indexOf(0x5d);
+  if (close < 2 || close > 40) {
+    return null;
+  }
+  const parsed = Date.parse(line.toString('utf-8', 1, close));
+  return Number.isNaN(parsed) ? null : parsed;
+}
+
+/**
+ * Sparse line index for an append-only log file, stored next to it as
+ * `<name>.idx`. Record i holds the start offset and timestamp of line
+ * i * INDEX_INTERVAL_LINES, so any line is reached by one record lookup plus a
+ * forward scan of at most INDEX_INTERVAL_LINES lines, whatever the file size.
+ * Updates only scan bytes appended since the previous update. The index is rebuilt
+ * when the log's generation changes (truncation, replacement or rotation). Record
+ * timestamps come from the `[ISO time]` line prefix of activation logs; ComfyUI
+ * output has none and is stamped with the time it was indexed, which the debounced
+ * updates after each write keep close to the time it was logged.
+ */
+export class LogIndex {
+  private handle: FileHandle | null = null;
+  private generation = '';
+  private records = 0;
+  // Scan state: bytes of the log covered, complete lines seen, and where the
+  // unfinished last line starts
+  private scannedOffset = 0;
+  private lineCount = 0;
+  private lastTimestamp = 0;
+  private lastRecordParsed = false;
+  private chain: Promise<unknown> = Promise.resolve();
+
+  constructor(readonly logFilePath: string) {}
+
+  /** Complete lines indexed so far */
+  get totalLines(): number {
+    return this.lineCount;
+  }
+
+  /**
+   * Brings the index up to date with the log file. Calls are serialized.
+   */
+  update(): Promise<void> {
+    return this.serialize(() => this.catchUp());
+  }
+
+  /**
+   * Returns up to `limit` lines ending before line number `beforeLine` (the end of
+   * the file when null), oldest first.
+   */
+  readBeforeLine(
+    beforeLine: number | null,
+    limit: number
+  ): Promise<{ lines: IndexedLine[]; firstLine: number; startOffset: number; totalLines: number }> {
+    return this.serialize(async () => {
+      await this.catchUp();
+      const end = beforeLine === null ? this.lineCount : Math.max(0, Math.min(beforeLine, this.lineCount));
+      const first = Math.max(0, end - limit);
+      const { lines, startOffset } = await this.readRange(first, end - first);
+      return { lines, firstLine: first, startOffset, totalLines: this.lineCount };
+    });
+  }
+
+  /**
+   * Returns a line number at most INDEX_INTERVAL_LINES lines before the first line
+   * logged at or after `timestamp`, found by binary search over the index records.
+   */
+  findLineAtTime(timestamp: number): Promise<number> {
+    return this.serialize(async () => {
+      await this.catchUp();
+      const first = await this.searchRecords(timestamp, false);
+      // The matching line lies within the interval before the first later record
+      return Math.min(this.lineCount, Math.max(0, first - 1) * INDEX_INTERVAL_LINES);
+    });
+  }
+
+  /**
+   * Narrows a time range to a byte range of the log: from the start of the interval
+   * containing the first line at or after `from`, to the start of the first
+   * interval that begins after `to`. Null bounds mean the start or end of the file.
+   */
+  findTimeRange(
+    from: number | null,
+    to: number | null
+  ): Promise<{ startLine: number; startOffset: number; endOffset: number }> {
+    return this.serialize(async () => {
+      await this.catchUp();
+      let startLine = 0;
+      let startOffset = 0;
+      if (from !== null && this.records > 0) {
+        const startRecord = Math.max(0, (await this.searchRecords(from, false)) - 1);
+        startLine = startRecord * INDEX_INTERVAL_LINES;
+        startOffset = (await this.readRecord(startRecord)).offset;
+      }
+      let endOffset = this.scannedOffset;
+      if (to !== null) {
+        const endRecord = await this.searchRecords(to, true);
+        if (endRecord < this.records) {
+          endOffset = (await this.readRecord(endRecord)).offset;
+        }
+      }
+      return { startLine, startOffset, endOffset: Math.max(startOffset, endOffset) };
+    });
+  }
+
+  /**
+   * Binary search for the first record with a timestamp at or after (or, when
+   * `strictlyAfter`, after) `timestamp`. Returns the record count when there is none.
+   */
+  private async searchRecords(timestamp: number, strictlyAfter: boolean): Promise<number> {
+    let low = 0;
+    let high = this.records;
+    while (low < high) {
+      const mid = (low + high) >> 1;
+      const record = await this.readRecord(mid);
+      if (record.timestamp < timestamp || (strictlyAfter && record.timestamp === timestamp)) {
+        low = mid + 1;
+      } else {
+        high = mid;
+      }
+    }
+    return low;
+  }
+
+  async close(): Promise<void> {
+    await this.serialize(async () => {
+      if (this.handle) {
+        const handle = this.handle;
+        this.handle = null;
+        await handle.close().catch(() => undefined);
+      }
+    });
+  }
+
+  private serialize<T>(task: () => Promise<T>): Promise<T> {
+    const run = this.chain.then(task, task);
+    this.chain = run.catch(() => undefined);
+    return run;
+  }
+
+  private async readRecord(index: number): Promise<{ offset: number; timestamp: number }> {
+    const buffer = Buffer.alloc(RECORD_BYTES);
+    await this.handle!.read(buffer, 0, RECORD_BYTES, HEADER_BYTES + index * RECORD_BYTES);
+    return { offset: buffer.readDoubleLE(0), timestamp: buffer.readDoubleLE(8) };
+  }
+
+  private async resetIndex(generation: string): Promise<void> {
+    const header = Buffer.alloc(HEADER_BYTES);
+    header.write(JSON.stringify({ v: INDEX_VERSION, k: INDEX_INTERVAL_LINES, generation }), 'utf-8');
+    await this.handle!.truncate(0);
+    await this.handle!.write(header, 0, HEADER_BYTES, 0);
+    this.generation = generation;
+    this.records = 0;
+    this.scannedOffset = 0;
+    this.lineCount = 0;
+    this.lastTimestamp = 0;
+    this.lastRecordParsed = false;
+  }
+
+  /**
+   * Opens the index file and restores the scan state from its last record, or
+   * starts a new index when it is missing, from another generation or damaged.
+   */
+  private async load(generation: string): Promise<void> {
+    if (!this.handle) {
+      // Records are only ever appended (after truncating), so append mode is enough
+      this.handle = await open(getLogIndexPath(this.logFilePath), 'a+');
+      this.generation = '';
+    }
+    if (this.generation === generation) {
+      return;
+    }
+
+    const { size } = await this.handle.stat();
+    if (size >= HEADER_BYTES) {
+      const header = Buffer.alloc(HEADER_BYTES);
+      await this.handle.read(header, 0, HEADER_BYTES, 0);
+      try {
+        const parsed = JSON.parse(header.toString('utf-8').replace(/\0+$/, ''));
+        if (parsed.v === INDEX_VERSION && parsed.k === INDEX_INTERVAL_LINES && parsed.generation === generation) {
+          this.generation = generation;
+          this.records = Math.floor((size - HEADER_BYTES) / RECORD_BYTES);
+          if (this.records > 0) {
+            // Rescan the last interval to recover the exact line count
+            const last = await this.readRecord(this.records - 1);
+            this.scannedOffset = last.offset;
+            this.lineCount = (this.records - 1) * INDEX_INTERVAL_LINES;
+            this.lastTimestamp = last.timestamp;
+            // Drop the last record; the scan re-adds it
+            this.records--;
+            await this.handle.truncate(HEADER_BYTES + this.records * RECORD_BYTES);
+          } else {
+            this.scannedOffset = 0;
+            this.lineCount = 0;
+            this.lastTimestamp = 0;
+            await this.handle.truncate(HEADER_BYTES);
+          }
+          return;
+        }
+      } catch (error) {
+        // Damaged header, rebuild below
+      }
+    }
+    await this.resetIndex(generation);
+  }
+
+  private async catchUp(): Promise<void> {
+    let logHandle: FileHandle;
+    try {
+      logHandle = await open(this.logFilePath, 'r');
+    } catch (error) {
+      // No log file (yet), nothing to index
+      this.lineCount = 0;
+      return;
+    }
+
+    try {
+      const stats = await logHandle.stat();
+      const { generation } = await readLogGeneration(logHandle, stats.ino, stats.size);
+      await this.load(generation);
+      if (stats.size < this.scannedOffset) {
+        await this.resetIndex(generation);
+      }
+
+      const newRecords: Buffer[] = [];
+      let lineStart = this.scannedOffset;
+      let lineHead = Buffer.alloc(0);
+      let position = this.scannedOffset;
+      while (position < stats.size) {
+        const chunk = Buffer.allocUnsafe(Math.min(SCAN_CHUNK_BYTES, stats.size - position));
+        const { bytesRead } = await logHandle.read(chunk, 0, chunk.length, position);
+        if (bytesRead === 0) {
+          break;
+        }
+        let start = 0;
+        let newlineIndex: number;
+        while ((newlineIndex = chunk.indexOf(0x0a, start)) !== -1 && newlineIndex < bytesRead) {
+          if (this.lineCount % INDEX_INTERVAL_LINES === 0) {
+            // The line may have started in an earlier chunk; its head was kept
+            const head = lineHead.length > 0
+              ? Buffer.concat([lineHead, chunk.subarray(start, Math.min(newlineIndex, start + LINE_HEAD_BYTES))])
+              : chunk.subarray(start, newlineIndex);
+            const parsed = parseLineTimestamp(head);
+            let fallback: number;
+            if (this.lineCount === 0) {
+              // Header line: sorts before everything, so later timestamps are never clamped
+              fallback = 0;
+            } else if (this.lastRecordParsed) {
+              // Stray line in a timestamped log, it belongs to the previous timestamp
+              fallback = this.lastTimestamp;
+            } else {
+              // Log without timestamps (ComfyUI output): use the time it was indexed
+              fallback = Math.min(Date.now(), stats.mtimeMs);
+            }
+            const timestamp = Math.max(this.lastTimestamp, parsed ?? fallback);
+            this.lastRecordParsed = parsed !== null;
+            const record = Buffer.alloc(RECORD_BYTES);
+            record.writeDoubleLE(lineStart, 0);
+            record.writeDoubleLE(timestamp, 8);
+            newRecords.push(record);
+            this.lastTimestamp = timestamp;
+          }
+          this.lineCount++;
+          lineStart = position + newlineIndex + 1;
+          lineHead = Buffer.alloc(0);
+          start = newlineIndex + 1;
+        }
+        if (start < bytesRead && lineHead.length < LINE_HEAD_BYTES) {
+          const needed = LINE_HEAD_BYTES - lineHead.length;
+          lineHead = Buffer.concat([lineHead, chunk.subarray(start, Math.min(bytesRead, start + needed))]);
+        }
+        position += bytesRead;
+      }
+      this.scannedOffset = lineStart;
+
+      if (newRecords.length > 0) {
+        await this.handle!.write(Buffer.concat(newRecords), 0, newRecords.length * RECORD_BYTES, HEADER_BYTES + this.records * RECORD_BYTES);
+        this.records += newRecords.length;
+      }
+    } finally {
+      await logHandle.close();
+    }
+  }
+
+  /**
+   * Reads `count` lines starting at line `firstLine` and reports the byte offset
+   * where line `firstLine` starts.
+   */
+  private async readRange(firstLine: number, count: number): Promise<{ lines: IndexedLine[]; startOffset: number }> {
+    if (count <= 0) {
+      return { lines: [], startOffset: this.scannedOffset };
+    }
+    const recordIndex = Math.floor(firstLine / INDEX_INTERVAL_LINES);
+    const { offset } = await this.readRecord(recordIndex);
+    let lineNumber = recordIndex * INDEX_INTERVAL_LINES;
+    let startOffset = offset;
+
+    const lines: IndexedLine[] = [];
+    const logHandle = await open(this.logFilePath, 'r');
+    try {
+      let position = offset;
+      let pending = Buffer.alloc(0);
+      const lastLine = firstLine + count;
+      while (lineNumber < lastLine && position < this.scannedOffset) {
+        const chunk = Buffer.allocUnsafe(Math.min(SCAN_CHUNK_BYTES, this.scannedOffset - position));
+        const { bytesRead } = await logHandle.read(chunk, 0, chunk.length, position);
+        if (bytesRead === 0) {
+          break;
+        }
+        position += bytesRead;
+        const data = pending.length > 0 ? Buffer.concat([pending, chunk.subarray(0, bytesRead)]) : chunk.subarray(0, bytesRead);
+        const dataStart = position - data.length;
+        let start = 0;
+        let newlineIndex: number;
+        while (lineNumber < lastLine && (newlineIndex = data.indexOf(0x0a, start)) !== -1) {
+          if (lineNumber < firstLine) {
+            startOffset = dataStart + newlineIndex + 1;
+          } else {
+            const line = data.toString('utf-8', start, newlineIndex).replace(/\r$/, '');
+            if (line.trim()) {
+              lines.push({ lineNumber, offset: dataStart + newlineIndex + 1, line });
+            }
+          }
+          lineNumber++;
+          start = newlineIndex + 1;
+        }
+        pending = Buffer.from(data.subarray(start));
+      }
+    } finally {
+      await logHandle.close();
+    }
+    return { lines, startOffset };
+  }
+}
+
+const indexes = new Map<string, LogIndex>();
+const updateTimers = new Map<string, NodeJS.Timeout>();
+
+/**
+ * Returns the shared index for a log file.
+ */
+export function getLogIndex(logFilePath: string): LogIndex {
+  let index = indexes.get(logFilePath);
+  if (!index) {
+    index = new LogIndex(logFilePath);
+    indexes.set(logFilePath, index);
+  }
+  return index;
+}
+
+/**
+ * Schedules an index update for a log file that was just appended to. Bursts of
+ * appends are coalesced into one incremental scan.
+ */
+export function scheduleLogIndexUpdate(logFilePath: string): void {
+  if (updateTimers.has(logFilePath)) {
+    return;
+  }
+  const timer = setTimeout(() => {
+    updateTimers.delete(logFilePath);
+    getLogIndex(logFilePath).update().catch(error => {
+      console.error(`Error updating log index for ${logFilePath}:`, error);
+    });
+  }, UPDATE_DEBOUNCE_MS);
+  timer.unref?.();
+  updateTimers.set(logFilePath, timer);
+}
+
+/**
+ * Drops the index of a log file that is being rotated away; the next update
+ * starts a fresh index for the new file.
+ */
+export async function discardLogIndex(logFilePath: string): Promise<void> {
+  const index = indexes.get(logFilePath);
+  if (index) {
+    indexes.delete(logFilePath);
+    await index.close();
+  }
+  await unlink(getLogIndexPath(logFilePath)).catch(() => undefined);
+}
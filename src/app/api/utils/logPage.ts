@@ -0,0 +1,181 @@
+import { open } from 'fs/promises';
+import { readLogGeneration } from './logTailer';
+import { listLogSegments, readLogSegment } from './logRotation';
+import { getLogIndex } from './logIndex';
+
+// Bytes read per step when walking a log file backwards
+const PAGE_CHUNK_BYTES = 64 * 1024;
+// Upper bound for one page, whatever the client asks for
+export const MAX_PAGE_LINES = 2000;
+
+export interface LogPageLine {
+  /** Byte offset just past the line, the same cursor the log stream uses */
+  offset: number;
+  line: string;
+  /** Zero-based line number, present on pages read through the line index */
+  lineNumber?: number;
+}
+
+export interface LogPage {
+  generation: string;
+  /** Oldest first */
+  lines: LogPageLine[];
+  /** Pass as `before` to fetch the page preceding this one */
+  before: number;
+  hasMore: boolean;
+  /** Once this file is exhausted, the next older segment to page through, if any */
+  previousSegment: number | null;
+  /** Line-addressed pages only: number of the first returned line and the file's line count */
+  firstLine?: number;
+  totalLines?: number;
+}
+
+/** Positioned reads over either an open file or a decompressed segment */
+interface PageSource {
+  size: number;
+  read(buffer: Buffer, length: number, position: number): Promise<number>;
+}
+
+/**
+ * Walks a source backwards from `before` collecting up to `limit` non-blank lines.
+ */
+async function readPage(
+  source: PageSource,
+  before: number | null,
+  limit: number
+): Promise<{ lines: LogPageLine[]; before: number; hasMore: boolean }> {
+  const end = before === null ? source.size : Math.max(0, Math.min(before, source.size));
+
+  const lines: LogPageLine[] = [];
+  // `buffered` holds the bytes [position, lineEnd)
+  let buffered = Buffer.alloc(0);
+  let position = end;
+  let lineEnd = end;
+  let aligned = false;
+
+  while (lines.length < limit && lineEnd > 0) {
+    // The byte before lineEnd is the current line's own newline once aligned
+    const searchFrom = lineEnd - position - (aligned ? 2 : 1);
+    const newlineIndex = searchFrom >= 0 ? buffered.lastIndexOf(0x0a, searchFrom) : -1;
+
+    if (newlineIndex === -1 && position > 0) {
+      const length = Math.min(PAGE_CHUNK_BYTES, position);
+      position -= length;
+      const chunk = Buffer.allocUnsafe(length);
+      const bytesRead = await source.read(chunk, length, position);
+      buffered = Buffer.concat([chunk.subarray(0, bytesRead), buffered]);
+      continue;
+    }
+
+    const lineStart = newlineIndex + 1;
+    if (!aligned) {
+      // Drop an unterminated tail (a line still being written or a cut cursor)
+      aligned = true;
+      if (newlineIndex === -1) {
+        lineEnd = 0;
+        break;
+      }
+      lineEnd = position + lineStart;
+    } else {
+      const line = buffered.toString('utf-8', lineStart, lineEnd - position - 1).replace(/\r$/, '');
+      if (line.trim()) {
+        lines.push({ offset: lineEnd, line });
+      }
+      lineEnd = position + lineStart;
+    }
+    buffered = buffered.subarray(0, lineEnd - position);
+  }
+
+  return { lines: lines.reverse(), before: lineEnd, hasMore: lineEnd > 0 };
+}
+
+async function findPreviousSegment(filePath: string, belowSeq: number | null): Promise<number | null> {
+  const segments = await listLogSegments(filePath);
+  const previous = segments.find(segment => belowSeq === null || segment.seq < belowSeq);
+  return previous ? previous.seq : null;
+}
+
+/**
+ * Reads up to `limit` non-blank lines of the active log file that end at or before
+ * the byte offset `before` (the end of the file when null), walking the file
+ * backwards in fixed-size chunks so the cost depends on the page size rather than
+ * on the file size. A `before` that falls inside a line is moved back to the start
+ * of that line.
+ */
+export async function readLinesBefore(filePath: string, before: number | null, limit: number): Promise<LogPage> {
+  const handle = await open(filePath, 'r');
+  try {
+    const stats = await handle.stat();
+    const { generation } = await readLogGeneration(handle, stats.ino, stats.size);
+    const page = await readPage({
+      size: stats.size,
+      read: async (buffer, length, position) => (await handle.read(buffer, 0, length, position)).bytesRead,
+    }, before, limit);
+    const previousSegment = page.hasMore ? null : await findPreviousSegment(filePath, null);
+    return { generation, ...page, previousSegment };
+  } finally {
+    await handle.close();
+  }
+}
+
+/**
+ * Same as readLinesBefore for a closed (possibly compressed) segment of the log
+ * file. Offsets refer to the decompressed segment.
+ */
+export async function readSegmentLinesBefore(
+  filePath: string,
+  seq: number,
+  before: number | null,
+  limit: number
+): Promise<LogPage | null> {
+  const segment = (await listLogSegments(filePath)).find(candidate => candidate.seq === seq);
+  if (!segment) {
+    return null;
+  }
+  const data = await readLogSegment(segment);
+  const page = await readPage({
+    size: data.length,
+    read: async (buffer, length, position) => data.copy(buffer, 0, position, position + length),
+  }, before, limit);
+  const previousSegment = page.hasMore ? null : await findPreviousSegment(filePath, seq);
+  return { generation: `segment-${seq}`, ...page, previousSegment };
+}
+
+/**
+ * Reads a page of the active log file by line number through its sparse line
+ * index: the lines before `beforeLine`, or, with `at`, the page starting just
+ * before the first line logged at that time. Cost is bounded by the index interval
+ * and the page size, not by the file size.
+ */
+export async function readIndexedPage(
+  filePath: string,
+  position: { beforeLine: number | null; at: number | null },
+  limit: number
+): Promise<LogPage> {
+  const index = getLogIndex(filePath);
+  let beforeLine = position.beforeLine;
+  if (position.at !== null) {
+    beforeLine = (await index.findLineAtTime(position.at)) + limit;
+  }
+  const page = await index.readBeforeLine(beforeLine, limit);
+
+  const handle = await open(filePath, 'r');
+  let generation: string;
+  try {
+    const stats = await handle.stat();
+    generation = (await readLogGeneration(handle, stats.ino, stats.size)).generation;
+  } finally {
+    await handle.close();
+  }
+
+  const hasMore = page.firstLine > 0;
+  return {
+    generation,
+    lines: page.lines,
+    before: page.startOffset,
+    hasMore,
+    previousSegment: hasMore ? null : await findPreviousSegment(filePath, null),
+    firstLine: page.firstLine,
+    totalLines: page.totalLines,
+  };
+}
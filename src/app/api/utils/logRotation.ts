@@ -0,0 +1,146 @@
+import { basename, dirname, join } from 'path';
+import { createReadStream, createWriteStream } from 'fs';
+import { readdir, readFile, rename, stat, unlink } from 'fs/promises';
+import { createGzip, gunzip } from 'zlib';
+import { pipeline } from 'stream/promises';
+import { promisify } from 'util';
+import { getPositiveIntEnv } from './concurrency';
+import { discardLogIndex } from './logIndex';
+
+const gunzipAsync = promisify(gunzip);
+
+// A log file is rotated once it grows past this size...
+export const LOG_MAX_BYTES = getPositiveIntEnv('LOG_MAX_BYTES', 10 * 1024 * 1024);
+// ...or once its current segment is older than this
+export const LOG_MAX_AGE_MS = getPositiveIntEnv('LOG_MAX_AGE_HOURS', 24) * 60 * 60 * 1000;
+// Closed segments kept per log file; older ones are deleted
+export const LOG_RETENTION_SEGMENTS = getPositiveIntEnv('LOG_RETENTION_SEGMENTS', 5);
+
+// Compressions in flight, so a segment is never compressed twice at once
+const compressing = new Map<string, Promise<void>>();
+
+export interface LogSegment {
+  path: string;
+  /** Increases with every rotation; the highest number is the most recent segment */
+  seq: number;
+  compressed: boolean;
+}
+
+function escapeRegExp(value: string): string {
+  return value.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+}
+
+/**
+ * Lists the closed segments of a log file, newest first. Segments sit next to the
+ * active file as `<name>.<seq>` while being compressed and `<name>.<seq>.gz` after.
+ */
+export async function listLogSegments(filePath: string): Promise<LogSegment[]> {
+  const pattern = new RegExp(`^${escapeRegExp(basename(filePath))}\\.(\\d+)(\\.gz)?$`);
+  let entries: string[];
+  try {
+    entries = await readdir(dirname(filePath));
+  } catch (error) {
+    return [];
+  }
+
+  const segments = new Map<number, LogSegment>();
+  for (const entry of entries) {
+    const match = entry.match(pattern);
+    if (!match) {
+      continue;
+    }
+    const seq = Number(match[1]);
+    const compressed = Boolean(match[2]);
+    // Prefer the finished .gz when a crash left both behind
+    if (!segments.has(seq) || compressed) {
+      segments.set(seq, { path: join(dirname(filePath), entry), seq, compressed });
+    }
+  }
+  return Array.from(segments.values()).sort((a, b) => b.seq - a.seq);
+}
+
+/**
+ * Returns a segment's contents, decompressing it if needed. Segments are capped at
+ * LOG_MAX_BYTES when written, so reading one whole stays bounded.
+ */
+export async function readLogSegment(segment: LogSegment): Promise<Buffer> {
+  const data = await readFile(segment.path);
+  return segment.compressed ? gunzipAsync(data) : data;
+}
+
+/**
+ * Returns true when the active log file is due for rotation.
+ */
+export function isRotationDue(size: number, segmentStartedAt: number): boolean {
+  return size >= LOG_MAX_BYTES || (size > 0 && Date.now() - segmentStartedAt >= LOG_MAX_AGE_MS);
+}
+
+function compressSegment(segmentPath: string): Promise<void> {
+  const existing = compressing.get(segmentPath);
+  if (existing) {
+    return existing;
+  }
+  const task = (async () => {
+    const tempPath = `${segmentPath}.gz.tmp`;
+    try {
+      await pipeline(createReadStream(segmentPath), createGzip(), createWriteStream(tempPath));
+      await rename(tempPath, `${segmentPath}.gz`);
+      await unlink(segmentPath);
+    } catch (error) {
+      console.error(`Failed to compress log segment ${segmentPath}:`, error);
+      await unlink(tempPath).catch(() => undefined);
+    }
+  })().finally(() => compressing.delete(segmentPath));
+  compressing.set(segmentPath, task);
+  return task;
+}
+
+/**
+ * Compresses any uncompressed segments (including ones left by an interrupted run)
+ * and deletes segments beyond LOG_RETENTION_SEGMENTS.
+ */
+export async function compactLogSegments(filePath: string): Promise<void> {
+  const segments = await listLogSegments(filePath);
+  const kept = segments.slice(0, LOG_RETENTION_SEGMENTS);
+  const expired = segments.slice(LOG_RETENTION_SEGMENTS);
+
+  await Promise.all(expired.map(async (segment) => {
+    await compressing.get(segment.path.replace(/\.gz$/, ''));
+    await unlink(segment.path).catch(() => undefined);
+    if (segment.compressed) {
+      // A raw copy may still exist if compression was interrupted after the rename
+      await unlink(segment.path.replace(/\.gz$/, '')).catch(() => undefined);
+    }
+  }));
+  await Promise.all(kept.filter(segment => !segment.compressed).map(segment => compressSegment(segment.path)));
+}
+
+/**
+ * Moves the active log file aside as the next numbered segment. The caller must
+ * not hold the file open for writing. Compression and retention run in the
+ * background; the returned promise resolves once the rename is done. Empty or
+ * missing files are left alone.
+ */
+export async function archiveLogFile(filePath: string): Promise<LogSegment | null> {
+  let size = 0;
+  try {
+    size = (await stat(filePath)).size;
+  } catch (error) {
+    return null;
+  }
+  if (size === 0) {
+    return null;
+  }
+
+  const segments = await listLogSegments(filePath);
+  const seq = (segments[0]?.seq ?? 0) + 1;
+  const segmentPath = `${filePath}.${seq}`;
+  await rename(filePath, segmentPath);
+  // The line index described the old file; a new one is built for the next file
+  await discardLogIndex(filePath);
+
+  void compactLogSegments(filePath).catch(error => {
+    console.error(`Failed to compact log segments for ${filePath}:`, error);
+  });
+  return { path: segmentPath, seq, compressed: false };
+}
@@ -0,0 +1,432 @@
+import { join } from 'path';
+import { createReadStream } from 'fs';
+import { stat } from 'fs/promises';
+import { createGunzip } from 'zlib';
+import { Script, createContext } from 'vm';
+import { listLogSegments } from './logRotation';
+import { getLogIndex } from './logIndex';
+import { LOG_LEVELS, LOG_SOURCES, getLogLevel, splitLogTimestamp } from './logFormat';
+import type { LogLevel, LogSource } from './logFormat';
+
+// Bytes read per step while scanning; together with the match limit this bounds memory
+const SEARCH_CHUNK_BYTES = 256 * 1024;
+// Lines longer than this are skipped rather than buffered
+const MAX_LINE_BYTES = 1024 * 1024;
+// Longest accepted search pattern
+const MAX_PATTERN_LENGTH = 500;
+// Wall-clock budget for one search; past it the matches found so far are returned
+const SEARCH_TIME_BUDGET_MS = 10000;
+// Longest matching may hold the event loop for one chunk; a pattern this slow ends the search
+const SEARCH_CHUNK_TIME_MS = 1000;
+// Bounded repetition ({n}, {n,m}, {n,}) as it follows an atom
+const BRACE_QUANTIFIER = /^\{\d+(,\d*)?\}/;
+// Matching runs through this script so a vm timeout can interrupt a regex stuck backtracking
+const timeoutScript = new Script('run()');
+const timeoutContext = createContext({ run: null as (() => void) | null });
+export const DEFAULT_SEARCH_LIMIT = 200;
+export const MAX_SEARCH_LIMIT = 1000;
+
+/**
+ * Line filter shared by the search endpoint and the log stream.
+ */
+export interface LogFilter {
+  /** Compiled from ?q= (substring) or ?q=&regex=1; null matches every line */
+  pattern: RegExp | null;
+  /** Sources selected by ?tag=APP,COMFY */
+  sources: LogSource[];
+  /** Levels selected by ?level=info,warn,error; null matches every level */
+  levels: LogLevel[] | null;
+  /** Time range in ms from ?from= and ?to= (ISO timestamps) */
+  from: number | null;
+  to: number | null;
+}
+
+export interface LogSearchMatch {
+  file: LogSource;
+  /** Rotated segment the match was found in, null for the active file */
+  segment: number | null;
+  /** Byte offset just past the line; pass as `before` to /api/logs/page for context */
+  offset: number;
+  lineNumber: number;
+  line: string;
+  timestamp: string | null;
+  level: LogLevel;
+}
+
+export interface LogSearchResult {
+  matches: LogSearchMatch[];
+  /** Matching lines found, including ones beyond the limit */
+  totalMatches: number;
+  truncated: boolean;
+  scannedBytes: number;
+  /** True when the search ran out of time and the scan stopped early */
+  timedOut: boolean;
+}
+
+function escapeRegExp(value: string): string {
+  return value.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+}
+
+/**
+ * Finds regex constructs that can backtrack exponentially: a repeated group that
+ * itself contains a quantifier or an alternation, such as (a+)+ or (a|aa)*, and
+ * backreferences. Returns a description of the first one found, or null.
+ */
+function findUnsafeRegexConstruct(pattern: string): string | null {
+  // One entry per open group: whether a quantifier or alternation appeared inside it
+  const groups: { quantifier: boolean; alternation: boolean }[] = [{ quantifier: false, alternation: false }];
+  let inClass = false;
+  for (let i = 0; i < pattern.length; i++) {
+    const char = pattern[i];
+    if (char === '\\') {
+      if (!inClass && /[1-9k]/.test(pattern[i + 1] ?? '')) {
+        return 'backreferences are not supported';
+      }
+      i++;
+    } else if (inClass) {
+      inClass = char !== ']';
+    } else if (char === '[') {
+      inClass = true;
+    } else if (char === '(') {
+      groups.push({ quantifier: false, alternation: false });
+    } else if (char === '|') {
+      groups[groups.length - 1].alternation = true;
+    } else if (char === ')' && groups.length > 1) {
+      const group = groups.pop() as { quantifier: boolean; alternation: boolean };
+      const next = pattern[i + 1];
+      const repeated = next === '*' || next === '+' || (next === '{' && BRACE_QUANTIFIER.test(pattern.slice(i + 1)));
+      if (repeated && group.quantifier) {
+        return 'nested quantifiers such as (a+)+ are not supported';
+      }
+      if (repeated && group.alternation) {
+        return 'repeated alternations such as (a|b)+ are not supported; use a character class';
+      }
+      const parent = groups[groups.length - 1];
+      parent.quantifier = parent.quantifier || group.quantifier || group.alternation;
+    } else if (
+      char === '*' ||
+      char === '+' ||
+      // A ? straight after ( opens a non-capturing or lookaround group
+      (char === '?' && pattern[i - 1] !== '(') ||
+      (char === '{' && BRACE_QUANTIFIER.test(pattern.slice(i)))
+    ) {
+      groups[groups.length - 1].quantifier = true;
+    }
+  }
+  return null;
+}
+
+/**
+ * Runs fn synchronously, interrupting it once timeoutMs have passed. A regex that
+ * backtracks cannot be stopped any other way short of a worker thread. Returns
+ * false when fn was interrupted.
+ */
+export function runWithTimeout(fn: () => void, timeoutMs: number): boolean {
+  timeoutContext.run = fn;
+  try {
+    timeoutScript.runInContext(timeoutContext, { timeout: Math.max(1, Math.floor(timeoutMs)) });
+    return true;
+  } catch (error) {
+    if ((error as NodeJS.ErrnoException).code === 'ERR_SCRIPT_EXECUTION_TIMEOUT') {
+      return false;
+    }
+    throw error;
+  } finally {
+    timeoutContext.run = null;
+  }
+}
+
+function parseList(value: string | null): string[] {
+  return (value || '').split(',').map(item => item.trim()).filter(Boolean);
+}
+
+/**
+ * Reads a LogFilter from query parameters. Returns an error message for invalid
+ * input instead of throwing, so routes can answer with 400.
+ */
+export function parseLogFilter(params: URLSearchParams): { filter: LogFilter; error: string | null } {
+  const filter: LogFilter = { pattern: null, sources: ['logs', 'comfy'], levels: null, from: null, to: null };
+
+  const query = params.get('q');
+  if (query) {
+    if (query.length > MAX_PATTERN_LENGTH) {
+      return { filter, error: `q must be at most ${MAX_PATTERN_LENGTH} characters` };
+    }
+    const flags = params.get('case') === '1' ? '' : 'i';
+    const isRegex = params.get('regex') === '1';
+    const unsafe = isRegex ? findUnsafeRegexConstruct(query) : null;
+    if (unsafe) {
+      return { filter, error: `Unsupported regular expression: ${unsafe}` };
+    }
+    try {
+      filter.pattern = new RegExp(isRegex ? query : escapeRegExp(query), flags);
+    } catch (error) {
+      return { filter, error: error instanceof Error ? error.message : 'Invalid regular expression' };
+    }
+  }
+
+  const tags = parseList(params.get('tag')).map(tag => tag.toUpperCase());
+  if (tags.length > 0) {
+    const sources = (Object.keys(LOG_SOURCES) as LogSource[]).filter(source => tags.includes(LOG_SOURCES[source].tag));
+    if (sources.length !== tags.length) {
+      return { filter, error: 'tag must be a list of APP and COMFY' };
+    }
+    filter.sources = sources;
+  }
+
+  const levels = parseList(params.get('level')).map(level => (level.toLowerCase() === 'warning' ? 'warn' : level.toLowerCase()));
+  if (levels.length > 0) {
+    if (!levels.every(level => (LOG_LEVELS as string[]).includes(level))) {
+      return { filter, error: 'level must be a list of info, warn and error' };
+    }
+    filter.levels = levels as LogLevel[];
+  }
+
+  for (const bound of ['from', 'to'] as const) {
+    const value = params.get(bound);
+    if (value) {
+      const parsed = Date.parse(value);
+      if (Number.isNaN(parsed)) {
+        return { filter, error: `${bound} must be an ISO timestamp` };
+      }
+      filter[bound] = parsed;
+    }
+  }
+
+  return { filter, error: null };
+}
+
+/**
+ * True when the filter narrows lines by content, level or time (source selection
+ * alone is handled by not reading the other file).
+ */
+export function isLineFilterActive(filter: LogFilter): boolean {
+  return filter.pattern !== null || filter.levels !== null || filter.from !== null || filter.to !== null;
+}
+
+/**
+ * Tests one raw log line against the filter. Lines without a timestamp of their
+ * own pass the time range check; callers narrow those by file position instead.
+ */
+export function matchesLogFilter(
+  filter: LogFilter,
+  source: LogSource,
+  line: string
+): { timestamp: string | null; level: LogLevel } | null {
+  if (!filter.sources.includes(source)) {
+    return null;
+  }
+  if (filter.pattern && !filter.pattern.test(line)) {
+    return null;
+  }
+  const { timestamp, message } = splitLogTimestamp(source, line);
+  const level = getLogLevel(source, message);
+  if (filter.levels && !filter.levels.includes(level)) {
+    return null;
+  }
+  if (timestamp && (filter.from !== null || filter.to !== null)) {
+    const time = Date.parse(timestamp);
+    if (!Number.isNaN(time) && ((filter.from !== null && time < filter.from) || (filter.to !== null && time > filter.to))) {
+      return null;
+    }
+  }
+  return { timestamp, level };
+}
+
+interface ScanPart {
+  path: string;
+  segment: number | null;
+  compressed: boolean;
+  startOffset: number;
+  /** Exclusive; null reads to the end */
+  endOffset: number | null;
+  startLine: number;
+}
+
+/**
+ * Lists the files to scan for one log, oldest first: rotated segments whose time
+ * span overlaps the filter (judged by modification times), then the active file,
+ * narrowed to the filter's time range through its line index.
+ */
+async function planScan(logFilePath: string, filter: LogFilter): Promise<ScanPart[]> {
+  const parts: ScanPart[] = [];
+  const segments = (await listLogSegments(logFilePath)).reverse();
+  let previousEnd = 0;
+  for (const segment of segments) {
+    // A segment may be renamed by compression or expire while we look at it
+    const segmentStats = await stat(segment.path).catch(() => null);
+    if (!segmentStats) {
+      continue;
+    }
+    const { mtimeMs } = segmentStats;
+    // A segment holds what was logged between the previous rotation and its own
+    const overlaps = (filter.from === null || mtimeMs >= filter.from) && (filter.to === null || previousEnd <= filter.to);
+    previousEnd = mtimeMs;
+    if (overlaps) {
+      parts.push({ path: segment.path, segment: segment.seq, compressed: segment.compressed, startOffset: 0, endOffset: null, startLine: 0 });
+    }
+  }
+
+  try {
+    const { size } = await stat(logFilePath);
+    let startOffset = 0;
+    let startLine = 0;
+    let endOffset = size;
+    if (filter.from !== null || filter.to !== null) {
+      const range = await getLogIndex(logFilePath).findTimeRange(filter.from, filter.to);
+      startOffset = range.startOffset;
+      startLine = range.startLine;
+      // Bytes appended after the index caught up are scanned as well when open-ended
+      endOffset = filter.to === null ? size : Math.min(size, range.endOffset);
+    }
+    if (endOffset > startOffset) {
+      parts.push({ path: logFilePath, segment: null, compressed: false, startOffset, endOffset, startLine });
+    }
+  } catch (error) {
+    // No active file
+  }
+  return parts;
+}
+
+/**
+ * Streams one file line by line, calling onLine with each complete line. Returns
+ * the number of bytes scanned. Stops early when onLine returns false, the signal
+ * is aborted or the deadline passes, even in the middle of a line. Yields to the
+ * event loop after every chunk so a slow pattern cannot starve other requests.
+ */
+async function scanPart(
+  part: ScanPart,
+  onLine: (line: string, offset: number, lineNumber: number) => boolean,
+  deadline: number,
+  signal?: AbortSignal
+): Promise<{ scanned: number; timedOut: boolean }> {
+  const input = createReadStream(part.path, {
+    start: part.compressed ? 0 : part.startOffset,
+    end: part.compressed || part.endOffset === null ? undefined : part.endOffset - 1,
+    highWaterMark: SEARCH_CHUNK_BYTES,
+  });
+  const stream = part.compressed ? input.pipe(createGunzip()) : input;
+  if (part.compressed) {
+    input.on('error', error => stream.destroy(error));
+  }
+
+  let carry = Buffer.alloc(0);
+  let dataStart = part.compressed ? 0 : part.startOffset;
+  let lineNumber = part.startLine;
+  let skippingLongLine = false;
+  let scanned = 0;
+  let timedOut = false;
+
+  try {
+    for await (const chunk of stream as AsyncIterable<Buffer>) {
+      if (signal?.aborted) {
+        break;
+      }
+      const remainingMs = deadline - Date.now();
+      if (remainingMs <= 0) {
+        timedOut = true;
+        break;
+      }
+      scanned += chunk.length;
+      const data = carry.length > 0 ? Buffer.concat([carry, chunk]) : chunk;
+      let start = 0;
+      let stop = false;
+      const finished = runWithTimeout(() => {
+        let newlineIndex: number;
+        while ((newlineIndex = data.indexOf(0x0a, start)) !== -1) {
+          if (skippingLongLine) {
+            skippingLongLine = false;
+          } else {
+            const line = data.toString('utf-8', start, newlineIndex).replace(/\r$/, '');
+            if (line.trim() && !onLine(line, dataStart + newlineIndex + 1, lineNumber)) {
+              stop = true;
+              break;
+            }
+          }
+          lineNumber++;
+          start = newlineIndex + 1;
+        }
+      }, Math.min(remainingMs, SEARCH_CHUNK_TIME_MS));
+      if (!finished) {
+        timedOut = true;
+        break;
+      }
+      if (stop) {
+        break;
+      }
+      if (data.length - start > MAX_LINE_BYTES) {
+        // Do not buffer a runaway line; skip to its end
+        skippingLongLine = true;
+        dataStart += data.length;
+        carry = Buffer.alloc(0);
+      } else {
+        dataStart += start;
+        carry = Buffer.from(data.subarray(start));
+      }
+      await new Promise(resolve => setImmediate(resolve));
+    }
+  } finally {
+    input.destroy();
+    stream.destroy();
+  }
+  return { scanned, timedOut };
+}
+
+/**
+ * Searches a space's logs, including rotated and compressed segments, with a
+ * streaming line matcher. Memory stays bounded by the read chunk size and the
+ * match limit regardless of log size. With order 'newest' (the default) the last
+ * `limit` matches are returned; with 'oldest' scanning stops at the first `limit`.
+ * A search that runs past its time budget returns what it found, with timedOut set.
+ */
+export async function searchLogs(
+  spacePath: string,
+  filter: LogFilter,
+  options: { limit?: number; order?: 'newest' | 'oldest'; signal?: AbortSignal } = {}
+): Promise<LogSearchResult> {
+  const limit = Math.max(1, Math.min(options.limit ?? DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT));
+  const order = options.order ?? 'newest';
+  const result: LogSearchResult = { matches: [], totalMatches: 0, truncated: false, scannedBytes: 0, timedOut: false };
+  const deadline = Date.now() + SEARCH_TIME_BUDGET_MS;
+
+  for (const source of filter.sources) {
+    const logFilePath = join(spacePath, LOG_SOURCES[source].fileName);
+    // Kept per source so one busy log cannot crowd out the other
+    const matches: LogSearchMatch[] = [];
+    let sourceMatches = 0;
+    for (const part of await planScan(logFilePath, filter)) {
+      if (options.signal?.aborted || result.timedOut || (order === 'oldest' && matches.length >= limit)) {
+        break;
+      }
+      const onLine = (line: string, offset: number, lineNumber: number) => {
+        const match = matchesLogFilter(filter, source, line);
+        if (!match) {
+          return true;
+        }
+        sourceMatches++;
+        if (order === 'oldest' && matches.length >= limit) {
+          return false;
+        }
+        matches.push({ file: source, segment: part.segment, offset, lineNumber, line, ...match });
+        if (matches.length > limit) {
+          // Ring behaviour: keep only the most recent matches
+          matches.shift();
+        }
+        return true;
+      };
+      try {
+        const { scanned, timedOut } = await scanPart(part, onLine, deadline, options.signal);
+        result.scannedBytes += scanned;
+        result.timedOut = result.timedOut || timedOut;
+      } catch (error) {
+        // Segment removed by retention mid-search; the remaining parts are still useful
+        console.warn(`Skipping log part ${part.path} during search:`, error);
+      }
+    }
+    result.totalMatches += sourceMatches;
+    result.truncated = result.truncated || result.timedOut || sourceMatches > matches.length;
+    result.matches.push(...matches);
+  }
+
+  return result;
+}
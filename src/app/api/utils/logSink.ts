@@ -0,0 +1,214 @@
+import { dirname } from 'path';
+import { mkdir, open } from 'fs/promises';
+import type { FileHandle } from 'fs/promises';
+import { archiveLogFile, isRotationDue } from './logRotation';
+import { scheduleLogIndexUpdate } from './logIndex';
+
+// Flush when this many bytes are buffered, or after FLUSH_INTERVAL_MS, whichever comes first
+const FLUSH_BYTES = 64 * 1024;
+const FLUSH_INTERVAL_MS = 200;
+// write() reports backpressure above this, and drops lines above MAX_PENDING_BYTES
+const HIGH_WATER_BYTES = 1024 * 1024;
+const MAX_PENDING_BYTES = 8 * 1024 * 1024;
+
+/**
+ * Buffered, asynchronous append-only writer for a log file. Lines are collected in
+ * memory and written through a single open file handle, so logging never blocks
+ * the event loop. Producers that can wait, such as child process output, pause
+ * when write() returns false and resume on waitForDrain(). If the disk still falls
+ * far behind, new lines are dropped and a marker with the drop count is written
+ * once the buffer drains. When the file
+ * outgrows LOG_MAX_BYTES or LOG_MAX_AGE_MS it is rotated into a numbered segment,
+ * split after the last complete line of the write that crossed the limit.
+ */
+export class LogSink {
+  private pending: Buffer[] = [];
+  private pendingBytes = 0;
+  private droppedLines = 0;
+  private handle: FileHandle | null = null;
+  private size = 0;
+  private segmentStartedAt = 0;
+  private flushChain: Promise<void> = Promise.resolve();
+  private timer: NodeJS.Timeout | null = null;
+  private drainWaiters: Array<() => void> = [];
+
+  constructor(readonly filePath: string) {}
+
+  /**
+   * Queues text (or raw process output) for writing. Returns false when the buffer
+   * is above the high-water mark; callers that can wait should use waitForDrain().
+   */
+  write(text: string | Buffer): boolean {
+    if (this.pendingBytes >= MAX_PENDING_BYTES) {
+      this.droppedLines++;
+      return false;
+    }
+
+    const chunk = typeof text === 'string' ? Buffer.from(text) : text;
+    this.pending.push(chunk);
+    this.pendingBytes += chunk.length;
+
+    if (this.pendingBytes >= FLUSH_BYTES) {
+      void this.flush();
+    } else if (!this.timer) {
+      this.timer = setTimeout(() => {
+        this.timer = null;
+        void this.flush();
+      }, FLUSH_INTERVAL_MS);
+      this.timer.unref?.();
+    }
+
+    return this.pendingBytes < HIGH_WATER_BYTES;
+  }
+
+  /**
+   * Resolves once the buffer is back below the high-water mark.
+   */
+  waitForDrain(): Promise<void> {
+    if (this.pendingBytes < HIGH_WATER_BYTES) {
+      return Promise.resolve();
+    }
+    return new Promise(resolve => this.drainWaiters.push(resolve));
+  }
+
+  /**
+   * Writes everything buffered so far. Flushes are serialized, so lines keep their order.
+   */
+  flush(): Promise<void> {
+    if (this.timer) {
+      clearTimeout(this.timer);
+      this.timer = null;
+    }
+    this.flushChain = this.flushChain.then(() => this.writePending());
+    return this.flushChain;
+  }
+
+  /**
+   * Flushes remaining lines and closes the file handle.
+   */
+  async close(): Promise<void> {
+    await this.flush();
+    await this.closeHandle();
+  }
+
+  /**
+   * Flushes, then moves the current file aside as a new segment. The next write
+   * starts a fresh file.
+   */
+  rotate(): Promise<void> {
+    this.flushChain = this.flushChain
+      .then(() => this.writePending())
+      .then(() => this.rotateNow())
+      .catch(error => console.error('Error rotating log file:', error));
+    return this.flushChain;
+  }
+
+  private async closeHandle(): Promise<void> {
+    if (this.handle) {
+      const handle = this.handle;
+      this.handle = null;
+      await handle.close().catch(() => undefined);
+    }
+  }
+
+  private async openHandle(): Promise<FileHandle> {
+    await mkdir(dirname(this.filePath), { recursive: true });
+    const handle = await open(this.filePath, 'a');
+    const stats = await handle.stat();
+    this.size = stats.size;
+    // birthtime is 0 on filesystems that do not record it
+    this.segmentStartedAt = stats.birthtimeMs > 0 ? stats.birthtimeMs : Date.now();
+    this.handle = handle;
+    return handle;
+  }
+
+  private async rotateNow(): Promise<void> {
+    await this.closeHandle();
+    await archiveLogFile(this.filePath);
+  }
+
+  private async writePending(): Promise<void> {
+    if (this.pending.length === 0 && this.droppedLines === 0) {
+      return;
+    }
+
+    let data = Buffer.concat(this.pending);
+    this.pending = [];
+    this.pendingBytes = 0;
+    if (this.droppedLines > 0) {
+      const marker = `[${new Date().toISOString()}] [WARN] ${this.droppedLines} log line(s) dropped because the log file could not keep up\n`;
+      data = Buffer.concat([data, Buffer.from(marker)]);
+      this.droppedLines = 0;
+    }
+
+    try {
+      let handle = this.handle || await this.openHandle();
+      if (this.size > 0 && isRotationDue(this.size + data.length, this.segmentStartedAt)) {
+        // Finish the current segment with whole lines, the rest starts the next one
+        const splitAt = data.lastIndexOf(0x0a) + 1;
+        if (splitAt > 0) {
+          await handle.write(data.subarray(0, splitAt));
+          data = data.subarray(splitAt);
+        }
+        await this.rotateNow();
+        handle = await this.openHandle();
+      }
+      if (data.length > 0) {
+        await handle.write(data);
+        this.size += data.length;
+      }
+      scheduleLogIndexUpdate(this.filePath);
+    } catch (error) {
+      console.error('Error writing to log file:', error);
+    }
+
+    const waiters = this.drainWaiters;
+    this.drainWaiters = [];
+    waiters.forEach(resolve => resolve());
+  }
+}
+
+const sinks = new Map<string, LogSink>();
+
+/**
+ * Returns the shared sink for a log file, creating it on first use. All streams
+ * writing to the same file share one buffer and one file handle.
+ */
+export function getLogSink(filePath: string): LogSink {
+  let sink = sinks.get(filePath);
+  if (!sink) {
+    sink = new LogSink(filePath);
+    sinks.set(filePath, sink);
+  }
+  return sink;
+}
+
+/**
+ * Flushes and closes the sink for a log file, if one is open. Call this when a
+ * stream that wrote to the file finishes.
+ */
+export async function closeLogSink(filePath: string): Promise<void> {
+  const sink = sinks.get(filePath);
+  if (!sink) {
+    return;
+  }
+  sinks.delete(filePath);
+  await sink.close();
+}
+
+/**
+ * Moves a log file aside as a new numbered segment (see logRotation), going through
+ * its sink when one is open so buffered lines land in the old segment first.
+ */
+export async function rotateLogFile(filePath: string): Promise<void> {
+  const sink = sinks.get(filePath);
+  if (sink) {
+    await sink.rotate();
+    return;
+  }
+  try {
+    await archiveLogFile(filePath);
+  } catch (error) {
+    console.error(`Error rotating log file ${filePath}:`, error);
+  }
+}
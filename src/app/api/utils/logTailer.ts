@@ -0,0 +1,354 @@
+import { basename, dirname } from 'path';
+import { watch } from 'fs';
+import type { FSWatcher } from 'fs';
+import { open, stat } from 'fs/promises';
+import type { FileHandle } from 'fs/promises';
+import { createHash } from 'crypto';
+
+// Largest single positioned read; big backlogs are read in several chunks
+const READ_CHUNK_BYTES = 1024 * 1024;
+// Leading bytes remembered to detect a file that was truncated and rewritten past the old offset
+const HEAD_SIGNATURE_BYTES = 64;
+// The generation hash covers at most this much of the first line
+const FIRST_LINE_MAX_BYTES = 4096;
+// Change events arriving within this window are coalesced into one read
+const WATCH_DEBOUNCE_MS = 15;
+// Safety poll while change events are flowing, and the poll used when watching is not possible
+const WATCH_SAFETY_POLL_MS = 10000;
+const FALLBACK_POLL_MS = 1000;
+
+export interface TailResult {
+  lines: string[];
+  /** Byte offset just past each returned line, usable as a resume cursor */
+  offsets: number[];
+  /** Byte offset from which this batch is complete: every non-blank line ending after it is included */
+  from: number;
+  /** Identifies the current incarnation of the file; changes when it is truncated or replaced */
+  generation: string;
+  /** True when the file was truncated, replaced or rotated since the last read */
+  reset: boolean;
+}
+
+/**
+ * Computes the generation of a log file from its inode and first line. `resolved` is
+ * false while the first line is still incomplete, in which case a placeholder
+ * generation is returned and the caller should compute it again later.
+ */
+export async function readLogGeneration(
+  handle: FileHandle,
+  inode: number,
+  size: number
+): Promise<{ generation: string; resolved: boolean }> {
+  const prefix = inode.toString(36);
+  if (size === 0) {
+    return { generation: `${prefix}-0`, resolved: false };
+  }
+  const head = Buffer.alloc(Math.min(size, FIRST_LINE_MAX_BYTES));
+  const { bytesRead } = await handle.read(head, 0, head.length, 0);
+  const newlineIndex = head.subarray(0, bytesRead).indexOf(0x0a);
+  if (newlineIndex === -1 && bytesRead < FIRST_LINE_MAX_BYTES) {
+    // First line not complete yet
+    return { generation: `${prefix}-0`, resolved: false };
+  }
+  const firstLine = head.subarray(0, newlineIndex === -1 ? bytesRead : newlineIndex);
+  return {
+    generation: `${prefix}-${createHash('sha1').update(firstLine).digest('hex').substring(0, 8)}`,
+    resolved: true,
+  };
+}
+
+/**
+ * Incremental reader for an append-only log file. Remembers the byte offset and
+ * inode of the last read and only reads bytes appended since then, using positioned
+ * reads on a single file handle. Truncation and rotation are detected from the
+ * inode, the size and the first bytes of the file, after which reading restarts
+ * from the beginning. A trailing line without a newline is held back until it is
+ * completed by a later read. With initialTailBytes set, the first read of a large
+ * file starts that many bytes before its end instead of at the beginning.
+ *
+ * Lines are split on raw bytes, so the reported offsets are exact even for
+ * multibyte text. The generation is derived from the inode and the file's first
+ * line (both logs start with a timestamped line), so it stays the same across
+ * server restarts for the same file contents.
+ */
+export class LogTailer {
+  private handle: FileHandle | null = null;
+  private inode: number | null = null;
+  private offset = 0;
+  private headSignature: Buffer | null = null;
+  // Bytes of the unfinished last line and the file offset where that line starts
+  private partial: Buffer = Buffer.alloc(0);
+  private lineStart = 0;
+  private generation = '';
+  private generationResolved = false;
+  private reading: Promise<TailResult> | null = null;
+  private skipFirstLine = false;
+
+  constructor(readonly filePath: string, private initialTailBytes: number = 0) {}
+
+  /** Byte offset up to which the file has been consumed */
+  get position(): number {
+    return this.offset;
+  }
+
+  /**
+   * Returns the complete lines appended since the previous call. Concurrent calls
+   * share one read, so callers may invoke this from overlapping timers or events.
+   */
+  read(): Promise<TailResult> {
+    if (!this.reading) {
+      this.reading = this.readAppended().finally(() => {
+        this.reading = null;
+      });
+    }
+    return this.reading;
+  }
+
+  /**
+   * Returns any held-back partial line, for example when the stream ends.
+   */
+  flushPartial(): string[] {
+    const rest = this.partial.toString('utf-8');
+    this.lineStart += this.partial.length;
+    this.partial = Buffer.alloc(0);
+    return rest.trim() ? [rest] : [];
+  }
+
+  async close(): Promise<void> {
+    if (this.handle) {
+      const handle = this.handle;
+      this.handle = null;
+      await handle.close().catch(() => undefined);
+    }
+  }
+
+  private resetState(): void {
+    this.offset = 0;
+    this.lineStart = 0;
+    this.skipFirstLine = false;
+    this.headSignature = null;
+    this.partial = Buffer.alloc(0);
+    this.generation = '';
+    this.generationResolved = false;
+  }
+
+  private async readAppended(): Promise<TailResult> {
+    let stats;
+    try {
+      stats = await stat(this.filePath);
+    } catch (error) {
+      // File does not exist (yet), start over once it appears
+      const hadContent = this.offset > 0;
+      await this.close();
+      this.inode = null;
+      this.resetState();
+      return { lines: [], offsets: [], from: 0, generation: '', reset: hadContent };
+    }
+
+    let reset = false;
+    if (this.inode !== null && stats.ino !== this.inode) {
+      // Rotated or replaced: the path now points at a different file
+      await this.close();
+      reset = this.offset > 0;
+      this.resetState();
+    } else if (stats.size < this.offset) {
+      // Truncated in place
+      reset = true;
+      this.resetState();
+    }
+    const isFirstRead = this.inode === null;
+    this.inode = stats.ino;
+
+    if (!this.handle) {
+      this.handle = await open(this.filePath, 'r');
+    }
+
+    if (isFirstRead && this.initialTailBytes > 0 && stats.size > this.initialTailBytes) {
+      // Skip the bulk of a large existing file; the first (likely cut) line is dropped below
+      const head = Buffer.alloc(HEAD_SIGNATURE_BYTES);
+      await this.handle.read(head, 0, head.length, 0);
+      this.headSignature = head;
+      this.offset = stats.size - this.initialTailBytes;
+      this.lineStart = this.offset;
+      this.skipFirstLine = true;
+    }
+
+    // A file cleared and rewritten beyond the old offset between two reads keeps its
+    // inode and may have grown, but its first bytes (timestamped header) differ
+    if (!reset && this.headSignature && stats.size >= this.headSignature.length) {
+      const head = Buffer.alloc(this.headSignature.length);
+      await this.handle.read(head, 0, head.length, 0);
+      if (!head.equals(this.headSignature)) {
+        reset = true;
+        this.resetState();
+      }
+    }
+
+    if (!this.generationResolved) {
+      const { generation, resolved } = await readLogGeneration(this.handle, stats.ino, stats.size);
+      this.generation = generation;
+      this.generationResolved = resolved;
+    }
+
+    if (stats.size === this.offset) {
+      return { lines: [], offsets: [], from: this.lineStart, generation: this.generation, reset };
+    }
+
+    const chunks: Buffer[] = this.partial.length > 0 ? [this.partial] : [];
+    while (this.offset < stats.size) {
+      const chunk = Buffer.allocUnsafe(Math.min(READ_CHUNK_BYTES, stats.size - this.offset));
+      const { bytesRead } = await this.handle.read(chunk, 0, chunk.length, this.offset);
+      if (bytesRead === 0) {
+        break;
+      }
+      if (!this.headSignature || this.headSignature.length < HEAD_SIGNATURE_BYTES) {
+        this.updateHeadSignature(chunk.subarray(0, bytesRead));
+      }
+      this.offset += bytesRead;
+      chunks.push(chunk.subarray(0, bytesRead));
+    }
+
+    // Newline bytes never occur inside multibyte UTF-8 sequences, so splitting raw bytes is safe
+    const data = chunks.length === 1 ? chunks[0] : Buffer.concat(chunks);
+    const lines: string[] = [];
+    const offsets: number[] = [];
+    let from = this.lineStart;
+    let start = 0;
+    let newlineIndex: number;
+    while ((newlineIndex = data.indexOf(0x0a, start)) !== -1) {
+      if (this.skipFirstLine) {
+        this.skipFirstLine = false;
+        from = this.lineStart + newlineIndex + 1;
+      } else {
+        const line = data.toString('utf-8', start, newlineIndex).replace(/\r$/, '');
+        if (line.trim()) {
+          lines.push(line);
+          offsets.push(this.lineStart + newlineIndex + 1);
+        }
+      }
+      start = newlineIndex + 1;
+    }
+    this.lineStart += start;
+    // Copy so the (possibly large) read buffer is not retained by the leftover
+    this.partial = Buffer.from(data.subarray(start));
+
+    return { lines, offsets, from, generation: this.generation, reset };
+  }
+
+  private updateHeadSignature(chunk: Buffer): void {
+    // The signature grows only while the first HEAD_SIGNATURE_BYTES of the file are being read
+    const current = this.headSignature || Buffer.alloc(0);
+    if (current.length !== this.offset) {
+      return;
+    }
+    const needed = HEAD_SIGNATURE_BYTES - current.length;
+    this.headSignature = Buffer.concat([current, chunk.subarray(0, needed)]);
+  }
+}
+
+export interface LogFollower {
+  /** Resolves once the initial contents have been read and delivered */
+  ready: Promise<void>;
+  stop(): Promise<void>;
+}
+
+/**
+ * Follows a log file and calls onResult with every batch of new lines. Reads are
+ * driven by fs.watch change events on the file's directory (so creation, rotation
+ * and replacement are seen too), debounced by a few milliseconds. A slow safety poll
+ * catches events the filesystem failed to deliver; if the directory cannot be
+ * watched at all (some network filesystems), a faster poll takes over. An idle file
+ * costs no reads between polls. The current contents (or their last
+ * initialTailBytes) are delivered immediately.
+ */
+export function followLogFile(
+  filePath: string,
+  onResult: (result: TailResult) => void,
+  onError: (error: unknown) => void = (error) => console.error(`Error reading ${filePath}:`, error),
+  initialTailBytes: number = 0
+): LogFollower {
+  const tailer = new LogTailer(filePath, initialTailBytes);
+  const fileName = basename(filePath);
+  let stopped = false;
+  let running = false;
+  let dirty = false;
+  let debounceTimer: NodeJS.Timeout | null = null;
+  let pollTimer: NodeJS.Timeout | null = null;
+  let watcher: FSWatcher | null = null;
+
+  const pump = async () => {
+    if (running) {
+      // Re-read once the current read finishes, so bytes appended meanwhile are not missed
+      dirty = true;
+      return;
+    }
+    running = true;
+    try {
+      do {
+        dirty = false;
+        const result = await tailer.read();
+        if (!stopped && (result.lines.length > 0 || result.reset)) {
+          onResult(result);
+        }
+      } while (dirty && !stopped);
+    } catch (error) {
+      if (!stopped) {
+        onError(error);
+      }
+    } finally {
+      running = false;
+    }
+  };
+
+  const schedule = () => {
+    if (stopped || debounceTimer) {
+      return;
+    }
+    debounceTimer = setTimeout(() => {
+      debounceTimer = null;
+      void pump();
+    }, WATCH_DEBOUNCE_MS);
+  };
+
+  const startPolling = (intervalMs: number) => {
+    if (pollTimer) {
+      clearInterval(pollTimer);
+    }
+    pollTimer = setInterval(schedule, intervalMs);
+  };
+
+  try {
+    watcher = watch(dirname(filePath), { persistent: false }, (_event, changedName) => {
+      // Some platforms do not report the file name; treat those events as relevant
+      if (!changedName || changedName.toString() === fileName) {
+        schedule();
+      }
+    });
+    watcher.on('error', () => {
+      // The directory went away or the watch broke; keep following by polling
+      watcher?.close();
+      watcher = null;
+      startPolling(FALLBACK_POLL_MS);
+    });
+    startPolling(WATCH_SAFETY_POLL_MS);
+  } catch (error) {
+    startPolling(FALLBACK_POLL_MS);
+  }
+
+  const ready = pump();
+
+  return {
+    ready,
+    stop: async () => {
+      stopped = true;
+      if (debounceTimer) {
+        clearTimeout(debounceTimer);
+      }
+      if (pollTimer) {
+        clearInterval(pollTimer);
+      }
+      watcher?.close();
+      await tailer.close();
+    },
+  };
+}
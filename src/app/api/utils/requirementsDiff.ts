@@ -0,0 +1,314 @@
+import { hashRequirements } from './requirementsHistory';
+
+/**
+ * One requirement of a requirements file. Lines that are not plain PEP 508
+ * requirements (pip options, bare URLs) are kept with the whole line as their
+ * key, so they still show up as added or removed.
+ */
+export interface RequirementEntry {
+  /** Name as written, without extras */
+  name: string;
+  /** Normalized name (PEP 503), used to match requirements across files */
+  key: string;
+  /** Sorted, comma-separated extras */
+  extras: string;
+  /** Version specifier or `@ url` without whitespace, '' when unconstrained */
+  specifier: string;
+  /** Environment marker after `;` */
+  marker: string;
+  /** Exact version for `==` pins, used for upgrade/downgrade ordering */
+  pinned: string | null;
+  /** Trimmed line without inline comment */
+  line: string;
+  /** 0-based line number in the file */
+  index: number;
+  /** False for pip options, URLs and paths, which are keyed by their whole line */
+  pep508: boolean;
+}
+
+export interface ParsedRequirements {
+  hash: string;
+  lines: readonly string[];
+  /** Requirements by key in file order; a repeated key keeps its last line */
+  entries: ReadonlyMap<string, RequirementEntry>;
+  /** Key of the requirement on each line, null for blank and comment lines */
+  lineKeys: readonly (string | null)[];
+}
+
+export type RequirementChangeType = 'added' | 'removed' | 'upgraded' | 'downgraded' | 'changed' | 'unchanged';
+
+export interface RequirementChange {
+  key: string;
+  type: RequirementChangeType;
+  base?: RequirementEntry;
+  target?: RequirementEntry;
+}
+
+export interface RequirementsDiff {
+  /** Both files have the same content */
+  identical: boolean;
+  /** Target requirements in file order, then requirements only in base */
+  changes: readonly RequirementChange[];
+  /** Change type per key, for annotating lines */
+  byKey: ReadonlyMap<string, RequirementChangeType>;
+}
+
+// Parsed files and diffs kept in memory, least recently used dropped first
+const MAX_CACHED_PARSES = 256;
+const MAX_CACHED_DIFFS = 256;
+
+const parseCache = new Map<string, ParsedRequirements>();
+const diffCache = new Map<string, RequirementsDiff>();
+
+function getCached<T>(cache: Map<string, T>, key: string): T | undefined {
+  const value = cache.get(key);
+  if (value !== undefined) {
+    // Move to the back of the eviction order
+    cache.delete(key);
+    cache.set(key, value);
+  }
+  return value;
+}
+
+function setCached<T>(cache: Map<string, T>, key: string, value: T, limit: number): void {
+  cache.set(key, value);
+  if (cache.size > limit) {
+    cache.delete(cache.keys().next().value as string);
+  }
+}
+
+// PEP 503 name normalization
+function normalizeName(name: string): string {
+  return name.toLowerCase().replace(/[-_.]+/g, '-');
+}
+
+function parseLine(trimmed: string, index: number): RequirementEntry {
+  // Inline comments need whitespace before `#`, URLs may contain `#egg=`
+  const line = trimmed.replace(/\s+#.*$/, '');
+  // A name may only be followed by a version specifier or `@ url`, so `git+https://...`
+  // and other bare URLs are not mistaken for a requirement named after their scheme
+  const match = line.match(/^([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[([^\]]*)\])?\s*((?:[<>=!~(@][^;]*?)?)\s*(?:;\s*(.*))?$/);
+  if (!match || line.startsWith('-')) {
+    return { name: line, key: line, extras: '', specifier: '', marker: '', pinned: null, line, index, pep508: false };
+  }
+
+  const specifier = match[3].replace(/[()\s]/g, '');
+  const pin = specifier.match(/^===?([^,*]+)$/);
+  return {
+    name: match[1],
+    key: normalizeName(match[1]),
+    extras: (match[2] || '').split(',').map(extra => normalizeName(extra.trim())).filter(Boolean).sort().join(','),
+    specifier,
+    marker: (match[4] || '').trim(),
+    pinned: pin ? pin[1] : null,
+    line,
+    index,
+    pep508: true,
+  };
+}
+
+/**
+ * Parses a requirements file into requirements keyed by normalized name. Results
+ * are memoized by content hash, so the same content is only parsed once; pass
+ * `hash` when it is already known (history entries store it).
+ */
+export function parseRequirements(content: string, hash: string = hashRequirements(content)): ParsedRequirements {
+  const cached = getCached(parseCache, hash);
+  if (cached) {
+    return cached;
+  }
+
+  const lines = content.split('\n');
+  const entries = new Map<string, RequirementEntry>();
+  const lineKeys: (string | null)[] = [];
+  lines.forEach((rawLine, index) => {
+    const trimmed = rawLine.trim();
+    if (!trimmed || trimmed.startsWith('#')) {
+      lineKeys.push(null);
+      return;
+    }
+    const entry = parseLine(trimmed, index);
+    // Keep the position of the first occurrence but the last line, like pip
+    entries.delete(entry.key);
+    entries.set(entry.key, entry);
+    lineKeys.push(entry.key);
+  });
+
+  const parsed: ParsedRequirements = { hash, lines, entries, lineKeys };
+  setCached(parseCache, hash, parsed, MAX_CACHED_PARSES);
+  return parsed;
+}
+
+interface Pep440Version {
+  epoch: number;
+  release: number[];
+  pre: [number, number] | null;
+  post: number | null;
+  dev: number | null;
+  local: (number | string)[] | null;
+}
+
+const PEP440_PATTERN = /^v?(?:(\d+)!)?(\d+(?:\.\d+)*)(?:[-_.]?(a|alpha|b|beta|c|rc|pre|preview)[-_.]?(\d*))?(?:-(\d+)|[-_.]?(post|rev|r)[-_.]?(\d*))?(?:[-_.]?(dev)[-_.]?(\d*))?(?:\+([a-z0-9]+(?:[-_.][a-z0-9]+)*))?$/i;
+
+function parsePep440(version: string): Pep440Version | null {
+  const match = version.trim().match(PEP440_PATTERN);
+  if (!match) {
+    return null;
+  }
+  const phase = match[3]?.toLowerCase();
+  const preRank = phase === undefined ? -1 : phase.startsWith('a') ? 0 : phase.startsWith('b') ? 1 : 2;
+  return {
+    epoch: Number(match[1] || 0),
+    release: match[2].split('.').map(Number),
+    pre: preRank >= 0 ? [preRank, Number(match[4] || 0)] : null,
+    post: match[5] !== undefined ? Number(match[5]) : match[6] !== undefined ? Number(match[7] || 0) : null,
+    dev: match[8] !== undefined ? Number(match[9] || 0) : null,
+    local: match[10] ? match[10].toLowerCase().split(/[-_.]/).map(part => /^\d+$/.test(part) ? Number(part) : part) : null,
+  };
+}
+
+function compareNumbers(a: number, b: number): number {
+  return a === b ? 0 : a < b ? -1 : 1;
+}
+
+function compareSegments(a: readonly (number | string)[], b: readonly (number | string)[], pad: boolean): number {
+  for (let i = 0; i < Math.max(a.length, b.length); i++) {
+    if (i >= a.length || i >= b.length) {
+      if (!pad) {
+        return compareNumbers(a.length, b.length);
+      }
+    }
+    const left = a[i] ?? 0;
+    const right = b[i] ?? 0;
+    if (left === right) {
+      continue;
+    }
+    if (typeof left === 'number' && typeof right === 'number') {
+      return compareNumbers(left, right);
+    }
+    // Numeric local segments sort after alphanumeric ones
+    if (typeof left !== typeof right) {
+      return typeof left === 'number' ? 1 : -1;
+    }
+    return String(left) < String(right) ? -1 : 1;
+  }
+  return 0;
+}
+
+/**
+ * Compares two versions by PEP 440 ordering (epochs, pre-, post- and
+ * dev-releases, local versions). Returns a negative number, zero or a positive
+ * number, or null when either is not a valid version.
+ */
+export function comparePep440(a: string, b: string): number | null {
+  const left = parsePep440(a);
+  const right = parsePep440(b);
+  if (!left || !right) {
+    return null;
+  }
+
+  // A dev release without a pre-release sorts before all pre-releases of a version
+  const preKey = (version: Pep440Version): [number, number] =>
+    version.pre ?? (version.post === null && version.dev !== null ? [-Infinity, 0] : [Infinity, 0]);
+
+  return compareNumbers(left.epoch, right.epoch)
+    || compareSegments(left.release, right.release, true)
+    || compareNumbers(preKey(left)[0], preKey(right)[0])
+    || compareNumbers(preKey(left)[1], preKey(right)[1])
+    || compareNumbers(left.post ?? -Infinity, right.post ?? -Infinity)
+    || compareNumbers(left.dev ?? Infinity, right.dev ?? Infinity)
+    || (left.local && right.local ? compareSegments(left.local, right.local, false) : compareNumbers(left.local ? 1 : 0, right.local ? 1 : 0));
+}
+
+function classify(base: RequirementEntry, target: RequirementEntry): RequirementChangeType {
+  if (base.specifier === target.specifier && base.extras === target.extras && base.marker === target.marker) {
+    return 'unchanged';
+  }
+  if (base.pinned && target.pinned && base.extras === target.extras && base.marker === target.marker) {
+    const order = comparePep440(target.pinned, base.pinned);
+    if (order !== null) {
+      return order > 0 ? 'upgraded' : order < 0 ? 'downgraded' : 'unchanged';
+    }
+  }
+  return 'changed';
+}
+
+/**
+ * Diffs two parsed requirements files by requirement, in time linear in their
+ * size. `target` is the newer side (the current requirements). Results are
+ * cached by the pair of content hashes and shared between callers, so treat
+ * them as read-only.
+ */
+export function diffRequirements(base: ParsedRequirements, target: ParsedRequirements): RequirementsDiff {
+  const cacheKey = `${base.hash}:${target.hash}`;
+  const cached = getCached(diffCache, cacheKey);
+  if (cached) {
+    return cached;
+  }
+
+  const identical = base.hash === target.hash;
+  const changes: RequirementChange[] = [];
+  const byKey = new Map<string, RequirementChangeType>();
+  const record = (change: RequirementChange) => {
+    changes.push(change);
+    byKey.set(change.key, change.type);
+  };
+
+  for (const [key, entry] of target.entries) {
+    const baseEntry = identical ? entry : base.entries.get(key);
+    if (!baseEntry) {
+      record({ key, type: 'added', target: entry });
+    } else {
+      record({ key, type: identical ? 'unchanged' : classify(baseEntry, entry), base: baseEntry, target: entry });
+    }
+  }
+  if (!identical) {
+    for (const [key, entry] of base.entries) {
+      if (!target.entries.has(key)) {
+        record({ key, type: 'removed', base: entry });
+      }
+    }
+  }
+
+  const diff: RequirementsDiff = { identical, changes, byKey };
+  setCached(diffCache, cacheKey, diff, MAX_CACHED_DIFFS);
+  return diff;
+}
+
+/**
+ * Parses and diffs two requirements files, both through the caches.
+ */
+export function diffRequirementsContent(baseContent: string, targetContent: string, baseHash?: string): RequirementsDiff {
+  return diffRequirements(parseRequirements(baseContent, baseHash), parseRequirements(targetContent));
+}
+
+export interface LineDiffEntry {
+  lineNumber: number;
+  type: 'added' | 'removed' | 'unchanged';
+  currentLine?: string;
+  backupLine?: string;
+}
+
+/**
+ * Lays out a diff as the added/removed/unchanged lines shown by the requirements
+ * diff on the home page. A changed requirement is a removed and an added line
+ * with the same line number, `current` being the diff's target.
+ */
+export function toLineDiff(diff: RequirementsDiff): LineDiffEntry[] {
+  const lines: LineDiffEntry[] = [];
+  let lineNumber = 1;
+  for (const { type, base, target } of diff.changes) {
+    if (type === 'unchanged') {
+      lines.push({ lineNumber, type: 'unchanged', currentLine: target?.line, backupLine: base?.line });
+    } else {
+      if (base) {
+        lines.push({ lineNumber, type: 'removed', backupLine: base.line });
+      }
+      if (target) {
+        lines.push({ lineNumber, type: 'added', currentLine: target.line });
+      }
+    }
+    lineNumber++;
+  }
+  return lines;
+}
@@ -0,0 +1,390 @@
+import { join } from 'path';
+import { appendFile, mkdir, open, readdir, readFile, rename, stat, unlink, writeFile } from 'fs/promises';
+import { createHash } from 'crypto';
+
+export type HistoryEntryType = 'activation' | 'node_install';
+
+/**
+ * One line of requirements_history/index.jsonl. The index lists every history
+ * entry in the order it was saved, so the history can be listed without opening
+ * the entry files. Snapshots are stored once per distinct content under
+ * requirements_history/objects/<hash>.txt.
+ */
+export interface HistoryIndexRecord {
+  id: string;
+  timestamp: string;
+  type: HistoryEntryType;
+  nodeName?: string;
+  /** sha256 of the requirements snapshot, also its file name under objects/ */
+  hash: string;
+  /** Snapshot size in bytes */
+  size: number;
+}
+
+export interface HistoryPage {
+  /** Newest first */
+  history: HistoryIndexRecord[];
+  /** Pass as ?cursor= to get the next (older) page; null on the last page */
+  nextCursor: string | null;
+  total: number;
+}
+
+export interface HistoryCompactionResult {
+  entries: number;
+  /** Distinct snapshots left after compaction */
+  snapshots: number;
+  /** Bytes of per-entry snapshot copies removed */
+  bytesFreed: number;
+}
+
+export const HISTORY_DIR_NAME = 'requirements_history';
+const INDEX_FILE_NAME = 'index.jsonl';
+const OBJECTS_DIR_NAME = 'objects';
+export const DEFAULT_HISTORY_PAGE_SIZE = 50;
+export const MAX_HISTORY_PAGE_SIZE = 500;
+
+interface IndexCache {
+  inode: number;
+  /** Bytes of the index consumed so far; always ends on a line boundary */
+  consumed: number;
+  records: HistoryIndexRecord[];
+}
+
+// Parsed index per space path; appends are picked up by reading only the new bytes
+const indexCache = new Map<string, IndexCache>();
+// Serializes index writes per space path
+const locks = new Map<string, Promise<void>>();
+
+export function getHistoryPath(spacePath: string): string {
+  return join(spacePath, HISTORY_DIR_NAME);
+}
+
+export function getSnapshotPath(spacePath: string, hash: string): string {
+  return join(getHistoryPath(spacePath), OBJECTS_DIR_NAME, `${hash}.txt`);
+}
+
+// Per-entry snapshot copy written before snapshots were deduplicated
+function getLegacySnapshotPath(spacePath: string, id: string): string {
+  return join(getHistoryPath(spacePath), `${id}_requirements.txt`);
+}
+
+function pathExists(path: string): Promise<boolean> {
+  return stat(path).then(() => true, () => false);
+}
+
+export function hashRequirements(content: string): string {
+  return createHash('sha256').update(content).digest('hex');
+}
+
+function withHistoryLock<T>(spacePath: string, task: () => Promise<T>): Promise<T> {
+  const previous = locks.get(spacePath) || Promise.resolve();
+  const run = previous.then(task);
+  const tail = run.then(() => undefined, () => undefined);
+  locks.set(spacePath, tail);
+  void tail.then(() => {
+    if (locks.get(spacePath) === tail) {
+      locks.delete(spacePath);
+    }
+  });
+  return run;
+}
+
+function parseRecords(text: string): HistoryIndexRecord[] {
+  const records: HistoryIndexRecord[] = [];
+  for (const line of text.split('\n')) {
+    if (!line.trim()) {
+      continue;
+    }
+    try {
+      const record = JSON.parse(line);
+      if (typeof record.id === 'string' && typeof record.hash === 'string') {
+        records.push(record);
+      }
+    } catch (error) {
+      // A line torn by a crash mid-append; the entry files are still there
+    }
+  }
+  return records;
+}
+
+// Stores a snapshot under its hash unless that content is already stored
+async function storeSnapshot(spacePath: string, content: string, hash: string): Promise<void> {
+  const snapshotPath = getSnapshotPath(spacePath, hash);
+  if (await pathExists(snapshotPath)) {
+    return;
+  }
+  await mkdir(join(getHistoryPath(spacePath), OBJECTS_DIR_NAME), { recursive: true });
+  // Renamed into place so a snapshot is never seen half written
+  const tempPath = `${snapshotPath}.${process.pid}.tmp`;
+  await writeFile(tempPath, content, 'utf-8');
+  await rename(tempPath, snapshotPath);
+}
+
+/**
+ * Moves the snapshots of a history directory into content-addressed storage and
+ * rewrites its index. Entry files that embed their requirements or have their own
+ * `<id>_requirements.txt` copy (as written before snapshots were deduplicated) are
+ * rewritten to reference the snapshot by hash, and the copies are removed.
+ * Entries that are already migrated are left alone, so this is safe to repeat.
+ */
+async function compactHistory(spacePath: string): Promise<HistoryCompactionResult> {
+  const historyPath = getHistoryPath(spacePath);
+  const files = (await readdir(historyPath)).filter(file => file.endsWith('.json'));
+  const records: HistoryIndexRecord[] = [];
+  let bytesFreed = 0;
+
+  for (const file of files) {
+    try {
+      const filePath = join(historyPath, file);
+      const entry = JSON.parse(await readFile(filePath, 'utf-8'));
+      const legacyPath = getLegacySnapshotPath(spacePath, entry.id);
+      let hash: string = entry.hash;
+      let size: number;
+
+      if (hash && typeof entry.requirementsContent !== 'string' && await pathExists(getSnapshotPath(spacePath, hash))) {
+        size = (await stat(getSnapshotPath(spacePath, hash))).size;
+      } else {
+        const content = typeof entry.requirementsContent === 'string'
+          ? entry.requirementsContent
+          : await readFile(legacyPath, 'utf-8');
+        hash = hashRequirements(content);
+        size = Buffer.byteLength(content);
+        await storeSnapshot(spacePath, content, hash);
+        bytesFreed += typeof entry.requirementsContent === 'string' ? size : 0;
+        const { requirementsContent, ...rest } = entry;
+        await writeFile(filePath, JSON.stringify({ ...rest, hash }, null, 2), 'utf-8');
+      }
+
+      try {
+        bytesFreed += (await stat(legacyPath)).size;
+        await unlink(legacyPath);
+      } catch (error) {
+        // Already migrated
+      }
+
+      records.push({
+        id: entry.id,
+        // Get file modification time as fallback
+        timestamp: entry.timestamp || (await stat(filePath)).mtime.toISOString(),
+        type: entry.type,
+        nodeName: entry.nodeName || undefined,
+        hash,
+        size,
+      });
+    } catch (error) {
+      // Skip invalid entries
+      console.error(`Error migrating history file ${file}:`, error);
+    }
+  }
+
+  records.sort((a, b) => new Date(a.timestamp).getTime() - new Date(b.timestamp).getTime());
+  // The objects directory also marks the history as migrated
+  await mkdir(join(historyPath, OBJECTS_DIR_NAME), { recursive: true });
+  const indexPath = join(historyPath, INDEX_FILE_NAME);
+  const tempPath = `${indexPath}.tmp`;
+  await writeFile(tempPath, records.map(record => `${JSON.stringify(record)}\n`).join(''), 'utf-8');
+  await rename(tempPath, indexPath);
+  indexCache.delete(spacePath);
+
+  return {
+    entries: records.length,
+    snapshots: new Set(records.map(record => record.hash)).size,
+    bytesFreed,
+  };
+}
+
+async function readIndex(spacePath: string): Promise<HistoryIndexRecord[]> {
+  const indexPath = join(getHistoryPath(spacePath), INDEX_FILE_NAME);
+  let stats;
+  try {
+    stats = await stat(indexPath);
+  } catch (error) {
+    indexCache.delete(spacePath);
+    return [];
+  }
+
+  let cached = indexCache.get(spacePath);
+  if (!cached || cached.inode !== stats.ino || stats.size < cached.consumed) {
+    cached = { inode: stats.ino, consumed: 0, records: [] };
+    indexCache.set(spacePath, cached);
+  }
+  if (stats.size > cached.consumed) {
+    // Append-only: only the bytes added since the last read are parsed
+    const handle = await open(indexPath, 'r');
+    try {
+      const buffer = Buffer.alloc(stats.size - cached.consumed);
+      const { bytesRead } = await handle.read(buffer, 0, buffer.length, cached.consumed);
+      const lastNewline = buffer.subarray(0, bytesRead).lastIndexOf(0x0a);
+      if (lastNewline !== -1) {
+        cached.records.push(...parseRecords(buffer.toString('utf-8', 0, lastNewline + 1)));
+        cached.consumed += lastNewline + 1;
+      }
+    } finally {
+      await handle.close();
+    }
+  }
+  return cached.records;
+}
+
+/**
+ * Returns all index records of a space in the order they were saved. A history
+ * directory without an index or without content-addressed snapshots (written by
+ * an older version) is compacted first; that happens once per space.
+ */
+export async function readHistoryIndex(spacePath: string): Promise<HistoryIndexRecord[]> {
+  const historyPath = getHistoryPath(spacePath);
+  const isCurrent = async () =>
+    await pathExists(join(historyPath, INDEX_FILE_NAME)) && await pathExists(join(historyPath, OBJECTS_DIR_NAME));
+
+  if (!await isCurrent()) {
+    if (!await pathExists(historyPath)) {
+      return [];
+    }
+    await withHistoryLock(spacePath, async () => {
+      // Another caller may have migrated it while we waited
+      if (!await isCurrent()) {
+        await compactHistory(spacePath);
+      }
+    });
+  }
+  return readIndex(spacePath);
+}
+
+/**
+ * Migrates a space's history to content-addressed snapshots and rebuilds its
+ * index. Reads do this automatically for old history directories; calling it
+ * again only rebuilds the index.
+ */
+export async function compactRequirementsHistory(spacePath: string): Promise<HistoryCompactionResult> {
+  if (!await pathExists(getHistoryPath(spacePath))) {
+    return { entries: 0, snapshots: 0, bytesFreed: 0 };
+  }
+  return withHistoryLock(spacePath, () => compactHistory(spacePath));
+}
+
+/**
+ * Returns the index record of a history entry, or null if the space has no such
+ * entry.
+ */
+export async function findHistoryRecord(spacePath: string, id: string): Promise<HistoryIndexRecord | null> {
+  const records = await readHistoryIndex(spacePath);
+  return records.find(record => record.id === id) ?? null;
+}
+
+/**
+ * Returns a history entry together with its requirements snapshot, or null if the
+ * entry or its snapshot does not exist.
+ */
+export async function readHistorySnapshot(
+  spacePath: string,
+  id: string
+): Promise<{ record: HistoryIndexRecord; content: string } | null> {
+  const record = await findHistoryRecord(spacePath, id);
+  if (!record) {
+    return null;
+  }
+  try {
+    return { record, content: await readFile(getSnapshotPath(spacePath, record.hash), 'utf-8') };
+  } catch (error) {
+    return null;
+  }
+}
+
+/**
+ * Returns one page of a space's requirements history, newest first. `cursor` is
+ * the nextCursor of the previous page.
+ */
+export async function listRequirementsHistory(
+  spacePath: string,
+  options: { cursor?: string | null; limit?: number } = {}
+): Promise<HistoryPage> {
+  const records = await readHistoryIndex(spacePath);
+  const limit = Math.max(1, Math.min(options.limit ?? DEFAULT_HISTORY_PAGE_SIZE, MAX_HISTORY_PAGE_SIZE));
+  // Records never move once appended, so a position is a stable cursor
+  const end = options.cursor ? Math.min(Number(options.cursor), records.length) : records.length;
+  const start = Math.max(0, end - limit);
+  return {
+    history: records.slice(start, end).reverse(),
+    nextCursor: start > 0 ? String(start) : null,
+    total: records.length,
+  };
+}
+
+// Normalize contents for comparison (trim, drop comments, sort lines)
+function normalizeRequirements(content: string): string {
+  return content.trim().split('\n').map(l => l.trim()).filter(l => l && !l.startsWith('#')).sort().join('\n');
+}
+
+/**
+ * Saves the current requirements.txt of a space as a history entry and appends it
+ * to the index. With `skipIfUnchanged` (used on activation) nothing is saved when
+ * the requirements match the latest entry. Returns the new record, or null when
+ * nothing was saved.
+ */
+export async function saveRequirementsHistory(
+  spacePath: string,
+  type: HistoryEntryType,
+  nodeName?: string,
+  options: { skipIfUnchanged?: boolean } = {}
+): Promise<HistoryIndexRecord | null> {
+  const requirementsPath = join(spacePath, 'requirements.txt');
+  let requirementsContent: string;
+  try {
+    requirementsContent = await readFile(requirementsPath, 'utf-8');
+  } catch (error) {
+    return null;
+  }
+
+  // Build the index for older spaces before taking the lock
+  await readHistoryIndex(spacePath);
+
+  return withHistoryLock(spacePath, async () => {
+    const records = await readIndex(spacePath);
+    const hash = hashRequirements(requirementsContent);
+    if (options.skipIfUnchanged && records.length > 0) {
+      const latest = records[records.length - 1];
+      if (latest.hash === hash) {
+        return null;
+      }
+      try {
+        const latestSnapshot = await readFile(getSnapshotPath(spacePath, latest.hash), 'utf-8');
+        if (normalizeRequirements(latestSnapshot) === normalizeRequirements(requirementsContent)) {
+          return null;
+        }
+      } catch (error) {
+        // Latest snapshot missing, save a new one
+      }
+    }
+
+    const historyPath = getHistoryPath(spacePath);
+    await mkdir(historyPath, { recursive: true });
+
+    const record: HistoryIndexRecord = {
+      id: `${Date.now()}_${Math.random().toString(36).substring(7)}`,
+      timestamp: new Date().toISOString(),
+      type,
+      nodeName: nodeName || undefined,
+      hash,
+      size: Buffer.byteLength(requirementsContent),
+    };
+
+    // Snapshot and entry file first, so an indexed entry always has them. A snapshot
+    // identical to an earlier one is not stored again.
+    await storeSnapshot(spacePath, requirementsContent, hash);
+    const historyEntry = {
+      id: record.id,
+      timestamp: record.timestamp,
+      type,
+      nodeName: record.nodeName,
+      hash,
+    };
+    await writeFile(join(historyPath, `${record.id}.json`), JSON.stringify(historyEntry, null, 2), 'utf-8');
+
+    // Terminate a line torn by an earlier crash so it does not swallow this one
+    const indexPath = join(historyPath, INDEX_FILE_NAME);
+    const indexSize = await stat(indexPath).then(stats => stats.size, () => 0);
+    const torn = indexSize > (indexCache.get(spacePath)?.consumed ?? 0);
+    await appendFile(indexPath, `${torn ? '\n' : ''}${JSON.stringify(record)}\n`, 'utf-8');
+    return record;
+  });
+}
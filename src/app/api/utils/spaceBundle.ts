@@ -0,0 +1,563 @@
+import { join } from 'path';
+import { tmpdir } from 'os';
+import { existsSync, createWriteStream } from 'fs';
+import { mkdir, readdir, readFile, rename, rm, writeFile } from 'fs/promises';
+import { PassThrough, Readable, Transform } from 'stream';
+import { pipeline } from 'stream/promises';
+import * as zlib from 'zlib';
+import { execFile } from 'child_process';
+import { promisify } from 'util';
+import { randomBytes } from 'crypto';
+import { TarWriter, readTar } from './tarStream';
+import type { TarEntry } from './tarStream';
+import { findWheelsForRequirements, buildWheels, getWheelhousePath, getWheelhouseTag } from './wheelhouse';
+import { createVenv, normalizeInstallerName } from './installer';
+import { writeInstallState } from './installState';
+import { writeSpaceJson } from './spaceStore';
+import type { SpaceJson } from './spaceStore';
+import { getConcurrencyLimit, runWithConcurrency } from './concurrency';
+
+const execFileAsync = promisify(execFile);
+
+export const BUNDLE_FORMAT = 'comfy-spaces-bundle';
+export const BUNDLE_VERSION = 1;
+
+const GIT_BUNDLE_TIMEOUT_MS = 600000;
+const OFFLINE_INSTALL_TIMEOUT_MS = 30 * 60 * 1000;
+// space.json, requirements.txt and the manifest are read into memory; cap them
+const MAX_METADATA_BYTES = 16 * 1024 * 1024;
+// Manager-internal directory under spaces/ where bundles are unpacked before the
+// space is moved into place
+const IMPORTS_DIR_NAME = '.imports';
+// Work directory inside an import for git bundles and wheels. The git bundles are
+// removed before the move, the wheels once the offline install is done.
+const IMPORT_WORK_DIR = '.bundle';
+
+export type BundleCompression = 'zstd' | 'gzip' | 'none';
+
+export interface BundleRepository {
+  /** Path of the checkout relative to the space, e.g. ComfyUI/custom_nodes/foo */
+  path: string;
+  commit: string;
+  branch: string | null;
+  url: string | null;
+  /** Archive entry of the git bundle, null when the repository had to be left out */
+  bundle: string | null;
+}
+
+export interface BundleManifest {
+  format: typeof BUNDLE_FORMAT;
+  version: number;
+  spaceId: string;
+  createdAt: string;
+  /** Wheelhouse tag the wheels were built for, null when the bundle has none */
+  wheelTag: string | null;
+  repositories: BundleRepository[];
+  wheels: string[];
+  /** Requirements without a wheel in the bundle; installing them needs the network */
+  missingWheels: string[];
+  warnings: string[];
+}
+
+export interface BundleImportResult {
+  spaceId: string;
+  visibleName: string;
+  repositories: number;
+  wheels: number;
+  /** Dependencies were installed from the bundled wheels, so activation skips pip */
+  dependenciesInstalled: boolean;
+  warnings: string[];
+}
+
+/**
+ * A bundle that cannot be imported as sent (malformed, or for a space that
+ * already exists). Routes answer these with 400 instead of 500.
+ */
+export class InvalidBundleError extends Error {}
+
+// zstd landed in Node's zlib in 22.15; older runtimes only have gzip
+type ZlibWithZstd = typeof zlib & {
+  createZstdCompress?: () => Transform;
+  createZstdDecompress?: () => Transform;
+};
+const zstdZlib = zlib as ZlibWithZstd;
+
+export function isZstdSupported(): boolean {
+  return typeof zstdZlib.createZstdCompress === 'function' && typeof zstdZlib.createZstdDecompress === 'function';
+}
+
+/**
+ * Compression used when an export does not ask for one: zstd when the runtime
+ * has it, otherwise none, since wheels and git bundles are already compressed and
+ * gzip would mostly cost time.
+ */
+export function getDefaultBundleCompression(): BundleCompression {
+  return isZstdSupported() ? 'zstd' : 'none';
+}
+
+export function getBundleFileName(spaceId: string, compression: BundleCompression): string {
+  const extension = compression === 'zstd' ? '.tar.zst' : compression === 'gzip' ? '.tar.gz' : '.tar';
+  return `space-${spaceId}${extension}`;
+}
+
+export function getBundleContentType(compression: BundleCompression): string {
+  return compression === 'zstd' ? 'application/zstd' : compression === 'gzip' ? 'application/gzip' : 'application/x-tar';
+}
+
+function createCompressor(compression: BundleCompression): Transform {
+  if (compression === 'zstd' && zstdZlib.createZstdCompress) {
+    return zstdZlib.createZstdCompress();
+  }
+  if (compression === 'gzip') {
+    return zlib.createGzip({ level: zlib.constants.Z_BEST_SPEED });
+  }
+  return new PassThrough();
+}
+
+function getPythonExec(venvPath: string): string {
+  return process.platform === 'win32' ? join(venvPath, 'Scripts', 'python.exe') : join(venvPath, 'bin', 'python3');
+}
+
+async function git(args: string[], cwd: string, timeout = 30000): Promise<string> {
+  const { stdout } = await execFileAsync('git', args, { cwd, timeout, maxBuffer: 16 * 1024 * 1024 });
+  return stdout.trim();
+}
+
+// ComfyUI first, then every custom node checkout that is a git repository
+async function listRepositoryPaths(spacePath: string): Promise<string[]> {
+  const paths: string[] = [];
+  if (!existsSync(join(spacePath, 'ComfyUI', '.git'))) {
+    return paths;
+  }
+  paths.push('ComfyUI');
+  const nodeDirs = await readdir(join(spacePath, 'ComfyUI', 'custom_nodes'), { withFileTypes: true }).catch(() => []);
+  for (const nodeDir of nodeDirs) {
+    const nodePath = `ComfyUI/custom_nodes/${nodeDir.name}`;
+    if (nodeDir.isDirectory() && !nodeDir.name.startsWith('.') && existsSync(join(spacePath, nodePath, '.git'))) {
+      paths.push(nodePath);
+    }
+  }
+  return paths;
+}
+
+async function describeRepository(repoPath: string, path: string): Promise<BundleRepository> {
+  const commit = await git(['rev-parse', 'HEAD'], repoPath);
+  const branch = await git(['symbolic-ref', '--quiet', '--short', 'HEAD'], repoPath).catch(() => '');
+  const url = await git(['remote', 'get-url', 'origin'], repoPath).catch(() => '');
+  return { path, commit, branch: branch || null, url: url || null, bundle: null };
+}
+
+async function writeSpaceBundle(spaceId: string, tar: TarWriter, includeWheels: boolean): Promise<void> {
+  const spacePath = join(process.cwd(), 'spaces', spaceId);
+  const spaceJsonContent = await readFile(join(spacePath, 'space.json'), 'utf-8');
+  const spaceJson: SpaceJson = JSON.parse(spaceJsonContent);
+  const manifest: BundleManifest = {
+    format: BUNDLE_FORMAT,
+    version: BUNDLE_VERSION,
+    spaceId,
+    createdAt: new Date().toISOString(),
+    wheelTag: null,
+    repositories: [],
+    wheels: [],
+    missingWheels: [],
+    warnings: [],
+  };
+
+  // space.json goes first so an import can reject a conflicting space before reading the rest
+  await tar.addBuffer('space.json', spaceJsonContent);
+  const requirementsPath = join(spacePath, 'requirements.txt');
+  if (existsSync(requirementsPath)) {
+    await tar.addFile('requirements.txt', requirementsPath);
+  }
+
+  // Each checkout as a git bundle of its HEAD (and branch), so the pinned commit
+  // and its history travel without a remote
+  const repositoryPaths = await listRepositoryPaths(spacePath);
+  for (const [index, path] of repositoryPaths.entries()) {
+    const repoPath = join(spacePath, path);
+    let repository: BundleRepository;
+    try {
+      repository = await describeRepository(repoPath, path);
+    } catch (error) {
+      manifest.warnings.push(`${path}: not a usable git checkout, left out`);
+      continue;
+    }
+    manifest.repositories.push(repository);
+
+    if ((await git(['rev-parse', '--is-shallow-repository'], repoPath).catch(() => 'false')) === 'true') {
+      // A bundle of a shallow clone cannot be cloned from; activation clones it again
+      manifest.warnings.push(`${path}: shallow clone, will be cloned from ${repository.url || 'its remote'} on activation`);
+      continue;
+    }
+
+    const bundlePath = join(tmpdir(), `comfy-spaces-${process.pid}-${randomBytes(6).toString('hex')}.bundle`);
+    try {
+      try {
+        const refs = repository.branch ? ['HEAD', repository.branch] : ['HEAD'];
+        await execFileAsync('git', ['bundle', 'create', '--quiet', bundlePath, ...refs], {
+          cwd: repoPath,
+          timeout: GIT_BUNDLE_TIMEOUT_MS,
+        });
+      } catch (error) {
+        manifest.warnings.push(`${path}: git bundle failed (${error instanceof Error ? error.message : String(error)})`);
+        continue;
+      }
+      repository.bundle = `git/${index}.bundle`;
+      await tar.addFile(repository.bundle, bundlePath);
+    } finally {
+      await rm(bundlePath, { force: true });
+    }
+  }
+
+  // The exact wheels for the pinned dependencies, from the shared wheelhouse
+  const pythonExec = getPythonExec(join(spacePath, 'venv'));
+  const dependencies: string[] = Array.isArray(spaceJson.dependencies) ? spaceJson.dependencies : [];
+  if (includeWheels && dependencies.length > 0 && existsSync(pythonExec)) {
+    const tag = await getWheelhouseTag(pythonExec);
+    const listPath = join(tmpdir(), `comfy-spaces-${process.pid}-${randomBytes(6).toString('hex')}.txt`);
+    try {
+      await writeFile(listPath, dependencies.join('\n'), 'utf-8');
+      // Fills in wheels the background prebuild has not produced yet
+      const built = await buildWheels(pythonExec, listPath);
+      if (built.failed.length > 0) {
+        manifest.warnings.push(`Could not build wheels for: ${built.failed.join(', ')}`);
+      }
+    } catch (error) {
+      manifest.warnings.push(`Wheel build failed (${error instanceof Error ? error.message : String(error)})`);
+    } finally {
+      await rm(listPath, { force: true });
+    }
+
+    const { wheels, missing } = await findWheelsForRequirements(tag, dependencies.join('\n'));
+    manifest.wheelTag = tag;
+    manifest.missingWheels = missing;
+    for (const wheel of wheels) {
+      await tar.addFile(`wheels/${wheel}`, join(getWheelhousePath(tag), wheel));
+      manifest.wheels.push(wheel);
+    }
+  }
+
+  // Written last, since it records what actually made it into the archive
+  await tar.addBuffer('manifest.json', JSON.stringify(manifest, null, 2));
+  await tar.finish();
+}
+
+/**
+ * Streams a self-contained bundle of a space: a tar archive with space.json,
+ * requirements.txt, a git bundle per checkout (ComfyUI and each custom node at
+ * its current commit) and the wheels its dependencies install from. Returns the
+ * archive stream at once; it is produced as it is read, so nothing is staged on
+ * disk beyond one git bundle at a time. A failure part-way destroys the stream.
+ */
+export function createSpaceBundle(
+  spaceId: string,
+  options: { compression: BundleCompression; includeWheels: boolean }
+): Readable {
+  const output = createCompressor(options.compression);
+  writeSpaceBundle(spaceId, new TarWriter(output), options.includeWheels).catch((error) => {
+    console.error(`Error exporting bundle for space ${spaceId}:`, error);
+    output.destroy(error instanceof Error ? error : new Error(String(error)));
+  });
+  return output;
+}
+
+/**
+ * Undoes the archive's compression, recognized by its magic bytes rather than
+ * trusting the file name or content type.
+ */
+async function decompress(source: AsyncIterable<Uint8Array>): Promise<AsyncIterable<Buffer | Uint8Array>> {
+  const iterator = source[Symbol.asyncIterator]();
+  let head = Buffer.alloc(0);
+  let done = false;
+  while (head.length < 4 && !done) {
+    const next = await iterator.next();
+    if (next.done) {
+      done = true;
+    } else {
+      head = Buffer.concat([head, Buffer.from(next.value)]);
+    }
+  }
+  async function* replay(): AsyncGenerator<Buffer | Uint8Array> {
+    yield head;
+    if (!done) {
+      yield* { [Symbol.asyncIterator]: () => iterator };
+    }
+  }
+
+  let decompressor: Transform | null = null;
+  if (head[0] === 0x1f && head[1] === 0x8b) {
+    decompressor = zlib.createGunzip();
+  } else if (head.length >= 4 && head.readUInt32LE(0) === 0xfd2fb528) {
+    if (!zstdZlib.createZstdDecompress) {
+      throw new InvalidBundleError('This bundle is zstd-compressed, which this Node.js version cannot read');
+    }
+    decompressor = zstdZlib.createZstdDecompress();
+  }
+  if (!decompressor) {
+    return replay();
+  }
+  const input = Readable.from(replay());
+  // Errors on either side end up in the iteration of the decompressor
+  input.on('error', error => decompressor?.destroy(error));
+  return input.pipe(decompressor);
+}
+
+async function readSmallEntry(entry: TarEntry): Promise<string> {
+  if (entry.size > MAX_METADATA_BYTES) {
+    throw new InvalidBundleError(`${entry.name} is too large`);
+  }
+  const chunks: Buffer[] = [];
+  for await (const chunk of entry.body) {
+    chunks.push(chunk);
+  }
+  return Buffer.concat(chunks).toString('utf-8');
+}
+
+async function writeEntry(entry: TarEntry, path: string): Promise<void> {
+  await pipeline(Readable.from(entry.body), createWriteStream(path));
+}
+
+function parseJsonEntry(content: string, name: string): any {
+  try {
+    return JSON.parse(content);
+  } catch (error) {
+    throw new InvalidBundleError(`${name} in the bundle is not valid JSON`);
+  }
+}
+
+// Only the checkouts a space can have; anything else in a manifest is refused
+function isValidRepositoryPath(path: unknown): path is string {
+  if (path === 'ComfyUI') {
+    return true;
+  }
+  const match = typeof path === 'string' ? path.match(/^ComfyUI\/custom_nodes\/([^/\\\0]+)$/) : null;
+  return !!match && !match[1].startsWith('.');
+}
+
+async function restoreRepository(repository: BundleRepository, bundlePath: string, spacePath: string): Promise<void> {
+  const repoPath = join(spacePath, repository.path);
+  await execFileAsync('git', ['clone', '--quiet', '--no-checkout', bundlePath, repoPath], { timeout: GIT_BUNDLE_TIMEOUT_MS });
+  if (repository.branch) {
+    // Recreates the local branch from the bundled ref, at the recorded commit
+    await git(['checkout', '--quiet', '-B', repository.branch, repository.commit], repoPath);
+    await git(['branch', '--quiet', '--set-upstream-to', `origin/${repository.branch}`], repoPath).catch(() => '');
+  } else {
+    await git(['checkout', '--quiet', '--detach', repository.commit], repoPath);
+  }
+  // Point origin back at the real remote instead of the bundle, which is deleted
+  if (repository.url) {
+    await git(['remote', 'set-url', 'origin', repository.url], repoPath);
+  } else {
+    await git(['remote', 'remove', 'origin'], repoPath);
+  }
+}
+
+// Installs the dependencies from the bundle's wheels only, recording the install
+// state activation compares against so it can skip pip
+async function installOffline(
+  venvPath: string,
+  spacePath: string,
+  dependencies: string[],
+  tag: string,
+  wheelsPath: string
+): Promise<void> {
+  const pythonExec = getPythonExec(venvPath);
+  if ((await getWheelhouseTag(pythonExec)) !== tag) {
+    throw new Error(`the wheels are for ${tag}, this venv needs ${await getWheelhouseTag(pythonExec)}`);
+  }
+  const listPath = join(spacePath, 'requirements_temp.txt');
+  try {
+    await writeFile(listPath, dependencies.join('\n'), 'utf-8');
+    await execFileAsync(
+      pythonExec,
+      ['-m', 'pip', 'install', '--no-index', '--find-links', wheelsPath, '-r', listPath],
+      { cwd: spacePath, timeout: OFFLINE_INSTALL_TIMEOUT_MS, maxBuffer: 64 * 1024 * 1024 }
+    );
+  } finally {
+    await rm(listPath, { force: true });
+  }
+  // Same version string activation reads, so the fingerprints match
+  const { stdout, stderr } = await execFileAsync(pythonExec, ['--version'], { cwd: spacePath, timeout: 30000 });
+  await writeInstallState(venvPath, dependencies, stdout.trim() || stderr.trim(), pythonExec);
+}
+
+// Removes what interrupted imports of earlier server runs left behind
+async function clearStaleImports(importsPath: string): Promise<void> {
+  const names = await readdir(importsPath).catch(() => [] as string[]);
+  await Promise.all(
+    names
+      .filter(name => !name.startsWith(`${process.pid}-`))
+      .map(name => rm(join(importsPath, name), { recursive: true, force: true, maxRetries: 3 }).catch(() => undefined))
+  );
+}
+
+/**
+ * Creates a space from a bundle made by createSpaceBundle, without network
+ * access. The archive is read as a stream and each entry written straight to
+ * disk, so bundles of any size import in constant memory. Entries are unpacked
+ * into spaces/.imports and the space only appears once its checkouts are
+ * restored; on failure the partial import is removed. When the bundled wheels
+ * cover every dependency they are installed into a new venv right away, then
+ * deleted; they are never added to the shared wheelhouse. `overrides` renames
+ * the space (to import a second copy).
+ */
+export async function importSpaceBundle(
+  source: AsyncIterable<Uint8Array>,
+  overrides: { spaceId?: string | null; visibleName?: string | null } = {}
+): Promise<BundleImportResult> {
+  const spacesPath = join(process.cwd(), 'spaces');
+  const importsPath = join(spacesPath, IMPORTS_DIR_NAME);
+  await mkdir(importsPath, { recursive: true });
+  await clearStaleImports(importsPath);
+
+  const stagingPath = join(importsPath, `${process.pid}-${Date.now()}-${randomBytes(4).toString('hex')}`);
+  const workPath = join(stagingPath, IMPORT_WORK_DIR);
+  await mkdir(join(workPath, 'git'), { recursive: true });
+  await mkdir(join(workPath, 'wheels'), { recursive: true });
+
+  try {
+    let spaceJson: SpaceJson | null = null;
+    let manifest: BundleManifest | null = null;
+    let spaceId = '';
+    const gitBundles = new Set<string>();
+    const wheelFiles = new Set<string>();
+
+    try {
+      for await (const entry of readTar(await decompress(source))) {
+        if (entry.type !== 'file') {
+          continue;
+        }
+        if (!spaceJson && entry.name !== 'space.json') {
+          throw new InvalidBundleError('Not a space bundle: space.json must be its first entry');
+        }
+
+        if (entry.name === 'space.json') {
+          spaceJson = parseJsonEntry(await readSmallEntry(entry), entry.name);
+          const metadata = spaceJson?.metadata;
+          if (!metadata || typeof metadata !== 'object' || !metadata.spaceId) {
+            throw new InvalidBundleError('Invalid space.json in bundle: missing metadata');
+          }
+          spaceId = overrides.spaceId || metadata.spaceId;
+          if (typeof spaceId !== 'string' || spaceId.length < 2 || /[\\/\0]/.test(spaceId) || spaceId.startsWith('.')) {
+            throw new InvalidBundleError('Space ID must be at least 2 characters');
+          }
+          // Checked before the large entries are read
+          if (existsSync(join(spacesPath, spaceId))) {
+            throw new InvalidBundleError(`Space "${spaceId}" already exists`);
+          }
+        } else if (entry.name === 'manifest.json') {
+          manifest = parseJsonEntry(await readSmallEntry(entry), entry.name);
+        } else if (entry.name === 'requirements.txt') {
+          await writeFile(join(stagingPath, 'requirements.txt'), await readSmallEntry(entry), 'utf-8');
+        } else if (/^git\/\d+\.bundle$/.test(entry.name)) {
+          await writeEntry(entry, join(workPath, entry.name));
+          gitBundles.add(entry.name);
+        } else if (/^wheels\/[A-Za-z0-9][A-Za-z0-9._+!-]*\.whl$/.test(entry.name)) {
+          await writeEntry(entry, join(workPath, entry.name));
+          wheelFiles.add(entry.name.slice('wheels/'.length));
+        }
+      }
+    } catch (error) {
+      // A corrupt archive or compressed stream is the bundle's fault; file system
+      // errors (ENOSPC and the like) are not
+      if (error instanceof Error && !(error instanceof InvalidBundleError) && !(error as NodeJS.ErrnoException).syscall) {
+        throw new InvalidBundleError(`Invalid bundle: ${error.message}`);
+      }
+      throw error;
+    }
+
+    if (!spaceJson) {
+      throw new InvalidBundleError('Not a space bundle: no space.json');
+    }
+    if (!manifest || manifest.format !== BUNDLE_FORMAT || !Array.isArray(manifest.repositories)) {
+      throw new InvalidBundleError('Not a space bundle: missing or invalid manifest.json');
+    }
+    if (manifest.version > BUNDLE_VERSION) {
+      throw new InvalidBundleError(`Bundle format version ${manifest.version} is newer than this manager supports`);
+    }
+
+    const warnings: string[] = [...(Array.isArray(manifest.warnings) ? manifest.warnings : [])];
+
+    // ComfyUI has to exist before custom nodes are cloned into it
+    const repositories = manifest.repositories.filter(repository => {
+      if (!isValidRepositoryPath(repository?.path) || typeof repository.commit !== 'string') {
+        warnings.push(`Skipped invalid repository entry ${JSON.stringify(repository?.path)}`);
+        return false;
+      }
+      return !!repository.bundle && gitBundles.has(repository.bundle);
+    });
+    const comfyUI = repositories.find(repository => repository.path === 'ComfyUI');
+    if (comfyUI) {
+      await restoreRepository(comfyUI, join(workPath, comfyUI.bundle as string), stagingPath);
+    }
+    const nodes = comfyUI ? repositories.filter(repository => repository !== comfyUI) : [];
+    const results = await runWithConcurrency(
+      nodes,
+      getConcurrencyLimit(process.env.NODE_CLONE_CONCURRENCY, 4),
+      repository => restoreRepository(repository, join(workPath, repository.bundle as string), stagingPath)
+    );
+    results.forEach((result, index) => {
+      if (result.status === 'rejected') {
+        const reason = result.reason instanceof Error ? result.reason.message : String(result.reason);
+        warnings.push(`${nodes[index].path}: restore failed, will be cloned on activation (${reason})`);
+      }
+    });
+    const restored = (comfyUI ? 1 : 0) + results.filter(result => result.status === 'fulfilled').length;
+
+    const wheelTag = typeof manifest.wheelTag === 'string' && /^[A-Za-z0-9_.-]+$/.test(manifest.wheelTag)
+      ? manifest.wheelTag
+      : null;
+
+    // The wheels stay with the space and are only used for its offline install.
+    // They never join the shared wheelhouse, which every space installs from.
+    await rm(join(workPath, 'git'), { recursive: true, force: true });
+    const spacePath = join(spacesPath, spaceId);
+    if (existsSync(spacePath)) {
+      throw new InvalidBundleError(`Space "${spaceId}" already exists`);
+    }
+    await rename(stagingPath, spacePath);
+
+    const metadata = spaceJson.metadata;
+    const visibleName: string = overrides.visibleName || metadata.visibleName || spaceId;
+    const installer = normalizeInstallerName(metadata.installer);
+    const dependencies: string[] = Array.isArray(spaceJson.dependencies) ? spaceJson.dependencies : [];
+    await writeSpaceJson(spaceId, {
+      ...spaceJson,
+      nodes: Array.isArray(spaceJson.nodes) ? spaceJson.nodes : [],
+      dependencies,
+      metadata: { ...metadata, spaceId, visibleName, installer },
+    });
+    if (!existsSync(join(spacePath, 'requirements.txt'))) {
+      await writeFile(join(spacePath, 'requirements.txt'), dependencies.join('\n'), 'utf-8');
+    }
+    await writeFile(join(spacePath, 'logs.txt'), '', 'utf-8');
+    await writeFile(join(spacePath, 'comfy-logs.txt'), '', 'utf-8');
+
+    // From here on the space exists; anything that fails is left to activation
+    let dependenciesInstalled = false;
+    const venvPath = join(spacePath, 'venv');
+    try {
+      await createVenv(venvPath, spacePath, metadata.pythonVersion || '3.11', installer);
+      if (dependencies.length > 0 && wheelTag && Array.isArray(manifest.missingWheels) && manifest.missingWheels.length === 0) {
+        await installOffline(venvPath, spacePath, dependencies, wheelTag, join(spacePath, IMPORT_WORK_DIR, 'wheels'));
+        dependenciesInstalled = true;
+      }
+    } catch (error) {
+      warnings.push(`Dependencies will be installed on activation (${error instanceof Error ? error.message : String(error)})`);
+    } finally {
+      await rm(join(spacePath, IMPORT_WORK_DIR), { recursive: true, force: true });
+    }
+
+    return {
+      spaceId,
+      visibleName,
+      repositories: restored,
+      wheels: wheelFiles.size,
+      dependenciesInstalled,
+      warnings,
+    };
+  } catch (error) {
+    await rm(stagingPath, { recursive: true, force: true, maxRetries: 3 }).catch(() => undefined);
+    throw error;
+  }
+}
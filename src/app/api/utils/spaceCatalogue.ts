@@ -0,0 +1,227 @@
+import { join } from 'path';
+import { readdir, readFile, stat } from 'fs/promises';
+import { createHash } from 'crypto';
+import { ensureSpacesDir } from './ensureSpacesDir';
+import { getDiskUsageSummary, scheduleDiskUsageRefresh } from './diskUsage';
+import type { DiskUsageSummary } from './diskUsage';
+import { resumeSpaceDeletions } from './spaceTrash';
+
+export interface SpaceInfo {
+  name: string; // spaceId (directory name)
+  visibleName: string; // visible name from space.json
+  pythonVersion: string;
+  lastUpdated: string;
+  path: string;
+  comfyUIVersion: string;
+  diskUsage: DiskUsageSummary | null; // last measured footprint, null until first measured
+}
+
+export interface SpaceCatalogue {
+  spaces: SpaceInfo[];
+  selectedVersion: string;
+  /** Strong validator for the serialized catalogue, usable as an HTTP ETag */
+  etag: string;
+}
+
+interface CatalogueEntry {
+  stamp: string;
+  info: Omit<SpaceInfo, 'diskUsage'>;
+}
+
+// Space records keyed by spaceId, validated by the mtimes and sizes of the files they are read from
+const entries = new Map<string, CatalogueEntry>();
+// Directory listing of spaces/, validated by the directory's own mtime
+let listing: { stamp: string; spaceIds: string[] } | null = null;
+// Last assembled catalogue, reused while no entry or the selection changed
+let assembled: { stamp: string; catalogue: SpaceCatalogue } | null = null;
+// Bumped by invalidateSpaceCatalogue so refreshes started earlier are not shared
+let catalogueVersion = 0;
+let refreshing: { version: number; promise: Promise<SpaceCatalogue> } | null = null;
+
+function getSpacesPath(): string {
+  return join(process.cwd(), 'spaces');
+}
+
+async function getStamp(path: string): Promise<string> {
+  try {
+    const stats = await stat(path);
+    return `${stats.mtimeMs}:${stats.size}`;
+  } catch (error) {
+    return '-';
+  }
+}
+
+async function readTextFile(path: string): Promise<string | null> {
+  try {
+    return await readFile(path, 'utf-8');
+  } catch (error) {
+    return null;
+  }
+}
+
+async function readSpaceInfo(spaceId: string, spacePath: string, mtimeMs: number | null): Promise<CatalogueEntry['info']> {
+  // Get visible name and Python version from space.json
+  let visibleName = spaceId; // Fallback to spaceId if space.json doesn't exist
+  let pythonVersion = 'Unknown';
+  try {
+    const spaceJsonContent = await readTextFile(join(spacePath, 'space.json'));
+    if (spaceJsonContent !== null) {
+      const spaceJson = JSON.parse(spaceJsonContent);
+      if (spaceJson.metadata?.visibleName) {
+        visibleName = spaceJson.metadata.visibleName;
+      }
+      if (spaceJson.metadata?.pythonVersion) {
+        pythonVersion = spaceJson.metadata.pythonVersion;
+      }
+    }
+  } catch (error) {
+    console.error(`Error reading space.json for ${spaceId}:`, error);
+  }
+
+  // If Python version not in space.json, try to get from pyvenv.cfg
+  if (pythonVersion === 'Unknown') {
+    const configContent = await readTextFile(join(spacePath, 'venv', 'pyvenv.cfg'));
+    const versionMatch = configContent?.match(/^version\s*=\s*(.+)$/m);
+    if (versionMatch) {
+      pythonVersion = versionMatch[1].trim();
+    }
+  }
+
+  // Get ComfyUI version from space's ComfyUI pyproject.toml
+  let comfyUIVersion = 'Unknown';
+  const tomlContent = await readTextFile(join(spacePath, 'ComfyUI', 'pyproject.toml'));
+  // Match version = "0.6.0" in the [project] section
+  const versionMatch = tomlContent?.match(/\[project\][\s\S]*?version\s*=\s*["']([^"']+)["']/);
+  if (versionMatch) {
+    comfyUIVersion = versionMatch[1].trim();
+  }
+
+  return {
+    name: spaceId,
+    visibleName,
+    pythonVersion,
+    lastUpdated: mtimeMs !== null ? new Date(mtimeMs).toISOString() : 'Unknown',
+    path: `spaces/${spaceId}`,
+    comfyUIVersion,
+  };
+}
+
+async function getSpaceEntry(spacesPath: string, spaceId: string): Promise<CatalogueEntry> {
+  const spacePath = join(spacesPath, spaceId);
+  let mtimeMs: number | null = null;
+  try {
+    mtimeMs = (await stat(spacePath)).mtimeMs;
+  } catch (error) {
+    console.error(`Error getting stats for ${spaceId}:`, error);
+  }
+  const sourceStamps = await Promise.all([
+    getStamp(join(spacePath, 'space.json')),
+    getStamp(join(spacePath, 'venv', 'pyvenv.cfg')),
+    getStamp(join(spacePath, 'ComfyUI', 'pyproject.toml')),
+  ]);
+  const stamp = `${mtimeMs}|${sourceStamps.join('|')}`;
+
+  const cached = entries.get(spaceId);
+  if (cached && cached.stamp === stamp) {
+    return cached;
+  }
+  const entry = { stamp, info: await readSpaceInfo(spaceId, spacePath, mtimeMs) };
+  entries.set(spaceId, entry);
+  return entry;
+}
+
+async function listSpaceIds(spacesPath: string): Promise<string[]> {
+  const stamp = await getStamp(spacesPath);
+  if (listing && listing.stamp === stamp) {
+    return listing.spaceIds;
+  }
+  const dirEntries = await readdir(spacesPath, { withFileTypes: true });
+  // Filter to only include directories (skip files like selected_version.txt
+  // and manager-internal dot-directories like .git-mirrors)
+  const spaceIds = dirEntries
+    .filter(entry => entry.isDirectory() && !entry.name.startsWith('.'))
+    .map(entry => entry.name)
+    .sort();
+  listing = { stamp, spaceIds };
+  return spaceIds;
+}
+
+async function refreshSpaceCatalogue(): Promise<SpaceCatalogue> {
+  // Ensure spaces directory exists
+  await ensureSpacesDir();
+  // Finish deletions interrupted by a restart (only looks at the trash once)
+  void resumeSpaceDeletions();
+  const spacesPath = getSpacesPath();
+  const spaceIds = await listSpaceIds(spacesPath);
+
+  // Spaces that disappeared since the last refresh
+  const present = new Set(spaceIds);
+  for (const spaceId of entries.keys()) {
+    if (!present.has(spaceId)) {
+      entries.delete(spaceId);
+    }
+  }
+
+  const spaceEntries = await Promise.all(spaceIds.map(spaceId => getSpaceEntry(spacesPath, spaceId)));
+  // Disk usage is measured in the background and shows up once a scan finishes
+  const usages = await Promise.all(spaceIds.map(spaceId => getDiskUsageSummary(spaceId)));
+  spaceIds.forEach(spaceId => scheduleDiskUsageRefresh(spaceId));
+
+  // Read selected version
+  const selectedContent = await readTextFile(join(spacesPath, 'selected_version.txt'));
+  // If file doesn't exist, use first space as default
+  const selectedVersion = selectedContent !== null ? selectedContent.trim() : spaceIds[0] || '';
+
+  const stamp = [
+    selectedVersion,
+    ...spaceEntries.map((entry, index) => `${entry.stamp}|${usages[index]?.scannedAt ?? ''}`),
+    spaceIds.join('/'),
+  ].join('\n');
+  if (assembled && assembled.stamp === stamp) {
+    return assembled.catalogue;
+  }
+  const spaces: SpaceInfo[] = spaceEntries.map((entry, index) => ({ ...entry.info, diskUsage: usages[index] }));
+  const etag = `"${createHash('sha1').update(JSON.stringify({ spaces, selectedVersion })).digest('hex')}"`;
+  const catalogue = { spaces, selectedVersion, etag };
+  assembled = { stamp, catalogue };
+  return catalogue;
+}
+
+/**
+ * Returns the list of spaces with the details shown on the home page. Records are
+ * kept in memory and only re-read when the mtime or size of the files they come
+ * from (the space directory, space.json, venv/pyvenv.cfg and ComfyUI's
+ * pyproject.toml) changes, so a refresh of an unchanged catalogue costs a few
+ * stats per space instead of reading and parsing every file. Disk usage is the
+ * last measured value; stale measurements are refreshed in the background.
+ * Concurrent callers share one refresh.
+ */
+export function getSpaceCatalogue(): Promise<SpaceCatalogue> {
+  if (!refreshing || refreshing.version !== catalogueVersion) {
+    const version = catalogueVersion;
+    const promise: Promise<SpaceCatalogue> = refreshSpaceCatalogue().finally(() => {
+      if (refreshing?.promise === promise) {
+        refreshing = null;
+      }
+    });
+    refreshing = { version, promise };
+  }
+  return refreshing.promise;
+}
+
+/**
+ * Drops cached catalogue records so the next read picks up a change right away,
+ * even one that mtimes cannot reveal (several writes within the timestamp
+ * resolution). Routes that create, import, duplicate, rename or delete spaces call
+ * this; without a spaceId the whole catalogue is dropped.
+ */
+export function invalidateSpaceCatalogue(spaceId?: string): void {
+  if (spaceId) {
+    entries.delete(spaceId);
+  } else {
+    entries.clear();
+  }
+  listing = null;
+  assembled = null;
+  catalogueVersion++;
+}
@@ -0,0 +1,145 @@
+import { dirname, join } from 'path';
+import { open, readFile, rename, stat, unlink } from 'fs/promises';
+
+// space.json is free-form JSON (metadata, dependencies, nodes); routes pick what they need
+export type SpaceJson = Record<string, any>;
+
+interface CachedSpaceJson {
+  stamp: string;
+  data: SpaceJson;
+}
+
+// Parsed space.json per space, validated by inode, mtime and size so that edits made
+// outside the manager are still picked up
+const cache = new Map<string, CachedSpaceJson>();
+// Tail of the mutation queue per space
+const queues = new Map<string, Promise<void>>();
+
+export function getSpaceJsonPath(spaceId: string): string {
+  return join(process.cwd(), 'spaces', spaceId, 'space.json');
+}
+
+function deepFreeze<T>(value: T): T {
+  if (value && typeof value === 'object' && !Object.isFrozen(value)) {
+    Object.freeze(value);
+    for (const child of Object.values(value)) {
+      deepFreeze(child);
+    }
+  }
+  return value;
+}
+
+async function getStamp(path: string): Promise<string | null> {
+  try {
+    const stats = await stat(path);
+    return `${stats.ino}:${stats.mtimeMs}:${stats.size}`;
+  } catch (error) {
+    return null;
+  }
+}
+
+async function loadSpaceJson(spaceId: string): Promise<SpaceJson | null> {
+  const path = getSpaceJsonPath(spaceId);
+  const stamp = await getStamp(path);
+  if (stamp === null) {
+    cache.delete(spaceId);
+    return null;
+  }
+  const cached = cache.get(spaceId);
+  if (cached && cached.stamp === stamp) {
+    return cached.data;
+  }
+  const data = deepFreeze(JSON.parse(await readFile(path, 'utf-8')));
+  cache.set(spaceId, { stamp, data });
+  return data;
+}
+
+async function persistSpaceJson(spaceId: string, data: SpaceJson): Promise<void> {
+  const path = getSpaceJsonPath(spaceId);
+  const tempPath = `${path}.${process.pid}.tmp`;
+  try {
+    const handle = await open(tempPath, 'w');
+    try {
+      await handle.writeFile(JSON.stringify(data, null, 2), 'utf-8');
+      await handle.sync();
+    } finally {
+      await handle.close();
+    }
+    // Readers see either the old or the new file, never a partly written one
+    await rename(tempPath, path);
+  } catch (error) {
+    await unlink(tempPath).catch(() => undefined);
+    throw error;
+  }
+
+  // Make the rename itself durable; directories cannot be synced on every platform
+  try {
+    const directory = await open(dirname(path), 'r');
+    try {
+      await directory.sync();
+    } finally {
+      await directory.close();
+    }
+  } catch (error) {
+    // Best effort
+  }
+
+  const stamp = await getStamp(path);
+  if (stamp !== null) {
+    cache.set(spaceId, { stamp, data: deepFreeze(data) });
+  }
+}
+
+function enqueue<T>(spaceId: string, task: () => Promise<T>): Promise<T> {
+  const previous = queues.get(spaceId) || Promise.resolve();
+  const run = previous.then(task);
+  const tail = run.then(() => undefined, () => undefined);
+  queues.set(spaceId, tail);
+  void tail.then(() => {
+    if (queues.get(spaceId) === tail) {
+      queues.delete(spaceId);
+    }
+  });
+  return run;
+}
+
+/**
+ * Returns the parsed space.json of a space, or null if it has none. The result is
+ * a shared, frozen copy that is only parsed again when the file changes; use
+ * updateSpaceJson to modify it.
+ */
+export function readSpaceJson(spaceId: string): Promise<SpaceJson | null> {
+  return loadSpaceJson(spaceId);
+}
+
+/**
+ * Applies a read-modify-write to a space's space.json. Mutations of one space run
+ * one at a time in this process, each on a fresh copy of the latest contents, so
+ * concurrent writers no longer overwrite each other's changes. The result is
+ * written to a temporary file, fsynced and renamed over space.json, so a crash
+ * never leaves a truncated file behind. If `mutate` throws nothing is written.
+ * Resolves with the value returned by `mutate`.
+ */
+export function updateSpaceJson<T>(
+  spaceId: string,
+  mutate: (spaceJson: SpaceJson) => T | Promise<T>
+): Promise<T> {
+  return enqueue(spaceId, async () => {
+    const current = await loadSpaceJson(spaceId);
+    if (!current) {
+      throw new Error(`space.json not found for ${spaceId}`);
+    }
+    const draft = structuredClone(current);
+    const result = await mutate(draft);
+    await persistSpaceJson(spaceId, draft);
+    return result;
+  });
+}
+
+/**
+ * Replaces a space's space.json, creating it if needed, with the same queueing
+ * and atomic write as updateSpaceJson. Used when a space is created or imported.
+ */
+export function writeSpaceJson(spaceId: string, spaceJson: SpaceJson): Promise<void> {
+  return enqueue(spaceId, () => persistSpaceJson(spaceId, structuredClone(spaceJson)));
+}
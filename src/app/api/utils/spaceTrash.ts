@@ -0,0 +1,202 @@
+import { join } from 'path';
+import { mkdir, readdir, rename, rm, rmdir, unlink } from 'fs/promises';
+import { getConcurrencyLimit, runWithConcurrency } from './concurrency';
+import { getDiskUsageSummary } from './diskUsage';
+
+// Files unlinked (and directories read or removed) at once while deleting a space
+const DELETE_CONCURRENCY = getConcurrencyLimit(process.env.SPACE_DELETE_CONCURRENCY, 8);
+// Manager-internal directory under spaces/ holding spaces waiting to be removed
+const TRASH_DIR_NAME = '.trash';
+
+export interface SpaceDeletion {
+  /** Name of the space's directory in the trash */
+  id: string;
+  spaceId: string;
+  status: 'queued' | 'deleting' | 'failed';
+  trashedAt: string;
+  /** Files, links and directories removed so far */
+  removedEntries: number;
+  /** Entries counted by the last disk usage scan, null when it was never measured */
+  totalEntries: number | null;
+  error?: string;
+}
+
+// Deletions not finished yet, by trash entry; finished ones are dropped
+const deletions = new Map<string, SpaceDeletion>();
+let worker: Promise<void> | null = null;
+let resumed = false;
+
+function getTrashPath(): string {
+  return join(process.cwd(), 'spaces', TRASH_DIR_NAME);
+}
+
+function isMissing(error: unknown): boolean {
+  return (error as NodeJS.ErrnoException)?.code === 'ENOENT';
+}
+
+// Throws the first failure that is not a file already being gone
+function throwFirstFailure(results: PromiseSettledResult<unknown>[]): void {
+  const failure = results.find(
+    (result): result is PromiseRejectedResult => result.status === 'rejected' && !isMissing(result.reason)
+  );
+  if (failure) {
+    throw failure.reason;
+  }
+}
+
+/**
+ * Removes a directory tree level by level: each level's directories are read,
+ * their files unlinked, and once every level is empty the directories are removed
+ * deepest first. At most DELETE_CONCURRENCY operations are in flight, so the
+ * libuv thread pool stays available to the rest of the server.
+ */
+async function removeTree(root: string, deletion: SpaceDeletion): Promise<void> {
+  const levels: string[][] = [];
+  let level = [root];
+
+  while (level.length > 0) {
+    levels.push(level);
+    const listings = await runWithConcurrency(level, DELETE_CONCURRENCY, dir => readdir(dir, { withFileTypes: true }));
+    throwFirstFailure(listings);
+
+    const files: string[] = [];
+    const nextLevel: string[] = [];
+    listings.forEach((listing, index) => {
+      if (listing.status !== 'fulfilled') {
+        return;
+      }
+      for (const entry of listing.value) {
+        // Symlinks are removed as links, never followed
+        (entry.isDirectory() ? nextLevel : files).push(join(level[index], entry.name));
+      }
+    });
+
+    const unlinked = await runWithConcurrency(files, DELETE_CONCURRENCY, async file => {
+      await unlink(file);
+      deletion.removedEntries++;
+    });
+    throwFirstFailure(unlinked);
+    level = nextLevel;
+  }
+
+  for (const dirs of levels.reverse()) {
+    const removed = await runWithConcurrency(dirs, DELETE_CONCURRENCY, async dir => {
+      await rmdir(dir);
+      deletion.removedEntries++;
+    });
+    throwFirstFailure(removed);
+  }
+}
+
+async function purge(deletion: SpaceDeletion): Promise<void> {
+  const trashedPath = join(getTrashPath(), deletion.id);
+  deletion.status = 'deleting';
+  try {
+    try {
+      await removeTree(trashedPath, deletion);
+    } catch (error) {
+      // Read-only files (git objects on Windows) and stray non-directories need
+      // the retries and permission handling of fs.rm
+      await rm(trashedPath, { recursive: true, force: true, maxRetries: 3 });
+    }
+    deletions.delete(deletion.id);
+  } catch (error) {
+    deletion.status = 'failed';
+    deletion.error = error instanceof Error ? error.message : 'Unknown error';
+    console.error(`Failed to delete trashed space ${deletion.spaceId}:`, error);
+  }
+}
+
+// Deletes queued spaces one at a time in the background
+function startWorker(): void {
+  if (worker) {
+    return;
+  }
+  worker = (async () => {
+    let next: SpaceDeletion | undefined;
+    while ((next = Array.from(deletions.values()).find(deletion => deletion.status === 'queued'))) {
+      await purge(next);
+    }
+  })().finally(() => {
+    worker = null;
+    // A deletion queued while the worker was finishing
+    if (Array.from(deletions.values()).some(deletion => deletion.status === 'queued')) {
+      startWorker();
+    }
+  });
+}
+
+/**
+ * Removes a space without blocking the server. The space directory is renamed
+ * into spaces/.trash, so it disappears from listings at once and its id can be
+ * reused, and is then deleted by a background worker. Resolves with the queued
+ * deletion once the rename is done.
+ */
+export async function trashSpace(spaceId: string): Promise<SpaceDeletion> {
+  await resumeSpaceDeletions();
+  // The last disk usage scan gives the number of entries to expect, for progress
+  const usage = await getDiskUsageSummary(spaceId);
+  const trashPath = getTrashPath();
+  await mkdir(trashPath, { recursive: true });
+
+  const trashedAt = Date.now();
+  const id = `${trashedAt}-${spaceId}`;
+  await rename(join(process.cwd(), 'spaces', spaceId), join(trashPath, id));
+
+  const deletion: SpaceDeletion = {
+    id,
+    spaceId,
+    status: 'queued',
+    trashedAt: new Date(trashedAt).toISOString(),
+    removedEntries: 0,
+    totalEntries: usage ? usage.files + usage.directories : null,
+  };
+  deletions.set(id, deletion);
+  startWorker();
+  return deletion;
+}
+
+/**
+ * Queues spaces left in the trash by an earlier run of the server, for example
+ * one stopped during a deletion. Only the first call looks at the trash.
+ */
+export async function resumeSpaceDeletions(): Promise<void> {
+  if (resumed) {
+    return;
+  }
+  resumed = true;
+
+  let names: string[];
+  try {
+    names = await readdir(getTrashPath());
+  } catch (error) {
+    // No trash yet
+    return;
+  }
+  for (const name of names) {
+    if (deletions.has(name)) {
+      continue;
+    }
+    const match = name.match(/^(\d+)-(.+)$/);
+    deletions.set(name, {
+      id: name,
+      spaceId: match ? match[2] : name,
+      status: 'queued',
+      trashedAt: new Date(match ? Number(match[1]) : Date.now()).toISOString(),
+      removedEntries: 0,
+      totalEntries: null,
+    });
+  }
+  startWorker();
+}
+
+/**
+ * Returns the deletions still in progress (or failed), optionally only those of
+ * one space. A space whose deletion finished is no longer listed.
+ */
+export async function getSpaceDeletions(spaceId?: string): Promise<SpaceDeletion[]> {
+  await resumeSpaceDeletions();
+  return Array.from(deletions.values())
+    .filter(deletion => !spaceId || deletion.spaceId === spaceId)
+    .map(deletion => ({ ...deletion }));
+}
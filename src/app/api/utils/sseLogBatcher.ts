@@ -0,0 +1,114 @@
+export interface StreamLogEntry {
+  message: string;
+  timestamp: string;
+}
+
+// Send a batch once it holds this many lines, or after this delay, whichever comes first
+const DEFAULT_MAX_LINES = 100;
+const DEFAULT_MAX_DELAY_MS = 100;
+
+/**
+ * Reassembles complete lines from raw subprocess output. Chunks can split lines
+ * anywhere, so the trailing partial line is carried over to the next chunk.
+ * Carriage returns (pip progress bars) are treated as line breaks.
+ */
+export class LineSplitter {
+  private partial = '';
+
+  push(chunk: Buffer | string): string[] {
+    const text = this.partial + chunk.toString();
+    const lines = text.split(/\r\n|\r|\n/);
+    this.partial = lines.pop() || '';
+    return lines.filter(line => line.trim());
+  }
+
+  end(): string[] {
+    const rest = this.partial;
+    this.partial = '';
+    return rest.trim() ? [rest] : [];
+  }
+}
+
+/**
+ * Coalesces log lines into SSE events. A single pending line is sent in the plain
+ * { message, timestamp } shape; several lines are sent as one { logs: [...] } event
+ * so clients can append them in a single state update.
+ */
+export class SseLogBatcher {
+  private pending: StreamLogEntry[] = [];
+  private timer: NodeJS.Timeout | null = null;
+  private closed = false;
+
+  constructor(
+    private controller: ReadableStreamDefaultController,
+    private encoder: TextEncoder,
+    private maxLines: number = DEFAULT_MAX_LINES,
+    private maxDelayMs: number = DEFAULT_MAX_DELAY_MS
+  ) {}
+
+  push(entry: StreamLogEntry): void {
+    if (this.closed) {
+      return;
+    }
+    this.pending.push(entry);
+    if (this.pending.length >= this.maxLines) {
+      this.flush();
+    } else if (!this.timer) {
+      this.timer = setTimeout(() => this.flush(), this.maxDelayMs);
+    }
+  }
+
+  flush(): void {
+    if (this.timer) {
+      clearTimeout(this.timer);
+      this.timer = null;
+    }
+    if (this.pending.length === 0 || this.closed) {
+      return;
+    }
+
+    const entries = this.pending;
+    this.pending = [];
+    const payload = entries.length === 1 ? entries[0] : { logs: entries };
+    try {
+      this.controller.enqueue(this.encoder.encode(`data: ${JSON.stringify(payload)}\n\n`));
+    } catch (error) {
+      // Client disconnected, drop the remaining output
+      this.closed = true;
+    }
+  }
+
+  /**
+   * Sends whatever is pending and stops accepting new lines.
+   */
+  close(): void {
+    this.flush();
+    this.closed = true;
+  }
+}
+
+const batchers = new WeakMap<ReadableStreamDefaultController, SseLogBatcher>();
+
+/**
+ * Returns the batcher attached to a stream controller, creating it on first use.
+ */
+export function getSseLogBatcher(controller: ReadableStreamDefaultController, encoder: TextEncoder): SseLogBatcher {
+  let batcher = batchers.get(controller);
+  if (!batcher) {
+    batcher = new SseLogBatcher(controller, encoder);
+    batchers.set(controller, batcher);
+  }
+  return batcher;
+}
+
+/**
+ * Sends any pending lines for a stream controller and detaches its batcher.
+ * Call this before closing the controller.
+ */
+export function closeSseLogBatcher(controller: ReadableStreamDefaultController): void {
+  const batcher = batchers.get(controller);
+  if (batcher) {
+    batcher.close();
+    batchers.delete(controller);
+  }
+}
@@ -0,0 +1,353 @@
+import { Writable } from 'stream';
+import { createReadStream } from 'fs';
+import { stat } from 'fs/promises';
+
+const BLOCK_SIZE = 512;
+// Largest size and longest name a plain ustar header holds; bigger ones get a PAX header
+const MAX_USTAR_SIZE = 0o77777777777;
+const MAX_USTAR_NAME_BYTES = 100;
+// PAX extended headers are a few records; anything bigger is not a tar we wrote
+const MAX_PAX_HEADER_BYTES = 1024 * 1024;
+
+export type TarEntryType = 'file' | 'directory' | 'other';
+
+export interface TarEntry {
+  name: string;
+  size: number;
+  type: TarEntryType;
+  mode: number;
+  /** Modification time in seconds */
+  mtime: number;
+  /**
+   * The entry's data. Reading it is optional: whatever is left unread is skipped
+   * when the next entry is requested.
+   */
+  body: AsyncIterable<Buffer>;
+}
+
+function writeOctal(header: Buffer, value: number, offset: number, length: number): void {
+  header.write(`${value.toString(8).padStart(length - 1, '0')}\0`, offset, length, 'ascii');
+}
+
+function readOctal(header: Buffer, offset: number, length: number): number {
+  // GNU base-256 encoding for values that do not fit in octal
+  if (header[offset] & 0x80) {
+    let value = header[offset] & 0x7f;
+    for (let i = offset + 1; i < offset + length; i++) {
+      value = value * 256 + header[i];
+    }
+    return value;
+  }
+  const text = header.toString('ascii', offset, offset + length).replace(/\0[\s\S]*$/, '').trim();
+  return text ? parseInt(text, 8) : 0;
+}
+
+function readString(header: Buffer, offset: number, length: number): string {
+  const end = header.indexOf(0, offset);
+  return header.toString('utf8', offset, end === -1 || end > offset + length ? offset + length : end);
+}
+
+function checksum(header: Buffer): number {
+  let sum = 0;
+  for (let i = 0; i < BLOCK_SIZE; i++) {
+    // The checksum field itself counts as spaces
+    sum += i >= 148 && i < 156 ? 0x20 : header[i];
+  }
+  return sum;
+}
+
+function encodeHeader(name: string, size: number, typeflag: string, mode: number, mtime: number): Buffer {
+  const header = Buffer.alloc(BLOCK_SIZE);
+  header.write(name, 0, MAX_USTAR_NAME_BYTES, 'utf8');
+  writeOctal(header, mode, 100, 8);
+  writeOctal(header, 0, 108, 8);
+  writeOctal(header, 0, 116, 8);
+  writeOctal(header, size, 124, 12);
+  writeOctal(header, mtime, 136, 12);
+  header.write(typeflag, 156, 1, 'ascii');
+  header.write('ustar\0', 257, 6, 'ascii');
+  header.write('00', 263, 2, 'ascii');
+  header.write(`${checksum(header).toString(8).padStart(6, '0')}\0 `, 148, 8, 'ascii');
+  return header;
+}
+
+// A PAX record is "<length> <key>=<value>\n", the length counting its own digits
+function encodePaxRecord(key: string, value: string): string {
+  const body = ` ${key}=${value}\n`;
+  const bodyBytes = Buffer.byteLength(body);
+  let length = bodyBytes + 1;
+  while (String(length).length + bodyBytes !== length) {
+    length = String(length).length + bodyBytes;
+  }
+  return `${length}${body}`;
+}
+
+function parsePaxRecords(data: Buffer): Record<string, string> {
+  const records: Record<string, string> = {};
+  let offset = 0;
+  while (offset < data.length) {
+    const space = data.indexOf(0x20, offset);
+    const length = space === -1 ? NaN : parseInt(data.toString('ascii', offset, space), 10);
+    if (!(length > 0) || offset + length > data.length) {
+      break;
+    }
+    const record = data.toString('utf8', space + 1, offset + length - 1);
+    const separator = record.indexOf('=');
+    if (separator > 0) {
+      records[record.slice(0, separator)] = record.slice(separator + 1);
+    }
+    offset += length;
+  }
+  return records;
+}
+
+function padding(size: number): number {
+  return (BLOCK_SIZE - (size % BLOCK_SIZE)) % BLOCK_SIZE;
+}
+
+/**
+ * Writes a tar archive (ustar, with PAX headers for long names and sizes over
+ * 8 GiB) to a stream, one entry at a time. Every write waits for the stream to
+ * drain, so data is produced no faster than the reader consumes it and memory
+ * stays bounded whatever the size of the files.
+ */
+export class TarWriter {
+  constructor(private readonly output: Writable) {}
+
+  private async write(chunk: Buffer): Promise<void> {
+    if (this.output.destroyed) {
+      throw new Error('Archive stream was closed');
+    }
+    if (!this.output.write(chunk)) {
+      await new Promise<void>((resolve, reject) => {
+        const cleanup = () => {
+          this.output.off('drain', onDrain);
+          this.output.off('close', onClose);
+        };
+        const onDrain = () => {
+          cleanup();
+          resolve();
+        };
+        const onClose = () => {
+          cleanup();
+          reject(new Error('Archive stream was closed'));
+        };
+        this.output.on('drain', onDrain);
+        this.output.on('close', onClose);
+      });
+    }
+  }
+
+  private async writeHeader(name: string, size: number, mode: number, mtime: number): Promise<void> {
+    let pax = '';
+    if (Buffer.byteLength(name) > MAX_USTAR_NAME_BYTES) {
+      pax += encodePaxRecord('path', name);
+    }
+    if (size > MAX_USTAR_SIZE) {
+      pax += encodePaxRecord('size', String(size));
+    }
+    if (pax) {
+      const data = Buffer.from(pax, 'utf8');
+      await this.write(encodeHeader('PaxHeader', data.length, 'x', 0o644, mtime));
+      await this.write(Buffer.concat([data, Buffer.alloc(padding(data.length))]));
+    }
+    await this.write(encodeHeader(name, size > MAX_USTAR_SIZE ? 0 : size, '0', mode, mtime));
+  }
+
+  /**
+   * Adds a file entry whose data comes from `source`, which must yield exactly
+   * `size` bytes.
+   */
+  async addStream(name: string, size: number, source: AsyncIterable<Buffer | Uint8Array>, mode = 0o644): Promise<void> {
+    await this.writeHeader(name, size, mode, Math.floor(Date.now() / 1000));
+    let written = 0;
+    for await (const chunk of source) {
+      written += chunk.length;
+      if (written > size) {
+        throw new Error(`${name} grew while it was being archived`);
+      }
+      await this.write(Buffer.isBuffer(chunk) ? chunk : Buffer.from(chunk));
+    }
+    if (written !== size) {
+      throw new Error(`${name} shrank while it was being archived`);
+    }
+    await this.write(Buffer.alloc(padding(size)));
+  }
+
+  async addBuffer(name: string, data: Buffer | string, mode = 0o644): Promise<void> {
+    const buffer = typeof data === 'string' ? Buffer.from(data, 'utf8') : data;
+    await this.addStream(name, buffer.length, [buffer], mode);
+  }
+
+  /**
+   * Adds a file from disk, streamed in chunks rather than read into memory.
+   */
+  async addFile(name: string, path: string): Promise<void> {
+    const stats = await stat(path);
+    await this.addStream(name, stats.size, createReadStream(path), stats.mode & 0o777);
+  }
+
+  /**
+   * Writes the end-of-archive marker and ends the output stream.
+   */
+  async finish(): Promise<void> {
+    await this.write(Buffer.alloc(BLOCK_SIZE * 2));
+    this.output.end();
+  }
+}
+
+// Buffers just enough of a byte stream to hand out exact-sized reads
+class ByteReader {
+  private chunks: Buffer[] = [];
+  private length = 0;
+  private ended = false;
+  private readonly iterator: AsyncIterator<Buffer | Uint8Array>;
+
+  constructor(source: AsyncIterable<Buffer | Uint8Array>) {
+    this.iterator = source[Symbol.asyncIterator]();
+  }
+
+  private async fill(minimum: number): Promise<boolean> {
+    while (this.length < minimum && !this.ended) {
+      const { value, done } = await this.iterator.next();
+      if (done) {
+        this.ended = true;
+        break;
+      }
+      const chunk = Buffer.isBuffer(value) ? value : Buffer.from(value);
+      if (chunk.length > 0) {
+        this.chunks.push(chunk);
+        this.length += chunk.length;
+      }
+    }
+    return this.length >= minimum;
+  }
+
+  private take(max: number): Buffer {
+    const first = this.chunks[0];
+    if (first.length <= max) {
+      this.chunks.shift();
+      this.length -= first.length;
+      return first;
+    }
+    this.chunks[0] = first.subarray(max);
+    this.length -= max;
+    return first.subarray(0, max);
+  }
+
+  /** Reads exactly `size` bytes, or returns null at a clean end of the stream */
+  async readExact(size: number): Promise<Buffer | null> {
+    if (!(await this.fill(size))) {
+      if (this.length === 0) {
+        return null;
+      }
+      throw new Error('Unexpected end of archive');
+    }
+    const parts: Buffer[] = [];
+    let needed = size;
+    while (needed > 0) {
+      const part = this.take(needed);
+      parts.push(part);
+      needed -= part.length;
+    }
+    return parts.length === 1 ? parts[0] : Buffer.concat(parts);
+  }
+
+  /** Reads up to `max` bytes without copying, pulling from the source only when empty */
+  async readChunk(max: number): Promise<Buffer> {
+    if (this.length === 0 && !(await this.fill(1))) {
+      throw new Error('Unexpected end of archive');
+    }
+    return this.take(max);
+  }
+
+  async skip(size: number): Promise<void> {
+    while (size > 0) {
+      size -= (await this.readChunk(size)).length;
+    }
+  }
+
+  async close(): Promise<void> {
+    await this.iterator.return?.();
+  }
+}
+
+/**
+ * Reads a tar archive from a byte stream entry by entry, holding at most one
+ * source chunk in memory. Understands ustar, PAX and GNU long-name headers.
+ * Throws on a truncated archive or a corrupt header.
+ */
+export async function* readTar(source: AsyncIterable<Buffer | Uint8Array>): AsyncGenerator<TarEntry> {
+  const reader = new ByteReader(source);
+  let extended: Record<string, string> = {};
+  let globalExtended: Record<string, string> = {};
+
+  try {
+    while (true) {
+      const header = await reader.readExact(BLOCK_SIZE);
+      if (!header) {
+        throw new Error('Unexpected end of archive');
+      }
+      if (header.every(byte => byte === 0)) {
+        // End-of-archive marker; the second zero block and any trailing padding are ignored
+        return;
+      }
+      if (readOctal(header, 148, 8) !== checksum(header)) {
+        throw new Error('Invalid tar header checksum');
+      }
+
+      const typeflag = header[156] === 0 ? '0' : String.fromCharCode(header[156]);
+      const headerSize = readOctal(header, 124, 12);
+
+      if (typeflag === 'x' || typeflag === 'g' || typeflag === 'L') {
+        if (headerSize > MAX_PAX_HEADER_BYTES) {
+          throw new Error('Tar extended header is too large');
+        }
+        const data = (await reader.readExact(headerSize)) ?? Buffer.alloc(0);
+        await reader.skip(padding(headerSize));
+        if (typeflag === 'L') {
+          extended.path = data.toString('utf8').replace(/\0+$/, '');
+        } else if (typeflag === 'g') {
+          globalExtended = { ...globalExtended, ...parsePaxRecords(data) };
+        } else {
+          extended = { ...extended, ...parsePaxRecords(data) };
+        }
+        continue;
+      }
+
+      const records = { ...globalExtended, ...extended };
+      extended = {};
+      const prefix = readString(header, 345, 155);
+      const baseName = readString(header, 0, 100);
+      const name = records.path ?? (prefix ? `${prefix}/${baseName}` : baseName);
+      const size = records.size !== undefined ? Number(records.size) : headerSize;
+      if (!Number.isSafeInteger(size) || size < 0) {
+        throw new Error(`Invalid size for tar entry ${name}`);
+      }
+      // Only regular files carry data
+      const type: TarEntryType = typeflag === '0' || typeflag === '7' ? 'file' : typeflag === '5' ? 'directory' : 'other';
+      const dataSize = type === 'directory' ? 0 : size;
+
+      let remaining = dataSize;
+      async function* body(): AsyncGenerator<Buffer> {
+        while (remaining > 0) {
+          const chunk = await reader.readChunk(remaining);
+          remaining -= chunk.length;
+          yield chunk;
+        }
+      }
+
+      yield {
+        name,
+        size: dataSize,
+        type,
+        mode: readOctal(header, 100, 8),
+        mtime: readOctal(header, 136, 12),
+        body: body(),
+      };
+      await reader.skip(remaining + padding(dataSize));
+    }
+  } finally {
+    await reader.close();
+  }
+}
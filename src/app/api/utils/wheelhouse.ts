@@ -0,0 +1,339 @@
+import { join } from 'path';
+import { existsSync } from 'fs';
+import { mkdir, readdir, readFile, rename, rm, stat, writeFile } from 'fs/promises';
+import { execFile } from 'child_process';
+import { promisify } from 'util';
+
+const execFileAsync = promisify(execFile);
+
+const WHEEL_BUILD_TIMEOUT_MS = 30 * 60 * 1000;
+const SINGLE_WHEEL_TIMEOUT_MS = 10 * 60 * 1000;
+// Delay before a scheduled prebuild starts, so back-to-back activations trigger one run
+const PREBUILD_DELAY_MS = 30000;
+
+// Prints e.g. "cp311-linux_x86_64": interpreter tag plus platform, the parts a wheel must match
+const TAG_SCRIPT = [
+  'import sys, sysconfig',
+  'impl = {"cpython": "cp", "pypy": "pp"}.get(sys.implementation.name, sys.implementation.name)',
+  'plat = sysconfig.get_platform().replace("-", "_").replace(".", "_")',
+  'print("%s%d%d-%s" % (impl, sys.version_info[0], sys.version_info[1], plat))',
+].join('\n');
+
+export interface WheelhouseTagInfo {
+  tag: string;
+  path: string;
+  wheels: number;
+  bytes: number;
+}
+
+export interface PrebuildStatus {
+  running: boolean;
+  startedAt: string | null;
+  finishedAt: string | null;
+  built: number;
+  skipped: number;
+  failed: string[];
+  lastError: string | null;
+}
+
+const tagCache = new Map<string, string>();
+let prebuildRun: Promise<void> | null = null;
+let prebuildTimer: NodeJS.Timeout | null = null;
+let prebuildStatus: PrebuildStatus = {
+  running: false,
+  startedAt: null,
+  finishedAt: null,
+  built: 0,
+  skipped: 0,
+  failed: [],
+  lastError: null,
+};
+
+/**
+ * Root of the manager-wide wheelhouse. Like the git mirror cache it lives under
+ * the spaces directory as a dot-directory so it is never listed as a space.
+ */
+export function getWheelhouseRoot(): string {
+  return join(process.cwd(), 'spaces', '.wheelhouse');
+}
+
+/**
+ * Returns the wheelhouse tag (interpreter + platform, e.g. "cp311-linux_x86_64")
+ * for a Python executable. Wheels are only shared between venvs with the same tag.
+ */
+export async function getWheelhouseTag(pythonExec: string): Promise<string> {
+  const cached = tagCache.get(pythonExec);
+  if (cached) {
+    return cached;
+  }
+  const { stdout } = await execFileAsync(pythonExec, ['-c', TAG_SCRIPT], { timeout: 30000 });
+  const tag = stdout.trim();
+  if (!/^[A-Za-z0-9_.-]+$/.test(tag)) {
+    throw new Error(`Unexpected wheelhouse tag from ${pythonExec}: ${tag}`);
+  }
+  tagCache.set(pythonExec, tag);
+  return tag;
+}
+
+export function getWheelhousePath(tag: string): string {
+  return join(getWheelhouseRoot(), tag);
+}
+
+/**
+ * Extra pip install arguments that make pip consult the wheelhouse for this
+ * interpreter before the index. Returns no arguments if there is nothing cached yet
+ * or the tag cannot be determined, so installs never fail because of the wheelhouse.
+ */
+export async function getWheelhouseArgs(pythonExec: string): Promise<string[]> {
+  try {
+    const wheelhousePath = getWheelhousePath(await getWheelhouseTag(pythonExec));
+    return existsSync(wheelhousePath) ? ['--find-links', wheelhousePath] : [];
+  } catch (error) {
+    return [];
+  }
+}
+
+function normalizeName(name: string): string {
+  return name.toLowerCase().replace(/[-_.]+/g, '_');
+}
+
+// Wheel file names in a wheelhouse directory by "name==version"
+async function listWheelFiles(wheelhousePath: string): Promise<Map<string, string>> {
+  const entries = await readdir(wheelhousePath).catch(() => [] as string[]);
+  const files = new Map<string, string>();
+  for (const entry of entries.sort()) {
+    if (!entry.endsWith('.whl')) {
+      continue;
+    }
+    const [name, version] = entry.split('-');
+    const key = `${normalizeName(name)}==${version}`;
+    if (name && version && !files.has(key)) {
+      files.set(key, entry);
+    }
+  }
+  return files;
+}
+
+async function listWheelKeys(wheelhousePath: string): Promise<Set<string>> {
+  return new Set((await listWheelFiles(wheelhousePath)).keys());
+}
+
+/**
+ * Keeps only plain "name==version" pins from a requirements file. Editable installs,
+ * VCS URLs and local paths are not worth caching (or cannot be), and unpinned
+ * requirements would resolve differently for every space.
+ */
+function parsePinnedRequirements(content: string): Array<{ line: string; key: string }> {
+  const pins: Array<{ line: string; key: string }> = [];
+  for (const rawLine of content.split('\n')) {
+    const line = rawLine.trim();
+    const match = line.match(/^([A-Za-z0-9][A-Za-z0-9._-]*)(\[[^\]]*\])?\s*==\s*([^\s;#]+)/);
+    if (match) {
+      pins.push({ line, key: `${normalizeName(match[1])}==${match[3]}` });
+    }
+  }
+  return pins;
+}
+
+/**
+ * Looks up the wheels in the wheelhouse for a tag that install the pinned
+ * requirements in `content`. Returns their file names, plus the pinned lines that
+ * have no wheel (and the unpinned lines, which cannot be matched to one).
+ */
+export async function findWheelsForRequirements(
+  tag: string,
+  content: string
+): Promise<{ wheels: string[]; missing: string[] }> {
+  const files = await listWheelFiles(getWheelhousePath(tag));
+  const pins = parsePinnedRequirements(content);
+  const pinnedLines = new Set(pins.map(pin => pin.line));
+  const wheels = new Set<string>();
+  const missing: string[] = [];
+  for (const pin of pins) {
+    const file = files.get(pin.key);
+    if (file) {
+      wheels.add(file);
+    } else {
+      missing.push(pin.line);
+    }
+  }
+  for (const rawLine of content.split('\n')) {
+    const line = rawLine.trim();
+    if (line && !line.startsWith('#') && !pinnedLines.has(line)) {
+      missing.push(line);
+    }
+  }
+  return { wheels: Array.from(wheels), missing };
+}
+
+async function runPipWheel(
+  pythonExec: string,
+  buildPath: string,
+  wheelhousePath: string,
+  args: string[],
+  timeout: number
+): Promise<void> {
+  await execFileAsync(
+    pythonExec,
+    ['-m', 'pip', 'wheel', '--no-deps', '--wheel-dir', buildPath, '--find-links', wheelhousePath, ...args],
+    { timeout, maxBuffer: 64 * 1024 * 1024, env: { ...process.env } }
+  );
+}
+
+/**
+ * Builds wheels for every pinned requirement in requirementsPath that is not already
+ * in the wheelhouse for the interpreter's tag. Sdists are compiled once here and then
+ * installed from local disk by every space with the same tag. Everything is built in
+ * one pip run; if that fails, requirements are retried one at a time so a single
+ * unbuildable package does not block the rest. pip writes into a private build
+ * directory and each finished wheel is renamed into place, so installs reading
+ * the wheelhouse never see a partly written file.
+ */
+export async function buildWheels(
+  pythonExec: string,
+  requirementsPath: string
+): Promise<{ built: number; skipped: number; failed: string[] }> {
+  const wheelhousePath = getWheelhousePath(await getWheelhouseTag(pythonExec));
+  await mkdir(wheelhousePath, { recursive: true });
+
+  const existing = await listWheelKeys(wheelhousePath);
+  const pins = parsePinnedRequirements(await readFile(requirementsPath, 'utf-8'));
+  const missing = pins.filter(pin => !existing.has(pin.key));
+  const skipped = pins.length - missing.length;
+  if (missing.length === 0) {
+    return { built: 0, skipped, failed: [] };
+  }
+
+  // A dot-directory inside the tag directory: same filesystem for the renames, and
+  // neither pip --find-links nor the wheel listing looks into it
+  const buildPath = join(wheelhousePath, `.build-${process.pid}-${Date.now()}`);
+  const listPath = join(buildPath, 'requirements.txt');
+  const failed: string[] = [];
+  try {
+    await mkdir(buildPath, { recursive: true });
+    await writeFile(listPath, missing.map(pin => pin.line).join('\n'), 'utf-8');
+    try {
+      await runPipWheel(pythonExec, buildPath, wheelhousePath, ['-r', listPath], WHEEL_BUILD_TIMEOUT_MS);
+    } catch (error) {
+      for (const pin of missing) {
+        try {
+          await runPipWheel(pythonExec, buildPath, wheelhousePath, [pin.line], SINGLE_WHEEL_TIMEOUT_MS);
+        } catch (pinError) {
+          failed.push(pin.line);
+        }
+      }
+    }
+    for (const entry of await readdir(buildPath)) {
+      if (entry.endsWith('.whl') && !existsSync(join(wheelhousePath, entry))) {
+        await rename(join(buildPath, entry), join(wheelhousePath, entry));
+      }
+    }
+  } finally {
+    await rm(buildPath, { recursive: true, force: true });
+  }
+
+  return { built: missing.length - failed.length, skipped, failed };
+}
+
+async function runPrebuild(): Promise<void> {
+  const spacesPath = join(process.cwd(), 'spaces');
+  const isWindows = process.platform === 'win32';
+  prebuildStatus = {
+    running: true,
+    startedAt: new Date().toISOString(),
+    finishedAt: null,
+    built: 0,
+    skipped: 0,
+    failed: [],
+    lastError: null,
+  };
+
+  try {
+    const spaceDirs = await readdir(spacesPath, { withFileTypes: true }).catch(() => []);
+    for (const spaceDir of spaceDirs) {
+      if (!spaceDir.isDirectory() || spaceDir.name.startsWith('.')) {
+        continue;
+      }
+      const spacePath = join(spacesPath, spaceDir.name);
+      const requirementsPath = join(spacePath, 'requirements.txt');
+      const pythonExec = isWindows
+        ? join(spacePath, 'venv', 'Scripts', 'python.exe')
+        : join(spacePath, 'venv', 'bin', 'python3');
+      if (!existsSync(requirementsPath) || !existsSync(pythonExec)) {
+        continue;
+      }
+
+      try {
+        const result = await buildWheels(pythonExec, requirementsPath);
+        prebuildStatus.built += result.built;
+        prebuildStatus.skipped += result.skipped;
+        prebuildStatus.failed.push(...result.failed.map(line => `${spaceDir.name}: ${line}`));
+      } catch (error) {
+        prebuildStatus.lastError = `${spaceDir.name}: ${error instanceof Error ? error.message : String(error)}`;
+        console.warn(`Wheelhouse prebuild failed for space ${spaceDir.name}:`, error);
+      }
+    }
+  } finally {
+    prebuildStatus.running = false;
+    prebuildStatus.finishedAt = new Date().toISOString();
+  }
+}
+
+/**
+ * Starts a background prebuild over all spaces' requirements.txt, or returns the run
+ * already in progress. Spaces are processed one at a time to keep build load bounded.
+ */
+export function startPrebuild(): Promise<void> {
+  if (!prebuildRun) {
+    prebuildRun = runPrebuild()
+      .catch((error) => console.error('Wheelhouse prebuild failed:', error))
+      .finally(() => {
+        prebuildRun = null;
+      });
+  }
+  return prebuildRun;
+}
+
+/**
+ * Schedules a prebuild shortly in the future. Repeated calls within the delay
+ * collapse into a single run. Used after installs so freshly built wheels end up
+ * in the wheelhouse without slowing down the install itself.
+ */
+export function schedulePrebuild(): void {
+  if (prebuildTimer) {
+    clearTimeout(prebuildTimer);
+  }
+  prebuildTimer = setTimeout(() => {
+    prebuildTimer = null;
+    void startPrebuild();
+  }, PREBUILD_DELAY_MS);
+  prebuildTimer.unref?.();
+}
+
+export function getPrebuildStatus(): PrebuildStatus {
+  return { ...prebuildStatus, failed: [...prebuildStatus.failed] };
+}
+
+/**
+ * Lists the wheelhouse per tag with wheel counts and total size.
+ */
+export async function listWheelhouse(): Promise<WheelhouseTagInfo[]> {
+  const root = getWheelhouseRoot();
+  const tagDirs = await readdir(root, { withFileTypes: true }).catch(() => []);
+
+  return Promise.all(
+    tagDirs
+      .filter(entry => entry.isDirectory())
+      .map(async (entry) => {
+        const tagPath = join(root, entry.name);
+        const wheels = (await readdir(tagPath)).filter(name => name.endsWith('.whl'));
+        const sizes = await Promise.all(wheels.map(name => stat(join(tagPath, name)).then(s => s.size).catch(() => 0)));
+        return {
+          tag: entry.name,
+          path: tagPath,
+          wheels: wheels.length,
+          bytes: sizes.reduce((total, size) => total + size, 0),
+        };
+      })
+  );
+}
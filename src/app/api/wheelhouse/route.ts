@@ -0,0 +1,40 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { listWheelhouse, getPrebuildStatus, startPrebuild } from '../utils/wheelhouse';
+
+// GET endpoint for the shared wheelhouse contents and prebuild status
+export async function GET() {
+  try {
+    const tags = await listWheelhouse();
+    return NextResponse.json({ tags, prebuild: getPrebuildStatus() });
+  } catch (error) {
+    console.error('Error listing wheelhouse:', error);
+    return NextResponse.json(
+      { error: 'Failed to list wheelhouse' },
+      { status: 500 }
+    );
+  }
+}
+
+// POST endpoint for wheelhouse maintenance: { action: 'prebuild' }
+export async function POST(request: NextRequest) {
+  try {
+    const { action } = await request.json();
+
+    if (action === 'prebuild') {
+      // Runs in the background, poll GET for progress
+      void startPrebuild();
+      return NextResponse.json({ success: true, prebuild: getPrebuildStatus() }, { status: 202 });
+    }
+
+    return NextResponse.json(
+      { error: 'Invalid action. Must be "prebuild"' },
+      { status: 400 }
+    );
+  } catch (error) {
+    console.error('Error maintaining wheelhouse:', error);
+    return NextResponse.json(
+      { error: `Failed to maintain wheelhouse: ${error instanceof Error ? error.message : 'Unknown error'}` },
+      { status: 500 }
+    );
+  }
+}
@@ -32,6 +32,11 @@ interface ValidationResult {
   warnings: string[];
 }
 
+// Offline bundles made by "Export offline bundle"
+function isBundleFile(name: string): boolean {
+  return /\.(tar|tar\.gz|tgz|tar\.zst)$/i.test(name);
+}
+
 export default function ImportJsonModal({ opened, onClose, onSuccess }: ImportJsonModalProps) {
   const [file, setFile] = useState<File | null>(null);
   const [jsonContent, setJsonContent] = useState<SpaceJson | null>(null);
@@ -142,8 +147,18 @@ export default function ImportJsonModal({ opened, onClose, onSuccess }: ImportJs
   };
 
   const handleFileSelect = useCallback(async (selectedFile: File) => {
+    if (isBundleFile(selectedFile.name)) {
+      // Bundles are uploaded as they are and validated by the server
+      setFile(selectedFile);
+      setJsonContent(null);
+      setError(null);
+      setSuccess(false);
+      setValidationResult({ valid: true, errors: [], warnings: [] });
+      return;
+    }
+
     if (!selectedFile.name.endsWith('.json')) {
-      setError('Please select a JSON file');
+      setError('Please select a JSON file or an offline bundle');
       setFile(null);
       setJsonContent(null);
       setValidationResult(null);
@@ -201,7 +216,8 @@ export default function ImportJsonModal({ opened, onClose, onSuccess }: ImportJs
   };
 
   const handleImport = async (useNewName = false) => {
-    if (!jsonContent || !validationResult?.valid) {
+    const isBundle = !!file && isBundleFile(file.name);
+    if ((!jsonContent && !isBundle) || !validationResult?.valid) {
       return;
     }
 
@@ -224,26 +240,41 @@ export default function ImportJsonModal({ opened, onClose, onSuccess }: ImportJs
     setNameConflict(false);
 
     try {
-      // Prepare the data to send
-      const importData = { ...jsonContent };
-      
-      // If using new name, update the metadata
-      if (useNewName && newSpaceName) {
-        const newSpaceId = generateSpaceId(newSpaceName);
-        importData.metadata = {
-          ...importData.metadata,
-          visibleName: newSpaceName,
-          spaceId: newSpaceId,
-        };
-      }
+      let response: Response;
+      if (isBundle && file) {
+        // The archive is streamed to the server, a new name goes in the query
+        const query = useNewName && newSpaceName
+          ? `?${new URLSearchParams({ spaceId: generateSpaceId(newSpaceName), visibleName: newSpaceName })}`
+          : '';
+        response = await fetch(`/api/spaces/import${query}`, {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/octet-stream',
+          },
+          body: file,
+        });
+      } else {
+        // Prepare the data to send
+        const importData = { ...jsonContent } as SpaceJson;
+
+        // If using new name, update the metadata
+        if (useNewName && newSpaceName) {
+          const newSpaceId = generateSpaceId(newSpaceName);
+          importData.metadata = {
+            ...importData.metadata,
+            visibleName: newSpaceName,
+            spaceId: newSpaceId,
+          };
+        }
 
-      const response = await fetch('/api/spaces/import', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify(importData),
-      });
+        response = await fetch('/api/spaces/import', {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify(importData),
+        });
+      }
 
       const data = await response.json();
 
@@ -251,7 +282,7 @@ export default function ImportJsonModal({ opened, onClose, onSuccess }: ImportJs
         // Check if it's a name conflict error
         if (data.error && data.error.includes('already exists')) {
           setNameConflict(true);
-          setNewSpaceName(jsonContent.metadata?.visibleName || '');
+          setNewSpaceName(jsonContent?.metadata?.visibleName || '');
           setError(data.error);
         } else {
           setError(data.error || 'Failed to import space');
@@ -289,7 +320,7 @@ export default function ImportJsonModal({ opened, onClose, onSuccess }: ImportJs
     }
   };
 
-  const canImport = validationResult?.valid && jsonContent && !isImporting && !nameConflict;
+  const canImport = validationResult?.valid && (jsonContent || (file && isBundleFile(file.name))) && !isImporting && !nameConflict;
 
   return (
     <Modal
@@ -343,7 +374,9 @@ export default function ImportJsonModal({ opened, onClose, onSuccess }: ImportJs
                 </Text>
               </Group>
               <Text size="sm" c="#ff9999">
-                A space with ID "{jsonContent?.metadata?.spaceId}" already exists. Please provide a different name.
+                {jsonContent
+                  ? `A space with ID "${jsonContent.metadata?.spaceId}" already exists. Please provide a different name.`
+                  : 'A space with this ID already exists. Please provide a different name.'}
               </Text>
               <TextInput
                 label="New Space Name"
@@ -442,11 +475,11 @@ export default function ImportJsonModal({ opened, onClose, onSuccess }: ImportJs
             </div>
             <Stack gap="xs" align="center">
               <Text size="lg" fw={600} c="#ffffff">
-                {file ? file.name : 'Drag & drop your JSON file'}
+                {file ? file.name : 'Drag & drop your JSON file or offline bundle'}
               </Text>
               {file && (
                 <Text size="xs" c="#888888">
-                  {(file.size / 1024).toFixed(2)} KB
+                  {file.size >= 1024 * 1024 ? `${(file.size / (1024 * 1024)).toFixed(2)} MB` : `${(file.size / 1024).toFixed(2)} KB`}
                 </Text>
               )}
               {!file && (
@@ -482,7 +515,7 @@ export default function ImportJsonModal({ opened, onClose, onSuccess }: ImportJs
             <input
               ref={fileInputRef}
               type="file"
-              accept=".json"
+              accept=".json,.tar,.tgz,.gz,.zst"
               onChange={handleFileInputChange}
               style={{ display: 'none' }}
             />
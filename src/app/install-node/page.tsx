@@ -384,41 +384,48 @@ export default function InstallNodePage() {
 
       eventSource.onmessage = (event) => {
         try {
-          const logEntry = JSON.parse(event.data);
-          setLogs(prev => [...prev, logEntry.message]);
+          // The activation stream batches several lines into one { logs: [...] } event
+          const data = JSON.parse(event.data);
+          const logEntries: Array<{ message: string; timestamp: string }> = Array.isArray(data.logs) ? data.logs : [data];
+          setLogs(prev => [...prev, ...logEntries.map(logEntry => logEntry.message)]);
           
-          const message = logEntry.message;
+          // Markers are handled line by line like separate events; an error marker ends
+          // the checks for its own line only, the ready marker closes the stream
+          for (const logEntry of logEntries) {
+            const message = logEntry.message;
           
-          // Check for restart failures
-          if (message.includes('[ERROR]') || 
-              message.includes('Failed to install dependencies') ||
-              message.includes('ERROR:') ||
-              message.includes('ResolutionImpossible') ||
-              message.includes('Activation failed')) {
-            setIsRestarting(false);
-            setMessage({ type: 'error', text: 'ComfyUI restart failed' });
-            return;
-          }
+            // Check for restart failures
+            if (message.includes('[ERROR]') || 
+                message.includes('Failed to install dependencies') ||
+                message.includes('ERROR:') ||
+                message.includes('ResolutionImpossible') ||
+                message.includes('Activation failed')) {
+              setIsRestarting(false);
+              setMessage({ type: 'error', text: 'ComfyUI restart failed' });
+              continue;
+            }
           
-          // Check if ComfyUI is ready - look for messages indicating server started
-          if (message.includes('To see the GUI go to:') || 
-              message.includes('Starting server') ||
-              message.includes('Server started') ||
-              message.includes('Running on') ||
-              (message.includes('[COMFY]') && (message.includes('Running on') || message.includes('Server started')))) {
-            setIsRestarting(false);
-            setLogs(prev => [...prev, '[APP] ComfyUI restarted successfully']);
+            // Check if ComfyUI is ready - look for messages indicating server started
+            if (message.includes('To see the GUI go to:') || 
+                message.includes('Starting server') ||
+                message.includes('Server started') ||
+                message.includes('Running on') ||
+                (message.includes('[COMFY]') && (message.includes('Running on') || message.includes('Server started')))) {
+              setIsRestarting(false);
+              setLogs(prev => [...prev, '[APP] ComfyUI restarted successfully']);
             
-            // Close event source
-            if (restartEventSourceRef.current) {
-              restartEventSourceRef.current.close();
-              restartEventSourceRef.current = null;
-            }
+              // Close event source
+              if (restartEventSourceRef.current) {
+                restartEventSourceRef.current.close();
+                restartEventSourceRef.current = null;
+              }
             
-            // Redirect to active page after a short delay
-            setTimeout(() => {
-              router.push('/active');
-            }, 2000);
+              // Redirect to active page after a short delay
+              setTimeout(() => {
+                router.push('/active');
+              }, 2000);
+              break;
+            }
           }
         } catch (error) {
           console.error('Error parsing log data:', error);
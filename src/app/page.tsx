@@ -4,7 +4,7 @@ import { useEffect, useState, useRef } from 'react';
 import { useRouter } from 'next/navigation';
 import { Container, Title, Text, Select, Button, Group, Stack, Paper, ScrollArea, Badge, Menu, ActionIcon, Modal, TextInput, Tooltip, Textarea } from '@mantine/core';
 import { notifications } from '@mantine/notifications';
-import { RiCheckLine, RiErrorWarningLine, RiRefreshLine, RiCheckboxCircleFill, RiCloseLine, RiAddLine, RiFileCodeLine, RiArrowRightLine, RiMoreFill, RiPencilLine, RiDeleteBinLine, RiDownloadLine, RiInformationLine, RiCodeLine, RiHistoryLine, RiFileCopyLine, RiTerminalBoxLine } from 'react-icons/ri';
+import { RiCheckLine, RiErrorWarningLine, RiRefreshLine, RiCheckboxCircleFill, RiCloseLine, RiAddLine, RiFileCodeLine, RiArrowRightLine, RiMoreFill, RiPencilLine, RiDeleteBinLine, RiDownloadLine, RiInformationLine, RiCodeLine, RiHistoryLine, RiFileCopyLine, RiTerminalBoxLine, RiArchiveLine } from 'react-icons/ri';
 import CreateSpaceModal from './components/CreateSpaceModal';
 import ImportJsonModal from './components/ImportJsonModal';
 
@@ -15,8 +15,11 @@ interface SpaceInfo {
   lastUpdated: string;
   path: string;
   comfyUIVersion: string;
+  diskUsage?: { totalBytes: number; sharedBytes: number; scannedAt: string } | null;
 }
 
+type SpaceSortOrder = 'updated' | 'disk';
+
 interface SpacesData {
   spaces: SpaceInfo[];
   selectedVersion: string;
@@ -31,6 +34,7 @@ export default function Home() {
   const router = useRouter();
   const [spaces, setSpaces] = useState<SpacesData | null>(null);
   const [selectedSpace, setSelectedSpace] = useState<string>('');
+  const [spaceSortOrder, setSpaceSortOrder] = useState<SpaceSortOrder>('updated');
   const [isActivating, setIsActivating] = useState(false);
   const [logs, setLogs] = useState<LogEntry[]>([]);
   const [showLogs, setShowLogs] = useState(false);
@@ -112,6 +116,17 @@ export default function Home() {
     }
   };
 
+  const formatBytes = (bytes: number) => {
+    const units = ['B', 'KB', 'MB', 'GB', 'TB'];
+    let value = bytes;
+    let unitIndex = 0;
+    while (value >= 1024 && unitIndex < units.length - 1) {
+      value /= 1024;
+      unitIndex++;
+    }
+    return `${value.toFixed(unitIndex === 0 ? 0 : 1)} ${units[unitIndex]}`;
+  };
+
   // Auto-scroll to bottom when new logs arrive
   useEffect(() => {
     if (logsEndRef.current) {
@@ -207,46 +222,52 @@ export default function Home() {
 
       eventSource.onmessage = (event) => {
         try {
-          const logEntry: LogEntry = JSON.parse(event.data);
-          setLogs((prev) => [...prev, logEntry]);
+          // The activation stream batches several lines into one { logs: [...] } event
+          const data = JSON.parse(event.data);
+          const logEntries: LogEntry[] = Array.isArray(data.logs) ? data.logs : [data];
+          setLogs((prev) => [...prev, ...logEntries]);
           
-          // Check if activation was cancelled
-          if (logEntry.message.includes('Activation cancelled by user')) {
-            setIsActivating(false);
-            setIsComfyUIReady(false);
-            setActivationFailed(false);
-            notifications.show({
-              title: 'Cancelled',
-              message: 'Activation cancelled',
-              color: 'orange',
-              icon: <RiCloseLine size={18} />,
-              autoClose: 5000,
-            });
-            return;
-          }
+          // Markers are handled line by line like separate events; a marker ends the
+          // checks for its own line only, so later lines in the batch are still seen
+          for (const logEntry of logEntries) {
+            // Check if activation was cancelled
+            if (logEntry.message.includes('Activation cancelled by user')) {
+              setIsActivating(false);
+              setIsComfyUIReady(false);
+              setActivationFailed(false);
+              notifications.show({
+                title: 'Cancelled',
+                message: 'Activation cancelled',
+                color: 'orange',
+                icon: <RiCloseLine size={18} />,
+                autoClose: 5000,
+              });
+              continue;
+            }
           
-          // Check for activation failures
-          const message = logEntry.message;
-          if (message.includes('[ERROR]') || 
-              message.includes('Failed to install dependencies') ||
-              message.includes('ERROR:') ||
-              message.includes('ResolutionImpossible') ||
-              message.includes('Activation failed')) {
-            setActivationFailed(true);
-            setIsActivating(false);
-            setIsComfyUIReady(false);
-            return;
-          }
+            // Check for activation failures
+            const message = logEntry.message;
+            if (message.includes('[ERROR]') || 
+                message.includes('Failed to install dependencies') ||
+                message.includes('ERROR:') ||
+                message.includes('ResolutionImpossible') ||
+                message.includes('Activation failed')) {
+              setActivationFailed(true);
+              setIsActivating(false);
+              setIsComfyUIReady(false);
+              continue;
+            }
           
-          // Check if ComfyUI is ready - look for messages in both APP and COMFY logs
-          if (message.includes('To see the GUI go to:') || 
-              message.includes('Starting server') ||
-              message.includes('Server started') ||
-              message.includes('Running on') ||
-              (message.includes('[COMFY]') && (message.includes('Running on') || message.includes('Server started')))) {
-            setIsComfyUIReady(true);
-            setIsActivating(false);
-            setActivationFailed(false);
+            // Check if ComfyUI is ready - look for messages in both APP and COMFY logs
+            if (message.includes('To see the GUI go to:') || 
+                message.includes('Starting server') ||
+                message.includes('Server started') ||
+                message.includes('Running on') ||
+                (message.includes('[COMFY]') && (message.includes('Running on') || message.includes('Server started')))) {
+              setIsComfyUIReady(true);
+              setIsActivating(false);
+              setActivationFailed(false);
+            }
           }
         } catch (error) {
           console.error('Error parsing log data:', error);
@@ -321,6 +342,23 @@ export default function Home() {
 
   const isActivateEnabled = !!selectedSpace;
 
+  const handleExportBundle = (space: SpaceInfo) => {
+    // Bundles can be gigabytes, so the browser downloads the stream directly instead of into a blob
+    const a = document.createElement('a');
+    a.href = `/api/spaces/${encodeURIComponent(space.name)}/export?format=bundle`;
+    document.body.appendChild(a);
+    a.click();
+    document.body.removeChild(a);
+
+    notifications.show({
+      title: 'Export Started',
+      message: `Bundling "${space.visibleName || space.name}" with its nodes and wheels, this can take a while`,
+      color: 'blue',
+      icon: <RiArchiveLine size={18} />,
+      autoClose: 5000,
+    });
+  };
+
   const handleExportJson = async (space: SpaceInfo) => {
     try {
       const response = await fetch(`/api/spaces/${encodeURIComponent(space.name)}/export`);
@@ -858,7 +896,41 @@ export default function Home() {
           {spaces?.spaces && spaces.spaces.length > 0 ? (
             <Paper p="md" style={{ backgroundColor: '#111111', border: '1px solid #333333', width: '50%', margin: '0 auto' }}>
               <Stack gap="xs">
+                <Group justify="flex-end" gap="xs">
+                  <Text size="xs" c="#888888">Sort by</Text>
+                  <Select
+                    size="xs"
+                    w={150}
+                    data={[
+                      { value: 'updated', label: 'Last updated' },
+                      { value: 'disk', label: 'Disk usage' },
+                    ]}
+                    value={spaceSortOrder}
+                    onChange={(value) => setSpaceSortOrder((value as SpaceSortOrder) || 'updated')}
+                    allowDeselect={false}
+                    styles={{
+                      input: {
+                        backgroundColor: '#25262b',
+                        border: '1px solid #373a40',
+                        color: '#ffffff',
+                      },
+                      dropdown: { backgroundColor: '#25262b', border: '1px solid #373a40' },
+                      option: {
+                        backgroundColor: '#25262b',
+                        color: '#ffffff',
+                      },
+                    }}
+                  />
+                </Group>
                 {[...spaces.spaces].sort((a, b) => {
+                  if (spaceSortOrder === 'disk') {
+                    // Largest first; spaces not measured yet go last
+                    const sizeA = a.diskUsage?.totalBytes ?? -1;
+                    const sizeB = b.diskUsage?.totalBytes ?? -1;
+                    if (sizeA !== sizeB) {
+                      return sizeB - sizeA;
+                    }
+                  }
                   const dateA = a.lastUpdated === 'Unknown' ? 0 : new Date(a.lastUpdated).getTime();
                   const dateB = b.lastUpdated === 'Unknown' ? 0 : new Date(b.lastUpdated).getTime();
                   return dateB - dateA; // Sort descending (most recent first)
@@ -933,6 +1005,16 @@ export default function Home() {
                                 >
                                   Export Json
                                 </Menu.Item>
+                                <Menu.Item
+                                  leftSection={<RiArchiveLine size={16} />}
+                                  style={{ color: '#ffffff' }}
+                                  onClick={(e) => {
+                                    e.stopPropagation();
+                                    handleExportBundle(space);
+                                  }}
+                                >
+                                  Export offline bundle
+                                </Menu.Item>
                                 <Menu.Item
                                   leftSection={<RiCodeLine size={16} />}
                                   style={{ color: '#ffffff' }}
@@ -1039,6 +1121,16 @@ export default function Home() {
                           <Text size="xs" c="#888888">
                             Updated: {formatDate(space.lastUpdated)}
                           </Text>
+                          {space.diskUsage && (
+                            <Tooltip
+                              label={`${formatBytes(space.diskUsage.sharedBytes)} shared with other spaces or caches through hardlinks. Measured ${formatDate(space.diskUsage.scannedAt)}`}
+                              withArrow
+                            >
+                              <Text size="xs" c="#888888" style={{ whiteSpace: 'nowrap' }}>
+                                Disk: {formatBytes(space.diskUsage.totalBytes)}
+                              </Text>
+                            </Tooltip>
+                          )}
                           <Text size="xs" c="#888888" style={{ fontFamily: 'monospace' }} truncate>
                             {space.path}
                           </Text>